@@ -17,6 +17,7 @@ Usos comunes:
       python manage.py limpiar_propietarios --viviendas V004 V005 --dry-run
 """
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from django.utils import timezone
 from datetime import date
 
@@ -81,8 +82,14 @@ class Command(BaseCommand):
                 f"Eliminados definitivamente {total} propietarios activos."
             ))
         else:
+            from core.services.saldos_deudas import invalidar_saldos
+
             hoy = date.today()
-            qs.update(activo=False, fecha_fin_tenencia=hoy)
+            # update() no emite señales: los saldos de esas personas se invalidan aquí
+            with transaction.atomic():
+                personas = list(qs.values_list('persona_id', flat=True))
+                qs.update(activo=False, fecha_fin_tenencia=hoy)
+                invalidar_saldos(personas)
             self.stdout.write(self.style.SUCCESS(
                 f"Desactivados {total} propietarios (activo=False, fecha_fin_tenencia={hoy})."
             ))
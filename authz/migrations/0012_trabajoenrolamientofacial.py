@@ -0,0 +1,39 @@
+# Generated by Django 5.2.6 on 2026-10-17 18:40
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authz', '0011_alter_persona_reconocimiento_facial_activo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrabajoEnrolamientoFacial',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('PROCESANDO', 'Procesando'), ('COMPLETADO', 'Completado'), ('ERROR', 'Error')], default='PENDIENTE', max_length=20)),
+                ('total_fotos', models.PositiveIntegerField(default=0)),
+                ('fotos_procesadas', models.PositiveIntegerField(default=0)),
+                ('encodings_agregados', models.PositiveIntegerField(default=0)),
+                ('resultados', models.JSONField(blank=True, default=list, help_text='Resultado por foto: calidad, rostro detectado, url, error')),
+                ('error', models.TextField(blank=True)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+                ('fecha_finalizacion', models.DateTimeField(blank=True, null=True)),
+                ('persona', models.ForeignKey(help_text='Persona (propietario o familiar) a la que se agregan los encodings', on_delete=django.db.models.deletion.CASCADE, related_name='trabajos_enrolamiento', to='authz.persona')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trabajos_enrolamiento', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Trabajo de Enrolamiento Facial',
+                'verbose_name_plural': 'Trabajos de Enrolamiento Facial',
+                'db_table': 'authz_trabajo_enrolamiento_facial',
+                'ordering': ['-fecha_creacion'],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.6 on 2026-10-17 18:57
+
+import core.fields
+from django.db import migrations
+
+
+def copiar_encodings(apps, schema_editor):
+    # JSON / base64 -> float32 binario; el campo de origen se conserva
+    core.fields.rellenar_encodings(apps.get_model('authz', 'Persona'), 'encoding_facial')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authz', '0012_trabajoenrolamientofacial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='persona',
+            name='encodings',
+            field=core.fields.EncodingsFacialesField(blank=True, help_text='Copia float32 de encoding_facial para cargar la galería sin parsear JSON', null=True),
+        ),
+        migrations.RunPython(copiar_encodings, migrations.RunPython.noop),
+    ]
@@ -5,8 +5,11 @@ from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
 import secrets
+import uuid
 import string
 from django.utils import timezone
+
+from core.fields import EncodingsFacialesField, sincronizar_encodings
         # Mover imágenes de reconocimiento facial a la carpeta definitiva del propietario en Dropbox
 
 
@@ -60,6 +63,7 @@ class Persona(models.Model):
     # Campos para reconocimiento facial
     foto_perfil = models.CharField(max_length=512, blank=True, null=True, help_text="URL pública de la foto de perfil (Dropbox)")
     encoding_facial = models.JSONField(blank=True, null=True, help_text="Lista de codificaciones faciales para reconocimiento (puede ser una lista de listas)")
+    encodings = EncodingsFacialesField(null=True, blank=True, help_text="Copia float32 de encoding_facial para cargar la galería sin parsear JSON")
     def agregar_encoding_facial(self, nuevo_encoding):
         """
         Agrega un nuevo encoding facial sin sobrescribir los existentes
@@ -123,6 +127,10 @@ class Persona(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    def save(self, *args, **kwargs):
+        sincronizar_encodings(self, 'encoding_facial', kwargs)
+        super().save(*args, **kwargs)
+
     class Meta:
         db_table = 'authz_persona'
         verbose_name = 'Persona'
@@ -688,4 +696,52 @@ class SolicitudRegistroPropietario(models.Model):
             logger = logging.getLogger(__name__)
             logger.error(f"[ERROR] aprobar_solicitud: {e}")
             print(f"[ERROR] aprobar_solicitud: {e}")
-            raise
\ No newline at end of file
+            raise
+
+
+class TrabajoEnrolamientoFacial(models.Model):
+    """Trabajo en segundo plano que procesa un lote de fotos de enrolamiento facial"""
+    ESTADO_CHOICES = [
+        ('PENDIENTE', 'Pendiente'),
+        ('PROCESANDO', 'Procesando'),
+        ('COMPLETADO', 'Completado'),
+        ('ERROR', 'Error'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='trabajos_enrolamiento'
+    )
+    persona = models.ForeignKey(
+        Persona,
+        on_delete=models.CASCADE,
+        related_name='trabajos_enrolamiento',
+        help_text="Persona (propietario o familiar) a la que se agregan los encodings"
+    )
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='PENDIENTE')
+    total_fotos = models.PositiveIntegerField(default=0)
+    fotos_procesadas = models.PositiveIntegerField(default=0)
+    encodings_agregados = models.PositiveIntegerField(default=0)
+    resultados = models.JSONField(default=list, blank=True, help_text="Resultado por foto: calidad, rostro detectado, url, error")
+    error = models.TextField(blank=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+    fecha_finalizacion = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'authz_trabajo_enrolamiento_facial'
+        verbose_name = 'Trabajo de Enrolamiento Facial'
+        verbose_name_plural = 'Trabajos de Enrolamiento Facial'
+        ordering = ['-fecha_creacion']
+
+    def __str__(self):
+        return f"Enrolamiento {self.id} - {self.persona.nombre_completo} ({self.estado})"
+
+    @property
+    def progreso(self):
+        """Porcentaje de fotos procesadas"""
+        if not self.total_fotos:
+            return 100.0
+        return round(100.0 * self.fotos_procesadas / self.total_fotos, 1)
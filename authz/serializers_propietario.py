@@ -3,6 +3,7 @@ Serializers específicos para el registro de propietarios
 Incluye formularios para propietarios, familiares y reconocimiento facial
 """
 from typing import Dict, cast, Any
+import logging
 import os
 from rest_framework import serializers
 from django.contrib.auth.password_validation import validate_password
@@ -12,10 +13,11 @@ from django.db import transaction
 from .models import (
     Usuario, Persona, FamiliarPropietario, 
     SolicitudRegistroPropietario, Rol,
-    RelacionesPropietarioInquilino
+    RelacionesPropietarioInquilino, TrabajoEnrolamientoFacial
 )
 from core.models.propiedades_residentes import Vivienda, Propiedad
 
+logger = logging.getLogger(__name__)
 
 
 class PersonaSimpleSerializer(serializers.ModelSerializer):
@@ -184,10 +186,6 @@ class RegistroPropietarioInicialSerializer(serializers.Serializer):
         persona = Persona.objects.create(**persona_data)
         print(f"🔍 DEBUG: Persona creada: {persona}")
 
-        # Procesar fotos si se proporcionan
-        if fotos_base64:
-            self._procesar_fotos_reconocimiento(persona, fotos_base64)
-
         # Crear usuario
         print(f"🔍 DEBUG: Creando usuario con email: {validated_data['email']}")
         usuario = Usuario.objects.create_user(
@@ -198,6 +196,10 @@ class RegistroPropietarioInicialSerializer(serializers.Serializer):
         )
         print(f"🔍 DEBUG: Usuario creado: {usuario}")
 
+        # Procesar fotos si se proporcionan (en segundo plano)
+        if fotos_base64:
+            self._procesar_fotos_reconocimiento(persona, fotos_base64, usuario)
+
         # Crear solicitud de registro con los campos correctos del modelo
         solicitud_data = {
             'nombres': validated_data['primer_nombre'],
@@ -226,47 +228,36 @@ class RegistroPropietarioInicialSerializer(serializers.Serializer):
         print(f"🔍 DEBUG: Retornando resultado: {type(resultado)}")
         return resultado
 
-    def _procesar_fotos_reconocimiento(self, persona, fotos_base64):
-        """Procesar fotos de reconocimiento facial"""
+    def _procesar_fotos_reconocimiento(self, persona, fotos_base64, usuario):
+        """
+        Encolar las fotos de reconocimiento facial como un trabajo de
+        enrolamiento por lotes, para no calcular los encodings dentro del request
+        """
         if not fotos_base64:
-            return
+            return None
         
-        try:
-            # Intentar importar servicios necesarios
+        import base64
+        from core.services.enrolamiento_service import crear_trabajo
+        
+        fotos = []
+        for idx, foto_base64 in enumerate(fotos_base64):
             try:
-                from core.utils.face_encoding import generate_face_encoding_from_base64
-                # Servicio de reconocimiento facial disponible
-                print("Usando servicio de reconocimiento facial básico")
-            except ImportError:
-                # Si no existe el servicio, usar función dummy
-                print("Servicio de reconocimiento facial no disponible")
-                return
-            
-            encodings = []
-            
-            for idx, foto_base64 in enumerate(fotos_base64):
-                try:
-                    encoding = generate_face_encoding_from_base64(foto_base64)
-                    if encoding:
-                        encodings.append(encoding)
-                except Exception as e:
-                    print(f"Error procesando foto {idx}: {e}")
-            
-            if encodings:
-                # Usar el método del modelo para agregar encodings de forma segura
-                try:
-                    for enc in encodings:
-                        if persona.agregar_encoding_facial(enc):
-                            print(f"Encoding facial agregado correctamente para persona {persona.documento_identidad}")
-                        else:
-                            print(f"Error agregando encoding facial")
-                except Exception as e:
-                    print(f"Error guardando encodings: {e}")
-                    
-        except ImportError:
-            print("Servicio de reconocimiento facial no disponible")
-        except Exception as e:
-            print(f"Error procesando fotos: {e}")
+                if ';base64,' in foto_base64:
+                    format_str, foto_base64 = foto_base64.split(';base64,')
+                    ext = format_str.split('/')[-1]
+                else:
+                    ext = 'jpg'
+                fotos.append((f'registro_{idx}.{ext}', base64.b64decode(foto_base64)))
+            except Exception as e:
+                print(f"Error decodificando foto {idx}: {e}")
+        
+        if not fotos:
+            return None
+        
+        # Sin subida a Dropbox: en el registro solo se guardan los encodings
+        trabajo = crear_trabajo(usuario, persona, fotos, subir_fotos=False)
+        logger.debug("Trabajo de enrolamiento %s encolado con %s fotos", trabajo.id, len(fotos))
+        return trabajo
 
 
 class FamiliarRegistroSerializer(serializers.Serializer):
@@ -806,6 +797,22 @@ class StatusSolicitudSerializer(serializers.ModelSerializer):
         return FamiliarPropietario.objects.filter(solicitud=obj).count()
 
 
+class TrabajoEnrolamientoFacialSerializer(serializers.ModelSerializer):
+    """Serializer para consultar el estado de un trabajo de enrolamiento por lotes"""
+    
+    trabajo_id = serializers.UUIDField(source='id', read_only=True)
+    persona_nombre = serializers.CharField(source='persona.nombre_completo', read_only=True)
+    progreso = serializers.FloatField(read_only=True)
+    
+    class Meta:
+        model = TrabajoEnrolamientoFacial
+        fields = [
+            'trabajo_id', 'estado', 'persona', 'persona_nombre', 'progreso',
+            'total_fotos', 'fotos_procesadas', 'encodings_agregados', 'resultados',
+            'error', 'fecha_creacion', 'fecha_actualizacion', 'fecha_finalizacion'
+        ]
+
+
 class SolicitudDetailSerializer(serializers.ModelSerializer):
     """Serializer para mostrar detalles completos de solicitud a administradores"""
     
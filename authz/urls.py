@@ -13,7 +13,9 @@ from .views_propietario import (
     DetallePropietarioView,
     MiInformacionPropietarioView,
     MisFotosPropietarioView,
-    SubirFotoPropietarioView
+    SubirFotoPropietarioView,
+    EnrolamientoLoteView,
+    EstadoEnrolamientoView
 )
 from .views_propietario_dropbox import (
     SubirFotoPropietarioDropboxView,
@@ -64,6 +66,8 @@ urlpatterns = [
     path('propietarios/mi-informacion/', MiInformacionPropietarioView.as_view(), name='mi-informacion-propietario'),
     path('propietarios/mis-fotos/', MisFotosDropboxView.as_view(), name='mis-fotos-propietario'),
     path('propietarios/subir-foto/', SubirFotoPropietarioDropboxView.as_view(), name='subir-foto-propietario'),
+    path('propietarios/enrolamiento-lote/', EnrolamientoLoteView.as_view(), name='enrolamiento-lote'),
+    path('propietarios/enrolamiento-lote/<uuid:trabajo_id>/', EstadoEnrolamientoView.as_view(), name='estado-enrolamiento-lote'),
     
     # ===== PANEL PROPIETARIO - ENDPOINTS LEGACY (BACKUP) =====
     path('propietarios/mis-fotos-legacy/', MisFotosPropietarioView.as_view(), name='mis-fotos-propietario-legacy'),
@@ -15,7 +15,7 @@ from django.utils import timezone
 from django.shortcuts import get_object_or_404
 from drf_spectacular.utils import extend_schema, OpenApiResponse
 
-from .models import SolicitudRegistroPropietario, FamiliarPropietario, Usuario, Rol
+from .models import SolicitudRegistroPropietario, FamiliarPropietario, Usuario, Rol, TrabajoEnrolamientoFacial
 from .serializers_propietario import (
     RegistroPropietarioInicialSerializer,
     SolicitudRegistroPropietarioSerializer,
@@ -23,7 +23,8 @@ from .serializers_propietario import (
     SolicitudDetailSerializer,
     AprobarSolicitudSerializer,
     RechazarSolicitudSerializer,
-    PropietarioDetalleSerializer
+    PropietarioDetalleSerializer,
+    TrabajoEnrolamientoFacialSerializer
 )
 # ...existing code...
 
@@ -938,6 +939,122 @@ class SubirFotoPropietarioView(APIView):
             }, status=500)
 
 
+
+class EnrolamientoLoteView(APIView):
+    """Vista para enrolar un lote de fotos de reconocimiento facial en segundo plano"""
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser, FormParser]
+    
+    @extend_schema(
+        summary="Enrolamiento facial por lotes",
+        description=(
+            "Recibe varias fotos (campo 'fotos') del propietario o de uno de sus familiares "
+            "('persona_id') y responde de inmediato con el ID del trabajo. La detección, "
+            "el control de calidad y la subida a Dropbox se hacen en segundo plano."
+        ),
+        responses={
+            202: OpenApiResponse(description="Trabajo de enrolamiento creado"),
+            400: OpenApiResponse(description="Error en los datos enviados"),
+            404: OpenApiResponse(description="Persona no encontrada"),
+            401: OpenApiResponse(description="No autorizado")
+        }
+    )
+    def post(self, request):
+        """Crear trabajo de enrolamiento con las fotos enviadas"""
+        from core.services.enrolamiento_service import crear_trabajo
+        
+        usuario = request.user
+        fotos = request.FILES.getlist('fotos')
+        if not fotos:
+            return Response({
+                'success': False,
+                'error': 'No se proporcionó ninguna foto'
+            }, status=400)
+        
+        max_fotos = getattr(settings, 'ENROLAMIENTO_MAX_FOTOS', 20)
+        if len(fotos) > max_fotos:
+            return Response({
+                'success': False,
+                'error': f'Se permiten como máximo {max_fotos} fotos por lote'
+            }, status=400)
+        
+        # Validar formato y tamaño de cada foto
+        allowed_extensions = ['.jpg', '.jpeg', '.png', '.gif']
+        for foto in fotos:
+            file_extension = foto.name.lower().split('.')[-1]
+            if f'.{file_extension}' not in allowed_extensions:
+                return Response({
+                    'success': False,
+                    'error': f'Formato de imagen no válido en {foto.name}. Solo se permiten JPG, PNG, GIF.'
+                }, status=400)
+            if foto.size > 5 * 1024 * 1024:  # 5MB
+                return Response({
+                    'success': False,
+                    'error': f'La imagen {foto.name} es demasiado grande. Máximo 5MB.'
+                }, status=400)
+        
+        # Persona a enrolar: el propio usuario o uno de sus familiares
+        persona_id = request.data.get('persona_id')
+        if persona_id:
+            familiar = FamiliarPropietario.objects.filter(
+                propietario=usuario, persona_id=persona_id
+            ).select_related('persona').first()
+            if not familiar:
+                return Response({
+                    'success': False,
+                    'error': 'La persona indicada no es un familiar registrado de este propietario'
+                }, status=404)
+            persona = familiar.persona
+        else:
+            persona = usuario.persona
+            if not persona:
+                return Response({
+                    'success': False,
+                    'error': 'El usuario no tiene una persona asociada'
+                }, status=404)
+        
+        trabajo = crear_trabajo(usuario, persona, [(foto.name, foto.read()) for foto in fotos])
+        
+        return Response({
+            'success': True,
+            'message': 'Fotos recibidas, el enrolamiento se procesa en segundo plano',
+            'data': {
+                'trabajo_id': str(trabajo.id),
+                'estado': trabajo.estado,
+                'total_fotos': trabajo.total_fotos,
+                'estado_url': request.build_absolute_uri(
+                    f'{request.path.rstrip("/")}/{trabajo.id}/'
+                )
+            }
+        }, status=202)
+
+
+class EstadoEnrolamientoView(APIView):
+    """Vista para consultar el progreso de un trabajo de enrolamiento por lotes"""
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+    
+    @extend_schema(
+        summary="Estado del enrolamiento facial por lotes",
+        description="Progreso y resultado por foto de un trabajo de enrolamiento del usuario",
+        responses={
+            200: TrabajoEnrolamientoFacialSerializer,
+            404: OpenApiResponse(description="Trabajo no encontrado"),
+            401: OpenApiResponse(description="No autorizado")
+        }
+    )
+    def get(self, request, trabajo_id):
+        """Consultar estado del trabajo"""
+        trabajo = get_object_or_404(
+            TrabajoEnrolamientoFacial.objects.select_related('persona'),
+            id=trabajo_id, usuario=request.user
+        )
+        return Response({
+            'success': True,
+            'data': TrabajoEnrolamientoFacialSerializer(trabajo).data
+        })
+
 # ==================== VISTAS MEJORADAS PARA IA ====================
 
 class ReconocimientoFacialIAView(APIView):
@@ -0,0 +1,14 @@
+"""
+Configuración de la suite de benchmarks (pytest-benchmark)
+
+    pip install pytest-benchmark
+    pytest benchmarks --benchmark-columns=median,ops,rounds
+
+BENCH_FACE_PERSONAS (p. ej. "100,1000,10000,100000") define los tamaños de galería.
+"""
+import os
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+django.setup()
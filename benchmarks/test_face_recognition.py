@@ -0,0 +1,57 @@
+"""
+Benchmarks del camino de match del reconocimiento facial
+
+Misma semilla en cada corrida para que las regresiones se vean al comparar
+(``pytest benchmarks --benchmark-autosave`` y ``--benchmark-compare``).
+"""
+import itertools
+import os
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from seguridad.services import face_benchmark  # noqa: E402
+
+TAMANOS = [int(p) for p in os.getenv('BENCH_FACE_PERSONAS', '100,1000,10000').split(',')]
+SONDAS = 200
+
+
+@pytest.fixture(scope='module', params=TAMANOS, ids=lambda p: f'{p}_personas')
+def galeria(request):
+    personas = face_benchmark.generar_galeria(request.param)
+    sondas, esperados = face_benchmark.generar_sondas(personas, SONDAS)
+    return personas, sondas, esperados
+
+
+@pytest.fixture(scope='module')
+def imagenes():
+    return [face_benchmark.generar_imagen_sonda(semilla=face_benchmark.SEMILLA + i) for i in range(5)]
+
+
+def _correr(benchmark, escenario, galeria, imagenes=None):
+    personas, sondas, esperados = galeria
+    try:
+        funcion, entradas = face_benchmark.ESCENARIOS[escenario](personas, sondas, imagenes or [])
+    except face_benchmark.EscenarioNoDisponible as e:
+        pytest.skip(str(e))
+
+    entradas_ciclicas = itertools.cycle(entradas)
+    benchmark.extra_info['encodings'] = sum(len(p['encodings']) for p in personas)
+    benchmark(lambda: funcion(next(entradas_ciclicas)))
+
+    if imagenes is None:
+        # Verifica que el camino medido siga reconociendo a las personas
+        metricas = face_benchmark.medir(funcion, sondas, calentamiento=0, esperados=esperados.tolist())
+        benchmark.extra_info['precision'] = metricas['precision']
+        assert metricas['precision'] >= 0.95
+
+
+@pytest.mark.parametrize('escenario', ['galeria_exacta', 'galeria_ivf', 'acceso_visita', 'tiempo_real_match', 'predecir_svc'])
+def test_match_encodings(benchmark, galeria, escenario):
+    _correr(benchmark, escenario, galeria)
+
+
+@pytest.mark.parametrize('escenario', ['tiempo_real_imagen', 'verify_faces'])
+def test_match_imagenes(benchmark, galeria, imagenes, escenario):
+    _correr(benchmark, escenario, galeria, imagenes)
@@ -1,17 +1,79 @@
-from rest_framework import generics, permissions
+from datetime import datetime
+from itertools import islice
+
+from django.utils import timezone
+from rest_framework import generics, permissions, status
+from rest_framework.response import Response
+
 from core.models.administracion import BitacoraAcciones, LogSistema
+from core.services.archivo_bitacora import iterar
+from seguridad.services.paginacion_cursor import CursorInvalido, codificar_cursor, decodificar_cursor
 from .serializers import BitacoraAccionesSerializer, LogSistemaSerializer
 
+# Registros máximos por página (solo con ?limit= o ?cursor=)
+MAX_LIMITE = 500
+
+
 class IsAdminUser(permissions.BasePermission):
     def has_permission(self, request, view):
         return request.user and request.user.is_authenticated and request.user.is_staff
 
-class BitacoraAccionesListView(generics.ListAPIView):
+
+class HistorialArchivadoMixin:
+    """
+    Lista una fuente de bitácora incluyendo los registros ya archivados
+
+    GET ?desde=&hasta= (ISO): la lista completa, como siempre. Con ``limit`` o
+    ``cursor`` la respuesta se pagina: ``{'results': [...], 'next': url}``.
+    """
+    fuente = None
+
+    def list(self, request, *args, **kwargs):
+        paginar = 'limit' in request.GET or 'cursor' in request.GET
+        try:
+            limite = min(max(int(request.GET.get('limit', MAX_LIMITE)), 1), MAX_LIMITE)
+            desde = self._fecha(request.GET.get('desde'))
+            hasta = self._fecha(request.GET.get('hasta'))
+            cursor = request.GET.get('cursor')
+            antes = decodificar_cursor(cursor) if cursor else None
+        except (ValueError, CursorInvalido) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        registros = iterar(self.fuente, desde, hasta, antes)
+        if not paginar:
+            return Response(self.get_serializer(list(registros), many=True).data)
+
+        registros = list(islice(registros, limite + 1))
+        next_url = None
+        if len(registros) > limite:
+            registros = registros[:limite]
+            ultimo = registros[-1]
+            parametros = request.GET.copy()
+            parametros['cursor'] = codificar_cursor(ultimo.fecha_hora, ultimo.pk)
+            next_url = request.build_absolute_uri(f"{request.path}?{parametros.urlencode()}")
+
+        return Response({
+            'results': self.get_serializer(registros, many=True).data,
+            'next': next_url,
+        })
+
+    @staticmethod
+    def _fecha(valor):
+        if not valor:
+            return None
+        fecha = datetime.fromisoformat(valor.replace('Z', '+00:00'))
+        return timezone.make_aware(fecha) if timezone.is_naive(fecha) else fecha
+
+
+class BitacoraAccionesListView(HistorialArchivadoMixin, generics.ListAPIView):
     queryset = BitacoraAcciones.objects.all().order_by('-fecha_hora')
     serializer_class = BitacoraAccionesSerializer
     permission_classes = [IsAdminUser]
+    fuente = 'core_bitacora'
+
 
-class LogSistemaListView(generics.ListAPIView):
+class LogSistemaListView(HistorialArchivadoMixin, generics.ListAPIView):
     queryset = LogSistema.objects.all().order_by('-fecha_hora')
     serializer_class = LogSistemaSerializer
     permission_classes = [IsAdminUser]
+    fuente = 'core_log_sistema'
@@ -7,13 +7,14 @@ from rest_framework import status, permissions
 from django.utils import timezone
 from core.api.visitas.acceso_facial_serializer import AccesoFacialSerializer
 from core.models.propiedades_residentes import Visita
+from seguridad.services.gallery_sync import GALERIA_VISITAS, obtener_galeria_sincronizada
+from seguridad.services.provider_registry import obtener_provider_tiempo_real
 from authz.models import Persona
 
 class ReconocerAccesoVisitaAPIView(APIView):
     permission_classes = [permissions.AllowAny]
 
     def post(self, request, *args, **kwargs):
-        import face_recognition
         print("[DEBUG] Usuario autenticado:", getattr(request.user, 'email', str(request.user)))
         serializer = AccesoFacialSerializer(data=request.data)
         if not serializer.is_valid():
@@ -24,8 +25,7 @@ class ReconocerAccesoVisitaAPIView(APIView):
         imagen_acceso = validated['imagen_acceso']
         try:
             # Codificar rostro de la imagen recibida
-            img = face_recognition.load_image_file(imagen_acceso)
-            encodings = face_recognition.face_encodings(img)
+            encodings = obtener_provider_tiempo_real().codificar_rostros(imagen_acceso.read())
             if not encodings:
                 return Response({'detail': 'No se detectó ningún rostro en la imagen.'}, status=400)
             encoding_acceso = encodings[0]
@@ -33,45 +33,19 @@ class ReconocerAccesoVisitaAPIView(APIView):
         except Exception as e:
             return Response({'detail': f'Error procesando la imagen: {str(e)}'}, status=400)
 
-        # Buscar visitas programadas o en curso
-        visitas = Visita.objects.filter(estado__in=['programada', 'en_curso'])
-        print(f"[DEBUG] Visitas a evaluar: {[getattr(v, 'id', None) for v in visitas]}")
-        from core.utils.download_image import download_image_from_url
-        mejor_distancia = 1.0
+        # Galería de visitas programadas o en curso, actualizada por deltas
+        galeria = obtener_galeria_sincronizada(GALERIA_VISITAS).sincronizar()
+        print(f"[DEBUG] Galería de visitas: {galeria.total_personas} visitas, {len(galeria)} encodings")
+
+        # Una sola comparación vectorizada contra todas las visitas
         visita_match = None
-        for visita in visitas:
-            print(f"[DEBUG] Evaluando visita {getattr(visita, 'id', None)} - {getattr(visita, 'nombre_visitante', '')}")
-            urls = visita.fotos_reconocimiento or []
-            encodings_db = []
-            for url in urls:
-                try:
-                    img_file = download_image_from_url(url)
-                    print(f"[DEBUG] Descargada imagen de Dropbox: {url}")
-                    img = face_recognition.load_image_file(img_file)
-                    encs = face_recognition.face_encodings(img)
-                    if encs:
-                        print(f"[DEBUG] Se detectó rostro en imagen: {url}")
-                        encodings_db.append(encs[0])
-                    else:
-                        print(f"[DEBUG] No se detectó rostro en imagen: {url}")
-                except Exception as e:
-                    print(f"[DEBUG] Error al procesar imagen {url}: {e}")
-                    continue
-            if not encodings_db:
-                print(f"[DEBUG] Ningún encoding facial válido para visita {getattr(visita, 'id', None)}")
-                continue
-            encodings_db_np = np.array(encodings_db)
-            if len(encodings_db_np.shape) == 1:
-                encodings_db_np = np.expand_dims(encodings_db_np, axis=0)
-            distancias = face_recognition.face_distance(encodings_db_np, encoding_acceso)
-            print(f"[DEBUG] Distancias para visita {getattr(visita, 'id', None)}: {distancias}")
-            distancia_min = np.min(distancias)
-            # Usar un umbral estricto para coincidencia facial
-            print(f"[DEBUG] Menor distancia para visita {getattr(visita, 'id', None)}: {distancia_min}")
-            if distancia_min < 0.60 and distancia_min < mejor_distancia:
-                print(f"[DEBUG] ¡Coincidencia candidata! (distancia={distancia_min}) para visita {getattr(visita, 'id', None)}")
-                mejor_distancia = distancia_min
-                visita_match = visita
+        ids_match, distancias = galeria.search(encoding_acceso)
+        distancia_min = float(distancias[0])
+        # Usar un umbral estricto para coincidencia facial
+        if ids_match[0] >= 0 and distancia_min < 0.60:
+            visita_match = Visita.objects.filter(id=int(ids_match[0])).first()
+            if visita_match:
+                print(f"[DEBUG] ¡Coincidencia! (distancia={distancia_min}) para visita {visita_match.id}")
         if not visita_match:
             print("[DEBUG] No se encontró coincidencia facial suficiente.")
             return Response({'autorizado': False, 'detail': 'No se encontró coincidencia facial.'}, status=403)
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from core.models.propiedades_residentes import Visita
 from core.utils.dropbox_upload import upload_image_to_dropbox
+from core.services.encoding_store import registrar_foto
 
 class VisitaSerializer(serializers.ModelSerializer):
 
@@ -63,6 +64,8 @@ class VisitaSerializer(serializers.ModelSerializer):
             print(f"[DEBUG][VisitaSerializer.create] Subiendo foto_reconocimiento_base64 {idx+1}: {file_name}")
             info_foto = upload_image_to_dropbox(file, file_name)
             print(f"[DEBUG][VisitaSerializer.create] Foto_reconocimiento subida: {info_foto}")
+            # Precalcular encoding una sola vez (el acceso solo lo lee)
+            info_foto['sha256'] = registrar_foto(img_data, info_foto.get('url'))
             fotos_info.append(info_foto)
         # Procesar imágenes como archivos
         for idx, file in enumerate(fotos_files):
@@ -71,6 +74,8 @@ class VisitaSerializer(serializers.ModelSerializer):
             print(f"[DEBUG][VisitaSerializer.create] Subiendo foto_reconocimiento_file {idx+1}: {file_name}")
             info_foto = upload_image_to_dropbox(file, file_name)
             print(f"[DEBUG][VisitaSerializer.create] Foto_reconocimiento subida: {info_foto}")
+            file.seek(0)
+            info_foto['sha256'] = registrar_foto(file.read(), info_foto.get('url'))
             fotos_info.append(info_foto)
         validated_data['fotos_reconocimiento'] = fotos_info
         print(f"[DEBUG][VisitaSerializer.create] validated_data final antes de crear: {validated_data}")
@@ -7,6 +7,22 @@ from authz.models import Persona, RelacionesPropietarioInquilino
 from decimal import Decimal
 
 
+def _ocupacion(obj):
+    """
+    Vivienda con ``propietarios_count``, ``inquilinos_count`` y ``estado_ocupacion``
+
+    Los listados los traen anotados (``Vivienda.objects.con_ocupacion()``); una
+    instancia sin anotar (p. ej. recién creada) se completa con una consulta.
+    """
+    if not hasattr(obj, 'estado_ocupacion'):
+        conteos = Vivienda.objects.con_ocupacion().filter(pk=obj.pk).values(
+            'propietarios_count', 'inquilinos_count', 'estado_ocupacion'
+        ).first() or {'propietarios_count': 0, 'inquilinos_count': 0, 'estado_ocupacion': 'disponible'}
+        for campo, valor in conteos.items():
+            setattr(obj, campo, valor)
+    return obj
+
+
 class PersonaBasicSerializer(serializers.ModelSerializer):
     """Serializer básico para mostrar información de personas"""
     nombre_completo = serializers.SerializerMethodField()
@@ -105,31 +121,20 @@ class ViviendaSerializer(serializers.ModelSerializer):
     @extend_schema_field(serializers.ListField())
     def get_propiedades(self, obj):
         """Obtiene las propiedades activas de la vivienda"""
-        propiedades = obj.propiedad_set.filter(activo=True)
+        propiedades = getattr(obj, 'propiedades_activas', None)
+        if propiedades is None:
+            propiedades = obj.propiedad_set.filter(activo=True).select_related('persona', 'vivienda')
         return PropiedadDetailSerializer(propiedades, many=True).data
     
     @extend_schema_field(serializers.IntegerField())
     def get_total_propietarios(self, obj):
         """Cuenta el total de propietarios activos"""
-        return obj.propiedad_set.filter(activo=True, tipo_tenencia='propietario').count()
+        return _ocupacion(obj).propietarios_count
     
     @extend_schema_field(serializers.CharField())
     def get_estado_ocupacion(self, obj):
-        """Calcula el estado de ocupación basado en las propiedades activas"""
-        propiedades_activas = obj.propiedad_set.filter(activo=True)
-        
-        if not propiedades_activas.exists():
-            return 'disponible'
-        
-        # Si hay propietarios activos
-        if propiedades_activas.filter(tipo_tenencia='propietario').exists():
-            return 'ocupada'
-        
-        # Si solo hay inquilinos (sin propietarios)
-        if propiedades_activas.filter(tipo_tenencia='inquilino').exists():
-            return 'alquilada'
-        
-        return 'disponible'
+        """Estado de ocupación según las propiedades activas (anotado en el queryset)"""
+        return _ocupacion(obj).estado_ocupacion
     
     @extend_schema_field(serializers.DecimalField(max_digits=10, decimal_places=2))
     def get_cobranza_real(self, obj):
@@ -193,21 +198,8 @@ class ViviendaListSerializer(serializers.ModelSerializer):
     
     @extend_schema_field(serializers.CharField())
     def get_estado_ocupacion(self, obj):
-        """Calcula el estado de ocupación basado en las propiedades activas"""
-        propiedades_activas = obj.propiedad_set.filter(activo=True)
-        
-        if not propiedades_activas.exists():
-            return 'disponible'
-        
-        # Si hay propietarios activos
-        if propiedades_activas.filter(tipo_tenencia='propietario').exists():
-            return 'ocupada'
-        
-        # Si solo hay inquilinos (sin propietarios)
-        if propiedades_activas.filter(tipo_tenencia='inquilino').exists():
-            return 'alquilada'
-        
-        return 'disponible'
+        """Estado de ocupación según las propiedades activas (anotado en el queryset)"""
+        return _ocupacion(obj).estado_ocupacion
     
     @extend_schema_field(serializers.DecimalField(max_digits=10, decimal_places=2))
     def get_cobranza_real(self, obj):
@@ -219,11 +211,11 @@ class ViviendaListSerializer(serializers.ModelSerializer):
     
     @extend_schema_field(serializers.IntegerField())
     def get_propietarios_count(self, obj):
-        return obj.propiedad_set.filter(activo=True, tipo_tenencia='propietario').count()
+        return _ocupacion(obj).propietarios_count
     
     @extend_schema_field(serializers.IntegerField())
     def get_inquilinos_count(self, obj):
-        return obj.propiedad_set.filter(activo=True, tipo_tenencia='inquilino').count()
+        return _ocupacion(obj).inquilinos_count
 
 
 class PropiedadSerializer(serializers.ModelSerializer):
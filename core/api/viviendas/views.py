@@ -5,7 +5,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.db import models
-from django.db.models import Q, Count, Avg, Sum
+from django.db.models import Q, Count, Avg, Sum, Prefetch
 
 from core.models.propiedades_residentes import Vivienda, Propiedad
 from authz.models import Persona, RelacionesPropietarioInquilino
@@ -29,7 +29,7 @@ class ViviendaViewSet(viewsets.ModelViewSet):
     - PATCH /viviendas/{id}/ - Actualizar vivienda parcial
     - DELETE /viviendas/{id}/ - Eliminar vivienda
     """
-    queryset = Vivienda.objects.all().order_by('numero_casa')
+    queryset = Vivienda.objects.con_ocupacion().order_by('numero_casa')
     serializer_class = ViviendaSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -47,6 +47,19 @@ class ViviendaViewSet(viewsets.ModelViewSet):
             return ViviendaListSerializer
         return ViviendaSerializer
     
+    def get_queryset(self):  # type: ignore[override]
+        """El serializer completo lee las propiedades activas precargadas"""
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            return queryset
+        return queryset.prefetch_related(Prefetch(
+            'propiedad_set',
+            queryset=Propiedad.objects.filter(activo=True).select_related('persona', 'vivienda').defer(
+                'persona__encoding_facial', 'persona__encodings'
+            ),
+            to_attr='propiedades_activas'
+        ))
+    
     def destroy(self, request, *args, **kwargs):
         """
         Personalizar eliminación - marcar como inactiva en lugar de eliminar
@@ -136,22 +149,11 @@ class ViviendaViewSet(viewsets.ModelViewSet):
         # Obtener todas las viviendas con el serializer completo
         queryset = self.get_queryset()
         serializer = self.get_serializer(queryset, many=True)
-        viviendas_data = serializer.data
-        
-        # Calcular estadísticas basadas en estado_ocupacion
-        total = len(viviendas_data)
-        ocupadas = len([v for v in viviendas_data if v.get('estado_ocupacion') == 'ocupada'])
-        alquiladas = len([v for v in viviendas_data if v.get('estado_ocupacion') == 'alquilada'])
-        disponibles = len([v for v in viviendas_data if v.get('estado_ocupacion') == 'disponible'])
         
+        # Estadísticas de ocupación en una sola consulta agregada
         return Response({
-            'viviendas': viviendas_data,
-            'estadisticas': {
-                'total': total,
-                'ocupadas': ocupadas,
-                'alquiladas': alquiladas,
-                'disponibles': disponibles
-            }
+            'viviendas': serializer.data,
+            'estadisticas': Vivienda.objects.resumen_ocupacion()
         })
 
 
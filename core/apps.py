@@ -8,4 +8,6 @@ class CoreConfig(AppConfig):
 
     def ready(self):
         # Importar señales de bitácora
-        import core.api.bitacora.signals
\ No newline at end of file
+        import core.api.bitacora.signals
+        # Señales del saldo pendiente materializado por persona
+        import core.signals
\ No newline at end of file
@@ -0,0 +1,141 @@
+# core/fields.py - Campos de modelo propios
+"""
+Campo binario para encodings faciales
+
+``EncodingsFacialesField`` guarda una matriz de encodings como bytes float32
+contiguos (512 bytes por encoding de 128 dimensiones) en lugar de JSON o
+base64. Al leer el atributo del modelo se obtiene directamente un
+``np.ndarray`` de forma ``(n, dimension)`` creado con ``np.frombuffer`` sobre
+los bytes que devolvió la base de datos: no hay parseo ni copia. El array es de
+solo lectura; para modificarlo se asigna uno nuevo.
+"""
+from base64 import b64encode
+from typing import Any, Optional
+
+import numpy as np
+from django.db import models
+from django.db.models.query_utils import DeferredAttribute
+
+DIMENSION_ENCODING = 128
+
+
+def encodings_a_bytes(valor: Any, dimension: int = DIMENSION_ENCODING) -> Optional[bytes]:
+    """
+    Convierte encodings (array, lista de vectores o bytes ya serializados) a
+    bytes float32; None si no hay ninguno
+
+    Raises:
+        ValueError: Si el tamaño no es múltiplo de ``dimension``
+    """
+    if valor is None:
+        return None
+    if isinstance(valor, (bytes, bytearray, memoryview)):
+        # bytes (sqlite, MySQL) y memoryview (PostgreSQL) se conservan tal cual
+        crudo = bytes(valor) if isinstance(valor, bytearray) else valor
+        if len(crudo) % (dimension * 4):
+            raise ValueError(f'{len(crudo)} bytes no son encodings float32 de dimensión {dimension}')
+        return crudo or None
+    matriz = np.asarray(valor, dtype=np.float32)
+    if matriz.size == 0:
+        return None
+    if matriz.size % dimension:
+        raise ValueError(f'Encodings de forma {matriz.shape} no tienen dimensión {dimension}')
+    return np.ascontiguousarray(matriz).tobytes()
+
+
+def bytes_a_encodings(crudo, dimension: int = DIMENSION_ENCODING) -> Optional[np.ndarray]:
+    """Vista ``(n, dimension)`` float32 sobre los bytes, sin copiar"""
+    if crudo is None:
+        return None
+    return np.frombuffer(crudo, dtype=np.float32).reshape(-1, dimension)
+
+
+def sincronizar_encodings(instancia, campo_origen: str, save_kwargs: dict, campo: str = 'encodings'):
+    """
+    Rellena la copia binaria ``campo`` a partir del campo de texto o JSON
+    ``campo_origen`` (en cualquier formato de ``normalizar_encodings``)
+
+    Se llama desde ``save()``; en un guardado parcial solo actúa si
+    ``update_fields`` incluye el campo de origen, y entonces agrega la copia.
+    """
+    update_fields = save_kwargs.get('update_fields')
+    if update_fields is not None:
+        if campo_origen not in update_fields:
+            return
+        save_kwargs['update_fields'] = {*update_fields, campo}
+    elif campo_origen in instancia.get_deferred_fields():
+        return
+
+    from seguridad.services.face_gallery import normalizar_encodings
+    setattr(instancia, campo, normalizar_encodings(getattr(instancia, campo_origen)) or None)
+
+
+def rellenar_encodings(modelo, campo_origen: str, campo: str = 'encodings', lote: int = 500) -> int:
+    """
+    Rellena la copia binaria de los registros existentes (migraciones de datos)
+
+    Returns:
+        Número de registros actualizados
+    """
+    from seguridad.services.face_gallery import normalizar_encodings
+
+    pendientes = []
+    actualizados = 0
+    filas = modelo.objects.filter(**{f'{campo}__isnull': True}).values_list('pk', campo_origen)
+    for pk, origen in filas.iterator(chunk_size=lote):
+        encodings = normalizar_encodings(origen)
+        if encodings:
+            pendientes.append(modelo(pk=pk, **{campo: encodings}))
+        if len(pendientes) >= lote:
+            actualizados += modelo.objects.bulk_update(pendientes, [campo])
+            pendientes = []
+    if pendientes:
+        actualizados += modelo.objects.bulk_update(pendientes, [campo])
+    return actualizados
+
+
+class EncodingsDescriptor(DeferredAttribute):
+    """
+    Guarda los bytes en la instancia y entrega la vista NumPy al leer
+
+    Es un descriptor de datos (define ``__set__``) para que la lectura pase
+    siempre por aquí; la carga diferida (``defer``/``only``) se hereda de
+    ``DeferredAttribute``.
+    """
+
+    def __get__(self, instance, cls=None):
+        if instance is None:
+            return self
+        return bytes_a_encodings(super().__get__(instance, cls), self.field.dimension)
+
+    def __set__(self, instance, valor):
+        instance.__dict__[self.field.attname] = encodings_a_bytes(valor, self.field.dimension)
+
+
+class EncodingsFacialesField(models.BinaryField):
+    """
+    Matriz de encodings faciales float32 (ver el docstring del módulo)
+
+    Args:
+        dimension: Dimensión de cada encoding (128 para dlib)
+    """
+
+    descriptor_class = EncodingsDescriptor
+    description = 'Encodings faciales float32'
+
+    def __init__(self, *args, dimension: int = DIMENSION_ENCODING, **kwargs):
+        self.dimension = dimension
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.dimension != DIMENSION_ENCODING:
+            kwargs['dimension'] = self.dimension
+        return name, path, args, kwargs
+
+    def get_prep_value(self, value):
+        return encodings_a_bytes(value, self.dimension)
+
+    def value_to_string(self, obj):
+        crudo = encodings_a_bytes(self.value_from_object(obj), self.dimension)
+        return b64encode(crudo).decode('ascii') if crudo else None
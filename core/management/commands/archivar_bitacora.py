@@ -0,0 +1,32 @@
+"""
+Comando para mover a archivos comprimidos los registros antiguos de las bitácoras
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.services.archivo_bitacora import FUENTES, archivar
+
+
+class Command(BaseCommand):
+    help = 'Archiva en JSONL.gz particionado por día los registros de bitácora fuera de la ventana de retención'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias', type=int, default=None,
+            help='Días que se conservan en la base de datos (por defecto BITACORA_RETENCION_DIAS)'
+        )
+        parser.add_argument(
+            '--fuente', nargs='+', choices=sorted(FUENTES), default=None,
+            help='Bitácoras a archivar (por defecto todas)'
+        )
+        parser.add_argument('--lote', type=int, default=5000, help='Registros por lote de archivo y borrado')
+
+    def handle(self, *args, **options):
+        dias = options['dias'] if options['dias'] is not None else settings.BITACORA_RETENCION_DIAS
+        if dias < 1:
+            raise CommandError('--dias debe ser al menos 1')
+
+        self.stdout.write(f"📦 Archivando registros de más de {dias} días en {settings.BITACORA_ARCHIVO_DIR}")
+        for nombre in options['fuente'] or sorted(FUENTES):
+            archivados = archivar(nombre, dias=dias, lote=options['lote'])
+            self.stdout.write(self.style.SUCCESS(f"✅ {nombre}: {archivados} registros archivados"))
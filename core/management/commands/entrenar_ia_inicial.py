@@ -15,6 +15,12 @@ class Command(BaseCommand):
             action='store_true',
             help='Fuerza el entrenamiento aunque ya exista un modelo',
         )
+        parser.add_argument(
+            '--modo',
+            choices=['svc', 'incremental'],
+            default='svc',
+            help='svc: refit completo del SVC (offline); incremental: actualiza solo las personas que cambiaron',
+        )
         parser.add_argument(
             '--verbose',
             action='store_true',
@@ -27,6 +33,16 @@ class Command(BaseCommand):
         try:
             training_service = AITrainingService()
             
+            if options['modo'] == 'incremental':
+                resultado = training_service.entrenar_modelo_incremental()
+                if resultado['success']:
+                    self.stdout.write(self.style.SUCCESS(
+                        f"✅ Entrenamiento {resultado['mode']}: {resultado['classes_updated']} personas actualizadas"
+                    ))
+                else:
+                    self.stdout.write(self.style.ERROR(f'❌ Error en el entrenamiento: {resultado["error"]}'))
+                return
+            
             # Verificar si ya existe un modelo
             estadisticas = training_service.obtener_estadisticas_modelo()
             
@@ -0,0 +1,33 @@
+"""
+Comando para generar en lote las expensas mensuales de un período
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.services.payments import generar_expensas_periodo
+
+
+class Command(BaseCommand):
+    help = 'Genera la expensa del período para cada propiedad activa (idempotente por período)'
+
+    def add_arguments(self, parser):
+        hoy = timezone.localdate()
+        parser.add_argument('--anio', type=int, default=hoy.year, help='Año del período (por defecto el actual)')
+        parser.add_argument('--mes', type=int, default=hoy.month, help='Mes del período (por defecto el actual)')
+        parser.add_argument('--lote', type=int, default=500, help='Expensas por bulk_create')
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError('--lote debe ser al menos 1')
+        try:
+            resultado = generar_expensas_periodo(options['anio'], options['mes'], lote=options['lote'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        periodo = f"{resultado.periodo_year}/{resultado.periodo_month:02d}"
+        self.stdout.write(f"🧾 Período {periodo}: {resultado.propiedades} propiedades activas")
+        self.stdout.write(f"   Ya facturadas: {resultado.existentes}")
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {resultado.creadas} expensas creadas por {resultado.monto_total} "
+            f"en {resultado.segundos:.2f}s ({resultado.filas_por_segundo:.0f} filas/s)"
+        ))
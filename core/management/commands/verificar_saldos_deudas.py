@@ -0,0 +1,40 @@
+"""
+Comando para comparar el saldo pendiente materializado con el recalculado
+"""
+from django.core.management.base import BaseCommand
+
+from core.models.administracion import SaldoPersona
+from core.services.saldos_deudas import calcular_saldo, recalcular_saldo
+
+CAMPOS = ('total_expensas', 'total_multas', 'total_reservas', 'detalle')
+
+
+class Command(BaseCommand):
+    help = 'Recalcula el saldo pendiente de cada persona y reporta las diferencias con SaldoPersona'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--corregir', action='store_true', help='Guarda el saldo recalculado cuando difiere')
+
+    def handle(self, *args, **options):
+        revisados = 0
+        diferencias = 0
+        for saldo in SaldoPersona.objects.order_by('persona_id').iterator(chunk_size=200):
+            revisados += 1
+            calculado = calcular_saldo(saldo.persona_id)
+            campos = [campo for campo in CAMPOS if getattr(saldo, campo) != calculado[campo]]
+            if not campos:
+                continue
+            diferencias += 1
+            detalle = ', '.join(
+                f"{campo}: {getattr(saldo, campo)} -> {calculado[campo]}" if campo != 'detalle' else 'detalle'
+                for campo in campos
+            )
+            self.stdout.write(self.style.WARNING(f"⚠️ Persona {saldo.persona_id}: {detalle}"))
+            if options['corregir']:
+                recalcular_saldo(saldo.persona_id)
+
+        self.stdout.write(f"🔎 {revisados} saldos revisados, {diferencias} con diferencias")
+        if diferencias and options['corregir']:
+            self.stdout.write(self.style.SUCCESS(f"✅ {diferencias} saldos corregidos"))
+        elif not diferencias:
+            self.stdout.write(self.style.SUCCESS("✅ Saldos consistentes"))
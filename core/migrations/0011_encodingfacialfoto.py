@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-17 18:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_alter_expensasmensuales_vivienda'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EncodingFacialFoto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(help_text='Hash SHA-256 del contenido de la foto', max_length=64, unique=True)),
+                ('encoding', models.BinaryField(blank=True, help_text='128 float32 (512 bytes); nulo si la foto no tiene rostro', null=True)),
+                ('url', models.URLField(blank=True, max_length=512, null=True)),
+                ('fecha_calculo', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
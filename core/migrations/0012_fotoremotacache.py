@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-17 18:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_encodingfacialfoto'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FotoRemotaCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(max_length=512, unique=True)),
+                ('etag', models.CharField(blank=True, help_text='ETag de la última descarga, para revalidar sin descargar', max_length=255)),
+                ('sha256', models.CharField(db_index=True, help_text='Hash del contenido descargado (ver EncodingFacialFoto)', max_length=64)),
+                ('fecha_verificacion', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
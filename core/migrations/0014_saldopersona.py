@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-17 19:18
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authz', '0013_persona_encodings'),
+        ('core', '0013_reconocimientofacial_encodings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SaldoPersona',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_expensas', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('total_multas', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('total_reservas', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('detalle', models.JSONField(default=dict)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+                ('persona', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='saldo_deudas', to='authz.persona')),
+            ],
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.6 on 2026-10-17 19:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_saldopersona'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BloqueoReservaDia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('espacio_comun', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.espaciocomun')),
+            ],
+            options={
+                'unique_together': {('espacio_comun', 'fecha')},
+            },
+        ),
+    ]
@@ -174,6 +174,19 @@ class Pagos(models.Model):
     def __str__(self):
         return f"Pago {self.tipo_pago} - {self.monto}"
 
+# Saldo pendiente materializado por persona (ver core/services/saldos_deudas.py)
+class SaldoPersona(models.Model):
+    persona = models.OneToOneField('authz.Persona', on_delete=models.CASCADE, related_name='saldo_deudas')
+    total_expensas = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    total_multas = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    total_reservas = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    # Expensas, multas y reservas pendientes tal como las devuelve PendingDebtsView
+    detalle = models.JSONField(default=dict)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Saldo {self.persona_id} - {self.total_expensas + self.total_multas + self.total_reservas}"
+
 # Tabla de reportes mensuales
 class ReporteMensual(models.Model):
     periodo_year = models.IntegerField()
@@ -10,6 +10,47 @@ User = get_user_model()
 
 # Importar modelo Persona centralizado de authz
 from authz.models import Persona
+
+
+class ViviendaQuerySet(models.QuerySet):
+    """Consultas de viviendas con su ocupación calculada en la base de datos"""
+
+    def con_ocupacion(self):
+        """
+        Anota ``propietarios_count``, ``inquilinos_count`` (propiedades activas)
+        y ``estado_ocupacion``: 'ocupada' con propietarios, 'alquilada' solo con
+        inquilinos, 'disponible' sin propiedades activas
+        """
+        return self.annotate(
+            propietarios_count=models.Count(
+                'propiedad', filter=models.Q(propiedad__activo=True, propiedad__tipo_tenencia='propietario')
+            ),
+            inquilinos_count=models.Count(
+                'propiedad', filter=models.Q(propiedad__activo=True, propiedad__tipo_tenencia='inquilino')
+            ),
+        ).annotate(
+            estado_ocupacion=models.Case(
+                models.When(propietarios_count__gt=0, then=models.Value('ocupada')),
+                models.When(inquilinos_count__gt=0, then=models.Value('alquilada')),
+                default=models.Value('disponible'),
+                output_field=models.CharField(),
+            )
+        )
+
+    def resumen_ocupacion(self):
+        """Totales por estado de ocupación en una sola consulta agregada"""
+        activas = Propiedad.objects.filter(vivienda=models.OuterRef('pk'), activo=True)
+        con_propietario = models.Exists(activas.filter(tipo_tenencia='propietario'))
+        con_inquilino = models.Exists(activas.filter(tipo_tenencia='inquilino'))
+        resumen = self.aggregate(
+            total=models.Count('pk'),
+            ocupadas=models.Count('pk', filter=models.Q(con_propietario)),
+            alquiladas=models.Count('pk', filter=models.Q(con_inquilino) & ~models.Q(con_propietario)),
+        )
+        resumen['disponibles'] = resumen['total'] - resumen['ocupadas'] - resumen['alquiladas']
+        return resumen
+
+
 # Tabla de viviendas
 class Vivienda(models.Model):
     numero_casa = models.CharField(max_length=20, unique=True)
@@ -22,6 +63,8 @@ class Vivienda(models.Model):
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     fecha_actualizacion = models.DateTimeField(auto_now=True)
 
+    objects = ViviendaQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.numero_casa} - {self.tipo_vivienda}"
 
@@ -184,6 +227,18 @@ class DisponibilidadEspacioComun(models.Model):
         return f"Disponibilidad de {self.espacio_comun.nombre} desde {self.fecha_inicio} hasta {self.fecha_fin}"
 
 
+# Fila de bloqueo por espacio y día: las reservas del mismo día se validan en serie
+class BloqueoReservaDia(models.Model):
+    espacio_comun = models.ForeignKey(EspacioComun, related_name='+', on_delete=models.CASCADE)
+    fecha = models.DateField()
+
+    class Meta:
+        unique_together = ['espacio_comun', 'fecha']
+
+    def __str__(self):
+        return f"Bloqueo {self.espacio_comun_id} - {self.fecha}"
+
+
 # Tabla de notificaciones
 class Notificacion(models.Model):
     usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
@@ -4,6 +4,8 @@ from django.contrib.auth import get_user_model
 from django.conf import settings
 from decimal import Decimal
 
+from core.fields import EncodingsFacialesField, sincronizar_encodings
+
 
 User = get_user_model()
 
@@ -82,6 +84,7 @@ class DeteccionIA(models.Model):
 class ReconocimientoFacial(models.Model):
     persona = models.OneToOneField('authz.Persona', on_delete=models.CASCADE)
     vector_facial = models.TextField()
+    encodings = EncodingsFacialesField(null=True, blank=True, help_text="Copia float32 de vector_facial")
     imagen_referencia_url = models.URLField(null=True, blank=True)
     activo = models.BooleanField(default=True)
     fecha_registro = models.DateTimeField(auto_now_add=True)
@@ -91,4 +94,28 @@ class ReconocimientoFacial(models.Model):
     numero_entrenamientos = models.IntegerField(default=1)
 
     def __str__(self):
-        return f"Reconocimiento Facial - {self.persona.nombre}"
\ No newline at end of file
+        return f"Reconocimiento Facial - {self.persona.nombre}"
+
+    def save(self, *args, **kwargs):
+        sincronizar_encodings(self, 'vector_facial', kwargs)
+        super().save(*args, **kwargs)
+
+# Tabla de encodings faciales precalculados por foto
+class EncodingFacialFoto(models.Model):
+    sha256 = models.CharField(max_length=64, unique=True, help_text="Hash SHA-256 del contenido de la foto")
+    encoding = models.BinaryField(null=True, blank=True, help_text="128 float32 (512 bytes); nulo si la foto no tiene rostro")
+    url = models.URLField(max_length=512, null=True, blank=True)
+    fecha_calculo = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Encoding {self.sha256[:12]}"
+
+# Caché URL -> contenido de fotos remotas (Dropbox) usadas en el entrenamiento
+class FotoRemotaCache(models.Model):
+    url = models.URLField(max_length=512, unique=True)
+    etag = models.CharField(max_length=255, blank=True, help_text="ETag de la última descarga, para revalidar sin descargar")
+    sha256 = models.CharField(max_length=64, db_index=True, help_text="Hash del contenido descargado (ver EncodingFacialFoto)")
+    fecha_verificacion = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.url} -> {self.sha256[:12]}"
@@ -56,7 +56,8 @@ class ExpensaDebtSerializer(serializers.ModelSerializer):
         )
 
     def get_vivienda(self, obj):
-        vivienda = obj.vivienda
+        # obj.vivienda es la Propiedad facturada
+        vivienda = obj.vivienda.vivienda
         return {
             'id': vivienda.id,
             'numero_casa': vivienda.numero_casa,
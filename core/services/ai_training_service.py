@@ -1,7 +1,9 @@
 # core/services/ai_training_service.py - Entrenamiento automático de IA
+import functools
 import os
 import pickle
-from typing import List, Dict, Tuple
+import threading
+from typing import List, Dict, Optional, Tuple
 import logging
 import random
 
@@ -39,6 +41,19 @@ except ImportError:
     joblib = None
     
 from datetime import datetime
+from django.utils import timezone
+
+from core.services.artefactos_modelo import obtener_modelo_compartido, publicar_version
+from core.services.clasificador_prototipos import ClasificadorPrototipos
+
+def _serializado(metodo):
+    """Ejecuta el método con el lock de la instancia (una sola escritura a la vez)"""
+    @functools.wraps(metodo)
+    def envoltura(self, *args, **kwargs):
+        with self._lock:
+            return metodo(self, *args, **kwargs)
+    return envoltura
+
 
 class AITrainingService:
     """
@@ -51,10 +66,14 @@ class AITrainingService:
         self.label_encoder = None
         self.last_training = None
         self.training_accuracy = 0.0
+        self.model_version = None
+        # Entrenamientos y recargas de una instancia compartida, de a uno
+        self._lock = threading.RLock()
         
         # Crear directorio si no existe
         os.makedirs(self.model_path, exist_ok=True)
     
+    @_serializado
     def entrenar_modelo_automatico(self) -> Dict:
         """
         Entrena el modelo automáticamente usando datos de la BD
@@ -107,10 +126,9 @@ class AITrainingService:
             accuracy = accuracy_score(y_val_split, y_pred)
             
             # 5. Guardar modelo entrenado
-            self._guardar_modelo(personas_map)
-            
             self.training_accuracy = accuracy
-            self.last_training = datetime.now()
+            self.last_training = timezone.now()
+            self._guardar_modelo(personas_map)
             
             logger.info(f"✅ Entrenamiento completado - Precisión: {accuracy:.2%}")
             
@@ -119,7 +137,7 @@ class AITrainingService:
                 'accuracy': accuracy,
                 'samples_used': len(X_train),
                 'people_count': len(personas_map),
-                'training_time': datetime.now().isoformat(),
+                'training_time': self.last_training.isoformat(),
                 'model_path': self.model_path,
                 'classification_report': classification_report(y_val_split, y_pred, output_dict=True) if classification_report else {}
             }
@@ -131,14 +149,133 @@ class AITrainingService:
                 'error': str(e)
             }
     
-    def _cargar_datos_entrenamiento(self) -> Tuple[List, List, Dict]:
+    @_serializado
+    def entrenar_modelo_incremental(self) -> Dict:
+        """
+        Actualiza un clasificador de prototipos solo con las personas que cambiaron
+        
+        Cada persona es un centroide de sus encodings, así que solo se
+        recalculan las clases cuyo ReconocimientoFacial se modificó desde el
+        último entrenamiento (o que dejaron de estar activas). Si el modelo
+        actual no es de prototipos se construye desde cero, lo que también es
+        lineal en el número de fotos. El refit completo del SVC sigue
+        disponible en ``entrenar_modelo_automatico`` como tarea offline.
+        """
+        if not FACE_RECOGNITION_AVAILABLE:
+            return {
+                'success': False,
+                'error': 'Dependencias de ML no disponibles',
+                'message': 'face_recognition y sklearn no están instalados'
+            }
+        
+        from seguridad.models import ReconocimientoFacial
+        
+        try:
+            inicio = timezone.now()
+            self.cargar_modelo_entrenado()
+            personas_map = dict(getattr(self, 'personas_map', None) or {})
+            
+            if isinstance(self.face_classifier, ClasificadorPrototipos) and self.last_training:
+                clasificador = self.face_classifier.copia()
+                afectados = set(ReconocimientoFacial.objects.filter(
+                    fecha_modificacion__gt=self.last_training
+                ).values_list('copropietario_id', flat=True))
+                activos = set(ReconocimientoFacial.objects.filter(
+                    activo=True, copropietario__activo=True
+                ).values_list('copropietario_id', flat=True))
+                # Personas en el modelo que ya no están activas
+                afectados |= set(clasificador.classes_.tolist()) - activos
+                modo = 'incremental'
+            else:
+                clasificador = ClasificadorPrototipos()
+                afectados = None
+                personas_map = {}
+                modo = 'completo'
+            
+            if afectados is not None and not afectados:
+                return {
+                    'success': True,
+                    'message': 'No hay nuevos datos para re-entrenar',
+                    'mode': modo,
+                    'classes_updated': 0,
+                    'last_training': self.last_training.isoformat()
+                }
+            
+            logger.info(f"🔄 Entrenamiento {modo} de prototipos ({len(afectados) if afectados is not None else 'todas las'} personas)...")
+            X_train, y_train, personas_cargadas = self._cargar_datos_entrenamiento(ids_copropietario=afectados)
+            
+            encodings_por_persona = {}
+            for encoding, persona_id in zip(X_train, y_train):
+                encodings_por_persona.setdefault(persona_id, []).append(encoding)
+            actualizadas = 0
+            for persona_id in (afectados or encodings_por_persona):
+                encodings = encodings_por_persona.get(persona_id)
+                if encodings:
+                    clasificador.reemplazar_clase(persona_id, encodings)
+                    personas_map[persona_id] = personas_cargadas.get(persona_id, personas_map.get(persona_id))
+                elif persona_id not in personas_cargadas:
+                    # Inactiva o sin fotos: deja de reconocerse
+                    clasificador.reemplazar_clase(persona_id, [])
+                    personas_map.pop(persona_id, None)
+                else:
+                    # Tiene fotos pero ninguna dio encoding (descarga fallida,
+                    # sin rostro): se conserva el prototipo anterior
+                    logger.warning(f"⚠️ Sin encodings para la persona {persona_id}, se conserva su prototipo")
+                    continue
+                actualizadas += 1
+            
+            if len(clasificador.classes_) < 2:
+                return {
+                    'success': False,
+                    'error': 'Necesitas al menos 2 personas con fotos para entrenar'
+                }
+            
+            # Precisión sobre las muestras recién cargadas
+            if X_train:
+                accuracy = float(np.mean(clasificador.predict(np.asarray(X_train)) == np.asarray(y_train)))
+            else:
+                accuracy = self.training_accuracy
+            
+            self.face_classifier = clasificador
+            self.training_accuracy = accuracy
+            self.last_training = inicio
+            self._guardar_modelo(personas_map)
+            
+            logger.info(f"✅ Entrenamiento {modo} completado - {actualizadas} clases actualizadas")
+            
+            return {
+                'success': True,
+                'mode': modo,
+                'accuracy': accuracy,
+                'classes_updated': actualizadas,
+                'samples_used': len(X_train),
+                'people_count': len(clasificador.classes_),
+                'training_time': inicio.isoformat(),
+                'model_path': self.model_path
+            }
+            
+        except Exception as e:
+            logger.error(f"❌ Error en entrenamiento incremental: {e}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
+    def _cargar_datos_entrenamiento(self, ids_copropietario=None) -> Tuple[List, List, Dict]:
         """
         Carga datos de entrenamiento desde la BD y Dropbox
+        
+        Con ``ids_copropietario`` solo se cargan esas personas. El mapa de
+        nombres solo incluye personas activas con al menos una foto.
+        
+        Los encodings se leen del almacén de encodings por foto: solo se
+        descargan (en paralelo) y procesan (en un pool de procesos) las fotos
+        nuevas o que cambiaron desde el último entrenamiento.
         """
+        from django.conf import settings
         from seguridad.models import Copropietarios, ReconocimientoFacial
-        import requests
-        from PIL import Image
-        import io
+        from core.services.encoding_store import encodings_de_urls
+        import json
         
         X_train = []  # Encodings faciales
         y_train = []  # Labels (IDs de personas)
@@ -149,13 +286,15 @@ class AITrainingService:
             activo=True,
             copropietario__activo=True
         ).select_related('copropietario')
+        if ids_copropietario is not None:
+            reconocimientos = reconocimientos.filter(copropietario_id__in=ids_copropietario)
         
         logger.info(f"📋 Procesando {len(reconocimientos)} personas registradas...")
         
+        fotos_por_persona = []
         for reconocimiento in reconocimientos:
             persona_id = reconocimiento.copropietario.id
             persona_nombre = reconocimiento.copropietario.nombre_completo
-            personas_map[persona_id] = persona_nombre
             
             # Procesar múltiples fotos si existen
             fotos_urls = []
@@ -166,39 +305,28 @@ class AITrainingService:
             
             # URLs adicionales del JSON
             try:
-                import json
                 if reconocimiento.fotos_urls:
                     fotos_adicionales = json.loads(reconocimiento.fotos_urls)
                     fotos_urls.extend(fotos_adicionales)
             except:
                 pass
             
-            # Procesar cada foto
-            encodings_persona = []
-            for foto_url in fotos_urls[:5]:  # Máximo 5 fotos por persona
-                try:
-                    # Descargar imagen
-                    response = requests.get(foto_url, timeout=10)
-                    if response.status_code == 200:
-                        imagen = Image.open(io.BytesIO(response.content))
-                        
-                        # Convertir imagen a array numpy
-                        if np is not None:
-                            imagen_rgb = np.array(imagen)
-                        else:
-                            logger.warning("numpy no disponible, saltando procesamiento de imagen")
-                            continue
-                        
-                        # Extraer encoding facial
-                        if face_recognition is not None:
-                            encodings = face_recognition.face_encodings(imagen_rgb)
-                            if encodings:
-                                encodings_persona.append(encodings[0])
-                        else:
-                            logger.warning("face_recognition no disponible, saltando encodings")
-                
-                except Exception as e:
-                    logger.warning(f"⚠️ Error procesando foto de {persona_nombre}: {e}")
+            if fotos_urls:
+                personas_map[persona_id] = persona_nombre
+                fotos_por_persona.append((persona_id, persona_nombre, fotos_urls[:5]))  # Máximo 5 fotos por persona
+        
+        # Descarga y extracción de todas las fotos de una vez, con caché
+        encodings_por_url = encodings_de_urls(
+            [url for _, _, urls in fotos_por_persona for url in urls],
+            descargas=getattr(settings, 'AI_TRAINING_DESCARGAS_SIMULTANEAS', 8),
+            procesos=getattr(settings, 'AI_TRAINING_PROCESOS_EXTRACCION', None),
+        )
+        
+        for persona_id, persona_nombre, fotos_urls in fotos_por_persona:
+            encodings_persona = [
+                encodings_por_url[url] for url in fotos_urls
+                if encodings_por_url.get(url) is not None
+            ]
             
             # Agregar encodings al conjunto de entrenamiento
             for encoding in encodings_persona:
@@ -211,102 +339,135 @@ class AITrainingService:
     
     def _guardar_modelo(self, personas_map: Dict):
         """
-        Guarda el modelo entrenado en disco
-        """
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        Publica el modelo entrenado como una nueva versión de artefactos
         
-        # Guardar clasificador
-        model_file = os.path.join(self.model_path, f'face_classifier_{timestamp}.pkl')
-        if joblib is not None:
-            joblib.dump(self.face_classifier, model_file)
-        else:
-            logger.warning("joblib no disponible, no se puede guardar el modelo")
-        
-        # Guardar mapa de personas
-        personas_file = os.path.join(self.model_path, f'personas_map_{timestamp}.pkl')
-        with open(personas_file, 'wb') as f:
-            pickle.dump(personas_map, f)
+        Ver ``core.services.artefactos_modelo``: pesos en ``.npy`` mapeados en
+        memoria y cambio de versión atómico, que los demás workers detectan y
+        recargan en segundo plano.
+        """
+        from django.conf import settings
         
-        # Guardar referencia al modelo actual
-        current_model_file = os.path.join(self.model_path, 'current_model.pkl')
-        with open(current_model_file, 'wb') as f:
-            pickle.dump({
-                'classifier_path': model_file,
-                'personas_path': personas_file,
-                'training_date': datetime.now(),
-                'accuracy': self.training_accuracy
-            }, f)
-        
-        logger.info(f"💾 Modelo guardado: {model_file}")
+        version = publicar_version(
+            self.model_path,
+            self.face_classifier,
+            personas_map,
+            self.last_training or timezone.now(),
+            self.training_accuracy,
+            conservar=getattr(settings, 'AI_MODEL_VERSIONES_CONSERVADAS', 5),
+        )
+        self.personas_map = personas_map
+        self.model_version = version
+        obtener_modelo_compartido(self.model_path).recargar()
     
+    @_serializado
     def cargar_modelo_entrenado(self) -> bool:
         """
         Carga el modelo entrenado más reciente
+        
+        El modelo se comparte por proceso: no se vuelve a leer de disco en cada
+        llamada y, si se publica una versión nueva, se recarga en segundo plano.
         """
         try:
-            current_model_file = os.path.join(self.model_path, 'current_model.pkl')
+            modelo = obtener_modelo_compartido(self.model_path).obtener()
+            if modelo is None:
+                return self._cargar_modelo_pickle()
             
-            if not os.path.exists(current_model_file):
-                return False
-            
-            with open(current_model_file, 'rb') as f:
-                model_info = pickle.load(f)
-            
-            # Cargar clasificador
-            if joblib is not None:
-                self.face_classifier = joblib.load(model_info['classifier_path'])
-            else:
-                logger.warning("joblib no disponible, no se puede cargar el modelo")
-                return False
-            
-            # Cargar mapa de personas
-            with open(model_info['personas_path'], 'rb') as f:
-                self.personas_map = pickle.load(f)
-            
-            self.last_training = model_info.get('training_date')
-            self.training_accuracy = model_info.get('accuracy', 0.0)
-            
-            logger.info(f"✅ Modelo cargado - Precisión: {self.training_accuracy:.2%}")
+            self.face_classifier, manifiesto = modelo
+            self.personas_map = manifiesto['personas_map']
+            self.last_training = manifiesto['training_date']
+            self.training_accuracy = manifiesto.get('accuracy', 0.0)
+            self.model_version = manifiesto['version']
             return True
             
         except Exception as e:
             logger.error(f"❌ Error cargando modelo: {e}")
             return False
     
+    def _cargar_modelo_pickle(self) -> bool:
+        """Formato anterior (current_model.pkl), para modelos entrenados antes de los artefactos versionados"""
+        current_model_file = os.path.join(self.model_path, 'current_model.pkl')
+        
+        if not os.path.exists(current_model_file):
+            return False
+        
+        with open(current_model_file, 'rb') as f:
+            model_info = pickle.load(f)
+        
+        # Cargar clasificador
+        if joblib is not None:
+            self.face_classifier = joblib.load(model_info['classifier_path'])
+        else:
+            logger.warning("joblib no disponible, no se puede cargar el modelo")
+            return False
+        
+        # Cargar mapa de personas
+        with open(model_info['personas_path'], 'rb') as f:
+            self.personas_map = pickle.load(f)
+        
+        self.last_training = model_info.get('training_date')
+        if self.last_training and timezone.is_naive(self.last_training):
+            self.last_training = timezone.make_aware(self.last_training)
+        self.training_accuracy = model_info.get('accuracy', 0.0)
+        
+        logger.info(f"✅ Modelo cargado - Precisión: {self.training_accuracy:.2%}")
+        return True
+    
+    def _modelo_para_prediccion(self) -> Optional[Tuple]:
+        """
+        (clasificador, personas_map, precisión, fecha) con el que predecir
+        
+        Con artefactos versionados se toma en cada llamada la versión vigente
+        del modelo compartido, sin modificar la instancia: la misma instancia
+        la usan varios hilos (``seguridad.services.provider_registry``). Un
+        clasificador asignado a mano o del formato anterior se usa tal cual.
+        """
+        if self.face_classifier is None or self.model_version is not None:
+            modelo = obtener_modelo_compartido(self.model_path).obtener()
+            if modelo is not None:
+                clasificador, manifiesto = modelo
+                return (clasificador, manifiesto['personas_map'], manifiesto.get('accuracy', 0.0),
+                        manifiesto['training_date'])
+        with self._lock:
+            if self.face_classifier is None and not self._cargar_modelo_pickle():
+                return None
+        return self.face_classifier, getattr(self, 'personas_map', {}), self.training_accuracy, self.last_training
+    
     def predecir_con_modelo_entrenado(self, face_encoding) -> Dict:
         """
         Usa el modelo entrenado para hacer predicciones
         """
-        if self.face_classifier is None:
-            if not self.cargar_modelo_entrenado():
-                return {
-                    'success': False,
-                    'error': 'No hay modelo entrenado disponible'
-                }
+        try:
+            modelo = self._modelo_para_prediccion()
+        except Exception as e:
+            logger.error(f"❌ Error cargando modelo: {e}")
+            modelo = None
+        if modelo is None:
+            return {
+                'success': False,
+                'error': 'No hay modelo entrenado disponible'
+            }
+        clasificador, personas_map, precision, fecha_entrenamiento = modelo
         
         try:
-            # Verificar que el modelo esté cargado
-            if self.face_classifier is None:
-                return {
-                    'success': False,
-                    'error': 'Modelo no disponible'
-                }
-            
             # Convertir a formato correcto para scikit-learn
-            if np is not None and self.face_classifier is not None:
+            if np is not None:
                 face_encoding_array = np.array([face_encoding])
                 # Predecir persona
-                prediction = self.face_classifier.predict(face_encoding_array)[0]
-                # Obtener probabilidades
-                probabilities = self.face_classifier.predict_proba(face_encoding_array)[0]
-                confidence = max(probabilities) * 100
+                prediction = clasificador.predict(face_encoding_array)[0]
+                if isinstance(clasificador, ClasificadorPrototipos):
+                    # Confianza por distancia al centroide (detecta desconocidos)
+                    confidence = float(clasificador.confianza(face_encoding_array)[0])
+                else:
+                    # Obtener probabilidades
+                    probabilities = clasificador.predict_proba(face_encoding_array)[0]
+                    confidence = max(probabilities) * 100
             else:
                 logger.warning("numpy o clasificador no disponible, usando fallback")
                 prediction = 'unknown'
                 confidence = 0
             
             # Obtener nombre de la persona
-            persona_nombre = getattr(self, 'personas_map', {}).get(prediction, 'Desconocido')
+            persona_nombre = personas_map.get(prediction, 'Desconocido')
             
             return {
                 'success': True,
@@ -314,8 +475,8 @@ class AITrainingService:
                 'persona_nombre': persona_nombre,
                 'confidence': confidence,
                 'recognized': confidence > 70,  # Umbral ajustable
-                'model_accuracy': self.training_accuracy,
-                'training_date': self.last_training.isoformat() if self.last_training else None
+                'model_accuracy': precision,
+                'training_date': fecha_entrenamiento.isoformat() if fecha_entrenamiento else None
             }
             
         except Exception as e:
@@ -325,13 +486,24 @@ class AITrainingService:
                 'error': str(e)
             }
     
+    @_serializado
     def re_entrenar_automatico(self) -> Dict:
         """
         Re-entrena el modelo si hay nuevos datos
+        
+        Por defecto (``AI_TRAINING_MODO = 'svc'``) se hace el refit completo
+        del SVC; con ``'incremental'`` solo se actualizan las personas que
+        cambiaron.
         """
+        from django.conf import settings
         from seguridad.models import ReconocimientoFacial
         
+        if getattr(settings, 'AI_TRAINING_MODO', 'svc') == 'incremental':
+            return self.entrenar_modelo_incremental()
+        
         # Verificar si hay nuevas fotos desde el último entrenamiento
+        if self.last_training is None:
+            self.cargar_modelo_entrenado()
         if self.last_training:
             nuevos_registros = ReconocimientoFacial.objects.filter(
                 fecha_modificacion__gt=self.last_training,
@@ -349,6 +521,7 @@ class AITrainingService:
         logger.info("🔄 Iniciando re-entrenamiento automático...")
         return self.entrenar_modelo_automatico()
     
+    @_serializado
     def obtener_estadisticas_modelo(self) -> Dict:
         """
         Obtiene estadísticas del modelo actual
@@ -364,7 +537,9 @@ class AITrainingService:
             'model_exists': True,
             'accuracy': self.training_accuracy,
             'last_training': self.last_training.isoformat() if self.last_training else None,
+            'model_version': self.model_version,
             'people_in_model': len(self.personas_map) if hasattr(self, 'personas_map') else 0,
+            'classifier_type': 'prototipos' if isinstance(self.face_classifier, ClasificadorPrototipos) else 'svc',
             'total_people_in_db': total_personas,
             'model_path': self.model_path,
             'needs_retraining': total_personas > len(self.personas_map) if hasattr(self, 'personas_map') else True
@@ -0,0 +1,293 @@
+"""
+Retención y archivo de las tablas de bitácora
+
+Las bitácoras (``seguridad.BitacoraAcciones``, ``core.BitacoraAcciones`` y
+``LogSistema``) crecen sin límite. ``archivar()`` mueve los registros más
+antiguos que la ventana de retención a archivos JSONL comprimidos,
+particionados por día::
+
+    <BITACORA_ARCHIVO_DIR>/<fuente>/<AAAA>/<MM>/<DD>/<primer_id>-<ultimo_id>.jsonl.gz
+
+El archivo se escribe (y se sincroniza a disco) antes de borrar las filas; si
+el proceso se corta entre ambos pasos, la siguiente ejecución vuelve a
+archivarlas y la lectura descarta los duplicados por ``(fecha, id)``.
+
+``iterar()`` recorre una fuente en orden ``(fecha, id)`` descendente mezclando
+la tabla y las particiones del rango pedido, con lo que el historial completo
+se consulta igual que antes de archivar. ``contar()`` y ``contar_por()``
+hacen lo mismo para los totales: ``COUNT`` en la tabla y lectura de las
+particiones del rango. Las consultas sobre una fuente archivada deben pasar
+por estas funciones; los filtros se indican dos veces, como ``queryset`` para
+la tabla y como ``incluir`` (predicado) para los registros archivados.
+"""
+
+import glob
+import gzip
+import heapq
+import json
+import logging
+import os
+from collections import Counter
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.apps import apps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+from django.utils import timezone
+
+logger = logging.getLogger('core')
+
+
+class _CodificadorArchivo(DjangoJSONEncoder):
+    """DjangoJSONEncoder recorta las fechas a milisegundos; aquí se conservan enteras"""
+
+    def default(self, o):
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+@dataclass(frozen=True)
+class Fuente:
+    modelo: str
+    campo_fecha: str
+
+    @property
+    def model(self):
+        return apps.get_model(self.modelo)
+
+
+FUENTES: Dict[str, Fuente] = {
+    'seguridad_bitacora': Fuente('seguridad.BitacoraAcciones', 'fecha_accion'),
+    'core_bitacora': Fuente('core.BitacoraAcciones', 'fecha_hora'),
+    'core_log_sistema': Fuente('core.LogSistema', 'fecha_hora'),
+}
+
+
+def _directorio(nombre: str) -> str:
+    return os.path.join(str(getattr(settings, 'BITACORA_ARCHIVO_DIR', 'archivo_bitacora')), nombre)
+
+
+def _ruta_dia(nombre: str, dia: date) -> str:
+    return os.path.join(_directorio(nombre), f'{dia:%Y}', f'{dia:%m}', f'{dia:%d}')
+
+
+# --- escritura ---
+
+def archivar(nombre: str, dias: Optional[int] = None, lote: int = 5000) -> int:
+    """
+    Mueve al archivo los registros de ``nombre`` más antiguos que ``dias``
+
+    Returns:
+        Registros archivados
+    """
+    fuente = FUENTES[nombre]
+    modelo = fuente.model
+    if dias is None:
+        dias = getattr(settings, 'BITACORA_RETENCION_DIAS', 90)
+    corte = timezone.now() - timedelta(days=dias)
+    campos = modelo._meta.concrete_fields
+
+    archivados = 0
+    while True:
+        filas = list(
+            modelo.objects.filter(**{f'{fuente.campo_fecha}__lt': corte})
+            .order_by(fuente.campo_fecha, 'pk')
+            .values_list(*(campo.attname for campo in campos))[:lote]
+        )
+        if not filas:
+            return archivados
+
+        por_dia: Dict[date, List[Dict]] = {}
+        for fila in filas:
+            registro = {campo.attname: valor for campo, valor in zip(campos, fila)}
+            dia = timezone.localdate(registro[fuente.campo_fecha])
+            por_dia.setdefault(dia, []).append(registro)
+        for dia, registros in por_dia.items():
+            _escribir_particion(nombre, dia, registros)
+
+        pks = [registro[modelo._meta.pk.attname] for registros in por_dia.values() for registro in registros]
+        with transaction.atomic():
+            modelo.objects.filter(pk__in=pks).delete()
+        archivados += len(pks)
+        logger.info(f"📦 {nombre}: {archivados} registros archivados")
+
+
+def _escribir_particion(nombre: str, dia: date, registros: List[Dict]):
+    directorio = _ruta_dia(nombre, dia)
+    os.makedirs(directorio, exist_ok=True)
+    pk = FUENTES[nombre].model._meta.pk.attname
+    ruta = os.path.join(directorio, f'{registros[0][pk]}-{registros[-1][pk]}.jsonl.gz')
+    temporal = f'{ruta}.tmp'
+    with open(temporal, 'wb') as crudo:
+        with gzip.GzipFile(fileobj=crudo, mode='wb') as comprimido:
+            for registro in registros:
+                comprimido.write((json.dumps(registro, cls=_CodificadorArchivo) + '\n').encode('utf-8'))
+        crudo.flush()
+        os.fsync(crudo.fileno())
+    os.replace(temporal, ruta)
+
+
+# --- lectura ---
+
+Incluir = Optional[Callable[[models.Model], bool]]
+
+
+def _filtrar_tabla(nombre: str, queryset: Optional[models.QuerySet], desde, hasta, antes=None) -> models.QuerySet:
+    fuente = FUENTES[nombre]
+    campo = fuente.campo_fecha
+    if queryset is None:
+        queryset = fuente.model.objects.all()
+    if desde:
+        queryset = queryset.filter(**{f'{campo}__gte': desde})
+    if hasta:
+        queryset = queryset.filter(**{f'{campo}__lt': hasta})
+    if antes:
+        queryset = queryset.filter(
+            models.Q(**{f'{campo}__lt': antes[0]}) | models.Q(**{campo: antes[0], 'pk__lt': antes[1]})
+        )
+    return queryset
+
+
+def iterar(nombre: str, desde: Optional[datetime] = None, hasta: Optional[datetime] = None,
+           antes: Optional[Tuple[datetime, int]] = None, queryset: Optional[models.QuerySet] = None,
+           incluir: Incluir = None, dividir_por: Optional[Tuple[str, Iterable]] = None) -> Iterator[models.Model]:
+    """
+    Registros de ``nombre`` en orden ``(fecha, id)`` descendente, de la tabla
+    y del archivo
+
+    Args:
+        desde: Fecha mínima (inclusive)
+        hasta: Fecha máxima (exclusive)
+        antes: Clave ``(fecha, id)`` a partir de la cual continuar (excluida)
+        queryset: Consulta de la tabla con los filtros (por defecto todos)
+        incluir: Los mismos filtros para los registros archivados
+        dividir_por: ``(campo, valores)``: una consulta por valor, mezcladas; con
+            un filtro ``campo IN (...)`` el índice ``(campo, fecha, id)`` no da
+            el orden global y se ordenarían todas las filas
+
+    Los registros archivados se devuelven como instancias sin guardar (sus
+    relaciones se cargan con ``prefetch_related_objects``).
+    """
+    campo = FUENTES[nombre].campo_fecha
+    queryset = _filtrar_tabla(nombre, queryset, desde, hasta, antes).order_by(f'-{campo}', '-pk')
+
+    def clave(objeto):
+        return getattr(objeto, campo), objeto.pk
+
+    if dividir_por:
+        division, valores = dividir_por
+        tabla = heapq.merge(
+            *(queryset.filter(**{division: valor}).iterator(chunk_size=200) for valor in valores),
+            key=clave, reverse=True,
+        )
+    else:
+        tabla = queryset.iterator(chunk_size=200)
+    archivo = _iterar_archivo(nombre, desde, hasta, antes)
+    if incluir is not None:
+        archivo = filter(incluir, archivo)
+
+    anterior = None
+    for objeto in heapq.merge(tabla, archivo, key=clave, reverse=True):
+        # Un corte entre escribir la partición y borrar las filas deja ambas copias
+        if clave(objeto) != anterior:
+            anterior = clave(objeto)
+            yield objeto
+
+
+def _solo_archivados(nombre: str, tabla: models.QuerySet, desde, hasta, incluir: Incluir) -> List[models.Model]:
+    """Registros archivados del rango que no siguen también en la tabla"""
+    archivados = {
+        objeto.pk: objeto for objeto in _iterar_archivo(nombre, desde, hasta, None)
+        if incluir is None or incluir(objeto)
+    }
+    if archivados:
+        # Un corte entre escribir la partición y borrar las filas deja ambas copias
+        for pk in tabla.filter(pk__in=list(archivados)).values_list('pk', flat=True):
+            del archivados[pk]
+    return list(archivados.values())
+
+
+def contar(nombre: str, desde: Optional[datetime] = None, hasta: Optional[datetime] = None,
+           queryset: Optional[models.QuerySet] = None, incluir: Incluir = None) -> int:
+    """
+    Total de registros de la tabla y del archivo
+
+    Lee las particiones de los días del rango: sin ``desde`` recorre todo el archivo.
+    """
+    tabla = _filtrar_tabla(nombre, queryset, desde, hasta)
+    return tabla.count() + len(_solo_archivados(nombre, tabla, desde, hasta, incluir))
+
+
+def contar_por(nombre: str, campo: str, desde: Optional[datetime] = None, hasta: Optional[datetime] = None,
+               queryset: Optional[models.QuerySet] = None, incluir: Incluir = None) -> Counter:
+    """Como ``contar()``, agrupado por los valores de ``campo``"""
+    tabla = _filtrar_tabla(nombre, queryset, desde, hasta)
+    totales: Counter = Counter(dict(
+        tabla.order_by().values(campo).annotate(total=models.Count('pk')).values_list(campo, 'total')
+    ))
+    for objeto in _solo_archivados(nombre, tabla, desde, hasta, incluir):
+        totales[getattr(objeto, campo)] += 1
+    return totales
+
+
+def _iterar_archivo(nombre, desde, hasta, antes) -> Iterator[models.Model]:
+    fuente = FUENTES[nombre]
+    campo = fuente.campo_fecha
+    limite = min(filter(None, [hasta, antes[0] if antes else None]), default=None)
+    for dia in _dias_archivados(nombre, desde, limite):
+        registros = _leer_dia(nombre, dia)
+        registros.sort(key=lambda objeto: (getattr(objeto, campo), objeto.pk), reverse=True)
+        for objeto in registros:
+            fecha = getattr(objeto, campo)
+            if desde and fecha < desde:
+                continue
+            if hasta and fecha >= hasta:
+                continue
+            if antes and (fecha, objeto.pk) >= antes:
+                continue
+            yield objeto
+
+
+def _dias_archivados(nombre: str, desde: Optional[datetime], hasta: Optional[datetime]) -> Iterator[date]:
+    """Días con particiones dentro del rango, del más reciente al más antiguo"""
+    primero = timezone.localdate(desde) if desde else None
+    ultimo = timezone.localdate(hasta) if hasta else None
+    raiz = _directorio(nombre)
+    for anio in sorted(os.listdir(raiz) if os.path.isdir(raiz) else [], reverse=True):
+        for mes in sorted(os.listdir(os.path.join(raiz, anio)), reverse=True):
+            for dia in sorted(os.listdir(os.path.join(raiz, anio, mes)), reverse=True):
+                try:
+                    fecha = date(int(anio), int(mes), int(dia))
+                except ValueError:
+                    continue
+                if ultimo and fecha > ultimo:
+                    continue
+                if primero and fecha < primero:
+                    return
+                yield fecha
+
+
+def _leer_dia(nombre: str, dia: date) -> List[models.Model]:
+    modelo = FUENTES[nombre].model
+    campos = {campo.attname: campo for campo in modelo._meta.concrete_fields}
+    vistos = set()
+    objetos = []
+    for ruta in glob.glob(os.path.join(_ruta_dia(nombre, dia), '*.jsonl.gz')):
+        with gzip.open(ruta, 'rt', encoding='utf-8') as archivo:
+            for linea in archivo:
+                if not linea.strip():
+                    continue
+                registro = json.loads(linea)
+                objeto = modelo(**{
+                    attname: campos[attname].to_python(valor) if valor is not None else None
+                    for attname, valor in registro.items() if attname in campos
+                })
+                objeto._state.adding = False
+                if objeto.pk not in vistos:
+                    vistos.add(objeto.pk)
+                    objetos.append(objeto)
+    return objetos
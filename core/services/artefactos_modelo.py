@@ -0,0 +1,247 @@
+# core/services/artefactos_modelo.py - Artefactos versionados del modelo facial
+"""
+Artefactos versionados del modelo de reconocimiento entrenado
+
+Cada entrenamiento publica un directorio ``versiones/<version>/`` con un
+``manifest.json`` (tipo de clasificador, fecha, precisión, mapa de personas) y
+los pesos como ``.npy``. Los ``.npy`` se abren con ``mmap_mode='r'``: varios
+workers de gunicorn comparten las mismas páginas del page cache en lugar de
+tener cada uno su copia deserializada. El SVC, que no se puede reconstruir a
+partir de arrays sueltos, se guarda con joblib sin comprimir y también se abre
+mapeado en memoria.
+
+La versión vigente es el symlink ``current``; se publica creando un symlink
+temporal y renombrándolo encima (``os.replace`` es atómico), así que un lector
+ve la versión anterior o la nueva, nunca una a medio escribir. En sistemas sin
+symlinks se usa un archivo ``CURRENT`` reemplazado de la misma forma.
+
+``ModeloCompartido`` detecta el cambio de versión y recarga en un hilo de
+fondo; las peticiones siguen usando la versión cargada mientras tanto.
+"""
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from core.services.clasificador_prototipos import ClasificadorPrototipos
+
+logger = logging.getLogger('ai_training')
+
+try:
+    import joblib
+except ImportError:
+    joblib = None
+
+DIRECTORIO_VERSIONES = 'versiones'
+ENLACE_ACTUAL = 'current'
+PUNTERO_ACTUAL = 'CURRENT'
+MANIFIESTO = 'manifest.json'
+
+
+def version_actual(base: str) -> Optional[str]:
+    """Nombre de la versión publicada (None si no hay ninguna)"""
+    enlace = os.path.join(base, ENLACE_ACTUAL)
+    if os.path.islink(enlace):
+        return os.path.basename(os.readlink(enlace).rstrip('/\\'))
+    puntero = os.path.join(base, PUNTERO_ACTUAL)
+    if os.path.isfile(puntero):
+        with open(puntero, encoding='utf-8') as f:
+            return f.read().strip() or None
+    return None
+
+
+def publicar_version(base: str, clasificador, personas_map: Dict, fecha: datetime, precision: float,
+                     conservar: int = 5) -> str:
+    """
+    Escribe una nueva versión y la publica atómicamente
+
+    Returns:
+        Nombre de la versión publicada
+    """
+    version = fecha.strftime('%Y%m%d_%H%M%S_%f')
+    versiones = os.path.join(base, DIRECTORIO_VERSIONES)
+    temporal = os.path.join(versiones, f'.{version}.tmp')
+    destino = os.path.join(versiones, version)
+    os.makedirs(temporal, exist_ok=True)
+
+    if isinstance(clasificador, ClasificadorPrototipos):
+        tipo = 'prototipos'
+        np.save(os.path.join(temporal, 'clases.npy'), np.asarray(clasificador.classes_))
+        np.save(os.path.join(temporal, 'sumas.npy'), np.asarray(clasificador._sumas))
+        np.save(os.path.join(temporal, 'conteos.npy'), np.asarray(clasificador._conteos))
+        np.save(os.path.join(temporal, 'centroides.npy'), np.asarray(clasificador.centroides))
+        parametros = {'distancia_maxima': clasificador.distancia_maxima, 'sigma': clasificador.sigma}
+    else:
+        if joblib is None:
+            shutil.rmtree(temporal, ignore_errors=True)
+            raise RuntimeError('joblib no disponible, no se puede guardar el modelo')
+        tipo = 'svc'
+        joblib.dump(clasificador, os.path.join(temporal, 'clasificador.joblib'))
+        parametros = {}
+
+    with open(os.path.join(temporal, MANIFIESTO), 'w', encoding='utf-8') as f:
+        json.dump({
+            'version': version,
+            'tipo': tipo,
+            'parametros': parametros,
+            'training_date': fecha.isoformat(),
+            'accuracy': float(precision),
+            'personas_map': {str(k): v for k, v in personas_map.items()},
+        }, f)
+
+    os.replace(temporal, destino)
+    _apuntar(base, version)
+    _limpiar_versiones(base, conservar)
+    logger.info(f"💾 Modelo publicado: versión {version} ({tipo})")
+    return version
+
+
+def _apuntar(base: str, version: str):
+    """Cambia la versión vigente de forma atómica"""
+    temporal = os.path.join(base, f'.{ENLACE_ACTUAL}.{os.getpid()}.tmp')
+    try:
+        if os.path.lexists(temporal):
+            os.remove(temporal)
+        os.symlink(os.path.join(DIRECTORIO_VERSIONES, version), temporal, target_is_directory=True)
+        os.replace(temporal, os.path.join(base, ENLACE_ACTUAL))
+    except (OSError, NotImplementedError):
+        # Sin permisos para symlinks (p. ej. Windows): archivo puntero
+        if os.path.lexists(temporal):
+            os.remove(temporal)
+        with open(temporal, 'w', encoding='utf-8') as f:
+            f.write(version)
+        os.replace(temporal, os.path.join(base, PUNTERO_ACTUAL))
+        # version_actual prefiere el enlace: uno anterior dejaría la versión vieja
+        enlace = os.path.join(base, ENLACE_ACTUAL)
+        if os.path.islink(enlace):
+            os.remove(enlace)
+    else:
+        # Comprobando el tipo: con nombres sin distinción de mayúsculas
+        # 'current' y 'CURRENT' son la misma ruta
+        puntero = os.path.join(base, PUNTERO_ACTUAL)
+        if os.path.isfile(puntero) and not os.path.islink(puntero):
+            os.remove(puntero)
+
+
+def _limpiar_versiones(base: str, conservar: int):
+    """Borra las versiones más antiguas; la vigente nunca se borra"""
+    versiones = os.path.join(base, DIRECTORIO_VERSIONES)
+    actual = version_actual(base)
+    nombres = sorted(n for n in os.listdir(versiones) if not n.startswith('.'))
+    for nombre in nombres[:-conservar] if conservar > 0 else []:
+        if nombre != actual:
+            # Los workers que aún la tengan mapeada conservan sus páginas
+            shutil.rmtree(os.path.join(versiones, nombre), ignore_errors=True)
+
+
+def cargar_version(base: str, version: str) -> Tuple[Any, Dict]:
+    """
+    Abre una versión con sus arrays mapeados en memoria (solo lectura)
+
+    Returns:
+        Tuple (clasificador, manifiesto)
+    """
+    ruta = os.path.join(base, DIRECTORIO_VERSIONES, version)
+    with open(os.path.join(ruta, MANIFIESTO), encoding='utf-8') as f:
+        manifiesto = json.load(f)
+
+    if manifiesto['tipo'] == 'prototipos':
+        clasificador = ClasificadorPrototipos.desde_arrays(
+            np.load(os.path.join(ruta, 'clases.npy'), mmap_mode='r'),
+            np.load(os.path.join(ruta, 'sumas.npy'), mmap_mode='r'),
+            np.load(os.path.join(ruta, 'conteos.npy'), mmap_mode='r'),
+            centroides=np.load(os.path.join(ruta, 'centroides.npy'), mmap_mode='r'),
+            **manifiesto.get('parametros', {}),
+        )
+    else:
+        if joblib is None:
+            raise RuntimeError('joblib no disponible, no se puede cargar el modelo')
+        clasificador = joblib.load(os.path.join(ruta, 'clasificador.joblib'), mmap_mode='r')
+
+    manifiesto['personas_map'] = {_clave(k): v for k, v in manifiesto['personas_map'].items()}
+    manifiesto['training_date'] = datetime.fromisoformat(manifiesto['training_date'])
+    return clasificador, manifiesto
+
+
+def _clave(valor: str):
+    try:
+        return int(valor)
+    except ValueError:
+        return valor
+
+
+class ModeloCompartido:
+    """
+    Modelo vigente de un directorio, compartido por todo el proceso
+
+    ``obtener()`` nunca espera una recarga salvo la primera vez: si detecta
+    una versión nueva la carga en un hilo y la cambia al terminar.
+
+    Args:
+        base: Directorio de artefactos
+        intervalo: Segundos mínimos entre revisiones del symlink
+    """
+
+    def __init__(self, base: str, intervalo: float = 5.0):
+        self.base = base
+        self.intervalo = intervalo
+        self._cargado: Optional[Tuple[str, Any, Dict]] = None
+        self._ultima_revision = 0.0
+        self._recargando = False
+        self._lock = threading.Lock()
+
+    def obtener(self) -> Optional[Tuple[Any, Dict]]:
+        """(clasificador, manifiesto) de la versión cargada, o None si no hay modelo"""
+        ahora = time.monotonic()
+        if self._cargado is None:
+            self._recargar(version_actual(self.base))
+        elif ahora - self._ultima_revision >= self.intervalo:
+            self._ultima_revision = ahora
+            version = version_actual(self.base)
+            if version and version != self._cargado[0]:
+                with self._lock:
+                    iniciar = not self._recargando
+                    self._recargando = True
+                if iniciar:
+                    threading.Thread(target=self._recargar, args=(version,), daemon=True).start()
+
+        cargado = self._cargado
+        return (cargado[1], cargado[2]) if cargado else None
+
+    def recargar(self):
+        """Carga ya la versión vigente (el proceso que acaba de publicarla)"""
+        self._recargar(version_actual(self.base))
+
+    def _recargar(self, version: Optional[str]):
+        try:
+            if version:
+                clasificador, manifiesto = cargar_version(self.base, version)
+                self._cargado = (version, clasificador, manifiesto)
+                logger.info(f"✅ Modelo versión {version} cargado")
+        except Exception as e:
+            logger.error(f"❌ Error cargando modelo versión {version}: {e}")
+        finally:
+            self._ultima_revision = time.monotonic()
+            with self._lock:
+                self._recargando = False
+
+
+_modelos: Dict[str, ModeloCompartido] = {}
+_modelos_lock = threading.Lock()
+
+
+def obtener_modelo_compartido(base: str) -> ModeloCompartido:
+    """Instancia única por directorio de artefactos en este proceso"""
+    from django.conf import settings
+
+    base = os.path.abspath(base)
+    with _modelos_lock:
+        if base not in _modelos:
+            _modelos[base] = ModeloCompartido(base, getattr(settings, 'AI_MODEL_RECARGA_SEGUNDOS', 5.0))
+        return _modelos[base]
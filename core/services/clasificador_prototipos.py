@@ -0,0 +1,167 @@
+# core/services/clasificador_prototipos.py - Clasificador facial incremental
+"""
+Clasificador de rostros por prototipos (centroide por identidad)
+
+Alternativa incremental al SVC de ``AITrainingService``: cada identidad se
+resume en la suma y el número de sus encodings, así que agregar fotos,
+reemplazar las de una persona o quitarla solo toca esa clase. La predicción es
+el centroide más cercano; no hay calibración de probabilidades que rehacer.
+
+Expone ``predict``/``predict_proba``/``classes_`` como un clasificador de
+scikit-learn para poder usarse donde hoy se usa el SVC.
+"""
+from typing import Any, Dict, Iterable, Optional
+
+import numpy as np
+
+
+class ClasificadorPrototipos:
+    """
+    Args:
+        distancia_maxima: Distancia al centroide que corresponde a 70% de
+            confianza (el umbral de ``predecir_con_modelo_entrenado``); por
+            defecto la tolerancia de face_recognition
+        sigma: Escala de las probabilidades de ``predict_proba``
+    """
+
+    def __init__(self, distancia_maxima: float = 0.6, sigma: float = 0.25):
+        self.distancia_maxima = distancia_maxima
+        self.sigma = sigma
+        self.classes_ = np.empty((0,), dtype=np.int64)
+        self._sumas: Optional[np.ndarray] = None
+        self._conteos = np.empty((0,), dtype=np.int64)
+        self._centroides: Optional[np.ndarray] = None
+
+    @classmethod
+    def desde_arrays(cls, clases, sumas, conteos, centroides=None, **parametros) -> 'ClasificadorPrototipos':
+        """
+        Reconstruye el clasificador desde sus arrays guardados
+
+        Los arrays pueden ser mapeos de solo lectura (``np.load(mmap_mode='r')``);
+        se copian recién cuando el clasificador se modifica.
+        """
+        clasificador = cls(**parametros)
+        clasificador.classes_ = clases
+        clasificador._sumas = sumas
+        clasificador._conteos = conteos
+        clasificador._centroides = centroides
+        return clasificador
+
+    def copia(self) -> 'ClasificadorPrototipos':
+        """Copia independiente y editable (el modelo publicado se comparte entre peticiones)"""
+        return ClasificadorPrototipos.desde_arrays(
+            np.array(self.classes_), np.array(self._sumas), np.array(self._conteos),
+            distancia_maxima=self.distancia_maxima, sigma=self.sigma,
+        )
+
+    # --- entrenamiento ---
+
+    def fit(self, X, y) -> 'ClasificadorPrototipos':
+        """Entrena desde cero con todas las muestras"""
+        self.classes_ = np.empty((0,), dtype=np.int64)
+        self._sumas = None
+        self._conteos = np.empty((0,), dtype=np.int64)
+        return self.partial_fit(X, y)
+
+    def partial_fit(self, X, y) -> 'ClasificadorPrototipos':
+        """Agrega muestras; solo cambian los centroides de las clases presentes en ``y``"""
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y)
+        if X.size == 0:
+            return self
+        if self._sumas is None:
+            self._sumas = np.empty((0, X.shape[1]), dtype=np.float64)
+
+        clases, inversa = np.unique(y, return_inverse=True)
+        sumas = np.zeros((len(clases), X.shape[1]), dtype=np.float64)
+        np.add.at(sumas, inversa, X)
+        conteos = np.bincount(inversa, minlength=len(clases))
+
+        for clase, suma, conteo in zip(clases.tolist(), sumas, conteos):
+            indice = self._indice(clase)
+            if indice is None:
+                self.classes_ = np.append(self.classes_, clase)
+                self._sumas = np.vstack([self._sumas, suma])
+                self._conteos = np.append(self._conteos, conteo)
+            else:
+                self._editable()
+                self._sumas[indice] += suma
+                self._conteos[indice] += conteo
+        self._centroides = None
+        return self
+
+    def reemplazar_clase(self, clase, encodings: Iterable) -> 'ClasificadorPrototipos':
+        """Rehace el prototipo de una clase con sus encodings actuales (sin encodings la elimina)"""
+        encodings = np.asarray(list(encodings), dtype=np.float64)
+        self.eliminar_clase(clase)
+        if len(encodings):
+            self.partial_fit(encodings, np.full(len(encodings), clase))
+        return self
+
+    def eliminar_clase(self, clase) -> bool:
+        indice = self._indice(clase)
+        if indice is None:
+            return False
+        self.classes_ = np.delete(self.classes_, indice)
+        self._sumas = np.delete(self._sumas, indice, axis=0)
+        self._conteos = np.delete(self._conteos, indice)
+        self._centroides = None
+        return True
+
+    def _editable(self):
+        """Copia los arrays si vienen de un mapeo de solo lectura"""
+        if not self._sumas.flags.writeable:
+            self._sumas = np.array(self._sumas)
+        if not self._conteos.flags.writeable:
+            self._conteos = np.array(self._conteos)
+
+    def _indice(self, clase) -> Optional[int]:
+        posiciones = np.flatnonzero(self.classes_ == clase)
+        return int(posiciones[0]) if len(posiciones) else None
+
+    # --- predicción ---
+
+    @property
+    def centroides(self) -> np.ndarray:
+        if self._centroides is None:
+            self._centroides = self._sumas / self._conteos[:, None]
+        return self._centroides
+
+    def distancias(self, X) -> np.ndarray:
+        """Distancia euclidiana de cada muestra a cada centroide, (n, clases)"""
+        if not len(self.classes_):
+            raise ValueError('El clasificador no tiene clases entrenadas')
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        centroides = self.centroides
+        cuadrados = (
+            np.einsum('ij,ij->i', X, X)[:, None]
+            + np.einsum('ij,ij->i', centroides, centroides)[None, :]
+            - 2.0 * X @ centroides.T
+        )
+        return np.sqrt(np.maximum(cuadrados, 0.0))
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[np.argmin(self.distancias(X), axis=1)]
+
+    def predict_proba(self, X) -> np.ndarray:
+        logits = -np.square(self.distancias(X)) / (2.0 * self.sigma ** 2)
+        logits -= logits.max(axis=1, keepdims=True)
+        probabilidades = np.exp(logits)
+        return probabilidades / probabilidades.sum(axis=1, keepdims=True)
+
+    def confianza(self, X) -> np.ndarray:
+        """
+        Confianza 0-100 del centroide más cercano según su distancia
+
+        A diferencia de ``predict_proba`` no depende de cuántas clases haya
+        cerca: un rostro desconocido lejos de todos los centroides tiene baja
+        confianza aunque uno de ellos sea el más probable.
+        """
+        minimas = self.distancias(X).min(axis=1)
+        return np.clip(100.0 * (1.0 - 0.3 * minimas / self.distancia_maxima), 0.0, 100.0)
+
+    def resumen(self) -> Dict[str, Any]:
+        return {
+            'clases': int(len(self.classes_)),
+            'muestras': int(self._conteos.sum()),
+        }
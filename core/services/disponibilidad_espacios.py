@@ -0,0 +1,232 @@
+"""
+Disponibilidad de los espacios comunes por día
+
+``DisponibilidadEspacioComun`` describe ventanas abiertas (o bloqueadas por
+mantenimiento), algunas recurrentes por día de la semana en un JSON que no se
+puede indexar. Aquí se expanden en memoria a intervalos por fecha (minutos
+desde medianoche, ``[inicio, fin)``, ordenados y sin solapes), se restan los
+bloqueos y las reservas que ocupan el espacio, y queda el calendario de
+horarios libres de un rango de fechas en tres consultas.
+
+Las fechas que no cubre ninguna ventana abierta usan el
+``horario_apertura``/``horario_cierre`` del espacio en los
+``dias_disponibles`` (todos los días si la lista está vacía).
+
+Las reservas nuevas se validan con ``BloqueoReservaDia`` bloqueado
+(``select_for_update``) hasta el commit: dos reservas del mismo espacio y día
+no pueden validarse a la vez y ocupar el mismo horario.
+"""
+
+import unicodedata
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.utils import timezone
+
+from core.models.propiedades_residentes import (
+    BloqueoReservaDia,
+    DisponibilidadEspacioComun,
+    EspacioComun,
+    ReservaEspacio,
+)
+
+# Minutos desde medianoche, fin excluido
+Intervalo = Tuple[int, int]
+
+FIN_DIA = 24 * 60
+
+# Reservas que ocupan su horario ('parcial' lo asigna el registro de pagos)
+ESTADOS_RESERVA_OCUPAN = ('solicitada', 'confirmada', 'pagada', 'parcial', 'en_uso')
+
+DIAS_SEMANA = ('lunes', 'martes', 'miercoles', 'jueves', 'viernes', 'sabado', 'domingo')
+
+# Días máximos por consulta del calendario
+MAX_DIAS_CALENDARIO = 31
+
+
+def _dia_semana(nombre) -> Optional[int]:
+    """'Lunes', 'miércoles', 'SABADO'... -> 0..6 (None si no se reconoce)"""
+    texto = unicodedata.normalize('NFKD', str(nombre)).encode('ascii', 'ignore').decode().strip().lower()
+    return DIAS_SEMANA.index(texto) if texto in DIAS_SEMANA else None
+
+
+def _minutos(hora: time) -> int:
+    return hora.hour * 60 + hora.minute
+
+
+def _hora(minutos: int) -> time:
+    # TimeField no admite 24:00: el fin del día se muestra como 23:59
+    return time(23, 59) if minutos >= FIN_DIA else time(minutos // 60, minutos % 60)
+
+
+def _ventana(inicio: time, fin: time) -> Optional[Intervalo]:
+    """Ventana horaria del día; un fin a medianoche cierra el día"""
+    a, b = _minutos(inicio), _minutos(fin) or FIN_DIA
+    return (a, b) if b > a else None
+
+
+def _fechas(desde: date, hasta: date) -> Iterable[date]:
+    for n in range((hasta - desde).days + 1):
+        yield desde + timedelta(days=n)
+
+
+def unir(intervalos: Iterable[Intervalo]) -> List[Intervalo]:
+    """Ordena y fusiona intervalos solapados o contiguos"""
+    resultado: List[Intervalo] = []
+    for inicio, fin in sorted(intervalos):
+        if resultado and inicio <= resultado[-1][1]:
+            resultado[-1] = (resultado[-1][0], max(resultado[-1][1], fin))
+        else:
+            resultado.append((inicio, fin))
+    return resultado
+
+
+def restar(libres: List[Intervalo], ocupados: List[Intervalo]) -> List[Intervalo]:
+    """``libres`` menos ``ocupados`` (ambos ordenados y sin solapes)"""
+    resultado: List[Intervalo] = []
+    i = 0
+    for inicio, fin in libres:
+        while i < len(ocupados) and ocupados[i][1] <= inicio:
+            i += 1
+        j = i
+        while j < len(ocupados) and ocupados[j][0] < fin:
+            if ocupados[j][0] > inicio:
+                resultado.append((inicio, ocupados[j][0]))
+            inicio = max(inicio, ocupados[j][1])
+            j += 1
+        if inicio < fin:
+            resultado.append((inicio, fin))
+    return resultado
+
+
+def contiene(intervalos: List[Intervalo], inicio: int, fin: int) -> bool:
+    """True si ``[inicio, fin)`` cae entero dentro de uno de los intervalos"""
+    i = bisect_right(intervalos, (inicio, FIN_DIA + 1)) - 1
+    return i >= 0 and intervalos[i][0] <= inicio and fin <= intervalos[i][1]
+
+
+def _cargar(espacio_id: int, desde: date, hasta: date):
+    """Espacio activo y ventanas de disponibilidad que tocan el rango"""
+    espacio = EspacioComun.objects.get(pk=espacio_id, activo=True)
+
+    inicio = timezone.make_aware(datetime.combine(desde, time.min))
+    fin = timezone.make_aware(datetime.combine(hasta + timedelta(days=1), time.min))
+    ventanas = list(DisponibilidadEspacioComun.objects.filter(
+        espacio_comun_id=espacio_id, fecha_inicio__lt=fin, fecha_fin__gt=inicio
+    ))
+    return espacio, ventanas
+
+
+def expandir(espacio: EspacioComun, ventanas: Iterable[DisponibilidadEspacioComun],
+             desde: date, hasta: date) -> Dict[date, List[Intervalo]]:
+    """Intervalos abiertos de cada fecha del rango, ya descontados los bloqueos"""
+    abiertos: Dict[date, List[Intervalo]] = defaultdict(list)
+    bloqueados: Dict[date, List[Intervalo]] = defaultdict(list)
+    # Fechas dentro del periodo de alguna ventana abierta (aunque no sea su día de la semana)
+    cubiertas = set()
+
+    for ventana in ventanas:
+        destino = bloqueados if ventana.bloqueado_por_mantenimiento else abiertos
+        inicio = timezone.localtime(ventana.fecha_inicio)
+        fin = timezone.localtime(ventana.fecha_fin)
+        fechas = list(_fechas(max(desde, inicio.date()), min(hasta, fin.date())))
+        if not ventana.bloqueado_por_mantenimiento:
+            cubiertas.update(fechas)
+        if ventana.es_recurrente:
+            # La misma franja horaria en los días de la semana indicados
+            dias = {_dia_semana(nombre) for nombre in ventana.dias_recurrentes or []}
+            franja = _ventana(inicio.time(), fin.time())
+            if franja:
+                for fecha in fechas:
+                    if fecha.weekday() in dias:
+                        destino[fecha].append(franja)
+        else:
+            for fecha in fechas:
+                a = _minutos(inicio.time()) if fecha == inicio.date() else 0
+                b = _minutos(fin.time()) if fecha == fin.date() else FIN_DIA
+                if b > a:
+                    destino[fecha].append((a, b))
+
+    dias = {_dia_semana(nombre) for nombre in espacio.dias_disponibles or []} - {None}
+    horario = _ventana(espacio.horario_apertura, espacio.horario_cierre)
+    if horario:
+        for fecha in _fechas(desde, hasta):
+            if fecha not in cubiertas and (not dias or fecha.weekday() in dias):
+                abiertos[fecha].append(horario)
+
+    return {
+        fecha: restar(unir(abiertos[fecha]), unir(bloqueados[fecha]))
+        for fecha in _fechas(desde, hasta)
+    }
+
+
+def calendario(espacio_id: int, desde: date, hasta: date) -> Dict[date, List[Intervalo]]:
+    """
+    Horarios libres de un espacio para cada fecha de ``desde`` a ``hasta``
+
+    Raises:
+        EspacioComun.DoesNotExist: El espacio no existe o no está activo
+    """
+    espacio, ventanas = _cargar(espacio_id, desde, hasta)
+    ocupados: Dict[date, List[Intervalo]] = defaultdict(list)
+    reservas = ReservaEspacio.objects.filter(
+        espacio_comun_id=espacio_id, fecha_reserva__range=(desde, hasta), estado__in=ESTADOS_RESERVA_OCUPAN
+    ).values_list('fecha_reserva', 'hora_inicio', 'hora_fin')
+    for fecha, hora_inicio, hora_fin in reservas:
+        intervalo = _ventana(hora_inicio, hora_fin)
+        if intervalo:
+            ocupados[fecha].append(intervalo)
+
+    return {
+        fecha: restar(libres, unir(ocupados[fecha]))
+        for fecha, libres in expandir(espacio, ventanas, desde, hasta).items()
+    }
+
+
+def a_horarios(intervalos: List[Intervalo]) -> List[Dict[str, time]]:
+    return [{'hora_inicio': _hora(inicio), 'hora_fin': _hora(fin)} for inicio, fin in intervalos]
+
+
+def bloquear_dia(espacio_id: int, fecha: date) -> BloqueoReservaDia:
+    """
+    Bloquea el día del espacio hasta el fin de la transacción en curso
+
+    Debe llamarse dentro de ``transaction.atomic()``.
+    """
+    bloqueo, _ = BloqueoReservaDia.objects.select_for_update().get_or_create(
+        espacio_comun_id=espacio_id, fecha=fecha
+    )
+    return bloqueo
+
+
+def validar_horario(espacio_id: int, fecha: date, hora_inicio: time, hora_fin: time,
+                    excluir: Optional[int] = None) -> Optional[str]:
+    """
+    Motivo por el que no se puede reservar el horario, o None si está libre
+
+    Para que el resultado siga valiendo al guardar, llamar con el día
+    bloqueado (``bloquear_dia``).
+    """
+    intervalo = _ventana(hora_inicio, hora_fin)
+    if not intervalo:
+        return "La hora de fin debe ser posterior a la hora de inicio."
+
+    ocupada = ReservaEspacio.objects.filter(
+        espacio_comun_id=espacio_id,
+        fecha_reserva=fecha,
+        estado__in=ESTADOS_RESERVA_OCUPAN,
+        hora_inicio__lt=hora_fin,
+        hora_fin__gt=hora_inicio,
+    ).exclude(pk=excluir).exists()
+    if ocupada:
+        return "La reserva no se puede realizar, el horario ya está ocupado."
+
+    try:
+        espacio, ventanas = _cargar(espacio_id, fecha, fecha)
+    except EspacioComun.DoesNotExist:
+        return "El espacio común no está activo."
+    if not contiene(expandir(espacio, ventanas, fecha, fecha)[fecha], *intervalo):
+        return "El horario está fuera de la disponibilidad del espacio."
+    return None
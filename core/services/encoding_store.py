@@ -0,0 +1,324 @@
+# core/services/encoding_store.py - Encodings faciales precalculados por foto
+"""
+Almacén persistente de encodings faciales
+
+Cada foto se identifica por el SHA-256 de su contenido. El encoding se calcula
+una sola vez (al subir la foto) y se guarda como 128 float32 en binario, de modo
+que el reconocimiento de acceso solo tiene que leerlos de la base de datos.
+
+Para fotos remotas (entrenamiento) ``encodings_de_urls`` recuerda qué contenido
+sirve cada URL y su ETag: solo se descargan y procesan las fotos nuevas o que
+cambiaron.
+
+Las fotos de visita que no se pudieron descargar o procesar guardan los
+intentos y la hora del siguiente (espera exponencial), para no descargarlas
+de nuevo en cada carga de la galería.
+"""
+import hashlib
+import io
+import logging
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from django.utils import timezone
+
+logger = logging.getLogger('seguridad')
+
+# Espera antes de reintentar una foto de visita fallida: se duplica con cada
+# intento hasta el máximo
+REINTENTO_FOTO_BASE_SEGUNDOS = 300
+REINTENTO_FOTO_MAX_SEGUNDOS = 24 * 3600
+
+try:
+    import face_recognition
+    FACE_RECOGNITION_AVAILABLE = True
+except ImportError:
+    face_recognition = None
+    FACE_RECOGNITION_AVAILABLE = False
+
+
+def hash_foto(contenido: bytes) -> str:
+    """SHA-256 hexadecimal del contenido de la foto"""
+    return hashlib.sha256(contenido).hexdigest()
+
+
+def serializar_encoding(encoding) -> bytes:
+    """Convierte un encoding a su forma binaria compacta (float32)"""
+    return np.asarray(encoding, dtype=np.float32).tobytes()
+
+
+def deserializar_encoding(crudo) -> np.ndarray:
+    """Vista float32 sobre los bytes almacenados, sin copiar"""
+    return np.frombuffer(crudo, dtype=np.float32)
+
+
+def calcular_encoding(contenido: bytes) -> Optional[np.ndarray]:
+    """
+    Calcula el encoding del primer rostro de la foto
+
+    Returns:
+        np.ndarray o None si no se detecta rostro o face_recognition no está disponible
+    """
+    if not FACE_RECOGNITION_AVAILABLE:
+        logger.warning("face_recognition no disponible, no se puede calcular el encoding")
+        return None
+
+    imagen = face_recognition.load_image_file(io.BytesIO(contenido))
+    encodings = face_recognition.face_encodings(imagen)
+    return encodings[0] if encodings else None
+
+
+def registrar_foto(contenido: bytes, url: Optional[str] = None) -> Optional[str]:
+    """
+    Calcula y guarda el encoding de una foto si aún no existe
+
+    Las fotos sin rostro también se registran (con encoding nulo) para no
+    volver a procesarlas.
+
+    Returns:
+        str: Hash SHA-256 de la foto, que se guarda junto a su path/url.
+        None si no se pudo calcular (se reintentará más adelante).
+    """
+    from core.models import EncodingFacialFoto
+
+    sha256 = hash_foto(contenido)
+    if EncodingFacialFoto.objects.filter(sha256=sha256).exists():
+        return sha256
+
+    try:
+        encoding = calcular_encoding(contenido)
+    except Exception as e:
+        logger.warning(f"Error calculando encoding de foto {sha256[:12]}: {e}")
+        return None
+
+    if encoding is None and not FACE_RECOGNITION_AVAILABLE:
+        # Sin motor de IA no se registra nada para poder calcularlo más adelante
+        return None
+
+    guardar_encoding(sha256, encoding, url)
+    return sha256
+
+
+def guardar_encoding(sha256: str, encoding, url: Optional[str] = None):
+    """Guarda un encoding ya calculado (None = la foto no tiene rostro)"""
+    from core.models import EncodingFacialFoto
+
+    EncodingFacialFoto.objects.get_or_create(
+        sha256=sha256,
+        defaults={
+            'encoding': serializar_encoding(encoding) if encoding is not None else None,
+            'url': url,
+        }
+    )
+
+
+def cargar_encodings(hashes: Iterable[str]) -> Dict[str, np.ndarray]:
+    """
+    Lee en una sola consulta los encodings de los hashes indicados
+
+    Returns:
+        Dict hash -> encoding float32; los hashes sin rostro o desconocidos no aparecen
+    """
+    from core.models import EncodingFacialFoto
+
+    hashes = {h for h in hashes if h}
+    if not hashes:
+        return {}
+
+    filas = EncodingFacialFoto.objects.filter(
+        sha256__in=hashes, encoding__isnull=False
+    ).values_list('sha256', 'encoding')
+    return {sha256: deserializar_encoding(crudo) for sha256, crudo in filas}
+
+
+def _normalizar_foto(foto):
+    """Las visitas antiguas guardan la URL sola en lugar de ``{'url': ...}``"""
+    return {'url': foto} if isinstance(foto, str) else foto
+
+
+def foto_pendiente(foto, ahora: Optional[datetime] = None) -> bool:
+    """True si a la foto le falta el hash y no está esperando un reintento"""
+    if isinstance(foto, str):
+        return True
+    if not isinstance(foto, dict) or foto.get('sha256'):
+        return False
+    reintentar = foto.get('reintentar')
+    return not reintentar or datetime.fromisoformat(reintentar) <= (ahora or timezone.now())
+
+
+def _marcar_fallo(foto: dict, ahora: datetime):
+    intentos = foto.get('intentos', 0) + 1
+    espera = min(REINTENTO_FOTO_BASE_SEGUNDOS * 2 ** (intentos - 1), REINTENTO_FOTO_MAX_SEGUNDOS)
+    foto['intentos'] = intentos
+    foto['reintentar'] = (ahora + timedelta(seconds=espera)).isoformat()
+
+
+def asegurar_hashes_visita(visita) -> bool:
+    """
+    Completa el hash de las fotos de reconocimiento de una visita antigua
+    (subidas antes de existir este almacén), descargándolas una única vez
+
+    Las fotos que fallan quedan marcadas con ``intentos`` y ``reintentar``
+    (ver ``foto_pendiente``).
+
+    Returns:
+        bool: True si se actualizó la visita
+    """
+    from core.utils.download_image import download_image_from_url
+
+    ahora = timezone.now()
+    originales = list(visita.fotos_reconocimiento or [])
+    fotos: List[dict] = [_normalizar_foto(foto) for foto in originales]
+    actualizada = fotos != originales
+    for foto in fotos:
+        if not foto_pendiente(foto, ahora):
+            continue
+        origen = foto if foto.get('path') else foto.get('url')
+        if not origen:
+            continue
+        try:
+            contenido = download_image_from_url(origen).getvalue()
+        except Exception as e:
+            logger.warning(f"No se pudo descargar foto de visita {visita.id}: {e}")
+            contenido = None
+        sha256 = registrar_foto(contenido, foto.get('url')) if contenido is not None else None
+        if sha256:
+            foto['sha256'] = sha256
+            foto.pop('intentos', None)
+            foto.pop('reintentar', None)
+        else:
+            _marcar_fallo(foto, ahora)
+        actualizada = True
+
+    if actualizada:
+        visita.fotos_reconocimiento = fotos
+        visita.save(update_fields=['fotos_reconocimiento'])
+    return actualizada
+
+
+def _descargar(url: str, etag: str = '') -> Tuple[int, bytes, str]:
+    """
+    Descarga una foto; con ``etag`` hace un GET condicional
+
+    Returns:
+        Tuple (status HTTP, contenido, ETag de la respuesta)
+    """
+    import requests
+
+    headers = {'If-None-Match': etag} if etag else {}
+    response = requests.get(url, timeout=10, headers=headers)
+    return response.status_code, response.content, response.headers.get('ETag', '')
+
+
+def encodings_de_urls(urls: Iterable[str], descargas: int = 8, procesos: Optional[int] = None,
+                      extraer=None) -> Dict[str, Optional[np.ndarray]]:
+    """
+    Encodings de fotos remotas usando el almacén como caché
+
+    - URL ya vista sin ETag: se reutiliza sin tocar la red (las fotos se suben
+      con nombre único, el contenido de una URL no cambia)
+    - URL con ETag: GET condicional; 304 reutiliza el encoding
+    - Contenido nuevo: se descarga (``descargas`` en paralelo) y, si su hash
+      no está en el almacén, el encoding se calcula en un pool de ``procesos``
+
+    Args:
+        urls: URLs de las fotos
+        descargas: Descargas simultáneas
+        procesos: Procesos de extracción (por defecto uno por CPU)
+        extraer: Función de extracción; si se indica se ejecuta en el proceso
+            actual en lugar del pool (tests)
+
+    Returns:
+        Dict url -> encoding float32, o None si la foto no tiene rostro o no se
+        pudo procesar
+    """
+    from core.models import EncodingFacialFoto, FotoRemotaCache
+
+    urls = list(dict.fromkeys(u for u in urls if u))
+    if not urls:
+        return {}
+
+    cache = {c.url: c for c in FotoRemotaCache.objects.filter(url__in=urls)}
+    conocidos = dict(
+        EncodingFacialFoto.objects.filter(sha256__in={c.sha256 for c in cache.values()}).values_list('sha256', 'encoding')
+    )
+    hash_por_url: Dict[str, str] = {}
+    etags: Dict[str, str] = {}
+    pendientes: List[str] = []
+
+    for url in urls:
+        entrada = cache.get(url)
+        if entrada and entrada.sha256 in conocidos and not entrada.etag:
+            hash_por_url[url] = entrada.sha256
+        else:
+            pendientes.append(url)
+
+    # Descargas concurrentes (condicionales cuando hay ETag)
+    contenidos: Dict[str, bytes] = {}
+    with ThreadPoolExecutor(max_workers=max(1, descargas)) as pool:
+        futuros = {}
+        for url in pendientes:
+            entrada = cache.get(url)
+            etag = entrada.etag if entrada and entrada.sha256 in conocidos else ''
+            futuros[url] = pool.submit(_descargar, url, etag)
+        for url, futuro in futuros.items():
+            try:
+                status_code, contenido, etag = futuro.result()
+            except Exception as e:
+                logger.warning(f"⚠️ Error descargando {url}: {e}")
+                continue
+            if status_code == 304:
+                hash_por_url[url] = cache[url].sha256
+            elif status_code == 200:
+                sha256 = hash_foto(contenido)
+                hash_por_url[url] = sha256
+                etags[url] = etag
+                if sha256 not in conocidos:
+                    contenidos.setdefault(sha256, contenido)
+            else:
+                logger.warning(f"⚠️ Descarga de {url} respondió {status_code}")
+
+    # Extracción de encodings solo para contenido nuevo
+    url_por_hash = {sha256: url for url, sha256 in hash_por_url.items()}
+    if contenidos and (FACE_RECOGNITION_AVAILABLE or extraer is not None):
+        hashes = list(contenidos)
+        if extraer is not None:
+            resultados = [_calcular_encoding_seguro(contenidos[h], extraer) for h in hashes]
+        else:
+            with ProcessPoolExecutor(max_workers=procesos) as pool:
+                resultados = list(pool.map(_calcular_encoding_seguro, (contenidos[h] for h in hashes)))
+        for sha256, (encoding, error) in zip(hashes, resultados):
+            if error:
+                logger.warning(f"⚠️ Error calculando encoding de {url_por_hash.get(sha256)}: {error}")
+                continue
+            guardar_encoding(sha256, encoding, url_por_hash.get(sha256))
+            conocidos[sha256] = serializar_encoding(encoding) if encoding is not None else None
+
+    for url, sha256 in hash_por_url.items():
+        if sha256 not in conocidos:
+            continue
+        entrada = cache.get(url)
+        if entrada is None:
+            FotoRemotaCache.objects.update_or_create(url=url, defaults={'sha256': sha256, 'etag': etags.get(url, '')})
+        elif url in etags or entrada.sha256 != sha256:
+            entrada.sha256, entrada.etag = sha256, etags.get(url, entrada.etag)
+            entrada.save()
+
+    logger.info(
+        f"📦 Encodings de {len(urls)} fotos: {len(urls) - len(pendientes)} desde caché, "
+        f"{len(pendientes)} revalidadas o descargadas, {len(contenidos)} procesadas"
+    )
+    return {
+        url: deserializar_encoding(conocidos[sha256]) if conocidos[sha256] is not None else None
+        for url, sha256 in hash_por_url.items() if sha256 in conocidos
+    }
+
+
+def _calcular_encoding_seguro(contenido: bytes, calcular=calcular_encoding):
+    """calcular_encoding para el pool de procesos: retorna (encoding, error)"""
+    try:
+        return calcular(contenido), None
+    except Exception as e:
+        return None, str(e)
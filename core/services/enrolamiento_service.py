@@ -0,0 +1,233 @@
+# core/services/enrolamiento_service.py - Enrolamiento facial por lotes
+"""
+Enrolamiento facial por lotes en segundo plano
+
+La vista crea un ``TrabajoEnrolamientoFacial`` y responde de inmediato con su
+ID. Un pool de hilos acotado orquesta cada trabajo: el análisis de cada foto
+(encoding + calidad) corre en un pool de procesos y la subida a Dropbox en
+paralelo, actualizando el progreso del trabajo a medida que termina cada foto.
+"""
+import io
+import json
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger('seguridad')
+
+# Calidad mínima (0-1) para aceptar una foto como referencia de enrolamiento
+CALIDAD_MINIMA = 0.3
+
+_pool_trabajos: Optional[ThreadPoolExecutor] = None
+_pool_analisis: Optional[ProcessPoolExecutor] = None
+_pools_lock = threading.Lock()
+
+
+def _configuracion() -> Tuple[int, int]:
+    from django.conf import settings
+    return (
+        getattr(settings, 'ENROLAMIENTO_TRABAJOS_SIMULTANEOS', 2),
+        getattr(settings, 'ENROLAMIENTO_PROCESOS_ANALISIS', 2),
+    )
+
+
+def _pools() -> Tuple[ThreadPoolExecutor, ProcessPoolExecutor]:
+    """Pools del proceso, creados al primer uso"""
+    global _pool_trabajos, _pool_analisis
+    with _pools_lock:
+        if _pool_trabajos is None:
+            trabajos, procesos = _configuracion()
+            _pool_trabajos = ThreadPoolExecutor(max_workers=trabajos, thread_name_prefix='enrolamiento')
+            _pool_analisis = ProcessPoolExecutor(max_workers=procesos)
+        return _pool_trabajos, _pool_analisis
+
+
+def analizar_foto(contenido: bytes) -> Dict:
+    """
+    Encoding y calidad de una foto; se ejecuta en el pool de procesos
+
+    Returns:
+        Dict con ``encoding`` (lista de floats o None), ``calidad`` (0-1) y
+        ``error`` si no se pudo procesar
+    """
+    from seguridad.services.provider_registry import obtener_provider_local
+    from seguridad.services.face_gallery import normalizar_encodings
+
+    # Una instancia por proceso del pool, no una por foto
+    provider = obtener_provider_local()
+    resultado = {'encoding': None, 'calidad': 0.0, 'error': None}
+    try:
+        resultado['calidad'] = float(provider._calculate_image_quality(contenido))
+        encoding_b64 = provider.detect_face(contenido)
+        encodings = normalizar_encodings(encoding_b64)
+        if encodings:
+            resultado['encoding'] = [float(v) for v in encodings[0]]
+        else:
+            resultado['error'] = 'No se detectó rostro en la foto'
+    except Exception as e:
+        resultado['error'] = str(e)
+    return resultado
+
+
+def crear_trabajo(usuario, persona, fotos: List[Tuple[str, bytes]], subir_fotos: bool = True):
+    """
+    Registra el trabajo y lo encola
+
+    Args:
+        usuario: Usuario que sube las fotos
+        persona: Persona a enrolar (el propietario o uno de sus familiares)
+        fotos: Lista de (nombre de archivo, contenido)
+        subir_fotos: Subir a Dropbox las fotos aceptadas
+
+    Returns:
+        TrabajoEnrolamientoFacial recién creado
+    """
+    from authz.models import TrabajoEnrolamientoFacial
+
+    trabajo = TrabajoEnrolamientoFacial.objects.create(
+        usuario=usuario, persona=persona, total_fotos=len(fotos)
+    )
+    encolar_trabajo(trabajo.id, fotos, subir_fotos)
+    return trabajo
+
+
+def encolar_trabajo(trabajo_id, fotos: List[Tuple[str, bytes]], subir_fotos: bool = True):
+    """Envía el trabajo al pool de hilos (después del commit de la transacción)"""
+    from django.db import transaction
+
+    def enviar():
+        pool_trabajos, _ = _pools()
+        pool_trabajos.submit(procesar_trabajo, trabajo_id, fotos, subir_fotos)
+
+    transaction.on_commit(enviar)
+
+
+def _subir_foto(usuario_id: int, nombre: str, contenido: bytes) -> Dict:
+    from django.utils import timezone
+    from core.utils.dropbox_upload import upload_image_to_dropbox
+
+    timestamp = timezone.now().strftime("%Y%m%d_%H%M%S_%f")
+    extension = nombre.rsplit('.', 1)[-1].lower() if '.' in nombre else 'jpg'
+    nombre_archivo = f"propietario_{usuario_id}_{timestamp}.{extension}"
+    folder_path = f"/PropietariosReconocimiento/propietario_{usuario_id}"
+    return upload_image_to_dropbox(io.BytesIO(contenido), nombre_archivo, folder_path)
+
+
+def procesar_trabajo(trabajo_id, fotos: List[Tuple[str, bytes]], subir_fotos: bool = True, analizar=None):
+    """
+    Procesa todas las fotos del trabajo
+
+    Args:
+        trabajo_id: ID del TrabajoEnrolamientoFacial
+        fotos: Lista de (nombre de archivo, contenido)
+        subir_fotos: Subir a Dropbox las fotos aceptadas
+        analizar: Función de análisis; por defecto ``analizar_foto`` en el pool de procesos
+    """
+    from django.db import close_old_connections
+    from django.utils import timezone
+    from authz.models import TrabajoEnrolamientoFacial
+
+    close_old_connections()
+    trabajo = TrabajoEnrolamientoFacial.objects.select_related('persona').get(id=trabajo_id)
+    trabajo.estado = 'PROCESANDO'
+    trabajo.save(update_fields=['estado', 'fecha_actualizacion'])
+
+    try:
+        resultados: List[Optional[Dict]] = [None] * len(fotos)
+        with ThreadPoolExecutor(max_workers=max(1, len(fotos))) as subidas:
+            if analizar is None:
+                _, pool_analisis = _pools()
+                analisis = {pool_analisis.submit(analizar_foto, contenido): i for i, (_, contenido) in enumerate(fotos)}
+            else:
+                analisis = {subidas.submit(analizar, contenido): i for i, (_, contenido) in enumerate(fotos)}
+
+            for futuro in as_completed(analisis):
+                indice = analisis[futuro]
+                nombre, contenido = fotos[indice]
+                resultado = {'indice': indice, 'nombre': nombre, **futuro.result()}
+                resultado['aceptada'] = bool(resultado['encoding']) and resultado['calidad'] >= CALIDAD_MINIMA
+                if resultado['encoding'] and not resultado['aceptada']:
+                    resultado['error'] = f"Calidad insuficiente ({resultado['calidad']:.2f})"
+
+                # Solo se suben a Dropbox las fotos aceptadas
+                if resultado['aceptada'] and subir_fotos:
+                    resultado['subida'] = subidas.submit(_subir_foto, trabajo.usuario_id, nombre, contenido)
+                resultados[indice] = resultado
+
+                trabajo.fotos_procesadas += 1
+                trabajo.resultados = [_resumen(r) for r in resultados if r is not None]
+                trabajo.save(update_fields=['fotos_procesadas', 'resultados', 'fecha_actualizacion'])
+
+            for resultado in resultados:
+                subida = resultado.pop('subida', None)
+                if subida is None:
+                    continue
+                try:
+                    resultado['url'] = subida.result().get('url')
+                except Exception as e:
+                    resultado['error'] = f'Error al subir foto a Dropbox: {e}'
+
+        _guardar_enrolamiento(trabajo, resultados)
+        trabajo.estado = 'COMPLETADO'
+    except Exception as e:
+        logger.error(f"Error en trabajo de enrolamiento {trabajo_id}: {e}")
+        trabajo.estado = 'ERROR'
+        trabajo.error = str(e)
+
+    trabajo.fecha_finalizacion = timezone.now()
+    trabajo.save()
+    close_old_connections()
+    return trabajo
+
+
+def _resumen(resultado: Dict) -> Dict:
+    """Resultado por foto sin el encoding (lo que se guarda y se muestra)"""
+    return {
+        'indice': resultado['indice'],
+        'nombre': resultado['nombre'],
+        'calidad': round(resultado['calidad'], 3),
+        'rostro_detectado': bool(resultado['encoding']),
+        'aceptada': resultado['aceptada'],
+        'url': resultado.get('url'),
+        'error': resultado.get('error'),
+    }
+
+
+def _guardar_enrolamiento(trabajo, resultados: List[Dict]):
+    """Agrega los encodings aceptados a la persona y las URLs al ReconocimientoFacial"""
+    from django.db import transaction
+    from authz.models import Persona
+    from seguridad.models import Copropietarios, ReconocimientoFacial
+
+    aceptados = [r for r in resultados if r['aceptada']]
+    trabajo.resultados = [_resumen(r) for r in resultados]
+    if not aceptados:
+        return
+
+    with transaction.atomic():
+        # Otro trabajo de la misma persona puede guardar a la vez: se agrega
+        # sobre la fila bloqueada, no sobre la copia cargada con el trabajo
+        persona = Persona.objects.select_for_update().get(pk=trabajo.persona_id)
+        encodings = persona.encoding_facial or []
+        if encodings and isinstance(encodings[0], (float, int)):
+            encodings = [encodings]
+        persona.encoding_facial = encodings + [r['encoding'] for r in aceptados]
+        persona.reconocimiento_facial_activo = True
+        persona.save(update_fields=['encoding_facial', 'reconocimiento_facial_activo'])
+        trabajo.encodings_agregados = len(aceptados)
+
+        copropietario = Copropietarios.objects.filter(usuario_sistema_id=trabajo.usuario_id).first()
+        urls = [r['url'] for r in aceptados if r.get('url')]
+        if copropietario and urls and getattr(trabajo.usuario, 'persona_id', None) == persona.id:
+            reconocimiento, _ = ReconocimientoFacial.objects.get_or_create(
+                copropietario=copropietario, defaults={'activo': True}
+            )
+            try:
+                fotos_list = json.loads(reconocimiento.fotos_urls) if reconocimiento.fotos_urls else []
+                if not isinstance(fotos_list, list):
+                    fotos_list = []
+            except (json.JSONDecodeError, TypeError):
+                fotos_list = []
+            reconocimiento.fotos_urls = json.dumps(fotos_list + urls)
+            reconocimiento.save()
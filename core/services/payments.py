@@ -1,9 +1,13 @@
 from __future__ import annotations
 
+import calendar
+import time
+from dataclasses import dataclass, field
 from datetime import date
-from decimal import Decimal
-from typing import Iterable, Optional, Tuple
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Dict, Iterable, Optional, Tuple
 
+import numpy as np
 from django.db import transaction
 from django.db.models import Q, Sum
 from django.utils import timezone
@@ -104,8 +108,8 @@ def ensure_vivienda_y_propiedad(persona: Persona) -> Tuple[Vivienda, Propiedad]:
 
 
 def crear_expensa_demo(persona: Persona, monto_total: Decimal = Decimal('450.00')) -> ExpensasMensuales:
-    vivienda, _ = ensure_vivienda_y_propiedad(persona)
-    last = ExpensasMensuales.objects.filter(vivienda=vivienda).order_by('-periodo_year', '-periodo_month').first()
+    _, propiedad = ensure_vivienda_y_propiedad(persona)
+    last = ExpensasMensuales.objects.filter(vivienda=propiedad).order_by('-periodo_year', '-periodo_month').first()
     if last:
         year = last.periodo_year
         month = last.periodo_month + 1
@@ -137,7 +141,7 @@ def crear_expensa_demo(persona: Persona, monto_total: Decimal = Decimal('450.00'
     }
 
     expensa, created = ExpensasMensuales.objects.get_or_create(
-        vivienda=vivienda,
+        vivienda=propiedad,
         periodo_year=year,
         periodo_month=month,
         defaults=defaults,
@@ -180,19 +184,83 @@ def crear_multa_demo(persona: Persona, monto: Decimal = Decimal('150.00')) -> Mu
     return multa
 
 
-def _sum_pagos_queryset(qs) -> Decimal:
-    total = qs.exclude(estado__in=('rechazado', 'reembolsado')).aggregate(total=Sum('monto'))['total']
-    return total or Decimal('0')
+# Estados de pago que cuentan para cada tipo de deuda (las reservas solo
+# descuentan pagos procesados)
+ESTADOS_PAGO_CONTABLES = {
+    'expensa': CONFIRMED_PAYMENT_STATES,
+    'multa': CONFIRMED_PAYMENT_STATES,
+    'reserva': ('procesado',),
+}
+
+
+@dataclass(frozen=True)
+class EstadoCobro:
+    monto: Decimal
+    pagado: Decimal
+
+    @property
+    def pendiente(self) -> Decimal:
+        return max(Decimal('0'), self.monto - self.pagado)
+
+    @property
+    def estado(self) -> str:
+        """Estado según lo pagado: pagada, parcial o pendiente"""
+        if self.pagado >= self.monto:
+            return 'pagada'
+        return 'parcial' if self.pagado > 0 else 'pendiente'
+
+
+@dataclass
+class ResumenPagos:
+    expensas: Dict[int, EstadoCobro] = field(default_factory=dict)
+    multas: Dict[int, EstadoCobro] = field(default_factory=dict)
+    reservas: Dict[int, EstadoCobro] = field(default_factory=dict)
+
+    def pagado_por(self, tipo: str) -> Dict[int, Decimal]:
+        """``{id: pagado}`` para el contexto de los serializers de deuda"""
+        return {pk: cobro.pagado for pk, cobro in getattr(self, tipo).items()}
+
+
+def _pagado_agrupado(tipo: str, ids) -> Dict[int, Decimal]:
+    if not ids:
+        return {}
+    filas = (
+        Pagos.objects
+        .filter(**{f'{tipo}_id__in': ids, 'estado__in': ESTADOS_PAGO_CONTABLES[tipo]})
+        .order_by()
+        .values(f'{tipo}_id')
+        .annotate(total=Sum('monto'))
+        .values_list(f'{tipo}_id', 'total')
+    )
+    return {pk: total or Decimal('0') for pk, total in filas}
+
+
+def resumen_pagos(expensas: Iterable[ExpensasMensuales] = (), multas: Iterable[MultasSanciones] = (),
+                  reservas: Iterable = ()) -> ResumenPagos:
+    """
+    Pagado, pendiente y estado de cada expensa, multa y reserva
+
+    Una consulta agrupada por tipo con elementos (ninguna si no hay).
+    """
+    resumen = ResumenPagos()
+    for tipo, objetos, destino in (
+        ('expensa', expensas, resumen.expensas),
+        ('multa', multas, resumen.multas),
+        ('reserva', reservas, resumen.reservas),
+    ):
+        montos = {obj.pk: obj.monto if tipo == 'multa' else obj.monto_total for obj in objetos}
+        pagado = _pagado_agrupado(tipo, list(montos))
+        for pk, monto in montos.items():
+            destino[pk] = EstadoCobro(monto=monto, pagado=pagado.get(pk, Decimal('0')))
+    return resumen
 
 
 def total_pagado_expensa(expensa: ExpensasMensuales) -> Decimal:
-    pagos = Pagos.objects.filter(expensa=expensa, estado__in=CONFIRMED_PAYMENT_STATES)
-    return _sum_pagos_queryset(pagos)
+    return resumen_pagos(expensas=[expensa]).expensas[expensa.pk].pagado
 
 
 def total_pagado_multa(multa: MultasSanciones) -> Decimal:
-    pagos = Pagos.objects.filter(multa=multa, estado__in=CONFIRMED_PAYMENT_STATES)
-    return _sum_pagos_queryset(pagos)
+    return resumen_pagos(multas=[multa]).multas[multa.pk].pagado
 
 
 def viviendas_de_persona(persona: Persona) -> Iterable[int]:
@@ -201,11 +269,10 @@ def viviendas_de_persona(persona: Persona) -> Iterable[int]:
 
 def expensas_pendientes(persona: Persona):
     estados_pendientes = ('pendiente', 'morosa', 'vencida', 'parcial')
-    viviendas_ids = list(viviendas_de_persona(persona))
-    if not viviendas_ids:
-        return ExpensasMensuales.objects.none()
+    # ExpensasMensuales.vivienda apunta a la Propiedad (tenencia) facturada
     return ExpensasMensuales.objects.filter(
-        vivienda_id__in=viviendas_ids,
+        vivienda__persona=persona,
+        vivienda__activo=True,
         estado__in=estados_pendientes,
     ).order_by('-periodo_year', '-periodo_month')
 
@@ -217,15 +284,123 @@ def multas_pendientes(persona: Persona):
         estado__in=estados_pendientes,
     ).order_by('-fecha_infraccion')
 
-def total_pagado_reserva(reserva):
+
+def total_pagado_reserva(reserva) -> Decimal:
+    """Total de los pagos procesados de la reserva"""
+    return resumen_pagos(reservas=[reserva]).reservas[reserva.pk].pagado
+
+
+@dataclass
+class ResultadoFacturacion:
+    periodo_year: int
+    periodo_month: int
+    propiedades: int
+    creadas: int
+    existentes: int
+    monto_total: Decimal
+    segundos: float
+
+    @property
+    def filas_por_segundo(self) -> float:
+        return self.creadas / self.segundos if self.segundos > 0 else 0.0
+
+
+def _centesimos(valores) -> np.ndarray:
+    """Decimales de 2 posiciones como enteros exactos (centavos / centésimos)"""
+    enteros = [int(valor.scaleb(2).to_integral_value(rounding=ROUND_HALF_UP)) for valor in valores]
+    return np.array(enteros, dtype=np.int64)
+
+
+def calcular_importes_expensas(tarifas, metros, por_metro, porcentajes) -> list:
+    """
+    Importe de cada propiedad en centavos: tarifa (por casa o por m²) por su
+    porcentaje de propiedad, redondeado a centavo (mitad hacia arriba)
+
+    Aritmética entera sobre arreglos: sin floats, igual que con Decimal.
     """
-    Calcula el total pagado por una reserva. 
-    Suma los montos de los pagos procesados que estén asociados a la reserva.
+    tarifas_c = _centesimos(tarifas)
+    # Factor de la tarifa en centésimos: m² o 1.00 para cobro por casa
+    factor = np.where(np.asarray(por_metro, dtype=bool), _centesimos(metros), 100)
+    porcentajes_c = _centesimos(porcentajes)
+    if len(tarifas_c) == 0:
+        return []
+    # producto en escala 1e6 (centésimos de factor y de porcentaje sobre 100)
+    maximo = int(tarifas_c.max()) * int(factor.max()) * int(porcentajes_c.max())
+    if maximo >= 2 ** 63:
+        # Fuera de rango para int64: mismos cálculos con enteros de Python
+        tarifas_c, factor, porcentajes_c = (arr.astype(object) for arr in (tarifas_c, factor, porcentajes_c))
+    producto = tarifas_c * factor * porcentajes_c
+    return [int(centavos) for centavos in (producto + 500_000) // 1_000_000]
+
+
+def generar_expensas_periodo(year: int, month: int, lote: int = 500) -> ResultadoFacturacion:
     """
-    # Filtrar los pagos procesados asociados a la reserva
-    pagos_reserva = Pagos.objects.filter(reserva=reserva, estado='procesado')
-    
-    # Sumar los montos de todos los pagos asociados
-    total_pagado = sum(pago.monto for pago in pagos_reserva)
-    
-    return total_pagado
\ No newline at end of file
+    Genera la expensa del período para cada propiedad activa en ese mes
+
+    Idempotente: las propiedades que ya tienen expensa del período se omiten y
+    ``bulk_create(ignore_conflicts=True)`` respeta ``unique_together`` si otra
+    ejecución inserta al mismo tiempo. Los importes van en
+    ``monto_base_administracion`` y ``monto_total``.
+    """
+    if not 1 <= month <= 12:
+        raise ValueError(f'Mes inválido: {month}')
+    inicio_cronometro = time.perf_counter()
+    primer_dia = date(year, month, 1)
+    ultimo_dia = date(year, month, calendar.monthrange(year, month)[1])
+
+    propiedades = list(
+        Propiedad.objects.filter(
+            Q(fecha_fin_tenencia__isnull=True) | Q(fecha_fin_tenencia__gte=primer_dia),
+            activo=True,
+            fecha_inicio_tenencia__lte=ultimo_dia,
+        ).exclude(vivienda__estado='inactiva').order_by('pk').values_list(
+            'pk', 'porcentaje_propiedad', 'vivienda__tarifa_base_expensas',
+            'vivienda__metros_cuadrados', 'vivienda__tipo_cobranza', 'persona_id',
+        )
+    )
+    existentes = set(
+        ExpensasMensuales.objects.filter(periodo_year=year, periodo_month=month).values_list('vivienda_id', flat=True)
+    )
+    pendientes = [fila for fila in propiedades if fila[0] not in existentes]
+
+    importes = calcular_importes_expensas(
+        [fila[2] for fila in pendientes],
+        [fila[3] for fila in pendientes],
+        [fila[4] == 'por_metro_cuadrado' for fila in pendientes],
+        [fila[1] for fila in pendientes],
+    )
+    cero = Decimal('0.00')
+    expensas = []
+    for fila, centavos in zip(pendientes, importes):
+        monto = Decimal(centavos).scaleb(-2)
+        expensas.append(ExpensasMensuales(
+            vivienda_id=fila[0],
+            periodo_year=year,
+            periodo_month=month,
+            monto_base_administracion=monto,
+            monto_total=monto,
+            saldo_inicial_periodo=cero,
+            saldo_final_periodo=cero,
+            estado='pendiente',
+        ))
+
+    from core.services.saldos_deudas import invalidar_saldos
+
+    # bulk_create no llama a save()/calculate_totals() ni emite señales: los
+    # totales ya van calculados y el saldo de cada persona se invalida aquí
+    for inicio in range(0, len(expensas), lote):
+        with transaction.atomic():
+            ExpensasMensuales.objects.bulk_create(expensas[inicio:inicio + lote], ignore_conflicts=True)
+            invalidar_saldos(fila[5] for fila in pendientes[inicio:inicio + lote])
+
+    # Las que otra ejecución concurrente insertó primero no cuentan como creadas
+    total_periodo = ExpensasMensuales.objects.filter(periodo_year=year, periodo_month=month).count()
+    return ResultadoFacturacion(
+        periodo_year=year,
+        periodo_month=month,
+        propiedades=len(propiedades),
+        creadas=min(len(expensas), total_periodo - len(existentes)),
+        existentes=len(propiedades) - len(pendientes),
+        monto_total=sum((expensa.monto_total for expensa in expensas), Decimal('0.00')),
+        segundos=time.perf_counter() - inicio_cronometro,
+    )
@@ -0,0 +1,143 @@
+"""
+Saldo pendiente materializado por persona
+
+``PendingDebtsView`` armaba la deuda en cada consulta (persona, viviendas,
+expensas, multas y dos agregaciones de ``Pagos``) y la app móvil la consulta
+con frecuencia. Aquí el resultado queda en ``SaldoPersona``:
+
+- las señales de ``Pagos``, ``ExpensasMensuales``, ``MultasSanciones``,
+  ``ReservaEspacio`` y ``Propiedad`` recalculan el saldo de las personas
+  afectadas dentro de la misma transacción (un rollback también lo descarta);
+  los borrados, que pueden ocurrir en cascada, solo eliminan el saldo
+- las escrituras por lotes (``bulk_create``, ``QuerySet.update``) no emiten
+  señales: toda escritura de ese tipo sobre esos modelos debe llamar a
+  ``invalidar_saldos()`` con las personas afectadas en la misma transacción
+  (ver ``generar_expensas_periodo`` y el comando ``limpiar_propietarios``)
+- ``saldo_de_persona()`` lee el saldo desde la caché o la tabla y lo construye
+  si falta
+
+El comando ``verificar_saldos_deudas`` recalcula todos los saldos y reporta
+las diferencias.
+"""
+
+import json
+from decimal import Decimal
+from typing import Dict, Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from core.models.administracion import SaldoPersona
+from core.models.propiedades_residentes import ReservaEspacio
+from core.services.payments import expensas_pendientes, multas_pendientes, resumen_pagos
+
+# Reservas con monto por cobrar ('parcial' lo asigna el registro de pagos)
+ESTADOS_RESERVA_PENDIENTES = ('solicitada', 'confirmada', 'parcial')
+
+
+def _clave(persona_id: int) -> str:
+    return f'core:saldo_persona:{persona_id}'
+
+
+def calcular_saldo(persona_id: int) -> Dict:
+    """
+    Deuda pendiente de la persona calculada desde las tablas
+
+    Returns:
+        Dict con ``detalle`` (expensas, multas y reservas ya serializadas a
+        JSON) y los totales ``total_expensas``, ``total_multas`` y
+        ``total_reservas``
+    """
+    from core.serializers import ExpensaDebtSerializer, MultaDebtSerializer
+
+    expensas = list(expensas_pendientes(persona_id).select_related('vivienda__vivienda'))
+    multas = list(multas_pendientes(persona_id).select_related('tipo_infraccion'))
+    reservas = list(
+        ReservaEspacio.objects
+        .filter(persona_id=persona_id, estado__in=ESTADOS_RESERVA_PENDIENTES, monto_total__gt=0)
+        .order_by('fecha_reserva', 'hora_inicio')
+    )
+
+    pagos = resumen_pagos(expensas=expensas, multas=multas, reservas=reservas)
+    expensas_data = ExpensaDebtSerializer(
+        expensas, many=True, context={'pagos_por_expensa': pagos.pagado_por('expensas')}
+    ).data
+    multas_data = MultaDebtSerializer(
+        multas, many=True, context={'pagos_por_multa': pagos.pagado_por('multas')}
+    ).data
+    reservas_data = [
+        {
+            'id': reserva.id,
+            'espacio_comun_id': reserva.espacio_comun_id,
+            'fecha_reserva': reserva.fecha_reserva,
+            'hora_inicio': reserva.hora_inicio,
+            'hora_fin': reserva.hora_fin,
+            'estado': reserva.estado,
+            'monto_total': reserva.monto_total,
+            'monto_pagado': pagos.reservas[reserva.id].pagado,
+            'monto_pendiente': pagos.reservas[reserva.id].pendiente,
+        }
+        for reserva in reservas if pagos.reservas[reserva.id].pendiente > 0
+    ]
+
+    detalle = {'expensas': expensas_data, 'multas': multas_data, 'reservas': reservas_data}
+    return {
+        # Mismo JSON que devolvía la vista al serializar en cada consulta
+        'detalle': json.loads(JSONRenderer().render(detalle)),
+        'total_expensas': sum((Decimal(str(item['monto_pendiente'])) for item in expensas_data), Decimal('0')),
+        'total_multas': sum((Decimal(str(item['monto_pendiente'])) for item in multas_data), Decimal('0')),
+        'total_reservas': sum((item['monto_pendiente'] for item in reservas_data), Decimal('0')),
+    }
+
+
+def recalcular_saldo(persona_id: int) -> SaldoPersona:
+    """Recalcula y guarda el saldo de la persona; la caché se limpia al confirmar"""
+    with transaction.atomic():
+        saldo, _ = SaldoPersona.objects.select_for_update().get_or_create(persona_id=persona_id)
+        for campo, valor in calcular_saldo(persona_id).items():
+            setattr(saldo, campo, valor)
+        saldo.save()
+        transaction.on_commit(lambda: cache.delete(_clave(persona_id)))
+    return saldo
+
+
+def recalcular_saldos(persona_ids: Iterable[Optional[int]]):
+    for persona_id in sorted({pk for pk in persona_ids if pk}):
+        recalcular_saldo(persona_id)
+
+
+def invalidar_saldos(persona_ids: Iterable[Optional[int]]):
+    """Borra los saldos; se vuelven a calcular en la siguiente lectura"""
+    ids = sorted({pk for pk in persona_ids if pk})
+    if not ids:
+        return
+    SaldoPersona.objects.filter(persona_id__in=ids).delete()
+    transaction.on_commit(lambda: cache.delete_many([_clave(pk) for pk in ids]))
+
+
+def saldo_de_persona(persona_id: int) -> Dict:
+    """
+    Saldo para ``PendingDebtsView``: una consulta (ninguna si está en caché)
+
+    Returns:
+        Dict con ``expensas``, ``multas``, ``reservas`` y los totales
+    """
+    datos = cache.get(_clave(persona_id))
+    if datos is not None:
+        return datos
+
+    saldo = SaldoPersona.objects.filter(persona_id=persona_id).first()
+    if saldo is None:
+        saldo = recalcular_saldo(persona_id)
+    datos = {
+        'expensas': saldo.detalle.get('expensas', []),
+        'multas': saldo.detalle.get('multas', []),
+        'reservas': saldo.detalle.get('reservas', []),
+        'total_expensas': saldo.total_expensas,
+        'total_multas': saldo.total_multas,
+        'total_reservas': saldo.total_reservas,
+    }
+    cache.set(_clave(persona_id), datos, getattr(settings, 'SALDOS_DEUDAS_CACHE_SEGUNDOS', 60))
+    return datos
@@ -210,6 +210,61 @@ AZURE_FACE_ENDPOINT = os.getenv('AZURE_FACE_ENDPOINT', '')
 # Local Face Recognition Configuration
 FACE_LOCAL_THRESHOLD = float(os.getenv('FACE_LOCAL_THRESHOLD', '0.6'))
 
+# Face Gallery Search Configuration
+# 'exact' = búsqueda exhaustiva vectorizada, 'ivf' = índice aproximado para galerías grandes
+FACE_GALLERY_BACKEND = os.getenv('FACE_GALLERY_BACKEND', 'exact')
+FACE_GALLERY_IVF_NLIST = int(os.getenv('FACE_GALLERY_IVF_NLIST', '0')) or None  # 0 = automático (~sqrt(N))
+FACE_GALLERY_IVF_NPROBE = int(os.getenv('FACE_GALLERY_IVF_NPROBE', '8'))
+FACE_GALLERY_IVF_MIN_SIZE = int(os.getenv('FACE_GALLERY_IVF_MIN_SIZE', '2000'))
+
+# Face Detection Resolution
+# La detección corre sobre una copia de este ancho; los encodings sobre una imagen de hasta FACE_ENCODING_MAX_WIDTH
+FACE_DETECTION_WIDTH = int(os.getenv('FACE_DETECTION_WIDTH', '640'))
+FACE_ENCODING_MAX_WIDTH = int(os.getenv('FACE_ENCODING_MAX_WIDTH', '1600'))
+
+# Batch Face Enrollment
+ENROLAMIENTO_TRABAJOS_SIMULTANEOS = int(os.getenv('ENROLAMIENTO_TRABAJOS_SIMULTANEOS', '2'))
+ENROLAMIENTO_PROCESOS_ANALISIS = int(os.getenv('ENROLAMIENTO_PROCESOS_ANALISIS', '2'))
+ENROLAMIENTO_MAX_FOTOS = int(os.getenv('ENROLAMIENTO_MAX_FOTOS', '20'))
+
+# AI Training Feature Extraction
+# Descargas simultáneas de fotos y procesos para calcular encodings (vacío = uno por CPU)
+AI_TRAINING_DESCARGAS_SIMULTANEAS = int(os.getenv('AI_TRAINING_DESCARGAS_SIMULTANEAS', '8'))
+AI_TRAINING_PROCESOS_EXTRACCION = int(os.getenv('AI_TRAINING_PROCESOS_EXTRACCION', '0')) or None
+# Re-entrenamiento: 'svc' (refit completo, por defecto) o 'incremental' (opcional:
+# prototipos, solo las personas que cambiaron)
+AI_TRAINING_MODO = os.getenv('AI_TRAINING_MODO', 'svc')
+# Artefactos del modelo: versiones que se conservan y cada cuánto un worker revisa si hay una nueva
+AI_MODEL_VERSIONES_CONSERVADAS = int(os.getenv('AI_MODEL_VERSIONES_CONSERVADAS', '5'))
+AI_MODEL_RECARGA_SEGUNDOS = float(os.getenv('AI_MODEL_RECARGA_SEGUNDOS', '5'))
+
+# Face Providers Warmup
+# Al iniciar el servidor se construyen los proveedores y se hace una inferencia de prueba
+FACE_PROVIDERS_CALENTAR = os.getenv('FACE_PROVIDERS_CALENTAR', 'True').lower() == 'true'
+
+# Audit Log Buffer
+# fn_bitacora_log encola y un hilo inserta por lotes cada N registros o T ms
+# El hilo solo arranca en gunicorn/uvicorn/daphne o runserver (seguridad.apps)
+BITACORA_BUFFER_ACTIVO = os.getenv('BITACORA_BUFFER_ACTIVO', 'True').lower() == 'true'
+BITACORA_BUFFER_LOTE = int(os.getenv('BITACORA_BUFFER_LOTE', '200'))
+BITACORA_BUFFER_INTERVALO_MS = int(os.getenv('BITACORA_BUFFER_INTERVALO_MS', '500'))
+BITACORA_BUFFER_MAX_PENDIENTES = int(os.getenv('BITACORA_BUFFER_MAX_PENDIENTES', '10000'))
+# Archivo local donde se copian los registros pendientes (vacío = solo memoria)
+BITACORA_BUFFER_ARCHIVO = os.getenv('BITACORA_BUFFER_ARCHIVO', '')
+
+# Security Dashboard
+# Segundos que se reutilizan las estadísticas del dashboard (contadores de bitácora)
+DASHBOARD_SEGURIDAD_CACHE_SEGUNDOS = int(os.getenv('DASHBOARD_SEGURIDAD_CACHE_SEGUNDOS', '15'))
+
+# Pending Debts
+# Segundos que se reutiliza el saldo pendiente por persona (se limpia al cambiar)
+SALDOS_DEUDAS_CACHE_SEGUNDOS = int(os.getenv('SALDOS_DEUDAS_CACHE_SEGUNDOS', '60'))
+
+# Audit Log Retention
+# Los registros de bitácora más antiguos se mueven a JSONL.gz por día (comando archivar_bitacora)
+BITACORA_RETENCION_DIAS = int(os.getenv('BITACORA_RETENCION_DIAS', '90'))
+BITACORA_ARCHIVO_DIR = os.getenv('BITACORA_ARCHIVO_DIR', str(BASE_DIR / 'archivo_bitacora'))
+
 # Custom User Model - Comentado temporalmente para migración gradual
 AUTH_USER_MODEL = 'authz.Usuario'
 
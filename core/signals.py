@@ -0,0 +1,64 @@
+"""
+Señales que mantienen al día el saldo pendiente materializado por persona
+
+El saldo se recalcula dentro de la transacción que guarda el pago, la
+expensa, la multa, la reserva o la propiedad (ver services/saldos_deudas.py).
+Los borrados solo eliminan el saldo: pueden llegar en cascada desde el borrado
+de la propia persona.
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.models.administracion import Pagos
+from core.models.propiedades_residentes import ExpensasMensuales, MultasSanciones, Propiedad, ReservaEspacio
+from core.services.saldos_deudas import invalidar_saldos, recalcular_saldos
+
+
+def _personas_de_expensas(propiedad_ids):
+    return Propiedad.objects.filter(pk__in=propiedad_ids).values_list('persona_id', flat=True)
+
+
+def _personas_de_pago(pago):
+    personas = set()
+    if pago.expensa_id:
+        expensa = ExpensasMensuales.objects.filter(pk=pago.expensa_id).values_list('vivienda_id', flat=True)
+        personas.update(_personas_de_expensas(expensa))
+    if pago.multa_id:
+        multa = MultasSanciones.objects.filter(pk=pago.multa_id).values_list(
+            'persona_responsable_id', 'persona_infractor_id'
+        ).first()
+        personas.update(multa or ())
+    if pago.reserva_id:
+        personas.update(ReservaEspacio.objects.filter(pk=pago.reserva_id).values_list('persona_id', flat=True))
+    return personas
+
+
+def _personas(instance):
+    if isinstance(instance, Pagos):
+        return _personas_de_pago(instance)
+    if isinstance(instance, ExpensasMensuales):
+        return set(_personas_de_expensas([instance.vivienda_id]))
+    if isinstance(instance, MultasSanciones):
+        return {instance.persona_responsable_id, instance.persona_infractor_id}
+    return {instance.persona_id}
+
+
+@receiver(post_save, sender=Pagos)
+@receiver(post_save, sender=ExpensasMensuales)
+@receiver(post_save, sender=MultasSanciones)
+@receiver(post_save, sender=ReservaEspacio)
+@receiver(post_save, sender=Propiedad)
+def deuda_guardada(sender, instance, **kwargs):
+    if kwargs.get('raw'):
+        return
+    recalcular_saldos(_personas(instance))
+
+
+@receiver(post_delete, sender=Pagos)
+@receiver(post_delete, sender=ExpensasMensuales)
+@receiver(post_delete, sender=MultasSanciones)
+@receiver(post_delete, sender=ReservaEspacio)
+@receiver(post_delete, sender=Propiedad)
+def deuda_borrada(sender, instance, **kwargs):
+    invalidar_saldos(_personas(instance))
@@ -0,0 +1,204 @@
+"""
+Tests para el entrenamiento incremental por prototipos de AITrainingService
+"""
+
+import os
+import tempfile
+import time
+from unittest.mock import patch
+
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from core.services import ai_training_service, artefactos_modelo
+from core.services.ai_training_service import AITrainingService
+from core.services.clasificador_prototipos import ClasificadorPrototipos
+from seguridad.models import Copropietarios, ReconocimientoFacial
+
+
+def _encodings(centro, cantidad, semilla=0):
+    rng = np.random.default_rng(semilla)
+    return np.full(128, centro) + rng.normal(0, 0.01, (cantidad, 128))
+
+
+class ClasificadorPrototiposTest(SimpleTestCase):
+
+    def test_partial_fit_solo_actualiza_las_clases_nuevas(self):
+        clasificador = ClasificadorPrototipos().fit(
+            np.vstack([_encodings(0.0, 3), _encodings(0.1, 3)]), [1, 1, 1, 2, 2, 2]
+        )
+        centroide_1 = clasificador.centroides[0].copy()
+
+        clasificador.partial_fit(_encodings(0.2, 2), [3, 3])
+        self.assertEqual(clasificador.classes_.tolist(), [1, 2, 3])
+        np.testing.assert_array_equal(clasificador.centroides[0], centroide_1)
+        self.assertEqual(clasificador.predict(_encodings(0.2, 1, semilla=5)).tolist(), [3])
+        self.assertEqual(clasificador.resumen(), {'clases': 3, 'muestras': 8})
+
+    def test_reemplazar_y_eliminar_clase(self):
+        clasificador = ClasificadorPrototipos().fit(np.vstack([_encodings(0.0, 2), _encodings(0.1, 2)]), [1, 1, 2, 2])
+        clasificador.reemplazar_clase(2, _encodings(0.3, 4))
+        self.assertEqual(clasificador.predict(_encodings(0.3, 1, semilla=9)).tolist(), [2])
+        clasificador.reemplazar_clase(1, [])
+        self.assertEqual(clasificador.classes_.tolist(), [2])
+
+    def test_confianza_baja_para_desconocidos(self):
+        clasificador = ClasificadorPrototipos().fit(np.vstack([_encodings(0.0, 2), _encodings(0.1, 2)]), [1, 1, 2, 2])
+        conocido = clasificador.confianza(_encodings(0.0, 1, semilla=3))[0]
+        desconocido = clasificador.confianza(np.full((1, 128), 0.5))[0]
+        self.assertGreater(conocido, 90)
+        self.assertLess(desconocido, 70)
+        np.testing.assert_allclose(clasificador.predict_proba(_encodings(0.0, 2)).sum(axis=1), 1.0)
+
+
+class EntrenamientoIncrementalTest(TestCase):
+    """Un re-entrenamiento solo vuelve a cargar las personas que cambiaron"""
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directorio.cleanup)
+        self.copropietarios = []
+        for i in range(3):
+            copropietario = Copropietarios.objects.create(
+                nombres=f'Persona{i}', apellidos='Test', numero_documento=f'DOC{i}',
+                tipo_documento='CI', unidad_residencial=f'Casa {i}'
+            )
+            ReconocimientoFacial.objects.create(copropietario=copropietario, proveedor_ia='Local', vector_facial='')
+            self.copropietarios.append(copropietario)
+        self.cargas = []
+        # Personas con fotos de las que no se pudo extraer ningún encoding
+        self.fallidas = set()
+
+        patches = [
+            patch.object(ai_training_service, 'FACE_RECOGNITION_AVAILABLE', True),
+            patch.object(ai_training_service, 'np', np),
+            patch.object(AITrainingService, '_cargar_datos_entrenamiento', self._cargar),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def _cargar(self, ids_copropietario=None):
+        self.cargas.append(None if ids_copropietario is None else set(ids_copropietario))
+        X, y, personas_map = [], [], {}
+        for i, copropietario in enumerate(self.copropietarios):
+            if ids_copropietario is not None and copropietario.id not in ids_copropietario:
+                continue
+            if not ReconocimientoFacial.objects.filter(copropietario=copropietario, activo=True).exists():
+                continue
+            personas_map[copropietario.id] = copropietario.nombres
+            if copropietario.id in self.fallidas:
+                continue
+            for encoding in _encodings(i * 0.1, 3, semilla=i):
+                X.append(encoding)
+                y.append(copropietario.id)
+        return X, y, personas_map
+
+    def _servicio(self):
+        servicio = AITrainingService()
+        servicio.model_path = self.directorio.name + '/'
+        return servicio
+
+    def test_primero_completo_luego_solo_cambios(self):
+        with self.settings(AI_TRAINING_MODO='incremental'):
+            primero = self._servicio().re_entrenar_automatico()
+            self.assertEqual(primero['mode'], 'completo')
+            self.assertEqual(primero['people_count'], 3)
+
+            sin_cambios = self._servicio().re_entrenar_automatico()
+            self.assertEqual(sin_cambios['classes_updated'], 0)
+
+            reconocimiento = ReconocimientoFacial.objects.get(copropietario=self.copropietarios[2])
+            reconocimiento.activo = False
+            reconocimiento.save()
+
+            servicio = self._servicio()
+            incremental = servicio.re_entrenar_automatico()
+
+        self.assertEqual(incremental['mode'], 'incremental')
+        self.assertEqual(self.cargas, [None, {self.copropietarios[2].id}])
+        self.assertEqual(servicio.face_classifier.classes_.tolist(), [c.id for c in self.copropietarios[:2]])
+
+        prediccion = self._servicio().predecir_con_modelo_entrenado(_encodings(0.1, 1, semilla=7)[0])
+        self.assertEqual(prediccion['persona_id'], self.copropietarios[1].id)
+        self.assertTrue(prediccion['recognized'])
+
+    def test_por_defecto_re_entrena_completo(self):
+        with patch.object(AITrainingService, 'entrenar_modelo_incremental') as incremental, \
+                patch.object(AITrainingService, 'entrenar_modelo_automatico', return_value={'success': True}) as completo:
+            self._servicio().re_entrenar_automatico()
+        incremental.assert_not_called()
+        completo.assert_called_once()
+
+    def test_fallo_de_extraccion_conserva_el_prototipo(self):
+        with self.settings(AI_TRAINING_MODO='incremental'):
+            self._servicio().re_entrenar_automatico()
+
+            ReconocimientoFacial.objects.get(copropietario=self.copropietarios[1]).save()
+            self.fallidas.add(self.copropietarios[1].id)
+            servicio = self._servicio()
+            resultado = servicio.re_entrenar_automatico()
+
+        self.assertTrue(resultado['success'])
+        self.assertEqual(resultado['classes_updated'], 0)
+        self.assertEqual(servicio.face_classifier.classes_.tolist(), [c.id for c in self.copropietarios])
+        prediccion = self._servicio().predecir_con_modelo_entrenado(_encodings(0.1, 1, semilla=7)[0])
+        self.assertEqual(prediccion['persona_id'], self.copropietarios[1].id)
+
+
+class ArtefactosModeloTest(SimpleTestCase):
+    """Versiones publicadas atómicamente y abiertas mapeadas en memoria"""
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directorio.cleanup)
+        self.base = self.directorio.name
+
+    def _publicar(self, centro, segundo):
+        clasificador = ClasificadorPrototipos().fit(np.vstack([_encodings(0.0, 2), _encodings(centro, 2)]), [1, 1, 2, 2])
+        fecha = timezone.now().replace(second=segundo, microsecond=0)
+        return artefactos_modelo.publicar_version(self.base, clasificador, {1: 'Ana', 2: 'Luis'}, fecha, 0.9, conservar=2)
+
+    def test_publicar_y_cargar_mapeado(self):
+        version = self._publicar(0.1, 1)
+        self.assertEqual(artefactos_modelo.version_actual(self.base), version)
+        self.assertTrue(os.path.islink(os.path.join(self.base, 'current')))
+
+        clasificador, manifiesto = artefactos_modelo.cargar_version(self.base, version)
+        self.assertIsInstance(clasificador.centroides, np.memmap)
+        self.assertEqual(manifiesto['personas_map'], {1: 'Ana', 2: 'Luis'})
+        self.assertEqual(clasificador.predict(_encodings(0.1, 1, semilla=4)).tolist(), [2])
+
+        # El modelo mapeado no se modifica: la copia sí
+        copia = clasificador.copia().partial_fit(_encodings(0.0, 1), [1])
+        self.assertEqual(copia.resumen()['muestras'], 5)
+        self.assertEqual(int(clasificador._conteos.sum()), 4)
+
+    def test_puntero_de_respaldo_reemplaza_un_enlace_anterior(self):
+        self._publicar(0.1, 1)
+        # Sin symlinks a partir de aquí: la nueva versión va al archivo CURRENT
+        with patch.object(artefactos_modelo.os, 'symlink', side_effect=OSError('sin permisos')):
+            segunda = self._publicar(0.3, 2)
+        self.assertFalse(os.path.lexists(os.path.join(self.base, 'current')))
+        self.assertEqual(artefactos_modelo.version_actual(self.base), segunda)
+
+        tercera = self._publicar(0.3, 3)
+        self.assertFalse(os.path.exists(os.path.join(self.base, 'CURRENT')))
+        self.assertEqual(artefactos_modelo.version_actual(self.base), tercera)
+
+    def test_recarga_en_segundo_plano_y_limpieza(self):
+        primera = self._publicar(0.1, 1)
+        compartido = artefactos_modelo.ModeloCompartido(self.base, intervalo=0)
+        self.assertEqual(compartido.obtener()[1]['version'], primera)
+
+        segunda = self._publicar(0.3, 2)
+        self._publicar(0.3, 3)
+        self.assertEqual(sorted(os.listdir(os.path.join(self.base, 'versiones'))), [segunda, artefactos_modelo.version_actual(self.base)])
+
+        # La recarga ocurre en un hilo; obtener() no la espera
+        for _ in range(100):
+            if compartido.obtener()[1]['version'] != primera:
+                break
+            time.sleep(0.01)
+        self.assertEqual(compartido.obtener()[1]['version'], artefactos_modelo.version_actual(self.base))
@@ -0,0 +1,84 @@
+"""
+Tests para el archivo de las bitácoras por retención
+"""
+
+import glob
+import os
+import tempfile
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.models.administracion import LogSistema
+from core.services.archivo_bitacora import archivar, iterar
+
+
+class ArchivoBitacoraTest(TestCase):
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ajustes = override_settings(BITACORA_ARCHIVO_DIR=directorio.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.directorio = directorio.name
+
+    def _logs(self, dias_atras):
+        for dias in dias_atras:
+            log = LogSistema.objects.create(modulo='pagos', accion='registrar', mensaje=f'hace {dias} días',
+                                            datos_adicionales={'dias': dias})
+            LogSistema.objects.filter(pk=log.pk).update(fecha_hora=timezone.now() - timedelta(days=dias))
+
+    def test_archiva_por_dia_y_lee_de_forma_transparente(self):
+        self._logs([1, 100, 100, 200])
+        esperado = list(LogSistema.objects.order_by('-fecha_hora', '-pk').values_list('pk', 'mensaje'))
+
+        self.assertEqual(archivar('core_log_sistema', dias=90, lote=2), 3)
+        self.assertEqual(LogSistema.objects.count(), 1)
+        # Un directorio por día; el lote parte el día con dos registros en dos archivos
+        self.assertEqual(len(glob.glob(os.path.join(self.directorio, 'core_log_sistema', '*', '*', '*'))), 2)
+        self.assertEqual(len(glob.glob(os.path.join(self.directorio, 'core_log_sistema', '*', '*', '*', '*.jsonl.gz'))), 3)
+
+        leidos = list(iterar('core_log_sistema'))
+        self.assertEqual([(log.pk, log.mensaje) for log in leidos], esperado)
+        self.assertEqual(leidos[-1].datos_adicionales, {'dias': 200})
+
+        rango = list(iterar('core_log_sistema', desde=timezone.now() - timedelta(days=150),
+                            hasta=timezone.now() - timedelta(days=50)))
+        self.assertEqual([log.mensaje for log in rango], ['hace 100 días'] * 2)
+
+    def test_sin_duplicados_si_el_borrado_no_llego_a_ocurrir(self):
+        self._logs([400])
+        registro = LogSistema.objects.get()
+        fecha = registro.fecha_hora
+        archivar('core_log_sistema', dias=90)
+        # Simula un corte entre escribir la partición y borrar las filas
+        LogSistema.objects.bulk_create([registro])
+        LogSistema.objects.filter(pk=registro.pk).update(fecha_hora=fecha)
+        self.assertEqual([r.pk for r in iterar('core_log_sistema')], [registro.pk])
+
+    def test_vista_pagina_tabla_y_archivo(self):
+        self._logs([1, 2, 100, 101])
+        archivar('core_log_sistema', dias=90)
+        cliente = APIClient()
+        cliente.force_authenticate(get_user_model().objects.create_user(
+            email='admin@test.com', password='12345678', is_staff=True
+        ))
+
+        from core.api.bitacora.views import LogSistemaListView
+        from django.urls import path
+        with self.settings(ROOT_URLCONF=type('urls', (), {'urlpatterns': [path('logs/', LogSistemaListView.as_view())]})):
+            vistos, url = [], '/logs/?limit=3'
+            while url:
+                respuesta = cliente.get(url)
+                self.assertEqual(respuesta.status_code, 200)
+                vistos += [log['mensaje'] for log in respuesta.data['results']]
+                url = respuesta.data['next']
+            self.assertEqual(cliente.get('/logs/?cursor=xyz').status_code, 400)
+            # Sin limit ni cursor: la lista completa, como antes de paginar
+            completa = cliente.get('/logs/')
+            self.assertEqual([log['mensaje'] for log in completa.data], vistos)
+        self.assertEqual(vistos, ['hace 1 días', 'hace 2 días', 'hace 100 días', 'hace 101 días'])
@@ -0,0 +1,186 @@
+"""
+Tests para el calendario de disponibilidad de espacios comunes
+"""
+
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from authz.models import Persona
+from core.models.propiedades_residentes import (
+    BloqueoReservaDia,
+    DisponibilidadEspacioComun,
+    EspacioComun,
+    ReservaEspacio,
+)
+from core.services.disponibilidad_espacios import calendario, contiene, restar, unir
+from reservas_areas.views import ReservaEspacioViewSet
+
+LUNES = date(2025, 3, 3)
+
+
+def _momento(fecha, hora, minuto=0):
+    return timezone.make_aware(datetime.combine(fecha, time(hora, minuto)))
+
+
+class IntervalosTest(TestCase):
+
+    def test_unir_restar_contiene(self):
+        self.assertEqual(unir([(600, 700), (100, 200), (150, 300), (300, 400)]), [(100, 400), (600, 700)])
+        self.assertEqual(
+            restar([(0, 500), (600, 900)], [(100, 200), (450, 650), (800, 1000)]),
+            [(0, 100), (200, 450), (650, 800)]
+        )
+        self.assertTrue(contiene([(0, 100), (200, 450)], 200, 450))
+        self.assertFalse(contiene([(0, 100), (200, 450)], 90, 210))
+        self.assertFalse(contiene([], 0, 10))
+
+
+class CalendarioEspacioTest(TestCase):
+
+    def setUp(self):
+        self.persona = Persona.objects.create(
+            nombre='Ana', apellido='Prueba', documento_identidad='DOC1', email='residente@test.com'
+        )
+        self.usuario = get_user_model().objects.create_user(
+            email='residente@test.com', password=None, persona=self.persona
+        )
+        self.espacio = EspacioComun.objects.create(nombre='Salón', precio_por_hora=Decimal('50.00'))
+
+    def _disponibilidad(self, inicio, fin, **kwargs):
+        return DisponibilidadEspacioComun.objects.create(
+            espacio_comun=self.espacio, fecha_inicio=inicio, fecha_fin=fin, **kwargs
+        )
+
+    def _reserva(self, fecha, inicio, fin, estado='confirmada'):
+        return ReservaEspacio.objects.create(
+            persona=self.persona, espacio_comun=self.espacio, fecha_reserva=fecha,
+            hora_inicio=time(inicio), hora_fin=time(fin), estado=estado
+        )
+
+    def test_ventanas_recurrentes_bloqueos_y_reservas(self):
+        # Lunes y miércoles de 8 a 12 durante marzo
+        self._disponibilidad(
+            _momento(date(2025, 3, 1), 8), _momento(date(2025, 3, 31), 12),
+            es_recurrente=True, dias_recurrentes=['Lunes', 'Miércoles']
+        )
+        # Martes puntual de 18 a 02 del miércoles
+        self._disponibilidad(_momento(LUNES + timedelta(days=1), 18), _momento(LUNES + timedelta(days=2), 2))
+        self._disponibilidad(
+            _momento(LUNES + timedelta(days=2), 10), _momento(LUNES + timedelta(days=2), 11),
+            bloqueado_por_mantenimiento=True
+        )
+        self._reserva(LUNES, 9, 10)
+        self._reserva(LUNES, 10, 11, estado='cancelada')
+
+        with self.assertNumQueries(3):
+            libres = calendario(self.espacio.id, LUNES, LUNES + timedelta(days=3))
+
+        self.assertEqual(libres, {
+            LUNES: [(8 * 60, 9 * 60), (10 * 60, 12 * 60)],
+            LUNES + timedelta(days=1): [(18 * 60, 24 * 60)],
+            LUNES + timedelta(days=2): [(0, 2 * 60), (8 * 60, 10 * 60), (11 * 60, 12 * 60)],
+            LUNES + timedelta(days=3): [],
+        })
+
+    def test_sin_ventanas_usa_el_horario_del_espacio(self):
+        self.espacio.horario_apertura = time(9)
+        self.espacio.horario_cierre = time(21)
+        self.espacio.dias_disponibles = ['Sábado', 'Domingo']
+        self.espacio.save()
+
+        libres = calendario(self.espacio.id, LUNES, LUNES + timedelta(days=6))
+
+        self.assertEqual([fecha.weekday() for fecha, intervalos in libres.items() if intervalos], [5, 6])
+        self.assertEqual(libres[LUNES + timedelta(days=5)], [(9 * 60, 21 * 60)])
+
+    def test_horario_del_espacio_en_fechas_sin_ventana_vigente(self):
+        self.espacio.horario_apertura = time(9)
+        self.espacio.horario_cierre = time(21)
+        self.espacio.save()
+        # Una ventana vencida no cuenta; la del miércoles solo cubre ese día
+        self._disponibilidad(_momento(date(2025, 1, 6), 8), _momento(date(2025, 1, 31), 12))
+        self._disponibilidad(_momento(LUNES + timedelta(days=2), 14), _momento(LUNES + timedelta(days=2), 16))
+
+        libres = calendario(self.espacio.id, LUNES, LUNES + timedelta(days=3))
+
+        self.assertEqual(libres, {
+            LUNES: [(9 * 60, 21 * 60)],
+            LUNES + timedelta(days=1): [(9 * 60, 21 * 60)],
+            LUNES + timedelta(days=2): [(14 * 60, 16 * 60)],
+            LUNES + timedelta(days=3): [(9 * 60, 21 * 60)],
+        })
+
+    def test_endpoint_calendario(self):
+        self._reserva(LUNES, 10, 12)
+        vista = ReservaEspacioViewSet.as_view({'get': 'disponibilidad'})
+
+        def consultar(**parametros):
+            request = APIRequestFactory().get('/', parametros)
+            force_authenticate(request, user=self.usuario)
+            return vista(request)
+
+        respuesta = consultar(espacio_comun=self.espacio.id, desde='2025-03-03', hasta='2025-03-04')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual([dia['fecha'] for dia in respuesta.data['dias']], [LUNES, LUNES + timedelta(days=1)])
+        self.assertEqual(respuesta.data['dias'][0]['libres'], [
+            {'hora_inicio': time(6), 'hora_fin': time(10)},
+            {'hora_inicio': time(12), 'hora_fin': time(22)},
+        ])
+
+        self.assertEqual(consultar(espacio_comun=self.espacio.id, desde='2025-03-01', hasta='2025-04-30').status_code, 400)
+        self.assertEqual(consultar(desde='2025-03-01').status_code, 400)
+        self.assertEqual(consultar(espacio_comun=999).status_code, 404)
+
+    def test_crear_reserva_valida_el_horario_con_el_dia_bloqueado(self):
+        hoy = timezone.localdate()
+        fecha = hoy + timedelta(days=7 - hoy.weekday())
+        vista = ReservaEspacioViewSet.as_view({'post': 'create'})
+
+        def reservar(inicio, fin):
+            request = APIRequestFactory().post('/', {
+                'espacio_comun': self.espacio.id, 'fecha_reserva': fecha.isoformat(),
+                'hora_inicio': inicio, 'hora_fin': fin,
+            }, format='json')
+            force_authenticate(request, user=self.usuario)
+            return vista(request)
+
+        self.assertEqual(reservar('10:00', '12:00').status_code, 201)
+        self.assertTrue(BloqueoReservaDia.objects.filter(espacio_comun=self.espacio, fecha=fecha).exists())
+        self.assertIn('ya está ocupado', str(reservar('11:00', '13:00').data))
+        self.assertIn('fuera de la disponibilidad', str(reservar('05:00', '07:00').data))
+        self.assertEqual(reservar('12:00', '13:00').status_code, 201)
+        self.assertEqual(
+            ReservaEspacio.objects.filter(espacio_comun=self.espacio, persona=self.persona).count(), 2
+        )
+
+    def test_editar_reserva_valida_el_horario_sin_chocar_consigo_misma(self):
+        hoy = timezone.localdate()
+        fecha = hoy + timedelta(days=7 - hoy.weekday())
+        reserva = self._reserva(fecha, 10, 12)
+        self._reserva(fecha, 14, 16)
+        vista = ReservaEspacioViewSet.as_view({'patch': 'partial_update'})
+
+        def editar(**datos):
+            request = APIRequestFactory().patch('/', datos, format='json')
+            force_authenticate(request, user=self.usuario)
+            return vista(request, pk=reserva.pk)
+
+        # Solapa solo con su propio horario anterior
+        self.assertEqual(editar(hora_inicio='11:00', hora_fin='13:00').status_code, 200)
+        self.assertIn('ya está ocupado', str(editar(hora_fin='15:00').data))
+        self.assertIn('fuera de la disponibilidad', str(editar(hora_inicio='05:00').data))
+
+        # Al cambiar de día se bloquean el día anterior y el nuevo
+        siguiente = fecha + timedelta(days=1)
+        self.assertEqual(editar(fecha_reserva=siguiente.isoformat()).status_code, 200)
+        self.assertEqual(
+            set(BloqueoReservaDia.objects.filter(espacio_comun=self.espacio).values_list('fecha', flat=True)),
+            {fecha, siguiente},
+        )
+        reserva.refresh_from_db()
+        self.assertEqual((reserva.fecha_reserva, reserva.hora_inicio, reserva.hora_fin), (siguiente, time(11), time(13)))
@@ -0,0 +1,158 @@
+"""
+Tests para el almacén de encodings precalculados de fotos de visitas
+"""
+
+from datetime import timedelta
+from io import BytesIO
+from unittest.mock import patch
+
+import numpy as np
+from django.test import TestCase
+from django.utils import timezone
+
+from authz.models import Persona
+from core.models import EncodingFacialFoto
+from core.models.propiedades_residentes import Visita
+from core.services import encoding_store
+
+
+class EncodingStoreTest(TestCase):
+    """El encoding de cada foto se calcula una sola vez y se lee en bloque"""
+
+    def setUp(self):
+        self.encoding = np.linspace(-1, 1, 128)
+
+    def test_registrar_foto_calcula_una_sola_vez(self):
+        with patch.object(encoding_store, 'FACE_RECOGNITION_AVAILABLE', True), \
+                patch.object(encoding_store, 'calcular_encoding', return_value=self.encoding) as calcular:
+            sha_1 = encoding_store.registrar_foto(b'foto-1', 'https://example.com/1.jpg')
+            sha_2 = encoding_store.registrar_foto(b'foto-1')
+
+        self.assertEqual(sha_1, sha_2)
+        self.assertEqual(calcular.call_count, 1)
+        self.assertEqual(EncodingFacialFoto.objects.count(), 1)
+
+        cargados = encoding_store.cargar_encodings([sha_1, 'desconocido'])
+        self.assertEqual(list(cargados), [sha_1])
+        self.assertEqual(cargados[sha_1].dtype, np.float32)
+        np.testing.assert_allclose(cargados[sha_1], self.encoding, rtol=1e-6)
+
+    def test_foto_sin_rostro_no_se_carga(self):
+        with patch.object(encoding_store, 'FACE_RECOGNITION_AVAILABLE', True), \
+                patch.object(encoding_store, 'calcular_encoding', return_value=None):
+            sha = encoding_store.registrar_foto(b'foto-sin-rostro')
+
+        self.assertIsNotNone(sha)
+        self.assertEqual(encoding_store.cargar_encodings([sha]), {})
+
+    def test_sin_motor_de_ia_no_registra(self):
+        with patch.object(encoding_store, 'FACE_RECOGNITION_AVAILABLE', False):
+            self.assertIsNone(encoding_store.registrar_foto(b'foto'))
+        self.assertFalse(EncodingFacialFoto.objects.exists())
+
+
+class EncodingsDeUrlsTest(TestCase):
+    """Un reentrenamiento solo descarga y procesa las fotos nuevas o cambiadas"""
+
+    def setUp(self):
+        self.descargas = []
+        self.extracciones = []
+        self.respuestas = {
+            'https://example.com/a.jpg': (200, b'foto-a', ''),
+            'https://example.com/b.jpg': (200, b'foto-b', '"v1"'),
+        }
+
+    def _descargar(self, url, etag=''):
+        self.descargas.append((url, etag))
+        status, contenido, etag_actual = self.respuestas[url]
+        if etag and etag == etag_actual:
+            return 304, b'', etag_actual
+        return status, contenido, etag_actual
+
+    def _extraer(self, contenido):
+        self.extracciones.append(contenido)
+        return None if contenido == b'sin-rostro' else np.full(128, len(self.extracciones), dtype=np.float32)
+
+    def _cargar(self, urls):
+        with patch.object(encoding_store, '_descargar', self._descargar):
+            return encoding_store.encodings_de_urls(urls, extraer=self._extraer)
+
+    def test_segunda_corrida_usa_cache(self):
+        urls = list(self.respuestas)
+        primera = self._cargar(urls)
+        self.assertEqual(set(primera), set(urls))
+        self.assertEqual(len(self.extracciones), 2)
+
+        self.descargas.clear()
+        segunda = self._cargar(urls)
+        # a.jpg sin ETag no se vuelve a pedir; b.jpg se revalida con If-None-Match
+        self.assertEqual(self.descargas, [('https://example.com/b.jpg', '"v1"')])
+        self.assertEqual(len(self.extracciones), 2)
+        np.testing.assert_array_equal(segunda['https://example.com/a.jpg'], primera['https://example.com/a.jpg'])
+
+    def test_foto_cambiada_se_reprocesa(self):
+        self._cargar(['https://example.com/b.jpg'])
+        self.respuestas['https://example.com/b.jpg'] = (200, b'foto-b-nueva', '"v2"')
+
+        resultado = self._cargar(['https://example.com/b.jpg'])
+        self.assertEqual(self.extracciones, [b'foto-b', b'foto-b-nueva'])
+        self.assertEqual(resultado['https://example.com/b.jpg'][0], 2.0)
+
+    def test_misma_foto_en_dos_urls_se_procesa_una_vez(self):
+        self.respuestas['https://example.com/copia.jpg'] = (200, b'foto-a', '')
+        resultado = self._cargar(['https://example.com/a.jpg', 'https://example.com/copia.jpg'])
+        self.assertEqual(self.extracciones, [b'foto-a'])
+        self.assertEqual(len(resultado), 2)
+
+    def test_sin_rostro_y_errores_de_descarga(self):
+        self.respuestas['https://example.com/vacia.jpg'] = (200, b'sin-rostro', '')
+        self.respuestas['https://example.com/404.jpg'] = (404, b'', '')
+        resultado = self._cargar(['https://example.com/vacia.jpg', 'https://example.com/404.jpg'])
+        self.assertEqual(resultado, {'https://example.com/vacia.jpg': None})
+
+
+class HashesVisitaTest(TestCase):
+    """Fotos de visitas anteriores al almacén: formato antiguo y reintentos"""
+
+    def setUp(self):
+        persona = Persona.objects.create(nombre='Ana', apellido='Rojas', documento_identidad='99887766')
+        self.visita = Visita.objects.create(
+            persona_autorizante=persona, nombre_visitante='Luis',
+            fotos_reconocimiento=['https://example.com/antigua.jpg', {'url': 'https://example.com/caida.jpg'}],
+        )
+        self.descargas = []
+
+    def _descargar(self, origen):
+        self.descargas.append(origen)
+        if origen.endswith('caida.jpg'):
+            raise ConnectionError('sin conexión')
+        return BytesIO(b'foto-antigua')
+
+    def _asegurar(self, ahora):
+        with patch('core.utils.download_image.download_image_from_url', self._descargar), \
+                patch.object(encoding_store, 'FACE_RECOGNITION_AVAILABLE', True), \
+                patch.object(encoding_store, 'calcular_encoding', return_value=np.zeros(128)), \
+                patch.object(encoding_store.timezone, 'now', return_value=ahora):
+            encoding_store.asegurar_hashes_visita(self.visita)
+        self.visita.refresh_from_db()
+        return self.visita.fotos_reconocimiento
+
+    def test_formato_antiguo_y_espera_entre_reintentos(self):
+        ahora = timezone.now()
+        antigua, caida = self._asegurar(ahora)
+        self.assertEqual(antigua['url'], 'https://example.com/antigua.jpg')
+        self.assertTrue(antigua['sha256'])
+        self.assertEqual(caida['intentos'], 1)
+        self.assertEqual(caida['reintentar'], (ahora + timedelta(minutes=5)).isoformat())
+
+        # Dentro de la espera no se vuelve a descargar
+        self.descargas.clear()
+        self._asegurar(ahora + timedelta(minutes=1))
+        self.assertEqual(self.descargas, [])
+        self.assertFalse(encoding_store.foto_pendiente(caida, ahora + timedelta(minutes=1)))
+
+        # Pasada la espera se reintenta y la siguiente espera se duplica
+        _, caida = self._asegurar(ahora + timedelta(minutes=6))
+        self.assertEqual(self.descargas, ['https://example.com/caida.jpg'])
+        self.assertEqual(caida['intentos'], 2)
+        self.assertEqual(caida['reintentar'], (ahora + timedelta(minutes=16)).isoformat())
@@ -0,0 +1,89 @@
+"""
+Tests para la generación en lote de expensas mensuales
+"""
+
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from authz.models import Persona
+from core.models.propiedades_residentes import ExpensasMensuales, Propiedad, Vivienda
+from core.services.payments import calcular_importes_expensas, generar_expensas_periodo
+
+
+class FacturacionExpensasTest(TestCase):
+
+    def _propiedad(self, numero, tipo_cobranza='por_casa', metros='80.00', tarifa='150.00',
+                   porcentaje='100.00', estado='activa', **kwargs):
+        vivienda = Vivienda.objects.create(
+            numero_casa=numero, tipo_vivienda='casa', metros_cuadrados=Decimal(metros),
+            tarifa_base_expensas=Decimal(tarifa), tipo_cobranza=tipo_cobranza, estado=estado
+        )
+        persona = Persona.objects.create(
+            nombre=f'Persona{numero}', apellido='Prueba', documento_identidad=f'DOC{numero}',
+            email=f'{numero}@test.com'
+        )
+        kwargs.setdefault('fecha_inicio_tenencia', date(2024, 1, 1))
+        return Propiedad.objects.create(
+            vivienda=vivienda, persona=persona, tipo_tenencia='propietario',
+            porcentaje_propiedad=Decimal(porcentaje), **kwargs
+        )
+
+    def test_importes_por_casa_y_por_metro(self):
+        por_casa = self._propiedad('C-1', tarifa='150.00')
+        por_metro = self._propiedad('C-2', tipo_cobranza='por_metro_cuadrado', metros='72.35', tarifa='2.15')
+        compartida = self._propiedad('C-3', tarifa='100.01', porcentaje='50.00')
+
+        resultado = generar_expensas_periodo(2025, 3)
+
+        self.assertEqual((resultado.propiedades, resultado.creadas, resultado.existentes), (3, 3, 0))
+        montos = dict(ExpensasMensuales.objects.values_list('vivienda_id', 'monto_total'))
+        # 72.35 m² x 2.15 = 155.5525 -> 155.55 ; 100.01 x 50% = 50.005 -> 50.01
+        self.assertEqual(montos, {
+            por_casa.pk: Decimal('150.00'), por_metro.pk: Decimal('155.55'), compartida.pk: Decimal('50.01'),
+        })
+        self.assertEqual(resultado.monto_total, Decimal('355.56'))
+        expensa = ExpensasMensuales.objects.get(vivienda=por_casa)
+        self.assertEqual(expensa.monto_base_administracion, expensa.monto_total)
+        self.assertEqual(expensa.estado, 'pendiente')
+
+    def test_idempotente_por_periodo(self):
+        self._propiedad('C-1')
+        generar_expensas_periodo(2025, 3, lote=1)
+        nueva = self._propiedad('C-2')
+
+        resultado = generar_expensas_periodo(2025, 3, lote=1)
+
+        self.assertEqual((resultado.creadas, resultado.existentes), (1, 1))
+        self.assertEqual(ExpensasMensuales.objects.filter(periodo_year=2025, periodo_month=3).count(), 2)
+        self.assertTrue(ExpensasMensuales.objects.filter(vivienda=nueva).exists())
+        self.assertEqual(generar_expensas_periodo(2025, 3).creadas, 0)
+
+    def test_omite_propiedades_no_activas_en_el_periodo(self):
+        self._propiedad('C-1', activo=False)
+        self._propiedad('C-2', estado='inactiva')
+        self._propiedad('C-3', fecha_fin_tenencia=date(2025, 2, 28))
+        self._propiedad('C-4', fecha_inicio_tenencia=date(2025, 4, 1))
+        vigente = self._propiedad('C-5', fecha_fin_tenencia=date(2025, 3, 10))
+
+        resultado = generar_expensas_periodo(2025, 3)
+
+        self.assertEqual(resultado.creadas, 1)
+        self.assertEqual(list(ExpensasMensuales.objects.values_list('vivienda_id', flat=True)), [vigente.pk])
+
+    def test_importes_fuera_de_rango_int64(self):
+        # 99999999.99 x 999999.99 = 99999998990000.0001: fuera de int64, sigue siendo exacto
+        importes = calcular_importes_expensas(
+            [Decimal('99999999.99')], [Decimal('999999.99')], [True], [Decimal('100.00')]
+        )
+        self.assertEqual(importes, [9999999899000000])
+
+    def test_comando(self):
+        self._propiedad('C-1')
+        salida = StringIO()
+        call_command('generar_expensas', '--anio', '2025', '--mes', '3', stdout=salida)
+        self.assertIn('1 expensas creadas', salida.getvalue())
+        self.assertIn('filas/s', salida.getvalue())
@@ -0,0 +1,69 @@
+"""
+Tests para el campo binario de encodings faciales
+"""
+
+import base64
+
+import numpy as np
+from django.test import TestCase
+
+from authz.models import Persona
+from core.fields import encodings_a_bytes, rellenar_encodings
+
+
+class EncodingsFacialesFieldTest(TestCase):
+
+    def _persona(self, **kwargs):
+        return Persona.objects.create(nombre='Ana', apellido='Rojas', documento_identidad='123', **kwargs)
+
+    def test_se_lee_como_matriz_float32_sin_copia(self):
+        persona = self._persona(encoding_facial=[[0.25] * 128, [0.5] * 128])
+
+        leida = Persona.objects.get(pk=persona.pk)
+        self.assertEqual(leida.encodings.shape, (2, 128))
+        self.assertEqual(leida.encodings.dtype, np.float32)
+        # Vista de solo lectura sobre los bytes que devolvió la base de datos
+        self.assertFalse(leida.encodings.flags.writeable)
+        self.assertFalse(leida.encodings.flags.owndata)
+        np.testing.assert_array_equal(leida.encodings[1], np.full(128, 0.5, dtype=np.float32))
+
+    def test_save_parcial_actualiza_la_copia(self):
+        persona = self._persona()
+        self.assertIsNone(Persona.objects.get(pk=persona.pk).encodings)
+
+        persona.agregar_encoding_facial([0.1] * 128)
+        persona.encoding_facial.append([0.2] * 128)
+        persona.save(update_fields=['encoding_facial'])
+        self.assertEqual(Persona.objects.get(pk=persona.pk).encodings.shape, (2, 128))
+
+        persona.limpiar_encodings_faciales()
+        self.assertIsNone(Persona.objects.get(pk=persona.pk).encodings)
+
+    def test_rellenar_desde_json_y_base64(self):
+        from seguridad.models import Copropietarios, ReconocimientoFacial
+
+        persona = self._persona(encoding_facial=[0.3] * 128)
+        copropietario = Copropietarios.objects.create(
+            nombres='Ana', apellidos='Rojas', numero_documento='123', unidad_residencial='A-1'
+        )
+        vector = base64.b64encode(np.full(128, 0.4).tobytes()).decode()
+        reconocimiento = ReconocimientoFacial.objects.create(
+            copropietario=copropietario, proveedor_ia='Local', vector_facial=vector
+        )
+        # Registros anteriores al campo binario
+        Persona.objects.update(encodings=None)
+        ReconocimientoFacial.objects.update(encodings=None)
+
+        self.assertEqual(rellenar_encodings(Persona, 'encoding_facial', lote=1), 1)
+        self.assertEqual(rellenar_encodings(ReconocimientoFacial, 'vector_facial'), 1)
+        np.testing.assert_allclose(Persona.objects.get(pk=persona.pk).encodings, np.full((1, 128), 0.3))
+        np.testing.assert_allclose(
+            ReconocimientoFacial.objects.get(pk=reconocimiento.pk).encodings, np.full((1, 128), 0.4)
+        )
+
+    def test_tamano_invalido(self):
+        with self.assertRaises(ValueError):
+            encodings_a_bytes([0.1] * 100)
+        with self.assertRaises(ValueError):
+            encodings_a_bytes(b'\x00' * 10)
+        self.assertIsNone(encodings_a_bytes([]))
@@ -0,0 +1,113 @@
+"""
+Tests para el resumen de pagos agregado en la base de datos
+"""
+
+from datetime import date, time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from authz.models import Persona
+from core.models.administracion import Pagos
+from core.models.propiedades_residentes import EspacioComun, ExpensasMensuales, Propiedad, ReservaEspacio, Vivienda
+from core.services.payments import crear_multa_demo, resumen_pagos, total_pagado_reserva
+from core.views import RegistrarPagoView
+from reservas_areas.views import ReservaEspacioViewSet
+
+
+class ResumenPagosTest(TestCase):
+
+    def setUp(self):
+        self.persona = Persona.objects.create(
+            nombre='Ana', apellido='Prueba', documento_identidad='DOC1', email='residente@test.com'
+        )
+        self.usuario = get_user_model().objects.create_user(
+            email='residente@test.com', password=None, persona=self.persona
+        )
+        vivienda = Vivienda.objects.create(
+            numero_casa='A-101', tipo_vivienda='departamento', metros_cuadrados=Decimal('80.00'),
+            tarifa_base_expensas=Decimal('300.00'), tipo_cobranza='por_casa'
+        )
+        propiedad = Propiedad.objects.create(
+            vivienda=vivienda, persona=self.persona, tipo_tenencia='propietario',
+            fecha_inicio_tenencia=date(2024, 1, 1)
+        )
+        self.expensas = [
+            ExpensasMensuales.objects.create(
+                vivienda=propiedad, periodo_year=2025, periodo_month=mes, monto_base_administracion=Decimal('300.00')
+            )
+            for mes in (1, 2, 3)
+        ]
+        self.multa = crear_multa_demo(self.persona, Decimal('150.00'))
+        espacio = EspacioComun.objects.create(nombre='Salón', precio_por_hora=Decimal('50.00'))
+        self.reserva = ReservaEspacio.objects.create(
+            persona=self.persona, espacio_comun=espacio, fecha_reserva=date(2025, 3, 10),
+            hora_inicio=time(10), hora_fin=time(12), estado='confirmada', monto_total=Decimal('100.00')
+        )
+
+    def _pago(self, monto, estado='procesado', **kwargs):
+        return Pagos.objects.create(
+            persona=self.persona, tipo_pago='expensa', metodo_pago='efectivo', monto=Decimal(monto),
+            estado=estado, **kwargs
+        )
+
+    def test_una_consulta_agrupada_por_tipo(self):
+        primera, segunda, tercera = self.expensas
+        self._pago('300.00', expensa=primera)
+        self._pago('100.00', expensa=segunda)
+        self._pago('50.00', expensa=segunda, estado='pendiente_verificacion')
+        self._pago('200.00', expensa=tercera, estado='rechazado')
+        self._pago('150.00', multa=self.multa)
+        self._pago('40.00', reserva=self.reserva)
+        # Las reservas solo descuentan pagos procesados
+        self._pago('60.00', reserva=self.reserva, estado='pendiente_verificacion')
+
+        with self.assertNumQueries(3):
+            resumen = resumen_pagos(expensas=self.expensas, multas=[self.multa], reservas=[self.reserva])
+
+        self.assertEqual(
+            [(c.pagado, c.pendiente, c.estado) for c in (resumen.expensas[e.id] for e in self.expensas)],
+            [(Decimal('300.00'), Decimal('0'), 'pagada'),
+             (Decimal('150.00'), Decimal('150.00'), 'parcial'),
+             (Decimal('0'), Decimal('300.00'), 'pendiente')]
+        )
+        self.assertEqual(resumen.multas[self.multa.id].estado, 'pagada')
+        self.assertEqual(resumen.reservas[self.reserva.id].pendiente, Decimal('60.00'))
+        self.assertEqual(total_pagado_reserva(self.reserva), Decimal('40.00'))
+
+        with self.assertNumQueries(0):
+            self.assertEqual(resumen_pagos().expensas, {})
+
+    def test_registrar_pago_de_expensa(self):
+        self._pago('100.00', expensa=self.expensas[0])
+        request = APIRequestFactory().post('/api/pagos/', {
+            'tipo': 'expensa', 'objetivo_id': self.expensas[0].id, 'metodo_pago': 'efectivo', 'monto': '50.00',
+        }, format='json')
+        force_authenticate(request, user=self.usuario)
+
+        respuesta = RegistrarPagoView.as_view()(request)
+
+        self.assertEqual(respuesta.status_code, 201, respuesta.data)
+        actualizada = respuesta.data['expensa_actualizada']
+        self.assertEqual((actualizada['monto_pagado'], actualizada['monto_pendiente']),
+                         (Decimal('150.00'), Decimal('150.00')))
+        self.expensas[0].refresh_from_db()
+        self.assertEqual(self.expensas[0].estado, 'parcial')
+
+    def test_registrar_pago_de_reserva(self):
+        # Un pago rechazado no reduce el saldo pendiente
+        self._pago('100.00', reserva=self.reserva, estado='rechazado')
+        vista = ReservaEspacioViewSet.as_view({'post': 'registrar_pago'})
+
+        def pagar(monto):
+            request = APIRequestFactory().post('/', {'monto': monto, 'metodo_pago': 'efectivo'}, format='json')
+            force_authenticate(request, user=self.usuario)
+            return vista(request, pk=self.reserva.pk)
+
+        self.assertEqual(pagar('100.01').data['error'], 'El monto excede el saldo pendiente.')
+        self.assertEqual(pagar('60.00').status_code, 200)
+        self.reserva.refresh_from_db()
+        self.assertEqual(self.reserva.estado, 'parcial')
+        self.assertIsNotNone(self.reserva.fecha_pago)
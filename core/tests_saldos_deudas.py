@@ -0,0 +1,137 @@
+"""
+Tests para el saldo pendiente materializado por persona
+"""
+
+from datetime import date, time
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from authz.models import Persona
+from core.models.administracion import Pagos, SaldoPersona
+from core.models.propiedades_residentes import EspacioComun, ExpensasMensuales, Propiedad, ReservaEspacio, Vivienda
+from core.services.payments import crear_multa_demo, generar_expensas_periodo
+from core.views import PendingDebtsView
+
+
+class SaldosDeudasTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.usuario = get_user_model().objects.create_user(email='residente@test.com', password=None)
+        self.persona = Persona.objects.create(
+            nombre='Ana', apellido='Prueba', documento_identidad='DOC1', email='residente@test.com'
+        )
+        self.vivienda = Vivienda.objects.create(
+            numero_casa='A-101', tipo_vivienda='departamento', metros_cuadrados=Decimal('80.00'),
+            tarifa_base_expensas=Decimal('300.00'), tipo_cobranza='por_casa'
+        )
+        self.propiedad = Propiedad.objects.create(
+            vivienda=self.vivienda, persona=self.persona, tipo_tenencia='propietario',
+            fecha_inicio_tenencia=date(2024, 1, 1)
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.expensa = ExpensasMensuales.objects.create(
+                vivienda=self.propiedad, periodo_year=2025, periodo_month=3,
+                monto_base_administracion=Decimal('250.00'), monto_mantenimiento=Decimal('50.00')
+            )
+            self.multa = crear_multa_demo(self.persona, Decimal('150.00'))
+
+    def _consultar(self):
+        request = APIRequestFactory().get('/api/pending-debts/')
+        force_authenticate(request, user=self.usuario)
+        return PendingDebtsView.as_view()(request)
+
+    def _pagar(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Pagos.objects.create(persona=self.persona, metodo_pago='efectivo', **kwargs)
+
+    def test_lectura_con_consultas_constantes(self):
+        # Persona del usuario y fila del saldo
+        with self.assertNumQueries(2):
+            respuesta = self._consultar()
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.data['resumen']['total_pendiente'], Decimal('450.00'))
+        self.assertEqual(respuesta.data['expensas'][0]['vivienda']['numero_casa'], 'A-101')
+        self.assertEqual(respuesta.data['multas'][0]['monto_pendiente'], 150.0)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self._consultar().data, respuesta.data)
+
+    def test_pagos_actualizan_el_saldo(self):
+        self._consultar()
+        self._pagar(tipo_pago='expensa', expensa=self.expensa, monto=Decimal('100.00'))
+        self._pagar(tipo_pago='multa', multa=self.multa, monto=Decimal('150.00'))
+        # Los pagos rechazados no descuentan deuda
+        self._pagar(tipo_pago='expensa', expensa=self.expensa, monto=Decimal('200.00'), estado='rechazado')
+
+        resumen = self._consultar().data['resumen']
+        self.assertEqual(resumen['total_expensas_pendientes'], Decimal('200.00'))
+        self.assertEqual(resumen['total_multas_pendientes'], Decimal('0.00'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.multa.estado = 'anulada'
+            self.multa.save(update_fields=['estado'])
+        self.assertEqual(self._consultar().data['resumen']['cantidad_multas'], 0)
+
+    def test_reservas_pendientes(self):
+        espacio = EspacioComun.objects.create(nombre='Salón', precio_por_hora=Decimal('50.00'))
+        with self.captureOnCommitCallbacks(execute=True):
+            reserva = ReservaEspacio.objects.create(
+                persona=self.persona, espacio_comun=espacio, fecha_reserva=date(2025, 3, 10),
+                hora_inicio=time(10), hora_fin=time(12), estado='confirmada', monto_total=Decimal('100.00')
+            )
+        self._pagar(tipo_pago='reserva', reserva=reserva, monto=Decimal('40.00'))
+
+        respuesta = self._consultar()
+        self.assertEqual(respuesta.data['resumen']['total_reservas_pendientes'], Decimal('60.00'))
+        self.assertEqual(respuesta.data['reservas'][0]['monto_pendiente'], 60.0)
+        # Las reservas no cambian el total que ya mostraba la app
+        self.assertEqual(respuesta.data['resumen']['total_pendiente'], Decimal('450.00'))
+
+    def test_rollback_descarta_el_saldo(self):
+        self._consultar()
+        try:
+            with transaction.atomic():
+                Pagos.objects.create(
+                    persona=self.persona, tipo_pago='expensa', expensa=self.expensa,
+                    monto=Decimal('300.00'), metodo_pago='efectivo'
+                )
+                raise RuntimeError('falla después del pago')
+        except RuntimeError:
+            pass
+        self.assertEqual(SaldoPersona.objects.get(persona=self.persona).total_expensas, Decimal('300.00'))
+
+    def test_facturacion_en_lote_invalida_el_saldo(self):
+        self._consultar()
+        with self.captureOnCommitCallbacks(execute=True):
+            generar_expensas_periodo(2025, 4)
+        self.assertFalse(SaldoPersona.objects.filter(persona=self.persona).exists())
+
+        resumen = self._consultar().data['resumen']
+        self.assertEqual((resumen['cantidad_expensas'], resumen['total_expensas_pendientes']), (2, Decimal('600.00')))
+
+    def test_limpiar_propietarios_invalida_el_saldo(self):
+        self._consultar()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('limpiar_propietarios', stdout=StringIO())
+        self.assertFalse(Propiedad.objects.filter(pk=self.propiedad.pk, activo=True).exists())
+        self.assertFalse(SaldoPersona.objects.filter(persona=self.persona).exists())
+
+    def test_verificacion_reporta_y_corrige_diferencias(self):
+        SaldoPersona.objects.filter(persona=self.persona).update(total_multas=Decimal('0.00'))
+
+        salida = StringIO()
+        call_command('verificar_saldos_deudas', stdout=salida)
+        self.assertIn(f'Persona {self.persona.pk}: total_multas: 0.00 -> 150.00', salida.getvalue())
+
+        call_command('verificar_saldos_deudas', '--corregir', stdout=StringIO())
+        salida = StringIO()
+        call_command('verificar_saldos_deudas', stdout=salida)
+        self.assertIn('1 saldos revisados, 0 con diferencias', salida.getvalue())
@@ -0,0 +1,71 @@
+"""
+Tests para la ocupación de viviendas calculada con anotaciones
+"""
+
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from authz.models import Persona
+from core.api.viviendas.serializers import ViviendaSerializer
+from core.api.viviendas.views import ViviendaViewSet
+from core.models.propiedades_residentes import Propiedad, Vivienda
+from core.utilidades_tests import ConsultasConstantesMixin
+
+# Ocupación de cada vivienda según su índice
+OCUPACIONES = ('ocupada', 'alquilada', 'disponible', 'ocupada_inactiva')
+
+
+class OcupacionViviendasTest(ConsultasConstantesMixin, TestCase):
+
+    tamanos = (4, 12)
+
+    def setUp(self):
+        self.usuario = get_user_model().objects.create_user(email='admin@test.com', password=None)
+
+    def _viviendas(self, desde, hasta):
+        for numero in range(desde, hasta):
+            vivienda = Vivienda.objects.create(
+                numero_casa=f'C-{numero:03d}', tipo_vivienda='casa', metros_cuadrados=Decimal('80.00'),
+                tarifa_base_expensas=Decimal('150.00'), tipo_cobranza='por_casa'
+            )
+            ocupacion = OCUPACIONES[numero % len(OCUPACIONES)]
+            if ocupacion == 'disponible':
+                continue
+            persona = Persona.objects.create(
+                nombre=f'Persona{numero}', apellido='Prueba', documento_identidad=f'DOC{numero}',
+                email=f'persona{numero}@test.com'
+            )
+            Propiedad.objects.create(
+                vivienda=vivienda, persona=persona, fecha_inicio_tenencia=date(2024, 1, 1),
+                tipo_tenencia='inquilino' if ocupacion == 'alquilada' else 'propietario',
+                activo=ocupacion != 'ocupada_inactiva'
+            )
+
+    def test_listado_con_consultas_constantes(self):
+        respuesta = self.assertConsultasConstantes(
+            ViviendaViewSet.as_view({'get': 'list'}), self._viviendas, esperadas=1
+        )
+        por_numero = {v['numero_casa']: v for v in respuesta.data}
+        self.assertEqual(
+            [por_numero[f'C-00{n}']['estado_ocupacion'] for n in range(4)],
+            ['ocupada', 'alquilada', 'disponible', 'disponible']
+        )
+        self.assertEqual((por_numero['C-000']['propietarios_count'], por_numero['C-001']['inquilinos_count']), (1, 1))
+
+    def test_estadisticas_frontend(self):
+        respuesta = self.assertConsultasConstantes(
+            ViviendaViewSet.as_view({'get': 'estadisticas_frontend'}), self._viviendas, esperadas=3
+        )
+        self.assertEqual(respuesta.data['estadisticas'], {
+            'total': 12, 'ocupadas': 3, 'alquiladas': 3, 'disponibles': 6
+        })
+        self.assertEqual(len(respuesta.data['viviendas'][0]['propiedades']), 1)
+
+    def test_instancia_sin_anotar(self):
+        self._viviendas(0, 1)
+        datos = ViviendaSerializer(Vivienda.objects.get()).data
+        self.assertEqual((datos['estado_ocupacion'], datos['total_propietarios']), ('ocupada', 1))
+        self.assertEqual(len(datos['propiedades']), 1)
@@ -0,0 +1,39 @@
+"""
+Utilidades compartidas por los tests de core y seguridad
+
+El nombre no empieza con ``test`` para que el runner no lo recorra como un
+módulo de tests.
+"""
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+
+class ConsultasConstantesMixin:
+    """``assertConsultasConstantes``: mismas consultas sin importar la cantidad de filas"""
+
+    tamanos = (2, 10)
+
+    def assertConsultasConstantes(self, vista, crear_filas, esperadas):
+        """
+        Args:
+            vista: Vista (``as_view()``) que se llama con GET
+            crear_filas: Callable ``(desde, hasta)`` que crea las filas de esos índices
+            esperadas: Consultas que debe hacer la vista en cada medición
+        """
+        creadas = 0
+        for tamano in self.tamanos:
+            crear_filas(creadas, tamano)
+            creadas = tamano
+            peticion = APIRequestFactory().get('/')
+            force_authenticate(peticion, user=self.usuario)
+            with CaptureQueriesContext(connection) as consultas:
+                respuesta = vista(peticion)
+            self.assertEqual(respuesta.status_code, 200, respuesta.data)
+            self.assertEqual(
+                len(consultas), esperadas,
+                f'{len(consultas)} consultas con {tamano} filas:\n'
+                + '\n'.join(consulta['sql'] for consulta in consultas.captured_queries)
+            )
+        return respuesta
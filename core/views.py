@@ -1,7 +1,6 @@
 from typing import cast
 from decimal import Decimal, InvalidOperation
 
-from django.db.models import Sum
 from django.utils import timezone
 from rest_framework import status
 from rest_framework.response import Response
@@ -17,14 +16,13 @@ from core.serializers import (
     RegistrarPagoSerializer,
 )
 from core.services.payments import (
-    CONFIRMED_PAYMENT_STATES,
     crear_expensa_demo,
     crear_multa_demo,
     ensure_persona_for_user,
-    expensas_pendientes,
     get_persona_for_user,
-    multas_pendientes,
+    resumen_pagos,
 )
+from core.services.saldos_deudas import saldo_de_persona
 
 
 class PendingDebtsView(APIView):
@@ -38,48 +36,24 @@ class PendingDebtsView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        expensas_qs = expensas_pendientes(persona)
-        multas_qs = multas_pendientes(persona)
-
-        pagos_expensas = (
-            Pagos.objects
-            .filter(expensa__in=expensas_qs, estado__in=CONFIRMED_PAYMENT_STATES)
-            .values('expensa_id')
-            .annotate(total=Sum('monto'))
-        )
-        pagos_multa = (
-            Pagos.objects
-            .filter(multa__in=multas_qs, estado__in=CONFIRMED_PAYMENT_STATES)
-            .values('multa_id')
-            .annotate(total=Sum('monto'))
-        )
-        pagos_por_expensa = {item['expensa_id']: item['total'] or Decimal('0') for item in pagos_expensas}
-        pagos_por_multa = {item['multa_id']: item['total'] or Decimal('0') for item in pagos_multa}
-
-        expensas_data = ExpensaDebtSerializer(
-            expensas_qs,
-            many=True,
-            context={'pagos_por_expensa': pagos_por_expensa},
-        ).data
-        multas_data = MultaDebtSerializer(
-            multas_qs,
-            many=True,
-            context={'pagos_por_multa': pagos_por_multa},
-        ).data
-
-        total_expensas = sum(Decimal(str(item['monto_pendiente'])) for item in expensas_data)
-        total_multas = sum(Decimal(str(item['monto_pendiente'])) for item in multas_data)
+        # Saldo materializado (core/services/saldos_deudas.py): una consulta o ninguna
+        saldo = saldo_de_persona(persona.pk)
+        total_expensas = saldo['total_expensas']
+        total_multas = saldo['total_multas']
 
         return Response({
             'persona': PersonaResumenSerializer(persona).data,
-            'expensas': expensas_data,
-            'multas': multas_data,
+            'expensas': saldo['expensas'],
+            'multas': saldo['multas'],
+            'reservas': saldo['reservas'],
             'resumen': {
                 'total_pendiente': total_expensas + total_multas,
                 'total_expensas_pendientes': total_expensas,
                 'total_multas_pendientes': total_multas,
-                'cantidad_expensas': len(expensas_data),
-                'cantidad_multas': len(multas_data),
+                'total_reservas_pendientes': saldo['total_reservas'],
+                'cantidad_expensas': len(saldo['expensas']),
+                'cantidad_multas': len(saldo['multas']),
+                'cantidad_reservas': len(saldo['reservas']),
             },
         })
 
@@ -106,42 +80,37 @@ class RegistrarPagoView(APIView):
             'pago': PagoDetailSerializer(pago).data,
         }
 
+        # Lo pagado de la deuda saldada, en una consulta agrupada
+        pagos = resumen_pagos(
+            expensas=[pago.expensa] if pago.expensa else (),
+            multas=[pago.multa] if pago.multa else (),
+            reservas=[pago.reserva] if pago.reserva else (),
+        )
+
         if pago.expensa:
-            total_pagado_expensa = (
-                Pagos.objects
-                .filter(expensa=pago.expensa, estado__in=CONFIRMED_PAYMENT_STATES)
-                .aggregate(total=Sum('monto'))['total'] or Decimal('0')
-            )
             expensa_serializer = ExpensaDebtSerializer(
                 [pago.expensa],
                 many=True,
-                context={'pagos_por_expensa': {pago.expensa.id: total_pagado_expensa}},
+                context={'pagos_por_expensa': pagos.pagado_por('expensas')},
             )
             payload['expensa_actualizada'] = expensa_serializer.data[0]
 
         if pago.multa:
-            total_pagado_multa = (
-                Pagos.objects
-                .filter(multa=pago.multa, estado__in=CONFIRMED_PAYMENT_STATES)
-                .aggregate(total=Sum('monto'))['total'] or Decimal('0')
-            )
             multa_serializer = MultaDebtSerializer(
                 [pago.multa],
                 many=True,
-                context={'pagos_por_multa': {pago.multa.id: total_pagado_multa}},
+                context={'pagos_por_multa': pagos.pagado_por('multas')},
             )
             payload['multa_actualizada'] = multa_serializer.data[0]
 
-        # Agregar manejo de reservas
-        if hasattr(pago, 'reserva') and pago.reserva:
-            from core.services.payments import total_pagado_reserva
-            total_pagado_reserva_actual = total_pagado_reserva(pago.reserva)
+        if pago.reserva:
+            cobro = pagos.reservas[pago.reserva.id]
             payload['reserva_actualizada'] = {
                 'id': pago.reserva.id,
                 'monto_total': pago.reserva.monto_total,
-                'monto_pagado': total_pagado_reserva_actual,
-                'monto_pendiente': max(Decimal('0'), pago.reserva.monto_total - total_pagado_reserva_actual),
-                'estado': 'pagada' if total_pagado_reserva_actual >= pago.reserva.monto_total else 'parcial'
+                'monto_pagado': cobro.pagado,
+                'monto_pendiente': cobro.pendiente,
+                'estado': 'pagada' if cobro.estado == 'pagada' else 'parcial'
             }
 
         return Response(payload, status=status.HTTP_201_CREATED)
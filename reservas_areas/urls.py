@@ -5,6 +5,7 @@ app_name = 'reservas_areas'
 
 urlpatterns = [
     path('reservas/', ReservaEspacioViewSet.as_view({'get': 'list', 'post': 'create'}), name='reservas-list-create'),
+    path('reservas/disponibilidad/', ReservaEspacioViewSet.as_view({'get': 'disponibilidad'}), name='reservas-disponibilidad'),
     path('reservas/<int:pk>/', ReservaEspacioViewSet.as_view({'get': 'retrieve', 'put': 'update', 'delete': 'destroy'}), name='reservas-detail'),
 
     #nuevas
@@ -1,16 +1,23 @@
 from __future__ import annotations
 
+from datetime import date, timedelta
 from decimal import Decimal
-from django.db.models import Q, Sum
+from django.db import transaction
 from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
 from django.utils import timezone
-from core.models.propiedades_residentes import ReservaEspacio
-from core.models.administracion import Pagos
-from core.services.payments import total_pagado_reserva
+from core.models.propiedades_residentes import EspacioComun, ReservaEspacio
+from core.services.disponibilidad_espacios import (
+    MAX_DIAS_CALENDARIO,
+    a_horarios,
+    bloquear_dia,
+    calendario,
+    validar_horario,
+)
+from core.services.payments import resumen_pagos
 from core.serializers import RegistrarPagoSerializer
 from reservas_areas.serializers import ReservaEspacioSerializer
 
@@ -38,30 +45,83 @@ class ReservaEspacioViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         """
         Se realiza la creación de la reserva, asegurando que solo se cree si el usuario es válido.
-        Además, se verifica que no exista una reserva en el mismo rango de fecha y hora.
+        Además, se verifica que el horario esté disponible y no se superponga con otra reserva.
         """
         user = self.request.user
+        if not user.is_authenticated or not hasattr(user, 'persona'):
+            raise ValidationError("El usuario no tiene persona asociada.")
+
         fecha_reserva = serializer.validated_data['fecha_reserva']
         hora_inicio = serializer.validated_data['hora_inicio']
         hora_fin = serializer.validated_data['hora_fin']
         espacio_comun = serializer.validated_data['espacio_comun']
 
-        # Validación: comprobar si hay superposición de horarios
-        reserva_conflictiva = ReservaEspacio.objects.filter(
-            espacio_comun=espacio_comun,
-            fecha_reserva=fecha_reserva,
-        ).filter(
-            Q(hora_inicio__lt=hora_fin) & Q(hora_fin__gt=hora_inicio)
-        ).exists()
+        # Con el día del espacio bloqueado, otra reserva concurrente espera
+        # a que esta se guarde antes de validar su horario
+        with transaction.atomic():
+            bloquear_dia(espacio_comun.id, fecha_reserva)
+            error = validar_horario(espacio_comun.id, fecha_reserva, hora_inicio, hora_fin)
+            if error:
+                raise ValidationError(error)
+            serializer.save(persona=user.persona, fecha_solicitud=timezone.now())
 
-        if reserva_conflictiva:
-            raise ValidationError("La reserva no se puede realizar, el horario ya está ocupado.")
+    def perform_update(self, serializer):
+        """
+        Actualiza la reserva validando el nuevo horario con los mismos bloqueos
+        que la creación; si cambia de día o de espacio, también se bloquea el
+        día anterior. La propia reserva no cuenta como superposición.
+        """
+        instance = serializer.instance
+        datos = serializer.validated_data
+        fecha_reserva = datos.get('fecha_reserva', instance.fecha_reserva)
+        hora_inicio = datos.get('hora_inicio', instance.hora_inicio)
+        hora_fin = datos.get('hora_fin', instance.hora_fin)
+        espacio_id = datos['espacio_comun'].id if 'espacio_comun' in datos else instance.espacio_comun_id
+
+        with transaction.atomic():
+            # En orden fijo para que dos ediciones cruzadas no se bloqueen entre sí
+            dias = {(instance.espacio_comun_id, instance.fecha_reserva), (espacio_id, fecha_reserva)}
+            for dia in sorted(dias):
+                bloquear_dia(*dia)
+            error = validar_horario(espacio_id, fecha_reserva, hora_inicio, hora_fin, excluir=instance.pk)
+            if error:
+                raise ValidationError(error)
+            serializer.save()
 
-        # Si no hay conflicto, guardamos la reserva
-        if not user.is_authenticated or not hasattr(user, 'persona'):
-            raise ValidationError("El usuario no tiene persona asociada.")
-        serializer.save(persona=getattr(user, 'persona', None), fecha_solicitud=timezone.now())
-        return super().perform_create(serializer)
+    @action(detail=False, methods=['get'])
+    def disponibilidad(self, request):
+        """
+        Horarios libres de un espacio común por día.
+
+        GET ?espacio_comun=<id>&desde=AAAA-MM-DD&hasta=AAAA-MM-DD (por defecto, los próximos 7 días)
+        """
+        try:
+            espacio_id = int(request.query_params['espacio_comun'])
+            desde = date.fromisoformat(request.query_params.get('desde') or timezone.localdate().isoformat())
+            hasta_param = request.query_params.get('hasta')
+            hasta = date.fromisoformat(hasta_param) if hasta_param else desde + timedelta(days=6)
+        except (KeyError, ValueError):
+            return Response(
+                {'error': 'Parámetros inválidos: espacio_comun (id), desde y hasta (AAAA-MM-DD).'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if hasta < desde or (hasta - desde).days >= MAX_DIAS_CALENDARIO:
+            return Response(
+                {'error': f'El rango debe ir de desde a hasta y abarcar como máximo {MAX_DIAS_CALENDARIO} días.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            libres = calendario(espacio_id, desde, hasta)
+        except EspacioComun.DoesNotExist:
+            return Response({'error': 'El espacio común no existe o no está activo.'}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response({
+            'espacio_comun': espacio_id,
+            'desde': desde,
+            'hasta': hasta,
+            'dias': [{'fecha': fecha, 'libres': a_horarios(intervalos)} for fecha, intervalos in libres.items()],
+        }, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['post'])
     def confirmar_reserva(self, request, pk=None):
@@ -89,9 +149,8 @@ class ReservaEspacioViewSet(viewsets.ModelViewSet):
         if reserva.estado != 'confirmada':
             return Response({'error': 'La reserva debe estar confirmada antes de registrar el pago.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Calcular el monto pendiente
-        total_pagado = Pagos.objects.filter(reserva=reserva).aggregate(total_pagado=Sum('monto'))['total_pagado'] or Decimal('0.00')
-        monto_pendiente = max(Decimal('0.00'), reserva.monto_total - total_pagado)
+        # Calcular el monto pendiente (solo cuentan los pagos procesados)
+        monto_pendiente = resumen_pagos(reservas=[reserva]).reservas[reserva.id].pendiente
 
         try:
             monto_pago = Decimal(request.data.get('monto', '0'))
@@ -118,14 +177,9 @@ class ReservaEspacioViewSet(viewsets.ModelViewSet):
         )
 
         if serializer.is_valid():
+            # RegistrarPagoSerializer.create también actualiza estado y fecha_pago de la reserva
             serializer.save()
 
-            # Verificar el total pagado y actualizar el estado de la reserva
-            total_pagado = Pagos.objects.filter(reserva=reserva).aggregate(total_pagado=Sum('monto'))['total_pagado'] or Decimal('0.00')
-            reserva.estado = 'pagada' if total_pagado >= reserva.monto_total else 'parcial'
-            reserva.fecha_pago = timezone.now()
-            reserva.save()
-
             return Response({'message': 'Pago registrado correctamente.'}, status=status.HTTP_200_OK)
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
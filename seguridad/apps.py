@@ -1,6 +1,48 @@
+import os
+import sys
+import threading
+
 from django.apps import AppConfig
 
 
+# Procesos que atienden peticiones y arrancan los hilos de fondo
+SERVIDORES = {'gunicorn', 'uvicorn', 'daphne'}
+
+
+def _es_servidor():
+    """True solo en gunicorn/uvicorn/daphne y en el proceso de runserver; no en scripts, comandos ni tests"""
+    if 'pytest' in sys.modules:
+        return False
+    programa = os.path.basename(sys.argv[0]) if sys.argv else ''
+    if programa == '__main__.py':
+        # python -m gunicorn: el nombre es el del paquete
+        programa = os.path.basename(os.path.dirname(sys.argv[0]))
+    if programa in SERVIDORES:
+        return True
+    # runserver carga las apps dos veces; solo el proceso que atiende (RUN_MAIN)
+    return (
+        programa == 'manage.py' and len(sys.argv) > 1 and sys.argv[1] == 'runserver'
+        and (os.environ.get('RUN_MAIN') == 'true' or '--noreload' in sys.argv)
+    )
+
+
 class SeguridadConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'seguridad'
+
+    def ready(self):
+        # Señales que mantienen las galerías de rostros sincronizadas
+        import seguridad.signals
+
+        from django.conf import settings
+        if not _es_servidor():
+            return
+
+        if getattr(settings, 'BITACORA_BUFFER_ACTIVO', False):
+            from seguridad.services.bitacora_buffer import obtener_escritor
+            obtener_escritor().iniciar()
+
+        if getattr(settings, 'FACE_PROVIDERS_CALENTAR', False):
+            # En segundo plano para no retrasar el arranque del worker
+            from seguridad.services.provider_registry import calentar
+            threading.Thread(target=calentar, name='calentar-proveedores', daemon=True).start()
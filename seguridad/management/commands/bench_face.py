@@ -0,0 +1,75 @@
+"""
+Management command para medir el camino de match del reconocimiento facial
+"""
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from seguridad.services.face_benchmark import ESCENARIOS, SEMILLA, ejecutar
+
+
+class Command(BaseCommand):
+    help = 'Mide latencia p50/p95/p99 y throughput del reconocimiento facial con galerías sintéticas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--personas', type=int, nargs='+', default=[100, 1000, 10000],
+            help='Tamaños de galería a medir (100 a 100000 personas)'
+        )
+        parser.add_argument('--encodings-min', type=int, default=1, help='Mínimo de encodings por persona')
+        parser.add_argument('--encodings-max', type=int, default=10, help='Máximo de encodings por persona')
+        parser.add_argument('--sondas', type=int, default=200, help='Encodings de consulta por escenario')
+        parser.add_argument('--imagenes', type=int, default=20, help='Imágenes sintéticas para los escenarios con detección')
+        parser.add_argument('--ancho-imagen', type=int, default=640, help='Ancho de las imágenes sintéticas')
+        parser.add_argument('--semilla', type=int, default=SEMILLA, help='Semilla de la galería y las sondas')
+        parser.add_argument(
+            '--escenarios', nargs='+', choices=sorted(ESCENARIOS), default=None,
+            help='Escenarios a correr (por defecto todos)'
+        )
+        parser.add_argument('--json', dest='salida_json', default=None, help='Guardar los resultados en este archivo JSON')
+
+    def handle(self, *args, **options):
+        if options['encodings_min'] < 1 or options['encodings_max'] < options['encodings_min']:
+            raise CommandError('Rango de encodings por persona inválido')
+        if any(p < 1 for p in options['personas']):
+            raise CommandError('El tamaño de galería debe ser positivo')
+
+        self.stdout.write(self.style.SUCCESS('⏱️ BENCHMARK DE RECONOCIMIENTO FACIAL'))
+        self.stdout.write(f"Semilla: {options['semilla']} - sondas: {options['sondas']} - imágenes: {options['imagenes']}")
+
+        resultados = []
+        for personas in options['personas']:
+            self.stdout.write(f"\n👥 Galería de {personas} personas")
+            self.stdout.write('-' * 96)
+            self.stdout.write(
+                f"{'escenario':<20}{'encodings':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+                f"{'consultas/s':>13}{'precisión':>11}{'preparación':>13}"
+            )
+            for resultado in ejecutar(
+                personas,
+                escenarios=options['escenarios'],
+                encodings_por_persona=(options['encodings_min'], options['encodings_max']),
+                sondas=options['sondas'],
+                imagenes=options['imagenes'],
+                ancho_imagen=options['ancho_imagen'],
+                semilla=options['semilla'],
+            ):
+                resultados.append(resultado)
+                self._mostrar(resultado)
+
+        if options['salida_json']:
+            with open(options['salida_json'], 'w', encoding='utf-8') as f:
+                json.dump({'semilla': options['semilla'], 'resultados': resultados}, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"\n💾 Resultados guardados en {options['salida_json']}"))
+
+    def _mostrar(self, resultado):
+        if 'omitido' in resultado:
+            self.stdout.write(self.style.WARNING(f"{resultado['escenario']:<20}omitido: {resultado['omitido']}"))
+            return
+        precision = f"{resultado['precision']:.1%}" if 'precision' in resultado else '-'
+        self.stdout.write(
+            f"{resultado['escenario']:<20}{resultado['encodings']:>10}"
+            f"{resultado['p50_ms']:>10.3f}{resultado['p95_ms']:>10.3f}{resultado['p99_ms']:>10.3f}"
+            f"{resultado['throughput']:>13.1f}{precision:>11}{resultado['preparacion_ms']:>11.0f}ms"
+        )
@@ -0,0 +1,33 @@
+"""
+Management command para compactar los contadores de la bitácora
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from seguridad.services.resumen_bitacora import DIAS_POR_HORA, compactar, reconstruir
+
+
+class Command(BaseCommand):
+    help = 'Agrupa por día los contadores por hora de la bitácora (ejecutar periódicamente, p. ej. cada noche)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias-por-hora', type=int, default=DIAS_POR_HORA,
+            help='Días recientes que conservan el detalle por hora'
+        )
+        parser.add_argument(
+            '--reconstruir', action='store_true',
+            help='Recalcular todos los contadores desde BitacoraAcciones antes de compactar'
+        )
+
+    def handle(self, *args, **options):
+        if options['dias_por_hora'] < 1:
+            raise CommandError('--dias-por-hora debe ser al menos 1')
+
+        if options['reconstruir']:
+            leidos = reconstruir(options['dias_por_hora'])
+            self.stdout.write(self.style.SUCCESS(f"✅ Contadores reconstruidos desde {leidos} registros de bitácora"))
+            return
+
+        compactadas = compactar(options['dias_por_hora'])
+        self.stdout.write(self.style.SUCCESS(f"✅ {compactadas} filas por hora compactadas en filas por día"))
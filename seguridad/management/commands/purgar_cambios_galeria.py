@@ -0,0 +1,24 @@
+"""
+Management command para purgar los cambios ya aplicados de las galerías faciales
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from seguridad.services.gallery_sync import purgar_cambios
+
+
+class Command(BaseCommand):
+    help = 'Borra los registros de CambioGaleriaFacial que ningún proceso necesita (también lo hace cada recarga completa)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--segundos', type=int, default=3600,
+            help='Antigüedad mínima de los cambios a borrar (intervalo de recarga completa de las galerías)'
+        )
+
+    def handle(self, *args, **options):
+        if options['segundos'] < 0:
+            raise CommandError('--segundos no puede ser negativo')
+
+        borrados = purgar_cambios(options['segundos'])
+        self.stdout.write(self.style.SUCCESS(f"✅ {borrados} cambios de galería purgados"))
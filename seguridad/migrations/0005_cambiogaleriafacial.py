@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-17 18:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seguridad', '0004_merge_20250928_0346'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CambioGaleriaFacial',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('galeria', models.CharField(choices=[('residentes', 'Residentes (ReconocimientoFacial)'), ('visitas', 'Visitas')], max_length=20)),
+                ('objeto_id', models.IntegerField()),
+                ('fecha', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Cambio de Galería Facial',
+                'verbose_name_plural': 'Cambios de Galería Facial',
+                'db_table': 'cambio_galeria_facial',
+                'indexes': [models.Index(fields=['galeria', 'id'], name='cambio_gale_galeria_ad8e39_idx')],
+            },
+        ),
+    ]
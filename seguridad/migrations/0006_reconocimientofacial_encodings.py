@@ -0,0 +1,25 @@
+# Generated by Django 5.2.6 on 2026-10-17 18:57
+
+import core.fields
+from django.db import migrations
+
+
+def copiar_encodings(apps, schema_editor):
+    # JSON / base64 -> float32 binario; el campo de origen se conserva
+    core.fields.rellenar_encodings(apps.get_model('seguridad', 'ReconocimientoFacial'), 'vector_facial')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seguridad', '0005_cambiogaleriafacial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reconocimientofacial',
+            name='encodings',
+            field=core.fields.EncodingsFacialesField(blank=True, null=True),
+        ),
+        migrations.RunPython(copiar_encodings, migrations.RunPython.noop),
+    ]
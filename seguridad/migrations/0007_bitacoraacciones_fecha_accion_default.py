@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-17 19:01
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seguridad', '0006_reconocimientofacial_encodings'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='bitacoraacciones',
+            name='fecha_accion',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-17 19:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seguridad', '0007_bitacoraacciones_fecha_accion_default'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bitacoraacciones',
+            index=models.Index(fields=['tipo_accion', '-fecha_accion', '-id'], name='bitacora_ac_tipo_ac_aa3cf2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bitacoraacciones',
+            index=models.Index(fields=['copropietario', '-fecha_accion', '-id'], name='bitacora_ac_copropi_fddb36_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.6 on 2026-10-17 19:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seguridad', '0008_bitacoraacciones_indices_cursor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenBitacora',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('granularidad', models.CharField(choices=[('hora', 'Hora'), ('dia', 'Día')], default='hora', max_length=4)),
+                ('periodo', models.DateTimeField(help_text='Inicio de la hora o del día (hora local)')),
+                ('tipo_accion', models.CharField(choices=[('LOGIN', 'Inicio de Sesión'), ('LOGOUT', 'Cierre de Sesión'), ('ENROLL_FACE', 'Enrolamiento Biométrico'), ('VERIFY_FACE', 'Verificación Biométrica'), ('DELETE_FACE', 'Eliminación Biométrico'), ('ACCESS_GRANTED', 'Acceso Concedido'), ('ACCESS_DENIED', 'Acceso Denegado'), ('SYSTEM_ERROR', 'Error del Sistema')], max_length=20)),
+                ('resultado', models.CharField(blank=True, choices=[('si', 'Match'), ('no', 'Sin match'), ('', 'Sin resultado')], default='', max_length=2)),
+                ('total', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Resumen de Bitácora',
+                'verbose_name_plural': 'Resúmenes de Bitácora',
+                'db_table': 'resumen_bitacora',
+                'unique_together': {('granularidad', 'periodo', 'tipo_accion', 'resultado')},
+            },
+        ),
+        migrations.CreateModel(
+            name='PresenciaDiariaBitacora',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('fecha', models.DateField()),
+                ('copropietario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='seguridad.copropietarios')),
+            ],
+            options={
+                'verbose_name': 'Presencia Diaria',
+                'verbose_name_plural': 'Presencias Diarias',
+                'db_table': 'presencia_diaria_bitacora',
+                'unique_together': {('fecha', 'copropietario')},
+            },
+        ),
+    ]
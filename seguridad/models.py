@@ -1,5 +1,8 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
+
+from core.fields import EncodingsFacialesField, sincronizar_encodings
 
 
 class Copropietarios(models.Model):
@@ -68,6 +71,8 @@ class ReconocimientoFacial(models.Model):
     )
     proveedor_ia = models.CharField(max_length=20, choices=PROVEEDOR_CHOICES)
     vector_facial = models.TextField()  # Almacena faceId (Azure) o vector base64 (Local)
+    # Copia float32 del vector Local, la que carga la galería
+    encodings = EncodingsFacialesField(null=True, blank=True)
     imagen_referencia_url = models.URLField(blank=True, null=True)  # Para Azure
     imagen_referencia_path = models.CharField(max_length=500, blank=True, null=True)  # Para Local
     activo = models.BooleanField(default=True)
@@ -92,6 +97,37 @@ class ReconocimientoFacial(models.Model):
     def __str__(self):
         return f"Reconocimiento {self.proveedor_ia} - {self.copropietario.nombre_completo}"
 
+    def save(self, *args, **kwargs):
+        sincronizar_encodings(self, 'vector_facial', kwargs)
+        super().save(*args, **kwargs)
+
+
+class CambioGaleriaFacial(models.Model):
+    """
+    Registro de cambios en las galerías de rostros en memoria
+
+    El ID autoincremental funciona como contador de versión: cada proceso
+    recuerda el último ID aplicado y solo recarga los objetos cambiados después.
+    """
+    GALERIA_CHOICES = [
+        ('residentes', 'Residentes (ReconocimientoFacial)'),
+        ('visitas', 'Visitas'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    galeria = models.CharField(max_length=20, choices=GALERIA_CHOICES)
+    objeto_id = models.IntegerField()
+    fecha = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'cambio_galeria_facial'
+        verbose_name = 'Cambio de Galería Facial'
+        verbose_name_plural = 'Cambios de Galería Facial'
+        indexes = [models.Index(fields=['galeria', 'id'])]
+
+    def __str__(self):
+        return f"Cambio {self.id} - {self.galeria} #{self.objeto_id}"
+
 
 class BitacoraAcciones(models.Model):
     """Bitácora de acciones del sistema"""
@@ -105,6 +141,8 @@ class BitacoraAcciones(models.Model):
         ('ACCESS_DENIED', 'Acceso Denegado'),
         ('SYSTEM_ERROR', 'Error del Sistema'),
     ]
+    # Tipos que lista logs_acceso (views_actividad.py)
+    TIPOS_ACCESO = ['VERIFY_FACE', 'ACCESS_GRANTED', 'ACCESS_DENIED']
     
     id = models.AutoField(primary_key=True)
     # Cambiar para usar el nuevo modelo de usuario
@@ -132,13 +170,21 @@ class BitacoraAcciones(models.Model):
     confianza = models.FloatField(blank=True, null=True)
     resultado_match = models.BooleanField(blank=True, null=True)
     
-    fecha_accion = models.DateTimeField(auto_now_add=True)
+    # default en lugar de auto_now_add: los registros encolados conservan su hora
+    # al insertarse después por lotes (ver services/bitacora_buffer.py)
+    fecha_accion = models.DateTimeField(default=timezone.now, editable=False)
 
     class Meta:
         db_table = 'bitacora_acciones'
         verbose_name = 'Bitácora de Acción'
         verbose_name_plural = 'Bitácora de Acciones'
         ordering = ['-fecha_accion']
+        # Paginación por cursor (fecha_accion, id) filtrando por tipo o por copropietario;
+        # con varios tipos se recorre cada uno por separado (archivo_bitacora.iterar)
+        indexes = [
+            models.Index(fields=['tipo_accion', '-fecha_accion', '-id']),
+            models.Index(fields=['copropietario', '-fecha_accion', '-id']),
+        ]
 
     def __str__(self):
         usuario_str = f"Usuario: {self.usuario.email}" if self.usuario else "Usuario: Sistema"
@@ -146,21 +192,81 @@ class BitacoraAcciones(models.Model):
         return f"{self.tipo_accion} - {usuario_str} {coprop_str} - {self.fecha_accion}"
 
 
+
+class ResumenBitacora(models.Model):
+    """
+    Contadores de la bitácora por hora y tipo de acción
+
+    Se actualizan al escribir cada registro (ver services/resumen_bitacora.py);
+    la compactación periódica agrupa las horas antiguas en filas por día.
+    """
+    GRANULARIDAD_CHOICES = [
+        ('hora', 'Hora'),
+        ('dia', 'Día'),
+    ]
+    RESULTADO_CHOICES = [
+        ('si', 'Match'),
+        ('no', 'Sin match'),
+        ('', 'Sin resultado'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    granularidad = models.CharField(max_length=4, choices=GRANULARIDAD_CHOICES, default='hora')
+    periodo = models.DateTimeField(help_text='Inicio de la hora o del día (hora local)')
+    tipo_accion = models.CharField(max_length=20, choices=BitacoraAcciones.TIPO_ACCION_CHOICES)
+    resultado = models.CharField(max_length=2, choices=RESULTADO_CHOICES, blank=True, default='')
+    total = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'resumen_bitacora'
+        verbose_name = 'Resumen de Bitácora'
+        verbose_name_plural = 'Resúmenes de Bitácora'
+        unique_together = [('granularidad', 'periodo', 'tipo_accion', 'resultado')]
+
+    def __str__(self):
+        return f"{self.granularidad} {self.periodo} - {self.tipo_accion}: {self.total}"
+
+
+class PresenciaDiariaBitacora(models.Model):
+    """Copropietarios con al menos una acción en el día (usuarios únicos del dashboard)"""
+    id = models.BigAutoField(primary_key=True)
+    fecha = models.DateField()
+    copropietario = models.ForeignKey(Copropietarios, on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        db_table = 'presencia_diaria_bitacora'
+        verbose_name = 'Presencia Diaria'
+        verbose_name_plural = 'Presencias Diarias'
+        unique_together = [('fecha', 'copropietario')]
+
+    def __str__(self):
+        return f"{self.fecha} - copropietario #{self.copropietario_id}"
+
+
 # Función auxiliar para logging en bitácora
 def fn_bitacora_log(tipo_accion, descripcion, usuario=None, copropietario=None, 
                    direccion_ip=None, user_agent=None, proveedor_ia=None, 
                    confianza=None, resultado_match=None):
     """
     Función auxiliar para crear registros en bitácora de acciones
+
+    En el servidor el registro se encola y se inserta por lotes en segundo
+    plano; si el escritor no está iniciado (tests, comandos) o su cola está
+    llena, se inserta en el momento.
     """
-    BitacoraAcciones.objects.create(
-        usuario=usuario,
-        copropietario=copropietario,
-        tipo_accion=tipo_accion,
-        descripcion=descripcion,
-        direccion_ip=direccion_ip,
-        user_agent=user_agent,
-        proveedor_ia=proveedor_ia,
-        confianza=confianza,
-        resultado_match=resultado_match
-    )
+    from seguridad.services.bitacora_buffer import encolar
+
+    registro = {
+        'usuario_id': getattr(usuario, 'pk', None),
+        'copropietario_id': getattr(copropietario, 'pk', None),
+        'tipo_accion': tipo_accion,
+        'descripcion': descripcion,
+        'direccion_ip': direccion_ip,
+        'user_agent': user_agent,
+        'proveedor_ia': proveedor_ia,
+        'confianza': confianza,
+        'resultado_match': resultado_match,
+        'fecha_accion': timezone.now(),
+    }
+    if not encolar(registro):
+        BitacoraAcciones.objects.create(**registro)
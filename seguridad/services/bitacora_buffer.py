@@ -0,0 +1,350 @@
+"""
+Escritura diferida y por lotes de la bitácora de acciones
+
+``fn_bitacora_log`` se llama en cada verificación facial, enrolamiento y
+resultado de frame WebRTC; con un INSERT por llamada la bitácora queda en el
+camino crítico de la petición (y en el servidor asíncrono bloquea el event
+loop). ``EscritorBitacora`` encola los registros en memoria y un hilo de fondo
+los inserta con ``bulk_create`` cada ``tamano_lote`` registros o cada
+``intervalo_ms`` milisegundos, lo que ocurra primero.
+
+Con ``archivo_respaldo`` cada registro encolado se agrega también a un archivo
+JSONL local del proceso (``<archivo>.<pid>.jsonl``) antes de devolver el
+control; al confirmar un lote su segmento se borra. Si el proceso muere con
+registros pendientes, ``recuperar()`` los inserta al siguiente arranque (entrega al menos una vez: un corte entre el
+INSERT y el borrado del segmento puede duplicar ese lote). Cada archivo
+huérfano se reclama primero con un ``os.replace`` a un nombre con el PID de
+quien lo recupera, así dos procesos que arrancan a la vez no lo insertan dos
+veces.
+
+Tras un fork el escritor se reinicia solo en procesos que atienden peticiones
+(workers de gunicorn), no en los hijos de un ``ProcessPoolExecutor``.
+
+Fuera del servidor (tests, comandos de management) el escritor no se inicia y
+``fn_bitacora_log`` sigue insertando de forma síncrona.
+"""
+
+import atexit
+import glob
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from django.db import DataError, IntegrityError, close_old_connections, transaction
+
+logger = logging.getLogger('seguridad')
+
+# Campos de BitacoraAcciones que viajan en cada registro encolado
+CAMPOS = (
+    'usuario_id', 'copropietario_id', 'tipo_accion', 'descripcion', 'direccion_ip',
+    'user_agent', 'proveedor_ia', 'confianza', 'resultado_match', 'fecha_accion',
+)
+
+
+class EscritorBitacora:
+    """
+    Args:
+        tamano_lote: Registros por ``bulk_create``
+        intervalo_ms: Espera máxima de un registro en la cola
+        archivo_respaldo: Archivo JSONL donde se copian los registros pendientes
+            (None = solo memoria)
+        max_pendientes: Con la cola llena ``encolar`` devuelve False y el
+            llamador escribe de forma síncrona
+    """
+
+    def __init__(self, tamano_lote: int = 200, intervalo_ms: int = 500,
+                 archivo_respaldo: Optional[str] = None, max_pendientes: int = 10000):
+        self.tamano_lote = max(1, tamano_lote)
+        self.intervalo = max(1, intervalo_ms) / 1000.0
+        self.archivo_respaldo = archivo_respaldo
+        self.max_pendientes = max_pendientes
+        self._pendientes: List[Dict] = []
+        self._primero: Optional[float] = None
+        self._condicion = threading.Condition()
+        self._escritura = threading.Lock()
+        self._archivo = None
+        self._segmento = 0
+        self._hilo: Optional[threading.Thread] = None
+        self._detenido = False
+        self._reiniciar_tras_fork = False
+
+    # --- lado productor ---
+
+    def encolar(self, registro: Dict) -> bool:
+        """Agrega un registro (dict con ``CAMPOS``); False si el escritor no lo aceptó"""
+        if self._reiniciar_tras_fork:
+            self._iniciar_tras_fork()
+        with self._condicion:
+            if self._hilo is None or self._detenido or len(self._pendientes) >= self.max_pendientes:
+                return False
+            if self.archivo_respaldo:
+                self._respaldar([registro])
+            self._pendientes.append(registro)
+            if self._primero is None:
+                # El hilo espera sin plazo mientras la cola está vacía
+                self._primero = time.monotonic()
+                self._condicion.notify()
+            elif len(self._pendientes) >= self.tamano_lote:
+                self._condicion.notify()
+        return True
+
+    @property
+    def activo(self) -> bool:
+        return self._hilo is not None and not self._detenido
+
+    # --- ciclo de vida ---
+
+    def iniciar(self):
+        """Inicia el hilo de escritura (que primero recupera lo que quedó en disco)"""
+        if self._hilo is not None:
+            return
+        self._detenido = False
+        self._hilo = threading.Thread(target=self._ciclo, name='escritor-bitacora', daemon=True)
+        self._hilo.start()
+        atexit.register(self.detener)
+
+    def detener(self, timeout: float = 10.0):
+        """Detiene el hilo y escribe todo lo pendiente (se registra con atexit)"""
+        with self._condicion:
+            if self._hilo is None or self._detenido:
+                return
+            self._detenido = True
+            self._condicion.notify()
+        self._hilo.join(timeout)
+        self.vaciar()
+
+    def _reiniciar_en_hijo(self):
+        """
+        Tras un fork (gunicorn --preload) el hilo no existe en el hijo: se
+        descarta el estado heredado, que sigue siendo del padre, y el escritor
+        se inicia con el primer registro encolado
+
+        En el hook de fork todavía no se sabe si el hijo es un worker o un
+        proceso de ``multiprocessing``; ver ``_iniciar_tras_fork``.
+        """
+        if self._hilo is None:
+            return
+        self._condicion = threading.Condition()
+        self._escritura = threading.Lock()
+        self._pendientes = []
+        self._primero = None
+        self._archivo = None
+        self._hilo = None
+        self._reiniciar_tras_fork = True
+
+    def _iniciar_tras_fork(self):
+        with self._escritura:
+            if not self._reiniciar_tras_fork:
+                return
+            self._reiniciar_tras_fork = False
+            # Los hijos de ProcessPoolExecutor (encoding_store, enrolamiento,
+            # inferencia WebRTC) no atienden peticiones: escriben en el momento
+            if multiprocessing.parent_process() is None:
+                self.iniciar()
+
+    def _ciclo(self):
+        try:
+            self.recuperar()
+        except Exception as e:
+            logger.error(f"❌ Error recuperando la bitácora pendiente: {e}")
+        while True:
+            with self._condicion:
+                while not self._detenido:
+                    if len(self._pendientes) >= self.tamano_lote:
+                        break
+                    if self._primero is not None:
+                        restante = self._primero + self.intervalo - time.monotonic()
+                        if restante <= 0:
+                            break
+                        self._condicion.wait(restante)
+                    else:
+                        self._condicion.wait()
+                detenido = self._detenido
+            try:
+                self.vaciar()
+            except Exception as e:
+                logger.error(f"❌ Error escribiendo bitácora: {e}")
+                # Los registros volvieron a la cola; reintentar tras una pausa
+                time.sleep(self.intervalo)
+            finally:
+                close_old_connections()
+            if detenido:
+                return
+
+    # --- escritura ---
+
+    def vaciar(self) -> int:
+        """Inserta ya todos los registros pendientes; retorna cuántos se escribieron"""
+        with self._escritura:
+            with self._condicion:
+                registros, self._pendientes = self._pendientes, []
+                self._primero = None
+                segmento = self._cerrar_segmento() if registros else None
+
+            escritos = 0
+            try:
+                for inicio in range(0, len(registros), self.tamano_lote):
+                    escritos += insertar_registros(registros[inicio:inicio + self.tamano_lote])
+            except Exception:
+                # Lo no escrito vuelve a la cola (y al respaldo) para reintentarse
+                self._devolver(registros[inicio:])
+                if segmento:
+                    os.remove(segmento)
+                raise
+            if segmento:
+                os.remove(segmento)
+            return escritos
+
+    def _respaldar(self, registros: List[Dict]):
+        """Agrega registros al archivo de respaldo (bajo la condición)"""
+        if self._archivo is None:
+            self._archivo = open(self._ruta_activa, 'a', encoding='utf-8')
+        self._archivo.writelines(json.dumps(r, default=str) + '\n' for r in registros)
+        # Al page cache del sistema: sobrevive a la caída del proceso
+        self._archivo.flush()
+
+    def _cerrar_segmento(self) -> Optional[str]:
+        """Aparta el archivo de respaldo con los registros que se van a escribir"""
+        if self._archivo is None:
+            return None
+        self._archivo.close()
+        self._archivo = None
+        self._segmento += 1
+        segmento = f'{self.archivo_respaldo}.{os.getpid()}.{self._segmento}.enviando'
+        os.replace(self._ruta_activa, segmento)
+        return segmento
+
+    def _devolver(self, registros: List[Dict]):
+        with self._condicion:
+            self._pendientes[:0] = registros
+            self._primero = time.monotonic()
+            if self.archivo_respaldo:
+                self._respaldar(registros)
+
+    def recuperar(self) -> int:
+        """
+        Inserta los registros que quedaron en disco de procesos que ya no
+        existen (cada worker escribe sus propios archivos, con su PID)
+
+        Cada archivo se renombra antes a ``<archivo>.<pid propio>.reclamado.<n>``:
+        si otro proceso ya lo reclamó, el renombrado falla y se omite; los
+        reclamados por un proceso vivo tampoco se tocan.
+        """
+        if not self.archivo_respaldo:
+            return 0
+        recuperados = 0
+        for ruta in sorted(glob.glob(f'{glob.escape(self.archivo_respaldo)}.*')):
+            pid = os.path.basename(ruta)[len(os.path.basename(self.archivo_respaldo)) + 1:].split('.')[0]
+            # Los archivos propios son del escritor de este proceso
+            if not pid.isdigit() or int(pid) == os.getpid() or _proceso_vivo(int(pid)):
+                continue
+            reclamado = f'{self.archivo_respaldo}.{os.getpid()}.reclamado.{next(_reclamos)}'
+            try:
+                os.replace(ruta, reclamado)
+            except FileNotFoundError:
+                continue
+            with open(reclamado, encoding='utf-8') as f:
+                registros = [json.loads(linea) for linea in f if linea.strip()]
+            recuperados += insertar_registros(registros)
+            os.remove(reclamado)
+        if recuperados:
+            logger.warning(f"⚠️ Bitácora: {recuperados} registros recuperados del archivo de respaldo")
+        return recuperados
+
+    @property
+    def _ruta_activa(self) -> str:
+        return f'{self.archivo_respaldo}.{os.getpid()}.jsonl'
+
+
+_reclamos = itertools.count(1)
+
+
+def _proceso_vivo(pid: int) -> bool:
+    if os.name == 'nt':
+        # os.kill(pid, 0) enviaría CTRL_C; en Windows se corre un solo proceso (runserver)
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+
+def insertar_registros(registros: List[Dict]) -> int:
+    """
+    ``bulk_create`` de los registros; si el lote falla (p. ej. un usuario
+    borrado mientras su registro esperaba) se insertan uno a uno y se descartan
+    solo los que fallan
+    """
+    from seguridad.models import BitacoraAcciones
+    from seguridad.services.resumen_bitacora import acumular
+
+    normalizados = [_normalizar(registro) for registro in registros]
+    objetos = [BitacoraAcciones(**registro) for registro in normalizados]
+    try:
+        with transaction.atomic():
+            BitacoraAcciones.objects.bulk_create(objetos)
+            # bulk_create no emite post_save: los contadores se suman aquí
+            acumular(normalizados)
+        return len(objetos)
+    except (IntegrityError, DataError) as e:
+        logger.warning(f"⚠️ Lote de bitácora rechazado ({e}); insertando uno a uno")
+    # Otros errores (base de datos caída) se propagan y el lote se reintenta
+    insertados = 0
+    for objeto in objetos:
+        try:
+            with transaction.atomic():
+                objeto.save(force_insert=True)
+            insertados += 1
+        except (IntegrityError, DataError) as e:
+            logger.error(f"❌ Registro de bitácora descartado ({objeto.tipo_accion}): {e}")
+    return insertados
+
+
+def _normalizar(registro: Dict) -> Dict:
+    datos = {campo: registro.get(campo) for campo in CAMPOS}
+    if isinstance(datos['fecha_accion'], str):
+        datos['fecha_accion'] = datetime.fromisoformat(datos['fecha_accion'])
+    return datos
+
+
+_escritor: Optional[EscritorBitacora] = None
+_escritor_lock = threading.Lock()
+
+
+def obtener_escritor() -> EscritorBitacora:
+    """Escritor del proceso configurado con ``BITACORA_BUFFER_*`` (sin iniciar)"""
+    global _escritor
+    from django.conf import settings
+
+    with _escritor_lock:
+        if _escritor is None:
+            _escritor = EscritorBitacora(
+                tamano_lote=getattr(settings, 'BITACORA_BUFFER_LOTE', 200),
+                intervalo_ms=getattr(settings, 'BITACORA_BUFFER_INTERVALO_MS', 500),
+                archivo_respaldo=getattr(settings, 'BITACORA_BUFFER_ARCHIVO', '') or None,
+                max_pendientes=getattr(settings, 'BITACORA_BUFFER_MAX_PENDIENTES', 10000),
+            )
+        return _escritor
+
+
+def _tras_fork():
+    if _escritor is not None:
+        _escritor._reiniciar_en_hijo()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_tras_fork)
+
+
+def encolar(registro: Dict) -> bool:
+    """Encola en el escritor del proceso si está iniciado"""
+    return _escritor is not None and _escritor.encolar(registro)
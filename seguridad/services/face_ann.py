@@ -0,0 +1,181 @@
+"""
+Índice aproximado (IVF) para galerías de rostros grandes
+
+Implementación en NumPy puro de un índice de archivo invertido: los encodings se
+agrupan con k-means en ``nlist`` celdas y cada consulta solo se compara contra
+los encodings de las ``nprobe`` celdas más cercanas. Con ``nprobe = nlist`` el
+resultado es idéntico a la búsqueda exacta; valores menores reducen la latencia
+a costa de recall.
+
+Expone la misma interfaz que ``FaceGalleryIndex`` y permite volver a la
+búsqueda exacta (``exact=True``) para verificar resultados.
+"""
+
+import logging
+from typing import Any, Optional, Tuple
+
+import numpy as np
+
+from .face_gallery import ENCODING_DIM, FaceGalleryIndex
+
+logger = logging.getLogger('seguridad')
+
+
+def _distancias_cuadradas(consultas: np.ndarray, matriz: np.ndarray, normas: np.ndarray) -> np.ndarray:
+    """||a - b||² para cada par consulta/fila usando un producto de matrices"""
+    normas_consulta = np.einsum('ij,ij->i', consultas, consultas)
+    cuadrados = normas_consulta[:, None] + normas[None, :] - 2.0 * (consultas @ matriz.T)
+    np.maximum(cuadrados, 0.0, out=cuadrados)
+    return cuadrados
+
+
+def kmeans(datos: np.ndarray, k: int, iteraciones: int = 10, seed: int = 0) -> np.ndarray:
+    """
+    K-means de Lloyd con inicialización aleatoria reproducible
+
+    Returns:
+        np.ndarray: Centroides (k, dimensión) en float32
+    """
+    rng = np.random.default_rng(seed)
+    centroides = datos[rng.choice(datos.shape[0], size=k, replace=False)].copy()
+
+    for _ in range(iteraciones):
+        normas = np.einsum('ij,ij->i', centroides, centroides)
+        asignacion = np.argmin(_distancias_cuadradas(datos, centroides, normas), axis=1)
+
+        sumas = np.zeros_like(centroides)
+        np.add.at(sumas, asignacion, datos)
+        conteos = np.bincount(asignacion, minlength=k)
+
+        ocupadas = conteos > 0
+        centroides[ocupadas] = sumas[ocupadas] / conteos[ocupadas, None]
+        # Las celdas vacías se reinician en puntos al azar para no perderlas
+        vacias = int((~ocupadas).sum())
+        if vacias:
+            centroides[~ocupadas] = datos[rng.choice(datos.shape[0], size=vacias, replace=False)]
+
+    return np.ascontiguousarray(centroides, dtype=np.float32)
+
+
+class IVFFaceGalleryIndex(FaceGalleryIndex):
+    """
+    Galería con búsqueda aproximada por archivo invertido
+
+    Args:
+        dimension: Dimensión de los encodings
+        nlist: Número de celdas; por defecto ~sqrt(N) al entrenar
+        nprobe: Celdas revisadas por consulta (recall vs latencia)
+        min_entrenamiento: Por debajo de este número de encodings se usa
+            búsqueda exacta, que a ese tamaño es igual de rápida
+        exact: Fuerza la búsqueda exacta en todas las consultas
+        seed: Semilla del k-means para que el índice sea reproducible
+    """
+
+    # Se reentrena cuando la galería crece este factor desde el último entrenamiento
+    FACTOR_REENTRENAMIENTO = 2.0
+
+    def __init__(self, dimension: int = ENCODING_DIM, nlist: Optional[int] = None, nprobe: int = 8,
+                 min_entrenamiento: int = 2000, exact: bool = False, seed: int = 0):
+        super().__init__(dimension)
+        self.nlist = nlist
+        self.nprobe = max(1, int(nprobe))
+        self.min_entrenamiento = min_entrenamiento
+        self.exact = exact
+        self.seed = seed
+
+        self._centroides: Optional[np.ndarray] = None
+        self._normas_centroides: Optional[np.ndarray] = None
+        self._tamano_entrenamiento = 0
+        # Filas de la matriz ordenadas por celda y offsets de cada celda
+        self._orden: Optional[np.ndarray] = None
+        self._offsets: Optional[np.ndarray] = None
+
+    def _set_matriz(self, encodings: np.ndarray, ids: np.ndarray):
+        super()._set_matriz(encodings, ids)
+        # Las listas invertidas se reconstruyen en la siguiente búsqueda
+        self._orden = None
+        self._offsets = None
+
+    @property
+    def entrenado(self) -> bool:
+        return self._centroides is not None
+
+    def train(self):
+        """Entrena los centroides con los encodings actuales y arma las listas"""
+        with self._lock:
+            total = len(self)
+            if total == 0:
+                self._centroides = None
+                return
+            nlist = self.nlist or int(np.sqrt(total))
+            nlist = max(1, min(nlist, total))
+            self._centroides = kmeans(self._encodings, nlist, seed=self.seed)
+            self._normas_centroides = np.einsum('ij,ij->i', self._centroides, self._centroides)
+            self._tamano_entrenamiento = total
+            self._construir_listas()
+            logger.info(f"Índice IVF entrenado: {total} encodings en {nlist} celdas")
+
+    def _construir_listas(self):
+        """Asigna cada encoding a su celda más cercana (sin reentrenar)"""
+        asignacion = np.argmin(
+            _distancias_cuadradas(self._encodings, self._centroides, self._normas_centroides), axis=1
+        )
+        self._orden = np.argsort(asignacion, kind='stable')
+        conteos = np.bincount(asignacion, minlength=self._centroides.shape[0])
+        self._offsets = np.concatenate([[0], np.cumsum(conteos)])
+
+    def _preparar(self) -> bool:
+        """Deja el índice listo para buscar. Retorna False si conviene búsqueda exacta"""
+        if self.exact or len(self) < self.min_entrenamiento:
+            return False
+        if not self.entrenado or len(self) > self._tamano_entrenamiento * self.FACTOR_REENTRENAMIENTO:
+            self.train()
+        elif self._orden is None:
+            self._construir_listas()
+        return True
+
+    def search(self, probes: Any, exact: Optional[bool] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Mejor coincidencia aproximada de cada probe
+
+        Args:
+            probes: Encoding(s) a buscar
+            exact: True para forzar la búsqueda exhaustiva en esta consulta
+        """
+        consultas = np.atleast_2d(np.asarray(probes, dtype=np.float32))
+        with self._lock:
+            if exact or not self._preparar():
+                return super().search(consultas)
+
+            encodings, normas, ids = self._encodings, self._normas, self._ids
+            orden, offsets = self._orden, self._offsets
+            nprobe = min(self.nprobe, self._centroides.shape[0])
+            celdas = np.argsort(
+                _distancias_cuadradas(consultas, self._centroides, self._normas_centroides), axis=1
+            )[:, :nprobe]
+
+        mejores_ids = np.full(consultas.shape[0], -1, dtype=np.int64)
+        mejores_distancias = np.full(consultas.shape[0], np.inf, dtype=np.float32)
+
+        for i, consulta in enumerate(consultas):
+            filas = np.concatenate([orden[offsets[c]:offsets[c + 1]] for c in celdas[i]])
+            if filas.size == 0:
+                continue
+            cuadrados = _distancias_cuadradas(consulta[None, :], encodings[filas], normas[filas])[0]
+            mejor = int(np.argmin(cuadrados))
+            mejores_ids[i] = ids[filas[mejor]]
+            mejores_distancias[i] = np.sqrt(cuadrados[mejor])
+
+        return mejores_ids, mejores_distancias
+
+    def recall(self, probes: Any) -> float:
+        """
+        Fracción de probes cuyo resultado aproximado coincide con el exacto
+
+        Útil para calibrar ``nprobe`` contra la galería real.
+        """
+        aproximados, _ = self.search(probes)
+        exactos, _ = self.search(probes, exact=True)
+        if exactos.size == 0:
+            return 1.0
+        return float(np.mean(aproximados == exactos))
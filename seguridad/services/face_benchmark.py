@@ -0,0 +1,303 @@
+"""
+Micro-benchmarks del reconocimiento facial con galerías sintéticas
+
+Genera galerías de encodings de 128 dimensiones con la misma semilla en cada
+corrida (personas con 1 a N encodings alrededor de un centroide, con
+distancias entre personas y dentro de una persona del orden de las de dlib) y
+mide la latencia p50/p95/p99 y el throughput de cada camino de match.
+
+Lo usan ``manage.py bench_face`` y la suite ``benchmarks/`` de pytest-benchmark.
+"""
+
+import io
+import time
+import logging
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .face_gallery import ENCODING_DIM, FaceGalleryIndex
+
+logger = logging.getLogger('seguridad')
+
+SEMILLA = 1234
+
+# Desviación de los centroides y del ruido dentro de una persona: da distancias
+# de ~0.95 entre personas distintas y ~0.25 entre fotos de la misma persona
+DISPERSION_PERSONAS = 0.06
+DISPERSION_FOTOS = 0.02
+
+
+def generar_galeria(personas: int, encodings_por_persona: Tuple[int, int] = (1, 10),
+                    dimension: int = ENCODING_DIM, semilla: int = SEMILLA) -> List[Dict[str, Any]]:
+    """
+    Galería sintética en el formato ``personas_bd`` de los proveedores
+
+    Args:
+        personas: Cantidad de personas
+        encodings_por_persona: Rango (mínimo, máximo) de encodings por persona
+        dimension: Dimensión de los encodings
+        semilla: Semilla del generador (misma semilla, misma galería)
+
+    Returns:
+        Lista de dicts con ``id``, ``nombre`` y ``encodings`` (ndarray float32)
+    """
+    rng = np.random.default_rng(semilla)
+    minimo, maximo = encodings_por_persona
+    centroides = rng.normal(0.0, DISPERSION_PERSONAS, (personas, dimension)).astype(np.float32)
+    cantidades = rng.integers(minimo, maximo + 1, size=personas)
+
+    galeria = []
+    for persona_id, (centroide, cantidad) in enumerate(zip(centroides, cantidades), start=1):
+        ruido = rng.normal(0.0, DISPERSION_FOTOS, (int(cantidad), dimension)).astype(np.float32)
+        galeria.append({
+            'id': persona_id,
+            'nombre': f'Persona {persona_id}',
+            'tipo_residente': 'sintetico',
+            'encodings': centroide + ruido,
+        })
+    return galeria
+
+
+def generar_sondas(galeria: Sequence[Dict[str, Any]], cantidad: int, fraccion_desconocidos: float = 0.2,
+                   semilla: int = SEMILLA) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Encodings de consulta: fotos nuevas de personas de la galería y desconocidos
+
+    Returns:
+        Tuple con la matriz de sondas (cantidad, dimension) y el ID esperado de
+        cada una (-1 para desconocidos)
+    """
+    rng = np.random.default_rng(semilla + 1)
+    dimension = galeria[0]['encodings'].shape[1]
+    esperados = np.full(cantidad, -1, dtype=np.int64)
+    sondas = np.empty((cantidad, dimension), dtype=np.float32)
+
+    for i in range(cantidad):
+        if rng.random() < fraccion_desconocidos:
+            sondas[i] = rng.normal(0.0, DISPERSION_PERSONAS, dimension)
+            continue
+        persona = galeria[int(rng.integers(len(galeria)))]
+        centroide = persona['encodings'].mean(axis=0)
+        sondas[i] = centroide + rng.normal(0.0, DISPERSION_FOTOS, dimension)
+        esperados[i] = persona['id']
+    return sondas, esperados
+
+
+def generar_imagen_sonda(ancho: int = 640, alto: int = 480, semilla: int = SEMILLA) -> bytes:
+    """
+    JPEG sintético para medir el camino completo (decodificación + detección)
+
+    No contiene un rostro real: sirve para medir el costo de detección, que no
+    depende del contenido, no para medir aciertos.
+    """
+    from PIL import Image, ImageDraw
+
+    rng = np.random.default_rng(semilla)
+    fondo = rng.integers(0, 255, (alto, ancho, 3), dtype=np.uint8)
+    imagen = Image.fromarray(fondo)
+    dibujo = ImageDraw.Draw(imagen)
+    cx, cy, r = ancho // 2, alto // 2, min(ancho, alto) // 4
+    dibujo.ellipse((cx - r, cy - int(r * 1.3), cx + r, cy + int(r * 1.3)), fill=(224, 172, 105))
+    buffer = io.BytesIO()
+    imagen.save(buffer, format='JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def medir(funcion: Callable[[Any], Any], entradas: Sequence[Any], calentamiento: int = 5,
+          esperados: Optional[Sequence[int]] = None) -> Dict[str, float]:
+    """
+    Latencia por llamada de ``funcion`` sobre cada entrada
+
+    Args:
+        funcion: Camino a medir; recibe una entrada y retorna el ID reconocido
+            (o None) si se quiere medir la precisión
+        entradas: Entradas, se mide una llamada por entrada
+        calentamiento: Llamadas previas que no se miden
+        esperados: ID esperado por entrada (-1 = desconocido) para calcular la
+            precisión top-1
+
+    Returns:
+        Dict con ``llamadas``, ``p50_ms``, ``p95_ms``, ``p99_ms``, ``media_ms``,
+        ``throughput`` (llamadas/s) y ``precision`` si se pasaron esperados
+    """
+    for entrada in list(entradas)[:calentamiento]:
+        funcion(entrada)
+
+    tiempos = np.empty(len(entradas), dtype=np.float64)
+    obtenidos = []
+    for i, entrada in enumerate(entradas):
+        inicio = time.perf_counter()
+        obtenidos.append(funcion(entrada))
+        tiempos[i] = time.perf_counter() - inicio
+
+    p50, p95, p99 = np.percentile(tiempos, [50, 95, 99]) * 1000.0
+    resultado = {
+        'llamadas': len(entradas),
+        'p50_ms': float(p50),
+        'p95_ms': float(p95),
+        'p99_ms': float(p99),
+        'media_ms': float(tiempos.mean() * 1000.0),
+        'throughput': float(len(entradas) / tiempos.sum()) if tiempos.sum() > 0 else 0.0,
+    }
+    if esperados is not None:
+        aciertos = sum(
+            1 for obtenido, esperado in zip(obtenidos, esperados)
+            if (obtenido if obtenido is not None else -1) == esperado
+        )
+        resultado['precision'] = aciertos / len(entradas)
+    return resultado
+
+
+# ---------------------------------------------------------------------------
+# Escenarios: cada uno prepara el camino a medir y retorna (función, entradas)
+# o lanza EscenarioNoDisponible si faltan dependencias
+# ---------------------------------------------------------------------------
+
+class EscenarioNoDisponible(Exception):
+    """El escenario necesita una dependencia que no está instalada"""
+
+
+UMBRAL_DISTANCIA = 0.6
+
+
+def _match_galeria(galeria: FaceGalleryIndex) -> Callable[[np.ndarray], Optional[int]]:
+    def match(sonda):
+        ids, distancias = galeria.search(sonda)
+        return int(ids[0]) if ids[0] >= 0 and distancias[0] < UMBRAL_DISTANCIA else None
+    return match
+
+
+def escenario_galeria_exacta(galeria, sondas, imagenes):
+    """FaceGalleryIndex: búsqueda exhaustiva vectorizada"""
+    return _match_galeria(FaceGalleryIndex.from_personas(galeria)), sondas
+
+
+def escenario_galeria_ivf(galeria, sondas, imagenes):
+    """IVFFaceGalleryIndex: índice aproximado, siempre entrenado (sin fallback exacto)"""
+    from django.conf import settings
+    from .face_ann import IVFFaceGalleryIndex
+
+    indice = IVFFaceGalleryIndex(
+        nlist=getattr(settings, 'FACE_GALLERY_IVF_NLIST', None),
+        nprobe=getattr(settings, 'FACE_GALLERY_IVF_NPROBE', 8),
+        min_entrenamiento=0,
+        seed=SEMILLA,
+    ).cargar_personas(galeria)
+    indice.train()
+    return _match_galeria(indice), sondas
+
+
+def escenario_acceso_visita(galeria, sondas, imagenes):
+    """Match de ReconocerAccesoVisitaAPIView: galería configurada + umbral 0.60"""
+    from .face_gallery import nueva_galeria
+
+    return _match_galeria(nueva_galeria().cargar_personas(galeria)), sondas
+
+
+def escenario_tiempo_real_match(galeria, sondas, imagenes):
+    """OpenCVFaceProvider.reconocer_encodings: match de procesar_reconocimiento_tiempo_real"""
+    from .realtime_face_provider import OpenCVFaceProvider
+
+    provider = OpenCVFaceProvider()
+    if not provider.available:
+        raise EscenarioNoDisponible('face_recognition no instalado')
+    indice = FaceGalleryIndex.from_personas(galeria)
+
+    def reconocer(sonda):
+        resultado = provider.reconocer_encodings([sonda], indice)[0]
+        return resultado['persona']['id'] if resultado.get('reconocido') else None
+    return reconocer, sondas
+
+
+def escenario_tiempo_real_imagen(galeria, sondas, imagenes):
+    """OpenCVFaceProvider.procesar_reconocimiento_tiempo_real con imágenes sintéticas"""
+    from .realtime_face_provider import OpenCVFaceProvider
+
+    provider = OpenCVFaceProvider()
+    if not provider.available:
+        raise EscenarioNoDisponible('face_recognition no instalado')
+    indice = FaceGalleryIndex.from_personas(galeria)
+    return (lambda imagen: provider.procesar_reconocimiento_tiempo_real(imagen, indice)), imagenes
+
+
+def escenario_verify_faces(galeria, sondas, imagenes):
+    """LocalFaceProvider.verify_faces: detección + comparación 1:1"""
+    import base64
+    from .local_face import FACE_RECOGNITION_AVAILABLE, LocalFaceProvider
+
+    if not FACE_RECOGNITION_AVAILABLE:
+        raise EscenarioNoDisponible('face_recognition no instalado')
+    provider = LocalFaceProvider()
+    referencia = base64.b64encode(galeria[0]['encodings'][0].astype(np.float64).tobytes()).decode('utf-8')
+    return (lambda imagen: provider.verify_faces(referencia, imagen)), imagenes
+
+
+def escenario_predecir_svc(galeria, sondas, imagenes, max_personas: int = 200):
+    """AITrainingService.predecir_con_modelo_entrenado con un SVC entrenado sobre la galería"""
+    from core.services import ai_training_service
+
+    if ai_training_service.np is None or ai_training_service.SVC is None:
+        raise EscenarioNoDisponible('face_recognition o scikit-learn no instalados')
+    if len(galeria) > max_personas:
+        raise EscenarioNoDisponible(f'SVC limitado a {max_personas} personas (entrenamiento O(n²))')
+
+    X = np.vstack([p['encodings'] for p in galeria])
+    y = np.concatenate([[p['id']] * len(p['encodings']) for p in galeria])
+    servicio = ai_training_service.AITrainingService()
+    servicio.face_classifier = ai_training_service.SVC(kernel='linear', probability=True).fit(X, y)
+    servicio.personas_map = {p['id']: p['nombre'] for p in galeria}
+
+    def predecir(sonda):
+        resultado = servicio.predecir_con_modelo_entrenado(sonda)
+        return int(resultado['persona_id']) if resultado.get('recognized') else None
+    return predecir, sondas
+
+
+ESCENARIOS = {
+    'galeria_exacta': escenario_galeria_exacta,
+    'galeria_ivf': escenario_galeria_ivf,
+    'acceso_visita': escenario_acceso_visita,
+    'tiempo_real_match': escenario_tiempo_real_match,
+    'tiempo_real_imagen': escenario_tiempo_real_imagen,
+    'verify_faces': escenario_verify_faces,
+    'predecir_svc': escenario_predecir_svc,
+}
+
+# Escenarios que consumen imágenes: la precisión no aplica
+ESCENARIOS_IMAGEN = {'tiempo_real_imagen', 'verify_faces'}
+
+
+def ejecutar(personas: int, escenarios: Optional[Sequence[str]] = None,
+             encodings_por_persona: Tuple[int, int] = (1, 10), sondas: int = 200,
+             imagenes: int = 20, ancho_imagen: int = 640, semilla: int = SEMILLA) -> List[Dict[str, Any]]:
+    """
+    Corre los escenarios indicados sobre una galería sintética
+
+    Returns:
+        Un dict por escenario con ``escenario``, ``personas``, ``encodings`` y
+        las métricas de ``medir``, o ``omitido`` con el motivo
+    """
+    galeria = generar_galeria(personas, encodings_por_persona, semilla=semilla)
+    matriz_sondas, esperados = generar_sondas(galeria, sondas, semilla=semilla)
+    lista_imagenes = [
+        generar_imagen_sonda(ancho_imagen, ancho_imagen * 3 // 4, semilla + i) for i in range(imagenes)
+    ]
+    total_encodings = sum(len(p['encodings']) for p in galeria)
+
+    resultados = []
+    for nombre in escenarios or list(ESCENARIOS):
+        base = {'escenario': nombre, 'personas': personas, 'encodings': total_encodings}
+        try:
+            inicio = time.perf_counter()
+            funcion, entradas = ESCENARIOS[nombre](galeria, matriz_sondas, lista_imagenes)
+            base['preparacion_ms'] = (time.perf_counter() - inicio) * 1000.0
+        except EscenarioNoDisponible as e:
+            resultados.append({**base, 'omitido': str(e)})
+            continue
+        metricas = medir(
+            funcion, entradas,
+            esperados=None if nombre in ESCENARIOS_IMAGEN else esperados.tolist()
+        )
+        resultados.append({**base, **metricas})
+    return resultados
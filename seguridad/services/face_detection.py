@@ -0,0 +1,111 @@
+"""
+Detección de rostros sobre una copia reducida de la imagen
+
+Las fotos de teléfono suelen tener 12 MP; correr HOG sobre la imagen completa
+es el paso más caro del pipeline. Aquí la imagen se decodifica con
+``Image.draft()`` (en JPEG el decodificador escala por DCT a 1/2, 1/4 u 1/8 sin
+decodificar la resolución completa), se detecta sobre una copia de
+``FACE_DETECTION_WIDTH`` píxeles de ancho y las cajas se llevan de vuelta a la
+imagen de codificación, donde ``face_encodings`` solo trabaja sobre el recorte
+de cada rostro.
+"""
+
+import io
+import logging
+from typing import List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger('seguridad')
+
+try:
+    import face_recognition
+    FACE_RECOGNITION_AVAILABLE = True
+except ImportError:
+    face_recognition = None
+    FACE_RECOGNITION_AVAILABLE = False
+
+Caja = Tuple[int, int, int, int]  # (top, right, bottom, left)
+
+
+def _configuracion() -> Tuple[Optional[int], Optional[int]]:
+    """Anchos de detección y de codificación configurados (None = sin límite)"""
+    try:
+        from django.conf import settings
+        return (
+            getattr(settings, 'FACE_DETECTION_WIDTH', 640),
+            getattr(settings, 'FACE_ENCODING_MAX_WIDTH', 1600),
+        )
+    except Exception:
+        return 640, 1600
+
+
+def abrir_imagen_rgb(imagen_bytes: bytes, ancho_maximo: Optional[int] = None) -> np.ndarray:
+    """
+    Decodifica una imagen a RGB limitando su ancho
+
+    Con JPEG, ``draft()`` hace que el decodificador entregue directamente una
+    versión reducida (la más pequeña que siga siendo >= ancho_maximo); luego se
+    ajusta al ancho exacto. Con otros formatos solo se redimensiona.
+    """
+    imagen = Image.open(io.BytesIO(imagen_bytes))
+    if ancho_maximo and imagen.width > ancho_maximo:
+        alto = max(1, round(imagen.height * ancho_maximo / imagen.width))
+        imagen.draft('RGB', (ancho_maximo, alto))
+
+    if imagen.mode != 'RGB':
+        imagen = imagen.convert('RGB')
+
+    if ancho_maximo and imagen.width > ancho_maximo:
+        alto = max(1, round(imagen.height * ancho_maximo / imagen.width))
+        imagen = imagen.resize((ancho_maximo, alto), Image.BILINEAR)
+
+    return np.asarray(imagen)
+
+
+def escalar_cajas(cajas: List[Caja], escala: float, alto: int, ancho: int) -> List[Caja]:
+    """Lleva cajas detectadas en la copia reducida a la imagen de codificación"""
+    return [
+        (
+            max(0, int(round(top * escala))),
+            min(ancho, int(round(right * escala))),
+            min(alto, int(round(bottom * escala))),
+            max(0, int(round(left * escala))),
+        )
+        for top, right, bottom, left in cajas
+    ]
+
+
+def detectar_ubicaciones(imagen, model: str = 'hog', ancho_deteccion: Optional[int] = None,
+                         ancho_codificacion: Optional[int] = None) -> Tuple[np.ndarray, List[Caja]]:
+    """
+    Detecta rostros sobre una copia reducida
+
+    Args:
+        imagen: Bytes de la imagen o array RGB ya decodificado
+        model: Modelo de face_recognition ('hog' o 'cnn')
+        ancho_deteccion: Ancho de la copia de detección (por defecto FACE_DETECTION_WIDTH)
+        ancho_codificacion: Ancho máximo de la imagen sobre la que se calculan
+            los encodings (por defecto FACE_ENCODING_MAX_WIDTH)
+
+    Returns:
+        Tuple con la imagen de codificación (RGB) y las cajas en sus coordenadas
+    """
+    deteccion_defecto, codificacion_defecto = _configuracion()
+    ancho_deteccion = ancho_deteccion or deteccion_defecto
+    ancho_codificacion = ancho_codificacion or codificacion_defecto
+
+    if isinstance(imagen, (bytes, bytearray, memoryview)):
+        imagen_rgb = abrir_imagen_rgb(bytes(imagen), ancho_codificacion)
+    else:
+        imagen_rgb = imagen
+
+    alto, ancho = imagen_rgb.shape[:2]
+    if not ancho_deteccion or ancho <= ancho_deteccion:
+        return imagen_rgb, [tuple(int(v) for v in caja) for caja in face_recognition.face_locations(imagen_rgb, model=model)]
+
+    alto_deteccion = max(1, round(alto * ancho_deteccion / ancho))
+    reducida = np.asarray(Image.fromarray(imagen_rgb).resize((ancho_deteccion, alto_deteccion), Image.BILINEAR))
+    cajas = face_recognition.face_locations(reducida, model=model)
+    return imagen_rgb, escalar_cajas(cajas, ancho / ancho_deteccion, alto, ancho)
@@ -0,0 +1,334 @@
+"""
+Índice vectorizado de la galería de rostros
+
+Mantiene todos los encodings activos en una única matriz float32 contigua con un
+array paralelo de IDs, de modo que encontrar la mejor coincidencia de cada cara
+detectada cuesta una sola operación matricial en lugar de un bucle Python por
+persona y por encoding.
+"""
+
+import base64
+import binascii
+import json
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger('seguridad')
+
+# Dimensión de los encodings generados por face_recognition (dlib)
+ENCODING_DIM = 128
+
+
+def normalizar_encodings(valor: Any, dimension: int = ENCODING_DIM) -> List[np.ndarray]:
+    """
+    Convierte cualquiera de los formatos de encoding usados en el sistema a una
+    lista de vectores float32
+
+    Formatos aceptados:
+        - lista de floats o lista de listas (``Persona.encoding_facial``)
+        - ``np.ndarray`` de 1 o 2 dimensiones
+        - string JSON con cualquiera de las formas anteriores
+        - string base64 con los bytes float64 de uno o más encodings
+          (``ReconocimientoFacial.vector_facial`` del proveedor Local)
+
+    Args:
+        valor: Encoding(s) en cualquiera de los formatos soportados
+        dimension: Dimensión esperada de cada encoding
+
+    Returns:
+        List[np.ndarray]: Encodings válidos; vacía si el valor no es utilizable
+    """
+    if valor is None:
+        return []
+
+    if isinstance(valor, (bytes, bytearray, memoryview)):
+        matriz = np.frombuffer(valor, dtype=np.float32)
+        if matriz.size == 0 or matriz.size % dimension:
+            return []
+        return list(matriz.reshape(-1, dimension))
+
+    if isinstance(valor, str):
+        texto = valor.strip()
+        if not texto:
+            return []
+        if texto[0] in '[{':
+            try:
+                return normalizar_encodings(json.loads(texto), dimension)
+            except (ValueError, TypeError):
+                return []
+        try:
+            crudo = base64.b64decode(texto, validate=True)
+        except (binascii.Error, ValueError):
+            return []
+        if not crudo or len(crudo) % (dimension * 8):
+            return []
+        return list(np.frombuffer(crudo, dtype=np.float64).astype(np.float32).reshape(-1, dimension))
+
+    try:
+        matriz = np.asarray(valor, dtype=np.float32)
+    except (ValueError, TypeError):
+        return []
+
+    if matriz.ndim == 1 and matriz.shape[0] == dimension:
+        return [matriz]
+    if matriz.ndim == 2 and matriz.shape[1] == dimension:
+        return list(matriz)
+    return []
+
+
+class FaceGalleryIndex:
+    """
+    Galería de rostros en memoria con búsqueda por lotes
+
+    Cada fila de ``encodings`` pertenece a la persona indicada en la misma
+    posición de ``ids``. Los datos de presentación de cada persona (nombre,
+    vivienda, etc.) se guardan aparte y se devuelven junto al match.
+    """
+
+    def __init__(self, dimension: int = ENCODING_DIM):
+        self.dimension = dimension
+        self._lock = threading.RLock()
+        self._encodings = np.empty((0, dimension), dtype=np.float32)
+        self._normas = np.empty((0,), dtype=np.float32)
+        self._ids = np.empty((0,), dtype=np.int64)
+        self._datos: Dict[int, Dict[str, Any]] = {}
+
+    @classmethod
+    def from_personas(cls, personas_bd: Iterable[Dict], dimension: int = ENCODING_DIM) -> 'FaceGalleryIndex':
+        """
+        Construye la galería a partir del formato ``personas_bd`` que usan los
+        proveedores (dicts con ``id``, ``nombre`` y ``encodings``)
+
+        Si una persona no trae ``id`` se usa su posición en la lista.
+        """
+        galeria = cls(dimension)
+        galeria.cargar_personas(personas_bd)
+        return galeria
+
+    def cargar_personas(self, personas_bd: Iterable[Dict]) -> 'FaceGalleryIndex':
+        """Reemplaza el contenido de la galería por las personas indicadas"""
+        filas: List[np.ndarray] = []
+        ids: List[int] = []
+        datos_personas: Dict[int, Dict[str, Any]] = {}
+
+        for posicion, persona in enumerate(personas_bd):
+            persona_id = int(persona.get('id', posicion))
+            encodings = normalizar_encodings(persona.get('encodings'), self.dimension)
+            if not encodings:
+                continue
+            datos = {k: v for k, v in persona.items() if k != 'encodings'}
+            datos.setdefault('id', persona_id)
+            datos_personas[persona_id] = datos
+            filas.extend(encodings)
+            ids.extend([persona_id] * len(encodings))
+
+        with self._lock:
+            self._datos = datos_personas
+            if filas:
+                self._set_matriz(np.vstack(filas), np.asarray(ids, dtype=np.int64))
+            else:
+                self._set_matriz(np.empty((0, self.dimension), dtype=np.float32), np.empty((0,), dtype=np.int64))
+        return self
+
+    def cargar_matriz(self, encodings: np.ndarray, ids: np.ndarray,
+                      datos_personas: Dict[int, Dict[str, Any]]) -> 'FaceGalleryIndex':
+        """
+        Reemplaza el contenido con una matriz ya armada (ver
+        ``gallery_sync.cargar_matriz_residentes``), sin pasar por listas de vectores
+        """
+        with self._lock:
+            self._datos = {int(k): dict(v, id=int(k)) for k, v in datos_personas.items()}
+            self._set_matriz(encodings.reshape(-1, self.dimension), np.asarray(ids, dtype=np.int64))
+        return self
+
+    def _set_matriz(self, encodings: np.ndarray, ids: np.ndarray):
+        """Reemplaza la matriz completa recalculando las normas al cuadrado"""
+        encodings = np.ascontiguousarray(encodings, dtype=np.float32)
+        self._encodings = encodings
+        self._normas = np.einsum('ij,ij->i', encodings, encodings)
+        self._ids = ids
+
+    def __len__(self) -> int:
+        """Número de encodings en la galería"""
+        return int(self._ids.shape[0])
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self._ids
+
+    @property
+    def encodings(self) -> np.ndarray:
+        return self._encodings
+
+    @property
+    def total_personas(self) -> int:
+        return len(self._datos)
+
+    def personas(self) -> List[Dict[str, Any]]:
+        """Datos de presentación de todas las personas de la galería"""
+        with self._lock:
+            return list(self._datos.values())
+
+    def get_datos(self, persona_id: int) -> Optional[Dict[str, Any]]:
+        return self._datos.get(int(persona_id))
+
+    def __contains__(self, persona_id) -> bool:
+        return int(persona_id) in self._datos
+
+    def add(self, persona_id: int, encodings: Any, datos: Optional[Dict[str, Any]] = None) -> int:
+        """
+        Agrega (o reemplaza) los encodings de una persona
+
+        Args:
+            persona_id: Identificador de la persona
+            encodings: Encoding(s) en cualquier formato aceptado por ``normalizar_encodings``
+            datos: Datos de presentación de la persona
+
+        Returns:
+            int: Número de encodings agregados
+        """
+        persona_id = int(persona_id)
+        nuevos = normalizar_encodings(encodings, self.dimension)
+
+        with self._lock:
+            conservar = self._ids != persona_id
+            matriz = self._encodings[conservar]
+            ids = self._ids[conservar]
+
+            if nuevos:
+                matriz = np.vstack([matriz, np.vstack(nuevos)])
+                ids = np.concatenate([ids, np.full(len(nuevos), persona_id, dtype=np.int64)])
+                self._datos[persona_id] = dict(datos or {})
+                self._datos[persona_id].setdefault('id', persona_id)
+            else:
+                self._datos.pop(persona_id, None)
+
+            self._set_matriz(matriz, ids)
+
+        return len(nuevos)
+
+    def remove(self, persona_id: int) -> bool:
+        """Elimina todos los encodings de una persona. Retorna True si existía"""
+        persona_id = int(persona_id)
+        with self._lock:
+            if persona_id not in self._datos:
+                return False
+            conservar = self._ids != persona_id
+            self._set_matriz(self._encodings[conservar], self._ids[conservar])
+            del self._datos[persona_id]
+        return True
+
+    def distances(self, probes: Any) -> np.ndarray:
+        """
+        Distancias euclidianas entre cada probe y cada encoding de la galería
+
+        Usa ||a - b||² = ||a||² + ||b||² - 2·a·b para resolver todo con un
+        único producto de matrices.
+
+        Returns:
+            np.ndarray: Matriz (n_probes, n_encodings) en float32
+        """
+        consultas = np.atleast_2d(np.asarray(probes, dtype=np.float32))
+        with self._lock:
+            encodings, normas = self._encodings, self._normas
+
+        if consultas.size == 0 or encodings.shape[0] == 0:
+            return np.empty((consultas.shape[0], encodings.shape[0]), dtype=np.float32)
+
+        normas_consulta = np.einsum('ij,ij->i', consultas, consultas)
+        cuadrados = normas_consulta[:, None] + normas[None, :] - 2.0 * (consultas @ encodings.T)
+        np.maximum(cuadrados, 0.0, out=cuadrados)
+        return np.sqrt(cuadrados)
+
+    def search(self, probes: Any) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Mejor coincidencia de cada probe
+
+        Returns:
+            Tuple con dos arrays de largo n_probes: IDs de persona (-1 si la
+            galería está vacía) y distancia mínima (inf si la galería está vacía)
+        """
+        consultas = np.atleast_2d(np.asarray(probes, dtype=np.float32))
+        with self._lock:
+            ids = self._ids
+            distancias = self.distances(consultas)
+
+        if distancias.shape[1] == 0:
+            vacios = np.full(consultas.shape[0], -1, dtype=np.int64)
+            return vacios, np.full(consultas.shape[0], np.inf, dtype=np.float32)
+
+        mejores = np.argmin(distancias, axis=1)
+        filas = np.arange(distancias.shape[0])
+        return ids[mejores], distancias[filas, mejores]
+
+    def best_matches(self, probes: Any, max_distance: Optional[float] = None) -> List[Optional[Dict[str, Any]]]:
+        """
+        Resultado amigable de ``search``: por cada probe, un dict con
+        ``id``, ``distancia`` y ``datos`` o None si no hay match aceptable
+        """
+        ids, distancias = self.search(probes)
+        resultados: List[Optional[Dict[str, Any]]] = []
+        for persona_id, distancia in zip(ids.tolist(), distancias.tolist()):
+            if persona_id < 0 or (max_distance is not None and distancia > max_distance):
+                resultados.append(None)
+                continue
+            resultados.append({
+                'id': persona_id,
+                'distancia': float(distancia),
+                'datos': self._datos.get(persona_id),
+            })
+        return resultados
+
+
+def datos_copropietario(copropietario) -> Dict[str, Any]:
+    """Datos de presentación de un Copropietario en el formato de personas_bd"""
+    return {
+        'id': copropietario.id,
+        'nombre': copropietario.nombre_completo,
+        'vivienda': copropietario.unidad_residencial,
+        'tipo_residente': copropietario.tipo_residente,
+        'documento': copropietario.numero_documento,
+    }
+
+
+def encodings_reconocimiento(reconocimiento) -> List[np.ndarray]:
+    """
+    Reúne los encodings de un ReconocimientoFacial de seguridad: su
+    ``vector_facial`` más los de la Persona vinculada al usuario del sistema
+    """
+    # La copia binaria float32 no necesita parseo; el texto solo si aún no existe
+    propios = reconocimiento.encodings
+    encodings = normalizar_encodings(reconocimiento.vector_facial if propios is None else propios)
+    usuario = getattr(reconocimiento.copropietario, 'usuario_sistema', None)
+    persona = getattr(usuario, 'persona', None) if usuario else None
+    if persona is not None and persona.reconocimiento_facial_activo:
+        de_persona = persona.encodings
+        encodings.extend(normalizar_encodings(persona.encoding_facial if de_persona is None else de_persona))
+    return encodings
+
+
+def nueva_galeria(dimension: int = ENCODING_DIM) -> FaceGalleryIndex:
+    """
+    Crea una galería vacía del tipo configurado en ``FACE_GALLERY_BACKEND``
+
+    - ``'exact'`` (por defecto): búsqueda exhaustiva vectorizada
+    - ``'ivf'``: índice aproximado (ver ``seguridad.services.face_ann``)
+    """
+    from django.conf import settings
+
+    backend = getattr(settings, 'FACE_GALLERY_BACKEND', 'exact')
+    if backend == 'ivf':
+        from .face_ann import IVFFaceGalleryIndex
+        return IVFFaceGalleryIndex(
+            dimension,
+            nlist=getattr(settings, 'FACE_GALLERY_IVF_NLIST', None),
+            nprobe=getattr(settings, 'FACE_GALLERY_IVF_NPROBE', 8),
+            min_entrenamiento=getattr(settings, 'FACE_GALLERY_IVF_MIN_SIZE', 2000),
+        )
+    if backend != 'exact':
+        logger.warning(f"FACE_GALLERY_BACKEND desconocido '{backend}', usando búsqueda exacta")
+    return FaceGalleryIndex(dimension)
+
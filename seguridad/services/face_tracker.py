@@ -0,0 +1,182 @@
+"""
+Seguimiento de rostros entre frames por cliente
+
+Cada cara detectada se asocia a un track existente por IoU de su caja
+(``face_recognition.face_locations``: top, right, bottom, left). Mientras el
+track conserve una confianza suficiente se reutiliza su identidad sin volver a
+calcular el encoding ni compararlo con la galería; la confianza decae con cada
+frame para forzar una re-identificación periódica.
+
+Un track que deja de verse (frame sin esa cara) o que pasa ``expiracion_ms``
+sin asociarse pierde su identidad: otra persona que aparezca en la misma
+posición se vuelve a codificar y comparar.
+"""
+
+import itertools
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger('seguridad')
+
+Caja = Tuple[int, int, int, int]  # (top, right, bottom, left)
+
+
+def iou(a: Caja, b: Caja) -> float:
+    """Intersección sobre unión de dos cajas (top, right, bottom, left)"""
+    top, right = max(a[0], b[0]), min(a[1], b[1])
+    bottom, left = min(a[2], b[2]), max(a[3], b[3])
+    interseccion = max(0, right - left) * max(0, bottom - top)
+    if interseccion == 0:
+        return 0.0
+    area_a = (a[1] - a[3]) * (a[2] - a[0])
+    area_b = (b[1] - b[3]) * (b[2] - b[0])
+    return interseccion / float(area_a + area_b - interseccion)
+
+
+class Track:
+    """Cara seguida a lo largo de varios frames"""
+
+    def __init__(self, track_id: int, caja: Caja, visto: float):
+        self.id = track_id
+        self.caja = caja
+        self.visto = visto
+        self.resultado: Optional[Dict[str, Any]] = None
+        self.confianza = 0.0
+        self.frames_perdido = 0
+        self.identificaciones = 0
+
+    @property
+    def persona_id(self) -> Optional[int]:
+        if self.resultado and self.resultado.get('reconocido'):
+            return self.resultado['persona']['id']
+        return None
+
+
+class FaceTracker:
+    """
+    Tracks de rostros de todos los clientes (uno por ``sid``)
+
+    Args:
+        iou_minimo: IoU mínimo para considerar que una caja es el mismo rostro
+        decaimiento: Factor por frame aplicado a la confianza de un track
+        confianza_minima: Por debajo de esta confianza el track se re-identifica
+        frames_maximos_perdido: Frames sin ver un track antes de descartarlo
+        expiracion_ms: Milisegundos sin asociarse antes de descartar un track
+        reloj: Fuente de tiempo en segundos (monotónica)
+    """
+
+    def __init__(self, iou_minimo: float = 0.4, decaimiento: float = 0.97,
+                 confianza_minima: float = 70.0, frames_maximos_perdido: int = 5,
+                 expiracion_ms: float = 1000.0, reloj: Callable[[], float] = time.monotonic):
+        self.iou_minimo = iou_minimo
+        self.decaimiento = decaimiento
+        self.confianza_minima = confianza_minima
+        self.frames_maximos_perdido = frames_maximos_perdido
+        self.expiracion = expiracion_ms / 1000.0
+        self.reloj = reloj
+        self._tracks: Dict[str, List[Track]] = {}
+        self._contador = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _vigentes(self, sid: str, ahora: float) -> List[Track]:
+        """Tracks del cliente que no expiraron (se llama con el lock tomado)"""
+        tracks = [t for t in self._tracks.get(sid, []) if ahora - t.visto <= self.expiracion]
+        self._tracks[sid] = tracks
+        return tracks
+
+    def cajas_confiables(self, sid: str) -> List[Caja]:
+        """Cajas de los tracks que no necesitan re-identificarse en el próximo frame"""
+        with self._lock:
+            return [
+                t.caja for t in self._vigentes(sid, self.reloj())
+                if t.resultado is not None and t.frames_perdido == 0
+                and t.confianza * self.decaimiento >= self.confianza_minima
+            ]
+
+    def actualizar(self, sid: str, cajas: Sequence[Caja], encodings: Dict[int, Any],
+                   reconocer: Callable[[List[Any]], List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """
+        Asocia las caras del frame a los tracks del cliente
+
+        Args:
+            sid: Cliente
+            cajas: Cajas detectadas en el frame
+            encodings: Encodings calculados, por índice de caja (solo las caras
+                que no coincidían con un track confiable)
+            reconocer: Función que compara encodings contra la galería y retorna
+                un resultado por encoding (``OpenCVFaceProvider.reconocer_encodings``)
+
+        Returns:
+            Un resultado por caja, con ``track_id`` y ``evento``: ``'nuevo'``
+            cuando el track recibe identidad por primera vez o la cambia,
+            ``'reidentificado'`` si se volvió a comparar y ``'seguido'`` si se
+            reutilizó la identidad del track
+        """
+        with self._lock:
+            ahora = self.reloj()
+            tracks = self._vigentes(sid, ahora)
+            libres = list(tracks)
+            asignados: List[Tuple[int, Track]] = []
+
+            # Asociación voraz por mayor IoU
+            for indice, caja in enumerate(cajas):
+                mejor, mejor_iou = None, self.iou_minimo
+                for track in libres:
+                    valor = iou(caja, track.caja)
+                    if valor >= mejor_iou:
+                        mejor, mejor_iou = track, valor
+                if mejor is None:
+                    mejor = Track(next(self._contador), caja, ahora)
+                    tracks.append(mejor)
+                else:
+                    libres.remove(mejor)
+                    if mejor.frames_perdido:
+                        # La cara dejó de verse: puede ser otra persona en el mismo lugar
+                        mejor.resultado, mejor.confianza, mejor.identificaciones = None, 0.0, 0
+                mejor.caja = caja
+                mejor.visto = ahora
+                mejor.frames_perdido = 0
+                asignados.append((indice, mejor))
+
+            for track in libres:
+                track.frames_perdido += 1
+            self._tracks[sid] = [t for t in tracks if t.frames_perdido <= self.frames_maximos_perdido]
+
+        pendientes = [(indice, track) for indice, track in asignados if indice in encodings]
+        nuevos = reconocer([encodings[indice] for indice, _ in pendientes]) if pendientes else []
+        recientes = {indice: resultado for (indice, _), resultado in zip(pendientes, nuevos)}
+
+        resultados: List[Dict[str, Any]] = []
+        with self._lock:
+            for indice, track in asignados:
+                if indice in recientes:
+                    resultado = recientes[indice]
+                    anterior = track.persona_id
+                    track.resultado = resultado
+                    track.confianza = float(resultado.get('confianza', 0.0))
+                    track.identificaciones += 1
+                    if track.identificaciones == 1 or track.persona_id != anterior:
+                        evento = 'nuevo'
+                    else:
+                        evento = 'reidentificado'
+                elif track.resultado is not None:
+                    track.confianza *= self.decaimiento
+                    resultado, evento = track.resultado, 'seguido'
+                else:
+                    # Caja sin encoding ni identidad previa: se identificará en el próximo frame
+                    resultado, evento = {'reconocido': False, 'confianza': 0.0}, 'pendiente'
+
+                resultados.append({
+                    **resultado,
+                    'track_id': track.id,
+                    'ubicacion': list(track.caja),
+                    'evento': evento,
+                })
+        return resultados
+
+    def olvidar(self, sid: str):
+        """Descartar los tracks de un cliente desconectado"""
+        with self._lock:
+            self._tracks.pop(sid, None)
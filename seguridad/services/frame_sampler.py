@@ -0,0 +1,119 @@
+"""
+Muestreo adaptativo de frames de cámara
+
+Antes de enviar un frame al detector se compara una miniatura en escala de
+grises con la del último frame procesado del mismo cliente. Si la diferencia
+media es menor al umbral (p.ej. un pasillo vacío) el frame se omite y se
+reutiliza el último resultado. Cada cierto tiempo se procesa un frame aunque
+no haya cambios para no quedar con un resultado viejo indefinidamente.
+"""
+
+import io
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger('seguridad')
+
+try:
+    import cv2
+    CV2_AVAILABLE = True
+except ImportError:
+    cv2 = None
+    CV2_AVAILABLE = False
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# Lado de la miniatura usada para comparar frames
+TAMANO_MINIATURA = 32
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+def miniatura(imagen: Buffer, tamano: int = TAMANO_MINIATURA) -> Optional[np.ndarray]:
+    """
+    Miniatura en escala de grises de un JPEG/PNG, decodificada directamente del buffer
+
+    Con OpenCV se decodifica a 1/8 de resolución (IMREAD_REDUCED_GRAYSCALE_8),
+    lo que en JPEG evita la mayor parte del trabajo de decodificación.
+
+    Returns:
+        np.ndarray (tamano, tamano) float32 o None si no se pudo decodificar
+    """
+    try:
+        if CV2_AVAILABLE:
+            reducida = cv2.imdecode(np.frombuffer(imagen, dtype=np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_8)
+            if reducida is None:
+                return None
+            return cv2.resize(reducida, (tamano, tamano), interpolation=cv2.INTER_AREA).astype(np.float32)
+
+        if Image is not None:
+            pil = Image.open(io.BytesIO(imagen))
+            pil.draft('L', (tamano * 4, tamano * 4))
+            return np.asarray(pil.convert('L').resize((tamano, tamano)), dtype=np.float32)
+    except Exception as e:
+        logger.debug(f"No se pudo generar miniatura del frame: {e}")
+    return None
+
+
+class AdaptiveFrameSampler:
+    """
+    Decide por cliente qué frames merecen pasar por el detector
+
+    Args:
+        umbral: Diferencia absoluta media (0-255) por debajo de la cual dos
+            frames se consideran iguales
+        intervalo_maximo: Segundos máximos sin procesar un frame de un cliente
+    """
+
+    def __init__(self, umbral: float = 4.0, intervalo_maximo: float = 2.0):
+        self.umbral = umbral
+        self.intervalo_maximo = intervalo_maximo
+        self._lock = threading.Lock()
+        # sid -> (miniatura del último frame procesado, momento en que se procesó)
+        self._referencias: Dict[str, Tuple[np.ndarray, float]] = {}
+        self._resultados: Dict[str, Any] = {}
+        self.frames_omitidos = 0
+
+    def debe_procesar(self, sid: str, imagen: Buffer, ahora: Optional[float] = None) -> bool:
+        """
+        True si el frame es distinto al último procesado (o pasó demasiado tiempo)
+
+        Si retorna True, el frame pasa a ser la referencia del cliente.
+        """
+        ahora = time.monotonic() if ahora is None else ahora
+        actual = miniatura(imagen)
+        if actual is None:
+            return True
+
+        with self._lock:
+            referencia = self._referencias.get(sid)
+            if referencia is not None:
+                anterior, momento = referencia
+                diferencia = float(np.mean(np.abs(actual - anterior)))
+                if diferencia < self.umbral and ahora - momento < self.intervalo_maximo:
+                    self.frames_omitidos += 1
+                    return False
+            self._referencias[sid] = (actual, ahora)
+        return True
+
+    def guardar_resultado(self, sid: str, resultado: Any):
+        """Último resultado del cliente, reutilizado para los frames omitidos"""
+        with self._lock:
+            self._resultados[sid] = resultado
+
+    def ultimo_resultado(self, sid: str) -> Any:
+        with self._lock:
+            return self._resultados.get(sid)
+
+    def olvidar(self, sid: str):
+        """Liberar el estado de un cliente desconectado"""
+        with self._lock:
+            self._referencias.pop(sid, None)
+            self._resultados.pop(sid, None)
@@ -0,0 +1,308 @@
+"""
+Sincronización incremental de las galerías de rostros en memoria
+
+Las señales de ``seguridad.signals`` registran en ``CambioGaleriaFacial`` qué
+objetos cambiaron. Cada proceso mantiene su galería y, en cada
+``sincronizar()``, compara el último ID aplicado con el máximo de la tabla
+(una consulta barata) y recarga únicamente los objetos modificados.
+
+Cada recarga completa (y el comando ``purgar_cambios_galeria``) borra los
+cambios que ya ningún proceso necesita: los anteriores al margen de versión
+y más antiguos que el intervalo de recarga completa.
+"""
+
+import logging
+import threading
+import time
+from datetime import timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from django.db.models import Case, F, Max, When
+from django.utils import timezone
+
+from .face_gallery import (
+    ENCODING_DIM,
+    FaceGalleryIndex,
+    datos_copropietario,
+    encodings_reconocimiento,
+    normalizar_encodings,
+    nueva_galeria,
+)
+
+logger = logging.getLogger('seguridad')
+
+GALERIA_RESIDENTES = 'residentes'
+GALERIA_VISITAS = 'visitas'
+
+# Estados de visita que pueden reconocerse en el acceso
+ESTADOS_VISITA_ACTIVOS = ('programada', 'en_curso')
+
+
+def registrar_cambio(galeria: str, objeto_ids: Iterable[int]):
+    """Anota que los objetos indicados deben recargarse en la galería"""
+    from seguridad.models import CambioGaleriaFacial
+
+    CambioGaleriaFacial.objects.bulk_create([
+        CambioGaleriaFacial(galeria=galeria, objeto_id=objeto_id)
+        for objeto_id in set(objeto_ids) if objeto_id is not None
+    ])
+
+
+def purgar_cambios(antiguedad: float = 3600, margen: Optional[int] = None) -> int:
+    """
+    Borra los cambios por debajo de ``Max(id) - margen`` con más de
+    ``antiguedad`` segundos
+
+    Un proceso que aplica deltas recargó todo hace menos de ``antiguedad``
+    segundos y solo lee cambios desde su versión menos el margen; los
+    borrados ya no le hacen falta.
+
+    Returns:
+        Cambios borrados
+    """
+    from seguridad.models import CambioGaleriaFacial
+
+    if margen is None:
+        margen = GaleriaSincronizada.MARGEN_VERSION
+    ultimo = CambioGaleriaFacial.objects.aggregate(ultimo=Max('id'))['ultimo']
+    if ultimo is None:
+        return 0
+    borrados, _ = CambioGaleriaFacial.objects.filter(
+        id__lt=ultimo - margen,
+        fecha__lt=timezone.now() - timedelta(seconds=antiguedad),
+    ).delete()
+    return borrados
+
+
+def cargar_residentes(copropietario_ids: Optional[Iterable[int]] = None) -> Dict[int, dict]:
+    """
+    Personas de la galería de residentes (ReconocimientoFacial activos)
+
+    Args:
+        copropietario_ids: Limitar a estos copropietarios; None carga todos
+
+    Returns:
+        Dict copropietario_id -> persona en formato personas_bd
+    """
+    from seguridad.models import ReconocimientoFacial
+
+    reconocimientos = ReconocimientoFacial.objects.filter(activo=True).select_related(
+        'copropietario__usuario_sistema__persona'
+    )
+    if copropietario_ids is not None:
+        reconocimientos = reconocimientos.filter(copropietario_id__in=list(copropietario_ids))
+
+    return {
+        reconocimiento.copropietario_id: {
+            **datos_copropietario(reconocimiento.copropietario),
+            'encodings': encodings_reconocimiento(reconocimiento),
+        }
+        for reconocimiento in reconocimientos
+    }
+
+
+def cargar_matriz_residentes() -> Tuple[np.ndarray, np.ndarray, Dict[int, dict]]:
+    """
+    Galería de residentes completa en una sola consulta
+
+    Lee las columnas binarias float32 (``ReconocimientoFacial.encodings`` y
+    ``Persona.encodings``) sin instanciar modelos y arma la matriz uniendo los
+    bytes: un único ``np.frombuffer`` en lugar de parsear cada encoding. Los
+    registros sin copia binaria traen su ``vector_facial``/``encoding_facial``
+    y se parsean como en ``encodings_reconocimiento``.
+
+    Returns:
+        Tuple (matriz n x 128, ids por fila, datos por copropietario)
+    """
+    from core.fields import encodings_a_bytes
+    from seguridad.models import ReconocimientoFacial
+
+    persona = 'copropietario__usuario_sistema__persona__'
+    # El texto solo viaja cuando falta la copia binaria
+    filas = ReconocimientoFacial.objects.filter(activo=True).annotate(
+        texto_propio=Case(When(encodings__isnull=True, then=F('vector_facial'))),
+        texto_persona=Case(When(**{f'{persona}encodings__isnull': True}, then=F(f'{persona}encoding_facial'))),
+    ).values_list(
+        'copropietario_id', 'encodings', 'texto_propio', f'{persona}encodings', 'texto_persona',
+        f'{persona}reconocimiento_facial_activo',
+        'copropietario__nombres', 'copropietario__apellidos', 'copropietario__unidad_residencial',
+        'copropietario__tipo_residente', 'copropietario__numero_documento',
+    )
+
+    def _crudo(binario, texto):
+        if binario is not None or texto is None:
+            return binario
+        return encodings_a_bytes(normalizar_encodings(texto), ENCODING_DIM)
+
+    bytes_por_encoding = ENCODING_DIM * 4
+    partes: List[bytes] = []
+    ids: List[np.ndarray] = []
+    datos: Dict[int, dict] = {}
+    for (copropietario_id, propios, texto_propio, de_persona, texto_persona, persona_activa,
+         nombres, apellidos, vivienda, tipo_residente, documento) in filas:
+        crudos = [_crudo(propios, texto_propio)]
+        if persona_activa:
+            crudos.append(_crudo(de_persona, texto_persona))
+        crudos = [c for c in crudos if c]
+        total = sum(len(c) for c in crudos) // bytes_por_encoding
+        if not total:
+            continue
+        partes.extend(crudos)
+        ids.append(np.full(total, copropietario_id, dtype=np.int64))
+        datos[copropietario_id] = {
+            'id': copropietario_id,
+            'nombre': f"{nombres} {apellidos}",
+            'vivienda': vivienda,
+            'tipo_residente': tipo_residente,
+            'documento': documento,
+        }
+
+    matriz = np.frombuffer(b''.join(partes), dtype=np.float32).reshape(-1, ENCODING_DIM)
+    return matriz, (np.concatenate(ids) if ids else np.empty((0,), dtype=np.int64)), datos
+
+
+def cargar_visitas(visita_ids: Optional[Iterable[int]] = None) -> Dict[int, dict]:
+    """
+    Visitas programadas o en curso con sus encodings precalculados
+
+    Las fotos anteriores al almacén de encodings se completan aquí una única
+    vez; las que fallan se reintentan con espera creciente.
+    """
+    from core.models.propiedades_residentes import Visita
+    from core.services.encoding_store import asegurar_hashes_visita, cargar_encodings, foto_pendiente
+
+    visitas = Visita.objects.filter(estado__in=ESTADOS_VISITA_ACTIVOS)
+    if visita_ids is not None:
+        visitas = visitas.filter(id__in=list(visita_ids))
+    visitas = list(visitas)
+
+    for visita in visitas:
+        fotos = visita.fotos_reconocimiento or []
+        if any(foto_pendiente(f) for f in fotos):
+            asegurar_hashes_visita(visita)
+
+    hashes_por_visita = {
+        visita.id: [f.get('sha256') for f in (visita.fotos_reconocimiento or []) if isinstance(f, dict)]
+        for visita in visitas
+    }
+    encodings_por_hash = cargar_encodings(h for hashes in hashes_por_visita.values() for h in hashes)
+
+    return {
+        visita.id: {
+            'id': visita.id,
+            'nombre': visita.nombre_visitante,
+            'encodings': [encodings_por_hash[h] for h in hashes_por_visita[visita.id] if h in encodings_por_hash],
+        }
+        for visita in visitas
+    }
+
+
+class GaleriaSincronizada:
+    """
+    Galería en memoria que se mantiene al día aplicando solo los cambios
+
+    Args:
+        nombre: Galería en ``CambioGaleriaFacial`` (residentes o visitas)
+        cargador: Función ``ids -> {id: persona}``; con None carga todo
+        recarga_completa: Segundos entre recargas completas de respaldo
+        cargador_matriz: Función opcional ``() -> (matriz, ids, datos)`` para
+            la recarga completa en bloque; sin ella se usa ``cargador(None)``
+    """
+
+    # Cambios anteriores a la versión que se vuelven a revisar, por si una
+    # transacción con un ID menor confirmó después que otra con un ID mayor
+    MARGEN_VERSION = 50
+
+    def __init__(self, nombre: str, cargador: Callable[[Optional[Iterable[int]]], Dict[int, dict]],
+                 recarga_completa: float = 3600,
+                 cargador_matriz: Optional[Callable[[], Tuple[np.ndarray, np.ndarray, Dict[int, dict]]]] = None):
+        self.nombre = nombre
+        self.cargador = cargador
+        self.cargador_matriz = cargador_matriz
+        self.recarga_completa = recarga_completa
+        self.galeria: FaceGalleryIndex = nueva_galeria()
+        self.version: Optional[int] = None
+        self.ultima_recarga = 0.0
+        self._lock = threading.Lock()
+
+    def _version_actual(self) -> int:
+        from seguridad.models import CambioGaleriaFacial
+
+        return CambioGaleriaFacial.objects.aggregate(ultimo=Max('id'))['ultimo'] or 0
+
+    def recargar(self) -> FaceGalleryIndex:
+        """Recarga completa de la galería"""
+        with self._lock:
+            version = self._version_actual()
+            if self.cargador_matriz is not None:
+                self.galeria.cargar_matriz(*self.cargador_matriz())
+            else:
+                self.galeria.cargar_personas(self.cargador(None).values())
+            self.version = version
+            self.ultima_recarga = time.monotonic()
+            purgar_cambios(self.recarga_completa, self.MARGEN_VERSION)
+            logger.info(
+                f"Galería '{self.nombre}' recargada: {self.galeria.total_personas} personas, "
+                f"{len(self.galeria)} encodings (versión {version})"
+            )
+            return self.galeria
+
+    def sincronizar(self) -> FaceGalleryIndex:
+        """
+        Aplica los cambios registrados desde la última versión
+
+        Returns:
+            FaceGalleryIndex: La galería actualizada
+        """
+        from seguridad.models import CambioGaleriaFacial
+
+        if self.version is None or time.monotonic() - self.ultima_recarga > self.recarga_completa:
+            return self.recargar()
+
+        version = self._version_actual()
+        if version == self.version:
+            return self.galeria
+        if version < self.version:
+            # La tabla de cambios se purgó o se revirtió: no se puede aplicar por deltas
+            return self.recargar()
+
+        with self._lock:
+            cambiados: List[int] = list(
+                CambioGaleriaFacial.objects.filter(
+                    galeria=self.nombre,
+                    id__gt=self.version - self.MARGEN_VERSION,
+                    id__lte=version,
+                ).values_list('objeto_id', flat=True).distinct()
+            )
+            if cambiados:
+                actuales = self.cargador(cambiados)
+                for objeto_id in cambiados:
+                    persona = actuales.get(objeto_id)
+                    if persona is None:
+                        self.galeria.remove(objeto_id)
+                    else:
+                        self.galeria.add(
+                            objeto_id,
+                            persona['encodings'],
+                            {k: v for k, v in persona.items() if k != 'encodings'},
+                        )
+                logger.debug(f"Galería '{self.nombre}': {len(cambiados)} cambios aplicados (versión {version})")
+            self.version = version
+
+        return self.galeria
+
+
+_galerias: Dict[str, GaleriaSincronizada] = {}
+_galerias_lock = threading.Lock()
+
+
+def obtener_galeria_sincronizada(nombre: str) -> GaleriaSincronizada:
+    """Galería sincronizada compartida por el proceso (residentes o visitas)"""
+    with _galerias_lock:
+        if nombre not in _galerias:
+            if nombre == GALERIA_RESIDENTES:
+                _galerias[nombre] = GaleriaSincronizada(nombre, cargar_residentes, cargador_matriz=cargar_matriz_residentes)
+            else:
+                _galerias[nombre] = GaleriaSincronizada(nombre, cargar_visitas)
+        return _galerias[nombre]
@@ -22,6 +22,7 @@ except ImportError:
     face_recognition = None
     cv2 = None
 
+from .face_detection import abrir_imagen_rgb, detectar_ubicaciones
 from .face_provider import (
     FaceRecognitionProvider, 
     FaceDetectionError, 
@@ -68,8 +69,8 @@ class LocalFaceProvider(FaceRecognitionProvider):
             # Cargar imagen
             image_array = self._bytes_to_rgb_array(image_bytes)
             
-            # Detectar ubicaciones de rostros
-            face_locations = face_recognition.face_locations(image_array)
+            # Detectar ubicaciones de rostros sobre una copia reducida
+            image_array, face_locations = detectar_ubicaciones(image_array)
             
             if not face_locations:
                 logger.warning("No se detectaron rostros en la imagen")
@@ -206,6 +207,9 @@ class LocalFaceProvider(FaceRecognitionProvider):
         """
         Convierte bytes de imagen a array RGB
         
+        Las imágenes más anchas que FACE_ENCODING_MAX_WIDTH se decodifican
+        reducidas (draft de JPEG), sin pasar por la resolución completa.
+        
         Args:
             image_bytes: Bytes de la imagen
             
@@ -216,17 +220,7 @@ class LocalFaceProvider(FaceRecognitionProvider):
             FaceDetectionError: Si no se puede cargar la imagen
         """
         try:
-            # Abrir imagen con PIL
-            image_pil = Image.open(io.BytesIO(image_bytes))
-            
-            # Convertir a RGB si es necesario
-            if image_pil.mode != 'RGB':
-                image_pil = image_pil.convert('RGB')
-            
-            # Convertir a array numpy
-            image_array = np.array(image_pil)
-            
-            return image_array
+            return abrir_imagen_rgb(image_bytes, getattr(settings, 'FACE_ENCODING_MAX_WIDTH', 1600))
             
         except Exception as e:
             raise FaceDetectionError(f"Error cargando imagen: {str(e)}")
@@ -0,0 +1,105 @@
+"""
+Paginación por cursor (keyset) para tablas de eventos ordenadas por fecha
+
+``Paginator`` hace un ``COUNT(*)`` y un ``OFFSET`` que crece con cada página:
+con meses de bitácora ambas consultas recorren la tabla. Aquí cada página
+continúa desde el último ``(fecha, id)`` entregado, con un filtro que el
+índice compuesto resuelve sin importar cuán atrás esté la página.
+
+El total es opcional: exacto (``COUNT(*)``) o estimado (el plan de PostgreSQL,
+o un conteo con tope en otros motores).
+"""
+
+import base64
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.db import connections
+from django.db.models import Q, QuerySet
+
+logger = logging.getLogger('seguridad')
+
+# Conteo máximo cuando no hay estimación del planificador
+TOPE_CONTEO_ESTIMADO = 10000
+
+
+class CursorInvalido(ValueError):
+    """El cursor recibido no se puede decodificar"""
+    pass
+
+
+def codificar_cursor(fecha: datetime, pk: int) -> str:
+    crudo = f'{fecha.isoformat()}|{pk}'.encode('utf-8')
+    return base64.urlsafe_b64encode(crudo).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        crudo = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8')
+        fecha, pk = crudo.rsplit('|', 1)
+        return datetime.fromisoformat(fecha), int(pk)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise CursorInvalido(f'Cursor inválido: {cursor}') from e
+
+
+def paginar_por_cursor(queryset: QuerySet, cursor: Optional[str], limite: int,
+                       campo_fecha: str = 'fecha_accion') -> Tuple[List[Any], Optional[str]]:
+    """
+    Una página en orden ``(fecha, id)`` descendente
+
+    Returns:
+        Tuple (objetos de la página, cursor de la siguiente o None si es la última)
+    """
+    queryset = queryset.order_by(f'-{campo_fecha}', '-pk')
+    if cursor:
+        fecha, pk = decodificar_cursor(cursor)
+        queryset = queryset.filter(
+            Q(**{f'{campo_fecha}__lt': fecha}) | Q(**{campo_fecha: fecha, 'pk__lt': pk})
+        )
+
+    # Un registro de más indica si hay otra página, sin contar
+    objetos = list(queryset[:limite + 1])
+    if len(objetos) <= limite:
+        return objetos, None
+    objetos = objetos[:limite]
+    ultimo = objetos[-1]
+    return objetos, codificar_cursor(getattr(ultimo, campo_fecha), ultimo.pk)
+
+
+def contar(queryset: QuerySet, modo: str) -> Dict[str, Any]:
+    """
+    Total de registros según ``modo``: 'exacto', 'estimado' o 'ninguno'
+
+    Returns:
+        Dict con ``count`` (None con 'ninguno') y ``count_estimado``
+    """
+    if modo == 'ninguno':
+        return {'count': None, 'count_estimado': False}
+    if modo == 'exacto':
+        return {'count': queryset.count(), 'count_estimado': False}
+
+    estimado = _estimacion_planificador(queryset)
+    if estimado is not None:
+        return {'count': estimado, 'count_estimado': True}
+    total = queryset.order_by()[:TOPE_CONTEO_ESTIMADO].count()
+    return {'count': total, 'count_estimado': total >= TOPE_CONTEO_ESTIMADO}
+
+
+def _estimacion_planificador(queryset: QuerySet) -> Optional[int]:
+    """Filas estimadas por el plan de PostgreSQL (None en otros motores)"""
+    conexion = connections[queryset.db]
+    if conexion.vendor != 'postgresql':
+        return None
+    sql, parametros = queryset.order_by().query.sql_with_params()
+    try:
+        with conexion.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', parametros)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudo estimar el total: {e}")
+        return None
@@ -0,0 +1,105 @@
+"""
+Registro de proveedores de reconocimiento facial por proceso
+
+Crear ``OpenCVFaceProvider`` o ``AITrainingService`` en cada petición repite
+trabajo (``os.makedirs`` del directorio de modelos, primera lectura del modelo
+entrenado, primera inferencia de dlib). Aquí cada instancia se construye una
+sola vez por worker y se comparte entre hilos: los proveedores no guardan
+estado por petición y el servicio de entrenamiento serializa sus operaciones
+de escritura (ver ``AITrainingService``).
+
+``calentar()`` se llama al iniciar el servidor (``SeguridadConfig.ready``) y
+hace una inferencia de prueba para que la primera petición real no pague la
+carga de los modelos.
+"""
+
+import logging
+import threading
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger('seguridad')
+
+_instancias: Dict[str, Any] = {}
+_lock = threading.Lock()
+
+
+def _obtener(nombre: str, fabrica: Callable[[], Any]) -> Any:
+    instancia = _instancias.get(nombre)
+    if instancia is None:
+        with _lock:
+            instancia = _instancias.get(nombre)
+            if instancia is None:
+                instancia = fabrica()
+                _instancias[nombre] = instancia
+    return instancia
+
+
+def obtener_provider_tiempo_real():
+    """``OpenCVFaceProvider`` compartido"""
+    from .realtime_face_provider import OpenCVFaceProvider
+    return _obtener('tiempo_real', OpenCVFaceProvider)
+
+
+def obtener_provider_local():
+    """``LocalFaceProvider`` compartido (encodings en base64)"""
+    from .local_face import LocalFaceProvider
+    return _obtener('local', LocalFaceProvider)
+
+
+def obtener_provider_configurado():
+    """Proveedor de ``FACE_RECOGNITION_PROVIDER`` compartido"""
+    from .face_provider import FaceProviderFactory
+    return _obtener('configurado', FaceProviderFactory.create_provider)
+
+
+def obtener_servicio_entrenamiento():
+    """``AITrainingService`` compartido (None si sus dependencias no están instaladas)"""
+    try:
+        from core.services.ai_training_service import AITrainingService
+    except ImportError:
+        return None
+    return _obtener('entrenamiento', AITrainingService)
+
+
+def limpiar():
+    """Descarta las instancias (pruebas o cambio de configuración)"""
+    with _lock:
+        _instancias.clear()
+
+
+def calentar() -> Dict[str, Any]:
+    """
+    Construye los proveedores y hace una inferencia de prueba
+
+    Returns:
+        Dict con lo que se pudo calentar, para el log de arranque
+    """
+    from .realtime_face_provider import FACE_RECOGNITION_AVAILABLE
+
+    resultado = {'face_recognition': FACE_RECOGNITION_AVAILABLE, 'inferencia': False, 'modelo': None}
+    provider = obtener_provider_tiempo_real()
+    obtener_provider_local()
+
+    if FACE_RECOGNITION_AVAILABLE:
+        import numpy as np
+        try:
+            # Imagen negra: no hay rostros, pero fuerza la carga del detector
+            # HOG y del modelo de encodings de dlib
+            imagen = np.zeros((64, 64, 3), dtype=np.uint8)
+            provider.codificar_rostros(imagen)
+            from .realtime_face_provider import face_recognition
+            face_recognition.face_encodings(imagen, [(0, 64, 64, 0)])
+            resultado['inferencia'] = True
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo calentar face_recognition: {e}")
+
+    servicio = obtener_servicio_entrenamiento()
+    if servicio is not None:
+        try:
+            if servicio.cargar_modelo_entrenado():
+                resultado['modelo'] = servicio.model_version
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo cargar el modelo entrenado: {e}")
+
+    logger.info(f"🔥 Proveedores de reconocimiento facial listos: {resultado}")
+    return resultado
@@ -4,7 +4,7 @@
 Proveedor de reconocimiento facial con manejo robusto de dependencias
 Compatible con Railway - importaciones seguras al inicio
 """
-from typing import List, Dict, Tuple, Optional, Any
+from typing import List, Dict, Tuple, Optional, Any, Union
 import logging
 import json
 import random
@@ -31,6 +31,10 @@ except ImportError as e:
     FACE_RECOGNITION_AVAILABLE = False
     logger.warning(f"⚠️ face_recognition no disponible: {e} - usando simulación")
 
+from .face_detection import detectar_ubicaciones
+from .face_gallery import FaceGalleryIndex
+from .face_tracker import iou
+
 
 class OpenCVFaceProvider:
     """
@@ -49,6 +53,35 @@ class OpenCVFaceProvider:
         else:
             logger.info("🎭 OpenCVFaceProvider inicializado - modo simulación")
         
+    def _cargar_imagen_rgb(self, imagen_path_o_bytes):
+        """
+        Carga una imagen (bytes, URL, path local o array) como array RGB
+        """
+        if isinstance(imagen_path_o_bytes, bytes):
+            # Si es bytes (imagen subida)
+            if Image is not None and io is not None:
+                imagen_pil = Image.open(io.BytesIO(imagen_path_o_bytes))
+                if np is not None:
+                    return np.array(imagen_pil)
+                raise Exception("numpy no disponible")
+            raise Exception("PIL o io no disponibles")
+        elif isinstance(imagen_path_o_bytes, str):
+            # Si es URL, descargar
+            if imagen_path_o_bytes.startswith('http'):
+                if requests is not None and Image is not None and io is not None:
+                    response = requests.get(imagen_path_o_bytes)
+                    imagen_pil = Image.open(io.BytesIO(response.content))
+                    if np is not None:
+                        return np.array(imagen_pil)
+                    raise Exception("numpy no disponible")
+                raise Exception("requests, PIL o io no disponibles")
+            # Si es path local
+            if face_recognition is not None:
+                return face_recognition.load_image_file(imagen_path_o_bytes)
+            raise Exception("face_recognition no disponible")
+        # Si ya es array numpy
+        return imagen_path_o_bytes
+
     def detectar_caras_en_imagen(self, imagen_path_o_bytes) -> List:
         """
         Detecta caras en una imagen y retorna los encodings faciales
@@ -59,55 +92,76 @@ class OpenCVFaceProvider:
             return [[random.random() for _ in range(128)]]  # Vector facial simulado
         
         try:
-            # Cargar imagen
-            if isinstance(imagen_path_o_bytes, bytes):
-                # Si es bytes (imagen subida)
-                if Image is not None and io is not None:
-                    imagen_pil = Image.open(io.BytesIO(imagen_path_o_bytes))
-                    if np is not None:
-                        imagen_rgb = np.array(imagen_pil)
-                    else:
-                        raise Exception("numpy no disponible")
-                else:
-                    raise Exception("PIL o io no disponibles")
-            elif isinstance(imagen_path_o_bytes, str):
-                # Si es URL, descargar
-                if imagen_path_o_bytes.startswith('http'):
-                    if requests is not None and Image is not None and io is not None:
-                        response = requests.get(imagen_path_o_bytes)
-                        imagen_pil = Image.open(io.BytesIO(response.content))
-                        if np is not None:
-                            imagen_rgb = np.array(imagen_pil)
-                        else:
-                            raise Exception("numpy no disponible")
-                    else:
-                        raise Exception("requests, PIL o io no disponibles")
-                else:
-                    # Si es path local
-                    if face_recognition is not None:
-                        imagen_rgb = face_recognition.load_image_file(imagen_path_o_bytes)
-                    else:
-                        raise Exception("face_recognition no disponible")
-            else:
-                # Si ya es array numpy
-                imagen_rgb = imagen_path_o_bytes
-            
-            # Detectar ubicaciones de caras
-            if face_recognition is not None:
-                face_locations = face_recognition.face_locations(imagen_rgb, model=self.model)
-                
-                # Obtener encodings faciales
-                face_encodings = face_recognition.face_encodings(imagen_rgb, face_locations)
-            else:
-                raise Exception("face_recognition no disponible")
-            
-            return face_encodings
-            
+            return self.codificar_rostros(imagen_path_o_bytes)
         except Exception as e:
             logger.error(f"Error detectando caras: {str(e)}")
             # Fallback a simulación en caso de error
             return [[random.random() for _ in range(128)]]
     
+    def codificar_rostros(self, imagen_path_o_bytes) -> List:
+        """
+        Encodings de las caras de una imagen, sin simulación: si algo falla
+        (imagen inválida, face_recognition no instalado) lanza la excepción
+        """
+        if face_recognition is None:
+            raise Exception("face_recognition no disponible")
+        
+        # Cargar imagen (los bytes se decodifican ya reducidos)
+        if isinstance(imagen_path_o_bytes, bytes):
+            imagen = imagen_path_o_bytes
+        else:
+            imagen = self._cargar_imagen_rgb(imagen_path_o_bytes)
+        
+        # Detectar ubicaciones de caras sobre una copia reducida
+        imagen_rgb, face_locations = detectar_ubicaciones(imagen, model=self.model)
+        
+        # Obtener encodings faciales
+        return face_recognition.face_encodings(imagen_rgb, face_locations)
+    
+    def detectar_caras_seguidas(self, imagen_bytes: bytes, cajas_conocidas: List = (),
+                                iou_minimo: float = 0.4) -> Tuple[List[Tuple[int, int, int, int]], Dict[int, Any]]:
+        """
+        Detecta las caras de un frame y calcula el encoding solo de las que no
+        coinciden con una caja ya identificada por el tracker
+        
+        Returns:
+            Tuple con las cajas (top, right, bottom, left) y un dict
+            índice de caja -> encoding para las caras que se codificaron
+        """
+        imagen_rgb, ubicaciones = detectar_ubicaciones(imagen_bytes, model=self.model)
+        
+        por_codificar = [
+            indice for indice, caja in enumerate(ubicaciones)
+            if not any(iou(caja, conocida) >= iou_minimo for conocida in cajas_conocidas)
+        ]
+        encodings = face_recognition.face_encodings(
+            imagen_rgb, [ubicaciones[indice] for indice in por_codificar]
+        ) if por_codificar else []
+        
+        return ubicaciones, {
+            indice: np.asarray(encoding, dtype=np.float32)
+            for indice, encoding in zip(por_codificar, encodings)
+        }
+    
+    def _distancia_a_confianza(self, distancia: float) -> float:
+        """
+        Convierte una distancia euclidiana entre encodings a porcentaje de confianza
+        """
+        if distancia <= self.tolerance:
+            confianza = max(0, (1 - distancia) * 100)
+            return min(100, confianza)
+        else:
+            confianza = max(0, (1 - distancia) * 70)
+            return min(50, confianza)
+    
+    def _obtener_galeria(self, personas_bd) -> FaceGalleryIndex:
+        """
+        Acepta una galería ya construida o la lista personas_bd (dicts con 'encodings')
+        """
+        if isinstance(personas_bd, FaceGalleryIndex):
+            return personas_bd
+        return FaceGalleryIndex.from_personas(personas_bd)
+    
     def comparar_caras(self, encoding_conocido: Any, encoding_desconocido: Any) -> float:
         """
         Compara dos encodings faciales y retorna el porcentaje de confianza
@@ -136,13 +190,7 @@ class OpenCVFaceProvider:
             else:
                 raise Exception("face_recognition no disponible")
             
-            # Convertir distancia a porcentaje de confianza
-            if distancia <= self.tolerance:
-                confianza = max(0, (1 - distancia) * 100)
-                return min(100, confianza)
-            else:
-                confianza = max(0, (1 - distancia) * 70)
-                return min(50, confianza)
+            return self._distancia_a_confianza(distancia)
             
         except Exception as e:
             logger.error(f"Error comparando caras: {str(e)}")
@@ -151,14 +199,20 @@ class OpenCVFaceProvider:
     
     def procesar_reconocimiento_tiempo_real(self, 
                                           imagen_subida: bytes, 
-                                          personas_bd: List[Dict]) -> List[Dict]:
+                                          personas_bd: Union[List[Dict], FaceGalleryIndex]) -> List[Dict]:
         """
         Procesa reconocimiento facial en tiempo real
+        
+        personas_bd puede ser la lista de personas (dicts con 'encodings') o un
+        FaceGalleryIndex ya construido para evitar reconstruirlo en cada frame
         """
         if not self.available:
             # Simulación para cuando face_recognition no está disponible
             logger.info("🎭 Simulando reconocimiento facial en tiempo real")
             
+            if isinstance(personas_bd, FaceGalleryIndex):
+                personas_bd = personas_bd.personas()
+            
             if personas_bd and random.random() > 0.3:  # 70% de probabilidad de reconocer
                 persona_simulada = random.choice(personas_bd)
                 return [{
@@ -185,64 +239,10 @@ class OpenCVFaceProvider:
                 }]
         
         # Procesamiento real con face_recognition
-        resultados = []
-        
         try:
             # Detectar caras en imagen subida
             encodings_imagen = self.detectar_caras_en_imagen(imagen_subida)
-            
-            if not encodings_imagen:
-                return [{
-                    'reconocido': False,
-                    'error': 'No se detectaron caras en la imagen',
-                    'confianza': 0.0
-                }]
-            
-            # Para cada cara detectada
-            for encoding_detectado in encodings_imagen:
-                mejor_match = None
-                mejor_confianza = 0.0
-                
-                # Comparar con todas las personas en BD
-                for persona in personas_bd:
-                    if 'encodings' in persona and persona['encodings']:
-                        for encoding_bd in persona['encodings']:
-                            try:
-                                confianza = self.comparar_caras(encoding_bd, encoding_detectado)
-                                
-                                if confianza > mejor_confianza and confianza >= 60:  # Umbral mínimo
-                                    mejor_confianza = confianza
-                                    mejor_match = persona
-                            except Exception as e:
-                                logger.warning(f"Error comparando con persona {persona.get('id', 'N/A')}: {e}")
-                                continue
-                
-                # Agregar resultado
-                if mejor_match and mejor_confianza >= 60:
-                    resultados.append({
-                        'reconocido': True,
-                        'persona': {
-                            'id': mejor_match['id'],
-                            'nombre': mejor_match['nombre'],
-                            'vivienda': mejor_match.get('vivienda', 'N/A'),
-                            'tipo_residente': mejor_match.get('tipo_residente', 'N/A'),
-                            'documento': mejor_match.get('documento', 'N/A')
-                        },
-                        'confianza': round(mejor_confianza, 2),
-                        'proveedor': 'OpenCV',
-                        'timestamp': '',
-                        'modo': 'real'
-                    })
-                else:
-                    resultados.append({
-                        'reconocido': False,
-                        'confianza': round(mejor_confianza, 2) if mejor_confianza > 0 else 0.0,
-                        'mensaje': 'Persona no reconocida o confianza insuficiente',
-                        'proveedor': 'OpenCV',
-                        'modo': 'real'
-                    })
-            
-            return resultados
+            return self.reconocer_encodings(encodings_imagen, personas_bd)
             
         except Exception as e:
             logger.error(f"Error en reconocimiento tiempo real: {str(e)}")
@@ -252,6 +252,62 @@ class OpenCVFaceProvider:
                 'confianza': 0.0
             }]
 
+    def reconocer_encodings(self, 
+                            encodings_imagen: List, 
+                            personas_bd: Union[List[Dict], FaceGalleryIndex]) -> List[Dict]:
+        """
+        Compara encodings ya detectados contra la galería
+        
+        Separado de la detección para que ésta pueda ejecutarse en otro
+        proceso (ver detectar_caras_frame) y el match contra la galería en
+        memoria se haga en el proceso que la mantiene.
+        """
+        if not encodings_imagen:
+            return [{
+                'reconocido': False,
+                'error': 'No se detectaron caras en la imagen',
+                'confianza': 0.0
+            }]
+        
+        resultados = []
+        
+        # Comparar todas las caras contra toda la galería en una sola operación
+        galeria = self._obtener_galeria(personas_bd)
+        ids_match, distancias = galeria.search(np.asarray(encodings_imagen, dtype=np.float32))
+        
+        for persona_id, distancia in zip(ids_match.tolist(), distancias.tolist()):
+            mejor_match = galeria.get_datos(persona_id) if persona_id >= 0 else None
+            mejor_confianza = self._distancia_a_confianza(distancia) if mejor_match else 0.0
+            if mejor_confianza < 60:  # Umbral mínimo
+                mejor_match, mejor_confianza = None, 0.0
+            
+            # Agregar resultado
+            if mejor_match and mejor_confianza >= 60:
+                resultados.append({
+                    'reconocido': True,
+                    'persona': {
+                        'id': mejor_match['id'],
+                        'nombre': mejor_match['nombre'],
+                        'vivienda': mejor_match.get('vivienda', 'N/A'),
+                        'tipo_residente': mejor_match.get('tipo_residente', 'N/A'),
+                        'documento': mejor_match.get('documento', 'N/A')
+                    },
+                    'confianza': round(mejor_confianza, 2),
+                    'proveedor': 'OpenCV',
+                    'timestamp': '',
+                    'modo': 'real'
+                })
+            else:
+                resultados.append({
+                    'reconocido': False,
+                    'confianza': round(mejor_confianza, 2) if mejor_confianza > 0 else 0.0,
+                    'mensaje': 'Persona no reconocida o confianza insuficiente',
+                    'proveedor': 'OpenCV',
+                    'modo': 'real'
+                })
+        
+        return resultados
+
     def verify_faces(self, vector_conocido: Any, imagen_bytes: bytes) -> Dict:
         """
         Verifica si una imagen coincide con un vector facial conocido
@@ -357,11 +413,21 @@ class RealTimeFaceProviderFactory:
     
     @staticmethod
     def create_provider():
-        """Crear proveedor OpenCV"""
-        return OpenCVFaceProvider()
+        """Proveedor OpenCV compartido del proceso"""
+        return get_face_provider()
+
+
+def detectar_caras_frame(imagen_bytes: bytes, cajas_conocidas: List = (),
+                         iou_minimo: float = 0.4) -> Tuple[List, Dict[int, Any]]:
+    """
+    ``OpenCVFaceProvider.detectar_caras_seguidas`` para ejecutarse en un
+    ProcessPoolExecutor (función de módulo, argumentos y resultado picklables)
+    """
+    # Cada proceso del pool tiene su propia instancia en el registro
+    return get_face_provider().detectar_caras_seguidas(imagen_bytes, cajas_conocidas, iou_minimo)
 
 
-# Función auxiliar para obtener el proveedor
 def get_face_provider():
-    """Retorna una instancia del proveedor de reconocimiento facial"""
-    return OpenCVFaceProvider()
\ No newline at end of file
+    """Retorna el proveedor de reconocimiento facial compartido del proceso"""
+    from .provider_registry import obtener_provider_tiempo_real
+    return obtener_provider_tiempo_real()
\ No newline at end of file
@@ -0,0 +1,183 @@
+"""
+Contadores pre-agregados de la bitácora para el dashboard de seguridad
+
+El dashboard contaba sobre ``BitacoraAcciones`` en cada refresco, con filtros
+``fecha_accion__date`` que no aprovechan índices. Aquí cada registro escrito
+suma 1 a su fila ``ResumenBitacora`` (hora, tipo de acción, resultado) en la
+misma transacción, y el copropietario queda en ``PresenciaDiariaBitacora``.
+El dashboard lee unas pocas filas de las últimas 24 horas.
+
+``compactar()`` (comando ``compactar_resumen_bitacora``) agrupa las horas
+antiguas en filas por día; ``reconstruir()`` recalcula todo desde la bitácora,
+tabla y archivo (datos anteriores a los contadores o después de borrar
+registros).
+"""
+
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+ACCESOS = ('VERIFY_FACE', 'ACCESS_GRANTED')
+
+# Días que se conservan con detalle por hora antes de compactar
+DIAS_POR_HORA = 7
+
+
+def _resultado(resultado_match: Optional[bool]) -> str:
+    if resultado_match is None:
+        return ''
+    return 'si' if resultado_match else 'no'
+
+
+def _inicio_hora(fecha: datetime) -> datetime:
+    return timezone.localtime(fecha).replace(minute=0, second=0, microsecond=0)
+
+
+def _inicio_dia(fecha: datetime) -> datetime:
+    return timezone.localtime(fecha).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def acumular(registros: Iterable[Dict]):
+    """
+    Suma registros de bitácora (dicts con ``tipo_accion``, ``resultado_match``,
+    ``fecha_accion`` y ``copropietario_id``) a los contadores por hora
+
+    Se llama dentro de la transacción que inserta los registros.
+    """
+    from seguridad.models import PresenciaDiariaBitacora
+
+    contadores = Counter()
+    presencias = set()
+    for registro in registros:
+        fecha = registro['fecha_accion']
+        if isinstance(fecha, str):
+            fecha = datetime.fromisoformat(fecha)
+        contadores[(_inicio_hora(fecha), registro['tipo_accion'], _resultado(registro.get('resultado_match')))] += 1
+        if registro.get('copropietario_id'):
+            presencias.add((timezone.localdate(fecha), registro['copropietario_id']))
+
+    for (periodo, tipo_accion, resultado), total in contadores.items():
+        _sumar('hora', periodo, tipo_accion, resultado, total)
+    if presencias:
+        PresenciaDiariaBitacora.objects.bulk_create(
+            [PresenciaDiariaBitacora(fecha=fecha, copropietario_id=pk) for fecha, pk in presencias],
+            ignore_conflicts=True,
+        )
+
+
+def _sumar(granularidad: str, periodo: datetime, tipo_accion: str, resultado: str, total: int):
+    """UPDATE total = total + n; si la fila no existe se crea (otro proceso puede ganarle)"""
+    from seguridad.models import ResumenBitacora
+
+    filtro = {'granularidad': granularidad, 'periodo': periodo, 'tipo_accion': tipo_accion, 'resultado': resultado}
+    if ResumenBitacora.objects.filter(**filtro).update(total=F('total') + total):
+        return
+    try:
+        with transaction.atomic():
+            ResumenBitacora.objects.create(total=total, **filtro)
+    except IntegrityError:
+        ResumenBitacora.objects.filter(**filtro).update(total=F('total') + total)
+
+
+def compactar(dias_por_hora: int = DIAS_POR_HORA) -> int:
+    """
+    Agrupa en filas por día las horas anteriores a ``dias_por_hora`` días y
+    borra las presencias de esos días
+
+    Returns:
+        Filas por hora compactadas
+    """
+    from seguridad.models import PresenciaDiariaBitacora, ResumenBitacora
+
+    limite = _inicio_dia(timezone.now()) - timedelta(days=max(1, dias_por_hora))
+    with transaction.atomic():
+        horas = list(
+            ResumenBitacora.objects.select_for_update()
+            .filter(granularidad='hora', periodo__lt=limite)
+            .values_list('id', 'periodo', 'tipo_accion', 'resultado', 'total')
+        )
+        por_dia = Counter()
+        for _, periodo, tipo_accion, resultado, total in horas:
+            por_dia[(_inicio_dia(periodo), tipo_accion, resultado)] += total
+        for (periodo, tipo_accion, resultado), total in por_dia.items():
+            _sumar('dia', periodo, tipo_accion, resultado, total)
+        ids = [fila[0] for fila in horas]
+        for inicio in range(0, len(ids), 500):
+            ResumenBitacora.objects.filter(id__in=ids[inicio:inicio + 500]).delete()
+        PresenciaDiariaBitacora.objects.filter(fecha__lt=timezone.localdate(limite)).delete()
+    return len(horas)
+
+
+def reconstruir(dias_por_hora: int = DIAS_POR_HORA, lote: int = 2000) -> int:
+    """
+    Recalcula todos los contadores; retorna los registros leídos
+
+    Lee la bitácora completa con ``archivo_bitacora.iterar()``: los registros
+    que ya se movieron al archivo también se cuentan.
+    """
+    from core.services.archivo_bitacora import iterar
+    from seguridad.models import PresenciaDiariaBitacora, ResumenBitacora
+
+    leidos = 0
+    with transaction.atomic():
+        ResumenBitacora.objects.all().delete()
+        PresenciaDiariaBitacora.objects.all().delete()
+        pendientes = []
+        for registro in iterar('seguridad_bitacora'):
+            pendientes.append({
+                'tipo_accion': registro.tipo_accion,
+                'resultado_match': registro.resultado_match,
+                'fecha_accion': registro.fecha_accion,
+                'copropietario_id': registro.copropietario_id,
+            })
+            if len(pendientes) >= lote:
+                acumular(pendientes)
+                leidos += len(pendientes)
+                pendientes = []
+        acumular(pendientes)
+        leidos += len(pendientes)
+    compactar(dias_por_hora)
+    return leidos
+
+
+def contadores_recientes() -> Dict[str, int]:
+    """
+    Contadores de hoy y de las últimas 24 horas (con resolución de una hora)
+
+    Returns:
+        Dict con eventos_hoy, accesos_hoy, accesos_exitosos, intentos_fallidos,
+        denegados_24h y usuarios_unicos
+    """
+    from seguridad.models import PresenciaDiariaBitacora, ResumenBitacora
+
+    ahora = timezone.now()
+    inicio_hoy = _inicio_dia(ahora)
+    inicio_24h = _inicio_hora(ahora) - timedelta(hours=23)
+
+    contadores = dict.fromkeys(
+        ('eventos_hoy', 'accesos_hoy', 'accesos_exitosos', 'intentos_fallidos', 'denegados_24h'), 0
+    )
+    filas = ResumenBitacora.objects.filter(
+        granularidad='hora', periodo__gte=min(inicio_hoy, inicio_24h)
+    ).values_list('periodo', 'tipo_accion', 'resultado', 'total')
+    for periodo, tipo_accion, resultado, total in filas:
+        if periodo >= inicio_24h and tipo_accion == 'ACCESS_DENIED':
+            contadores['denegados_24h'] += total
+        if periodo < inicio_hoy:
+            continue
+        contadores['eventos_hoy'] += total
+        if tipo_accion in ACCESOS:
+            contadores['accesos_hoy'] += total
+            if resultado == 'si':
+                contadores['accesos_exitosos'] += total
+        elif tipo_accion == 'ACCESS_DENIED':
+            contadores['intentos_fallidos'] += total
+
+    contadores['usuarios_unicos'] = PresenciaDiariaBitacora.objects.filter(
+        fecha=timezone.localdate(ahora)
+    ).count()
+    return contadores
@@ -4,7 +4,7 @@
 Proveedor de reconocimiento facial con manejo robusto de dependencias
 Implementación que funciona tanto con como sin face_recognition instalado
 """
-from typing import List, Dict, Tuple, Optional
+from typing import List, Dict, Tuple, Optional, Union
 import logging
 import json
 
@@ -32,6 +32,8 @@ except ImportError as e:
     FACE_RECOGNITION_AVAILABLE = False
     logger.warning(f"⚠️ face_recognition no disponible: {e} - usando simulación")
 
+from .face_gallery import FaceGalleryIndex
+
 
 class OpenCVFaceProvider:
     """
@@ -105,6 +107,25 @@ class OpenCVFaceProvider:
             logger.error(f"Error detectando caras: {str(e)}")
             return []
     
+    def _distancia_a_confianza(self, distancia: float) -> float:
+        """
+        Convierte una distancia euclidiana entre encodings a porcentaje de confianza
+        """
+        if distancia <= self.tolerance:
+            confianza = max(0, (1 - distancia) * 100)
+            return min(100, confianza)
+        else:
+            confianza = max(0, (1 - distancia) * 70)
+            return min(50, confianza)
+    
+    def _obtener_galeria(self, personas_bd) -> FaceGalleryIndex:
+        """
+        Acepta una galería ya construida o la lista personas_bd (dicts con 'encodings')
+        """
+        if isinstance(personas_bd, FaceGalleryIndex):
+            return personas_bd
+        return FaceGalleryIndex.from_personas(personas_bd)
+    
     def comparar_caras(self, encoding_conocido, encoding_desconocido) -> float:
         """
         Compara dos encodings faciales y retorna el porcentaje de confianza
@@ -133,13 +154,7 @@ class OpenCVFaceProvider:
             else:
                 raise Exception("face_recognition no disponible")
             
-            # Convertir distancia a porcentaje de confianza
-            if distancia <= self.tolerance:
-                confianza = max(0, (1 - distancia) * 100)
-                return min(100, confianza)
-            else:
-                confianza = max(0, (1 - distancia) * 70)
-                return min(50, confianza)
+            return self._distancia_a_confianza(distancia)
             
         except Exception as e:
             logger.error(f"Error comparando caras: {str(e)}")
@@ -147,14 +162,20 @@ class OpenCVFaceProvider:
     
     def procesar_reconocimiento_tiempo_real(self, 
                                           imagen_subida: bytes, 
-                                          personas_bd: List[Dict]) -> List[Dict]:
+                                          personas_bd: Union[List[Dict], FaceGalleryIndex]) -> List[Dict]:
         """
         Procesa reconocimiento facial en tiempo real
+        
+        personas_bd puede ser la lista de personas (dicts con 'encodings') o un
+        FaceGalleryIndex ya construido para evitar reconstruirlo en cada frame
         """
         if not self.face_recognition_available:
             # Simulación para cuando face_recognition no está disponible
             logger.info("🎭 Simulando reconocimiento facial en tiempo real")
             
+            if isinstance(personas_bd, FaceGalleryIndex):
+                personas_bd = personas_bd.personas()
+            
             if personas_bd and random.random() > 0.3:  # 70% de probabilidad de reconocer
                 persona_simulada = random.choice(personas_bd)
                 return [{
@@ -194,24 +215,15 @@ class OpenCVFaceProvider:
                     'confianza': 0.0
                 }]
             
-            # Para cada cara detectada
-            for encoding_detectado in encodings_imagen:
-                mejor_match = None
-                mejor_confianza = 0.0
-                
-                # Comparar con todas las personas en BD
-                for persona in personas_bd:
-                    if 'encodings' in persona and persona['encodings']:
-                        for encoding_bd in persona['encodings']:
-                            try:
-                                confianza = self.comparar_caras(encoding_bd, encoding_detectado)
-                                
-                                if confianza > mejor_confianza and confianza >= 55:  # Umbral mínimo
-                                    mejor_confianza = confianza
-                                    mejor_match = persona
-                            except Exception as e:
-                                logger.warning(f"Error comparando con persona {persona.get('id', 'N/A')}: {e}")
-                                continue
+            # Comparar todas las caras contra toda la galería en una sola operación
+            galeria = self._obtener_galeria(personas_bd)
+            ids_match, distancias = galeria.search(np.asarray(encodings_imagen, dtype=np.float32))
+            
+            for persona_id, distancia in zip(ids_match.tolist(), distancias.tolist()):
+                mejor_match = galeria.get_datos(persona_id) if persona_id >= 0 else None
+                mejor_confianza = self._distancia_a_confianza(distancia) if mejor_match else 0.0
+                if mejor_confianza < 55:  # Umbral mínimo
+                    mejor_match, mejor_confianza = None, 0.0
                 
                 # Agregar resultado
                 if mejor_match and mejor_confianza >= 60:
@@ -0,0 +1,60 @@
+"""
+Señales que mantienen al día las galerías de rostros en memoria y los
+contadores de la bitácora
+
+Cada cambio relevante queda registrado en ``CambioGaleriaFacial`` dentro de la
+misma transacción, de modo que un rollback también descarta el cambio.
+"""
+
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from authz.models import Persona
+from core.models.propiedades_residentes import Visita
+from seguridad.models import BitacoraAcciones, Copropietarios, ReconocimientoFacial
+from seguridad.services.gallery_sync import GALERIA_RESIDENTES, GALERIA_VISITAS, registrar_cambio
+from seguridad.services.resumen_bitacora import acumular
+
+# Campos de Persona que afectan a sus encodings en la galería
+CAMPOS_FACIALES_PERSONA = {'encoding_facial', 'encodings', 'reconocimiento_facial_activo'}
+
+
+def _afecta(update_fields, campos) -> bool:
+    return update_fields is None or bool(set(update_fields) & set(campos))
+
+
+@receiver(post_save, sender=ReconocimientoFacial)
+@receiver(post_delete, sender=ReconocimientoFacial)
+def reconocimiento_cambiado(sender, instance, **kwargs):
+    if _afecta(kwargs.get('update_fields'), {'vector_facial', 'encodings', 'activo', 'copropietario'}):
+        registrar_cambio(GALERIA_RESIDENTES, [instance.copropietario_id])
+
+
+@receiver(post_save, sender=Persona)
+@receiver(pre_delete, sender=Persona)
+def persona_cambiada(sender, instance, **kwargs):
+    if not _afecta(kwargs.get('update_fields'), CAMPOS_FACIALES_PERSONA):
+        return
+    copropietarios = Copropietarios.objects.filter(
+        usuario_sistema__persona=instance, reconocimiento_facial__isnull=False
+    ).values_list('id', flat=True)
+    registrar_cambio(GALERIA_RESIDENTES, copropietarios)
+
+
+@receiver(post_save, sender=Visita)
+@receiver(post_delete, sender=Visita)
+def visita_cambiada(sender, instance, **kwargs):
+    if _afecta(kwargs.get('update_fields'), {'fotos_reconocimiento', 'estado'}):
+        registrar_cambio(GALERIA_VISITAS, [instance.id])
+
+
+@receiver(post_save, sender=BitacoraAcciones)
+def bitacora_creada(sender, instance, created, **kwargs):
+    # Las inserciones por lotes (bulk_create) acumulan en bitacora_buffer
+    if created:
+        acumular([{
+            'tipo_accion': instance.tipo_accion,
+            'resultado_match': instance.resultado_match,
+            'fecha_accion': instance.fecha_accion,
+            'copropietario_id': instance.copropietario_id,
+        }])
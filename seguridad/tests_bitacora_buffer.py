@@ -0,0 +1,181 @@
+"""
+Tests para la escritura por lotes de la bitácora
+"""
+
+import glob
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.db import OperationalError
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from seguridad.models import BitacoraAcciones, fn_bitacora_log
+from seguridad.services import bitacora_buffer
+from seguridad.services.bitacora_buffer import EscritorBitacora
+
+
+def _registro(numero):
+    return {'tipo_accion': 'VERIFY_FACE', 'descripcion': f'frame {numero}', 'fecha_accion': timezone.now()}
+
+
+class EscritorBitacoraTest(SimpleTestCase):
+
+    def setUp(self):
+        self.lotes = []
+        insertar = patch.object(bitacora_buffer, 'insertar_registros', side_effect=self._insertar)
+        insertar.start()
+        self.addCleanup(insertar.stop)
+
+    def _insertar(self, registros):
+        self.lotes.append([r['descripcion'] for r in registros])
+        return len(registros)
+
+    def _esperar(self, condicion):
+        for _ in range(200):
+            if condicion():
+                return
+            time.sleep(0.01)
+
+    def test_sin_iniciar_no_acepta(self):
+        self.assertFalse(EscritorBitacora().encolar(_registro(0)))
+
+    def test_lote_por_tamano_y_por_intervalo(self):
+        escritor = EscritorBitacora(tamano_lote=2, intervalo_ms=60000)
+        escritor.iniciar()
+        self.addCleanup(escritor.detener)
+        for numero in range(2):
+            self.assertTrue(escritor.encolar(_registro(numero)))
+        self._esperar(lambda: self.lotes)
+        self.assertEqual(self.lotes, [['frame 0', 'frame 1']])
+
+        escritor.intervalo = 0.05
+        escritor.encolar(_registro(2))
+        self._esperar(lambda: len(self.lotes) == 2)
+        self.assertEqual(self.lotes[1], ['frame 2'])
+
+    def test_detener_escribe_lo_pendiente(self):
+        escritor = EscritorBitacora(tamano_lote=100, intervalo_ms=60000)
+        escritor.iniciar()
+        for numero in range(3):
+            escritor.encolar(_registro(numero))
+        escritor.detener()
+        self.assertEqual(sum(len(lote) for lote in self.lotes), 3)
+        self.assertFalse(escritor.encolar(_registro(4)))
+
+    def test_respaldo_sobrevive_a_una_caida(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        archivo = os.path.join(directorio.name, 'bitacora')
+
+        escritor = EscritorBitacora(tamano_lote=100, intervalo_ms=60000, archivo_respaldo=archivo)
+        escritor._hilo = object()  # acepta registros sin hilo de escritura
+        for numero in range(3):
+            escritor.encolar(_registro(numero))
+
+        # La base de datos no responde: los registros vuelven a la cola y al respaldo
+        with patch.object(bitacora_buffer, 'insertar_registros', side_effect=OperationalError('sin conexión')):
+            with self.assertRaises(OperationalError):
+                escritor.vaciar()
+        self.assertEqual(len(escritor._pendientes), 3)
+
+        # El proceso muere: otro proceso recupera su archivo
+        escritor._archivo.close()
+        os.replace(escritor._ruta_activa, f'{archivo}.999999999.jsonl')
+        self.assertEqual(EscritorBitacora(archivo_respaldo=archivo).recuperar(), 3)
+        self.assertEqual(self.lotes, [['frame 0', 'frame 1', 'frame 2']])
+        self.assertEqual(glob.glob(f'{archivo}.*'), [])
+
+    def test_recuperar_omite_archivos_reclamados_por_otro_proceso(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        archivo = os.path.join(directorio.name, 'bitacora')
+        for pid in (999999998, 999999999):
+            with open(f'{archivo}.{pid}.jsonl', 'w', encoding='utf-8') as f:
+                f.write(json.dumps({'descripcion': f'pid {pid}'}) + '\n')
+
+        # Otro proceso renombra el primero entre el listado y el reclamo
+        reemplazar = os.replace
+
+        def reclamado_antes(origen, destino):
+            if origen.endswith('.999999998.jsonl'):
+                os.remove(origen)
+            return reemplazar(origen, destino)
+
+        with patch.object(bitacora_buffer.os, 'replace', side_effect=reclamado_antes):
+            self.assertEqual(EscritorBitacora(archivo_respaldo=archivo).recuperar(), 1)
+        self.assertEqual(self.lotes, [['pid 999999999']])
+
+        # Lo reclamado por un proceso vivo no se toca
+        with open(f'{archivo}.{os.getpid()}.reclamado.1', 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'descripcion': 'propio'}) + '\n')
+        self.assertEqual(EscritorBitacora(archivo_respaldo=archivo).recuperar(), 0)
+
+    def test_tras_fork_solo_inicia_en_procesos_que_encolan(self):
+        escritor = EscritorBitacora()
+        escritor._hilo = object()
+        escritor._reiniciar_en_hijo()
+        self.assertIsNone(escritor._hilo)
+
+        # Hijo de un ProcessPoolExecutor: no se inicia, el registro se escribe en el momento
+        with patch.object(bitacora_buffer.multiprocessing, 'parent_process', return_value=object()), \
+                patch.object(escritor, 'iniciar') as iniciar:
+            self.assertFalse(escritor.encolar(_registro(0)))
+        iniciar.assert_not_called()
+
+        escritor._hilo = object()
+        escritor._reiniciar_en_hijo()
+        with patch.object(bitacora_buffer.multiprocessing, 'parent_process', return_value=None), \
+                patch.object(escritor, 'iniciar') as iniciar:
+            escritor.encolar(_registro(1))
+        iniciar.assert_called_once_with()
+
+
+class InsertarRegistrosTest(TestCase):
+
+    def test_conserva_la_hora_del_evento(self):
+        hace_un_rato = timezone.now() - timedelta(minutes=5)
+        self.assertEqual(bitacora_buffer.insertar_registros([
+            {**_registro(0), 'fecha_accion': hace_un_rato.isoformat()},
+            _registro(1),
+        ]), 2)
+        self.assertEqual(BitacoraAcciones.objects.get(descripcion='frame 0').fecha_accion, hace_un_rato)
+
+    def test_fn_bitacora_log_encola_con_el_escritor_activo(self):
+        escritor = EscritorBitacora()
+        escritor._hilo = object()
+        with patch.object(bitacora_buffer, '_escritor', escritor):
+            fn_bitacora_log(tipo_accion='ACCESS_GRANTED', descripcion='puerta 1', proveedor_ia='Local')
+            self.assertFalse(BitacoraAcciones.objects.exists())
+            escritor.vaciar()
+        self.assertEqual(BitacoraAcciones.objects.get().descripcion, 'puerta 1')
+
+
+class EsServidorTest(SimpleTestCase):
+    """Los hilos de fondo (escritor, calentamiento) solo arrancan en servidores"""
+
+    def _es_servidor(self, argv, entorno=None):
+        from seguridad.apps import _es_servidor
+        with patch('sys.argv', argv), patch.dict(os.environ, entorno or {}), patch.dict(sys.modules):
+            # Bajo pytest nunca es servidor; se prueba la detección en sí
+            sys.modules.pop('pytest', None)
+            return _es_servidor()
+
+    def test_servidores_explicitos(self):
+        self.assertTrue(self._es_servidor(['/usr/bin/gunicorn', 'core.wsgi']))
+        self.assertTrue(self._es_servidor(['/venv/bin/uvicorn', 'core.asgi:application']))
+        self.assertTrue(self._es_servidor(['/venv/lib/daphne/__main__.py', 'core.asgi:application']))
+        self.assertTrue(self._es_servidor(['manage.py', 'runserver'], {'RUN_MAIN': 'true'}))
+
+    def test_scripts_y_comandos_no(self):
+        self.assertFalse(self._es_servidor(['scripts/entrenar.py']))
+        self.assertFalse(self._es_servidor(['-c']))
+        self.assertFalse(self._es_servidor(['manage.py', 'migrate'], {'RUN_MAIN': 'true'}))
+        with patch.dict(os.environ):
+            os.environ.pop('RUN_MAIN', None)
+            self.assertFalse(self._es_servidor(['manage.py', 'runserver']))
@@ -0,0 +1,66 @@
+"""
+Tests de regresión del número de consultas en los listados del panel de seguridad
+
+Cada listado se mide con pocas y con muchas filas: la cantidad de consultas
+debe ser la misma (sin N+1).
+"""
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from authz.models import Persona, Rol
+from core.utilidades_tests import ConsultasConstantesMixin
+from seguridad.models import Copropietarios, ReconocimientoFacial
+from seguridad.views import (
+    ListarUsuariosReconocimientoFacialView, ListaUsuariosActivosView, PropietariosConReconocimientoView,
+)
+
+
+class ListadosSeguridadConsultasTest(ConsultasConstantesMixin, TestCase):
+
+    def setUp(self):
+        self.usuario = get_user_model().objects.create_user(email='guardia@test.com', password='12345678')
+        self.usuario.roles.add(Rol.objects.create(nombre='security'))
+
+    def _residentes(self, desde, hasta):
+        for numero in range(desde, hasta):
+            persona = Persona.objects.create(
+                nombre=f'Residente{numero}', apellido='Prueba', documento_identidad=f'DOC{numero}',
+                email=f'residente{numero}@test.com'
+            )
+            usuario = get_user_model().objects.create_user(
+                email=f'residente{numero}@test.com', password=None, persona=persona
+            )
+            copropietario = Copropietarios.objects.create(
+                nombres=f'Residente{numero}', apellidos='Prueba', numero_documento=f'DOC{numero}',
+                email=usuario.email, unidad_residencial=f'A-{numero:03d}', usuario_sistema=usuario
+            )
+            # Uno de cada dos con reconocimiento facial
+            if numero % 2 == 0:
+                ReconocimientoFacial.objects.create(
+                    copropietario=copropietario, proveedor_ia='Local', vector_facial='[]',
+                    fotos_urls=f'["https://fotos/{numero}.jpg"]'
+                )
+
+    def test_usuarios_reconocimiento_facial(self):
+        respuesta = self.assertConsultasConstantes(
+            ListarUsuariosReconocimientoFacialView.as_view(), self._residentes, esperadas=1
+        )
+        self.assertEqual(respuesta.data['total'], 5)
+        self.assertEqual(respuesta.data['data'][0]['reconocimiento_facial']['fotos_urls'], ['https://fotos/0.jpg'])
+
+    def test_propietarios_con_reconocimiento(self):
+        respuesta = self.assertConsultasConstantes(
+            PropietariosConReconocimientoView.as_view(), self._residentes, esperadas=3
+        )
+        self.assertEqual(respuesta.data['data']['resumen']['con_reconocimiento'], 5)
+        self.assertEqual(respuesta.data['data']['resumen']['total_propietarios'], 10)
+
+    def test_lista_usuarios_activos(self):
+        # Permisos (rol de seguridad y de administrador) + usuarios + roles
+        respuesta = self.assertConsultasConstantes(
+            ListaUsuariosActivosView.as_view(), self._residentes, esperadas=5
+        )
+        con_reconocimiento = [u['email'] for u in respuesta.data['data'] if u['tiene_reconocimiento']]
+        self.assertEqual(len(con_reconocimiento), 5)
+        self.assertIn('residente0@test.com', con_reconocimiento)
@@ -0,0 +1,58 @@
+"""
+Tests para las galerías sintéticas y la medición de latencia de los benchmarks
+"""
+
+from unittest.mock import patch
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from seguridad.services import face_benchmark
+
+
+class GaleriaSinteticaTest(SimpleTestCase):
+
+    def test_misma_semilla_misma_galeria(self):
+        a = face_benchmark.generar_galeria(50, (1, 10), semilla=7)
+        b = face_benchmark.generar_galeria(50, (1, 10), semilla=7)
+        self.assertEqual([len(p['encodings']) for p in a], [len(p['encodings']) for p in b])
+        np.testing.assert_array_equal(a[10]['encodings'], b[10]['encodings'])
+        self.assertTrue(all(1 <= len(p['encodings']) <= 10 for p in a))
+        self.assertEqual(a[0]['encodings'].shape[1], 128)
+
+    def test_distancias_del_orden_de_dlib(self):
+        galeria = face_benchmark.generar_galeria(2, (2, 2))
+        misma = np.linalg.norm(galeria[0]['encodings'][0] - galeria[0]['encodings'][1])
+        distinta = np.linalg.norm(galeria[0]['encodings'][0] - galeria[1]['encodings'][0])
+        self.assertLess(misma, 0.6)
+        self.assertGreater(distinta, 0.6)
+
+    def test_sondas_con_desconocidos(self):
+        galeria = face_benchmark.generar_galeria(20)
+        sondas, esperados = face_benchmark.generar_sondas(galeria, 100, fraccion_desconocidos=0.3)
+        self.assertEqual(sondas.shape, (100, 128))
+        self.assertTrue(0 < (esperados == -1).sum() < 100)
+        self.assertTrue(set(esperados[esperados >= 0].tolist()) <= {p['id'] for p in galeria})
+
+
+class MedirTest(SimpleTestCase):
+
+    def test_percentiles_y_precision(self):
+        metricas = face_benchmark.medir(lambda x: x, [1, 2, 3, 4], calentamiento=2, esperados=[1, 2, -1, 4])
+        self.assertEqual(metricas['llamadas'], 4)
+        self.assertLessEqual(metricas['p50_ms'], metricas['p95_ms'])
+        self.assertLessEqual(metricas['p95_ms'], metricas['p99_ms'])
+        self.assertGreater(metricas['throughput'], 0)
+        self.assertEqual(metricas['precision'], 0.75)
+
+    def test_ejecutar_omite_escenarios_sin_dependencias(self):
+        def no_disponible(galeria, sondas, imagenes):
+            raise face_benchmark.EscenarioNoDisponible('falta dependencia')
+
+        with patch.dict(face_benchmark.ESCENARIOS, {'no_disponible': no_disponible}):
+            resultados = face_benchmark.ejecutar(100, ['galeria_exacta', 'no_disponible'], sondas=50, imagenes=0)
+
+        exacta, omitido = resultados
+        self.assertEqual(exacta['precision'], 1.0)
+        self.assertEqual(exacta['llamadas'], 50)
+        self.assertEqual(omitido['omitido'], 'falta dependencia')
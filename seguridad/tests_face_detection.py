@@ -0,0 +1,65 @@
+"""
+Tests para la detección sobre imagen reducida
+"""
+
+import io
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+from django.test import SimpleTestCase
+from PIL import Image
+
+from seguridad.services import face_detection
+
+
+def _jpeg(ancho, alto):
+    buffer = io.BytesIO()
+    Image.new('RGB', (ancho, alto), (120, 80, 40)).save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+class AbrirImagenTest(SimpleTestCase):
+
+    def test_reduce_al_ancho_maximo(self):
+        imagen = face_detection.abrir_imagen_rgb(_jpeg(4000, 3000), ancho_maximo=640)
+        self.assertEqual(imagen.shape, (480, 640, 3))
+
+    def test_imagen_pequena_sin_cambios(self):
+        imagen = face_detection.abrir_imagen_rgb(_jpeg(320, 240), ancho_maximo=640)
+        self.assertEqual(imagen.shape, (240, 320, 3))
+
+    def test_png_con_alpha_se_convierte_a_rgb(self):
+        buffer = io.BytesIO()
+        Image.new('RGBA', (100, 50)).save(buffer, format='PNG')
+        self.assertEqual(face_detection.abrir_imagen_rgb(buffer.getvalue()).shape, (50, 100, 3))
+
+
+class DetectarUbicacionesTest(SimpleTestCase):
+
+    def test_cajas_vuelven_a_la_imagen_de_codificacion(self):
+        falso = MagicMock()
+        falso.face_locations.return_value = [(10, 60, 60, 10)]
+        with patch.object(face_detection, 'face_recognition', falso):
+            imagen, cajas = face_detection.detectar_ubicaciones(
+                _jpeg(4000, 3000), ancho_deteccion=400, ancho_codificacion=1600
+            )
+
+        self.assertEqual(imagen.shape, (1200, 1600, 3))
+        reducida = falso.face_locations.call_args[0][0]
+        self.assertEqual(reducida.shape, (300, 400, 3))
+        self.assertEqual(cajas, [(40, 240, 240, 40)])
+
+    def test_escalar_cajas_respeta_bordes(self):
+        self.assertEqual(
+            face_detection.escalar_cajas([(0, 100, 100, 0)], 2.0, alto=150, ancho=150),
+            [(0, 150, 150, 0)]
+        )
+
+    def test_array_pequeno_no_se_reduce(self):
+        falso = MagicMock()
+        falso.face_locations.return_value = [(1, 2, 3, 0)]
+        imagen = np.zeros((100, 200, 3), dtype=np.uint8)
+        with patch.object(face_detection, 'face_recognition', falso):
+            resultado, cajas = face_detection.detectar_ubicaciones(imagen, ancho_deteccion=640)
+        self.assertIs(resultado, imagen)
+        self.assertEqual(cajas, [(1, 2, 3, 0)])
@@ -0,0 +1,176 @@
+"""
+Tests para el índice vectorizado de la galería de rostros
+"""
+
+import base64
+import json
+from unittest.mock import patch
+
+import numpy as np
+from django.test import SimpleTestCase, override_settings
+
+from seguridad.services.face_ann import IVFFaceGalleryIndex
+from seguridad.services.face_gallery import FaceGalleryIndex, normalizar_encodings, nueva_galeria
+from seguridad.services import realtime_face_provider
+
+
+def _galeria_sintetica(personas=50, encodings_por_persona=3, seed=7):
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            'id': persona_id,
+            'nombre': f'Persona {persona_id}',
+            'encodings': rng.normal(size=(encodings_por_persona, 128)).tolist(),
+        }
+        for persona_id in range(1, personas + 1)
+    ]
+
+
+class NormalizarEncodingsTest(SimpleTestCase):
+    """Tests para la conversión de formatos de encoding"""
+
+    def test_lista_simple_y_lista_de_listas(self):
+        vector = list(np.linspace(0, 1, 128))
+        self.assertEqual(len(normalizar_encodings(vector)), 1)
+        self.assertEqual(len(normalizar_encodings([vector, vector])), 2)
+
+    def test_json_y_base64(self):
+        vector = np.linspace(0, 1, 128)
+        self.assertEqual(len(normalizar_encodings(json.dumps(vector.tolist()))), 1)
+
+        b64 = base64.b64encode(vector.astype(np.float64).tobytes()).decode('utf-8')
+        decodificado = normalizar_encodings(b64)
+        self.assertEqual(len(decodificado), 1)
+        np.testing.assert_allclose(decodificado[0], vector, rtol=1e-6)
+
+    def test_valores_invalidos(self):
+        for valor in (None, '', '[]', 'test_vector', 'faceId-azure', [1.0, 2.0]):
+            self.assertEqual(normalizar_encodings(valor), [])
+
+
+class FaceGalleryIndexTest(SimpleTestCase):
+    """Tests para FaceGalleryIndex"""
+
+    def test_search_coincide_con_busqueda_exhaustiva(self):
+        personas = _galeria_sintetica()
+        galeria = FaceGalleryIndex.from_personas(personas)
+        self.assertEqual(len(galeria), 150)
+        self.assertEqual(galeria.total_personas, 50)
+
+        probes = np.random.default_rng(3).normal(size=(5, 128))
+        ids, distancias = galeria.search(probes)
+
+        for probe, persona_id, distancia in zip(probes, ids, distancias):
+            mejor_id, mejor_distancia = None, np.inf
+            for persona in personas:
+                d = np.linalg.norm(np.asarray(persona['encodings']) - probe, axis=1).min()
+                if d < mejor_distancia:
+                    mejor_id, mejor_distancia = persona['id'], d
+            self.assertEqual(persona_id, mejor_id)
+            self.assertAlmostEqual(float(distancia), mejor_distancia, places=3)
+
+    def test_add_reemplaza_y_remove_elimina(self):
+        galeria = FaceGalleryIndex.from_personas(_galeria_sintetica(personas=3))
+        nuevo = np.full(128, 0.5)
+
+        galeria.add(2, [nuevo], {'nombre': 'Actualizada'})
+        self.assertEqual(len(galeria), 7)
+        ids, distancias = galeria.search(nuevo)
+        self.assertEqual(ids[0], 2)
+        self.assertAlmostEqual(float(distancias[0]), 0.0, places=3)
+        self.assertEqual(galeria.get_datos(2), {'nombre': 'Actualizada', 'id': 2})
+
+        self.assertTrue(galeria.remove(2))
+        self.assertFalse(galeria.remove(2))
+        self.assertNotIn(2, galeria)
+        self.assertNotIn(2, galeria.ids.tolist())
+
+    def test_galeria_vacia(self):
+        ids, distancias = FaceGalleryIndex().search(np.zeros((2, 128)))
+        self.assertEqual(ids.tolist(), [-1, -1])
+        self.assertTrue(np.isinf(distancias).all())
+        self.assertEqual(FaceGalleryIndex().best_matches(np.zeros(128)), [None])
+
+
+class ProveedorConGaleriaTest(SimpleTestCase):
+    """El proveedor en tiempo real usa la galería en lugar del triple bucle"""
+
+    def test_reconocimiento_tiempo_real_con_galeria(self):
+        personas = _galeria_sintetica(personas=10)
+        objetivo = np.asarray(personas[4]['encodings'][1]) + 0.001
+
+        provider = realtime_face_provider.OpenCVFaceProvider()
+        provider.available = True
+        with patch.object(realtime_face_provider, 'np', np), \
+                patch.object(provider, 'detectar_caras_en_imagen', return_value=[objetivo]):
+            resultados = provider.procesar_reconocimiento_tiempo_real(b'frame', personas)
+            resultados_galeria = provider.procesar_reconocimiento_tiempo_real(
+                b'frame', FaceGalleryIndex.from_personas(personas)
+            )
+
+        self.assertTrue(resultados[0]['reconocido'])
+        self.assertEqual(resultados[0]['persona']['id'], personas[4]['id'])
+        self.assertEqual(resultados, resultados_galeria)
+
+
+class IVFFaceGalleryIndexTest(SimpleTestCase):
+    """Tests para el índice aproximado IVF"""
+
+    def _galeria_agrupada(self, personas=400, seed=11):
+        # Encodings agrupados como en una galería real: varias fotos por persona
+        rng = np.random.default_rng(seed)
+        centros = rng.normal(size=(personas, 128))
+        return [
+            {'id': i + 1, 'encodings': centro + rng.normal(scale=0.05, size=(3, 128))}
+            for i, centro in enumerate(centros)
+        ], centros
+
+    def test_nprobe_completo_equivale_a_busqueda_exacta(self):
+        personas, centros = self._galeria_agrupada()
+        galeria = IVFFaceGalleryIndex(nlist=16, nprobe=16, min_entrenamiento=0)
+        galeria.cargar_personas(personas)
+        exacta = FaceGalleryIndex.from_personas(personas)
+
+        probes = centros[:50] + 0.01
+        ids, distancias = galeria.search(probes)
+        ids_exactos, distancias_exactas = exacta.search(probes)
+        self.assertTrue(galeria.entrenado)
+        np.testing.assert_array_equal(ids, ids_exactos)
+        np.testing.assert_allclose(distancias, distancias_exactas, atol=1e-3)
+
+    def test_recall_con_pocas_celdas(self):
+        personas, centros = self._galeria_agrupada()
+        galeria = IVFFaceGalleryIndex(nlist=20, nprobe=4, min_entrenamiento=0)
+        galeria.cargar_personas(personas)
+        self.assertGreaterEqual(galeria.recall(centros[:100] + 0.01), 0.9)
+
+    def test_galeria_pequena_y_modo_exacto_no_entrenan(self):
+        personas, centros = self._galeria_agrupada(personas=20)
+        galeria = IVFFaceGalleryIndex(min_entrenamiento=1000)
+        galeria.cargar_personas(personas)
+        ids, _ = galeria.search(centros[3])
+        self.assertEqual(ids[0], 4)
+        self.assertFalse(galeria.entrenado)
+
+        galeria = IVFFaceGalleryIndex(min_entrenamiento=0, exact=True)
+        galeria.cargar_personas(personas)
+        galeria.search(centros[3])
+        self.assertFalse(galeria.entrenado)
+
+    def test_add_despues_de_entrenar(self):
+        personas, _ = self._galeria_agrupada(personas=100)
+        galeria = IVFFaceGalleryIndex(nlist=8, nprobe=8, min_entrenamiento=0)
+        galeria.cargar_personas(personas)
+        galeria.search(np.zeros(128))
+
+        nuevo = np.full(128, 3.0)
+        galeria.add(999, [nuevo])
+        ids, distancias = galeria.search(nuevo)
+        self.assertEqual(ids[0], 999)
+        self.assertAlmostEqual(float(distancias[0]), 0.0, places=3)
+
+    @override_settings(FACE_GALLERY_BACKEND='ivf', FACE_GALLERY_IVF_NPROBE=3)
+    def test_nueva_galeria_segun_configuracion(self):
+        galeria = nueva_galeria()
+        self.assertIsInstance(galeria, IVFFaceGalleryIndex)
+        self.assertEqual(galeria.nprobe, 3)
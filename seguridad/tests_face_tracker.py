@@ -0,0 +1,158 @@
+"""
+Tests para el seguimiento de rostros entre frames
+"""
+
+import asyncio
+import importlib.util
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from seguridad.services.face_tracker import FaceTracker, iou
+
+
+def _reconocer(persona_id, confianza=90.0):
+    llamadas = []
+
+    def reconocer(encodings):
+        llamadas.append(len(encodings))
+        return [
+            {'reconocido': True, 'persona': {'id': persona_id}, 'confianza': confianza}
+            for _ in encodings
+        ]
+    return reconocer, llamadas
+
+
+class IouTest(SimpleTestCase):
+
+    def test_iou(self):
+        caja = (10, 110, 110, 10)
+        self.assertAlmostEqual(iou(caja, caja), 1.0)
+        self.assertEqual(iou(caja, (200, 300, 300, 200)), 0.0)
+        self.assertAlmostEqual(iou(caja, (10, 160, 110, 60)), 50 / 150)
+
+
+class FaceTrackerTest(SimpleTestCase):
+    """El tracker reutiliza la identidad mientras la confianza no decae"""
+
+    def test_reutiliza_identidad_hasta_que_decae(self):
+        tracker = FaceTracker(iou_minimo=0.4, decaimiento=0.9, confianza_minima=70.0)
+        reconocer, llamadas = _reconocer(7)
+
+        primero = tracker.actualizar('sid', [(10, 110, 110, 10)], {0: 'enc'}, reconocer)
+        self.assertEqual(primero[0]['evento'], 'nuevo')
+        self.assertEqual(tracker.cajas_confiables('sid'), [(10, 110, 110, 10)])
+
+        # La cara se movió un poco: sigue siendo el mismo track, sin encoding
+        segundo = tracker.actualizar('sid', [(12, 112, 112, 12)], {}, reconocer)
+        self.assertEqual(segundo[0]['evento'], 'seguido')
+        self.assertEqual(segundo[0]['track_id'], primero[0]['track_id'])
+        self.assertEqual(llamadas, [1])
+
+        # 90 * 0.9 = 81 -> 72.9 -> 65.6: al tercer frame ya no es confiable
+        tracker.actualizar('sid', [(12, 112, 112, 12)], {}, reconocer)
+        self.assertEqual(tracker.cajas_confiables('sid'), [])
+
+        tercero = tracker.actualizar('sid', [(12, 112, 112, 12)], {0: 'enc'}, reconocer)
+        self.assertEqual(tercero[0]['evento'], 'reidentificado')
+        self.assertEqual(llamadas, [1, 1])
+
+    def test_nueva_cara_y_clientes_independientes(self):
+        tracker = FaceTracker()
+        reconocer, _ = _reconocer(1)
+        a = tracker.actualizar('a', [(0, 100, 100, 0)], {0: 'enc'}, reconocer)
+        b = tracker.actualizar('b', [(0, 100, 100, 0)], {0: 'enc'}, reconocer)
+        self.assertNotEqual(a[0]['track_id'], b[0]['track_id'])
+
+        otra = tracker.actualizar('a', [(0, 100, 100, 0), (0, 400, 100, 300)], {1: 'enc'}, reconocer)
+        self.assertEqual([r['evento'] for r in otra], ['seguido', 'nuevo'])
+
+    def test_cambio_de_identidad_es_evento_nuevo(self):
+        tracker = FaceTracker()
+        tracker.actualizar('a', [(0, 100, 100, 0)], {0: 'enc'}, _reconocer(1)[0])
+        resultado = tracker.actualizar('a', [(0, 100, 100, 0)], {0: 'enc'}, _reconocer(2)[0])
+        self.assertEqual(resultado[0]['evento'], 'nuevo')
+
+    def test_descarta_tracks_perdidos(self):
+        tracker = FaceTracker(frames_maximos_perdido=1)
+        reconocer, _ = _reconocer(1)
+        tracker.actualizar('a', [(0, 100, 100, 0)], {0: 'enc'}, reconocer)
+        tracker.actualizar('a', [], {}, reconocer)
+        tracker.actualizar('a', [], {}, reconocer)
+        resultado = tracker.actualizar('a', [(0, 100, 100, 0)], {0: 'enc'}, reconocer)
+        self.assertEqual(resultado[0]['evento'], 'nuevo')
+
+    def test_cara_que_deja_de_verse_pierde_la_identidad(self):
+        tracker = FaceTracker()
+        tracker.actualizar('a', [(0, 100, 100, 0)], {0: 'enc'}, _reconocer(7)[0])
+        tracker.actualizar('a', [], {}, _reconocer(7)[0])
+        self.assertEqual(tracker.cajas_confiables('a'), [])
+
+        # Otra persona en la misma caja: se codifica y se compara de nuevo
+        resultado = tracker.actualizar('a', [(0, 100, 100, 0)], {0: 'enc'}, _reconocer(8)[0])
+        self.assertEqual((resultado[0]['evento'], resultado[0]['persona']['id']), ('nuevo', 8))
+
+        # Sin encoding no se reutiliza la identidad anterior
+        tracker.actualizar('a', [], {}, _reconocer(8)[0])
+        pendiente = tracker.actualizar('a', [(0, 100, 100, 0)], {}, _reconocer(8)[0])
+        self.assertEqual((pendiente[0]['evento'], pendiente[0]['reconocido']), ('pendiente', False))
+
+    def test_tracks_expiran_por_tiempo(self):
+        ahora = [0.0]
+        tracker = FaceTracker(expiracion_ms=500, reloj=lambda: ahora[0])
+        primero = tracker.actualizar('a', [(0, 100, 100, 0)], {0: 'enc'}, _reconocer(7)[0])
+
+        ahora[0] = 0.4
+        self.assertEqual(tracker.cajas_confiables('a'), [(0, 100, 100, 0)])
+        ahora[0] = 1.0
+        self.assertEqual(tracker.cajas_confiables('a'), [])
+        resultado = tracker.actualizar('a', [(0, 100, 100, 0)], {0: 'enc'}, _reconocer(8)[0])
+        self.assertNotEqual(resultado[0]['track_id'], primero[0]['track_id'])
+        self.assertEqual(resultado[0]['evento'], 'nuevo')
+
+
+@unittest.skipUnless(
+    importlib.util.find_spec('socketio') and importlib.util.find_spec('cv2'),
+    'El servidor WebRTC requiere python-socketio y opencv'
+)
+class ServidorWebRTCTrackerTest(SimpleTestCase):
+    """Un frame sin caras también actualiza los tracks del cliente"""
+
+    def test_frame_vacio_y_nueva_cara_en_la_misma_caja(self):
+        from seguridad import webrtc_server
+
+        servidor = object.__new__(webrtc_server.WebRTCFaceRecognitionServer)
+        servidor.tracker = FaceTracker()
+        servidor.inference_pool = ThreadPoolExecutor(max_workers=1)
+        servidor.galeria = None
+        self.addCleanup(servidor.inference_pool.shutdown)
+
+        class Provider:
+            def __init__(self):
+                self.persona_id = 7
+
+            def reconocer_encodings(self, encodings, galeria):
+                return [
+                    {'reconocido': True, 'persona': {'id': self.persona_id}, 'confianza': 95.0}
+                    for _ in encodings
+                ]
+
+        caja = (0, 100, 100, 0)
+
+        def detectar(imagen, cajas_conocidas, iou_minimo):
+            # Solo se codifican las caras que no siguen a un track confiable
+            if imagen == b'vacio':
+                return [], {}
+            return [caja], ({} if caja in cajas_conocidas else {0: 'enc'})
+
+        provider = Provider()
+        with patch.object(webrtc_server, 'detectar_caras_frame', detectar):
+            primero = asyncio.run(servidor.reconocer_en_pool(provider, b'residente', 'sid'))
+            self.assertEqual(asyncio.run(servidor.reconocer_en_pool(provider, b'vacio', 'sid')), [])
+            provider.persona_id = 8
+            segundo = asyncio.run(servidor.reconocer_en_pool(provider, b'otra', 'sid'))
+
+        self.assertEqual(primero[0]['persona']['id'], 7)
+        self.assertEqual((segundo[0]['evento'], segundo[0]['persona']['id']), ('nuevo', 8))
@@ -0,0 +1,52 @@
+"""
+Tests para el muestreo adaptativo de frames
+"""
+
+import io
+
+import numpy as np
+from django.test import SimpleTestCase
+from PIL import Image
+
+from seguridad.services.frame_sampler import AdaptiveFrameSampler, miniatura
+
+
+def _jpeg(valor, ruido=0, seed=0):
+    rng = np.random.default_rng(seed)
+    pixeles = np.full((240, 320, 3), valor, dtype=np.int16) + rng.integers(-ruido, ruido + 1, size=(240, 320, 3))
+    buffer = io.BytesIO()
+    Image.fromarray(np.clip(pixeles, 0, 255).astype(np.uint8)).save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+class AdaptiveFrameSamplerTest(SimpleTestCase):
+    """Los frames casi idénticos no llegan al detector"""
+
+    def test_miniatura_desde_memoryview(self):
+        reducida = miniatura(memoryview(_jpeg(100)))
+        self.assertEqual(reducida.shape, (32, 32))
+        self.assertIsNone(miniatura(b'no es una imagen'))
+
+    def test_omite_frames_iguales_por_cliente(self):
+        sampler = AdaptiveFrameSampler(umbral=4.0, intervalo_maximo=2.0)
+        self.assertTrue(sampler.debe_procesar('a', _jpeg(100), ahora=0.0))
+        self.assertFalse(sampler.debe_procesar('a', _jpeg(100, ruido=2, seed=1), ahora=0.5))
+        # Otro cliente tiene su propia referencia
+        self.assertTrue(sampler.debe_procesar('b', _jpeg(100), ahora=0.5))
+        # Un cambio real de escena sí se procesa
+        self.assertTrue(sampler.debe_procesar('a', _jpeg(180), ahora=0.6))
+        self.assertEqual(sampler.frames_omitidos, 1)
+
+    def test_procesa_tras_intervalo_maximo(self):
+        sampler = AdaptiveFrameSampler(intervalo_maximo=2.0)
+        self.assertTrue(sampler.debe_procesar('a', _jpeg(100), ahora=0.0))
+        self.assertFalse(sampler.debe_procesar('a', _jpeg(100), ahora=1.0))
+        self.assertTrue(sampler.debe_procesar('a', _jpeg(100), ahora=2.5))
+
+    def test_olvidar_cliente(self):
+        sampler = AdaptiveFrameSampler()
+        sampler.debe_procesar('a', _jpeg(100), ahora=0.0)
+        sampler.guardar_resultado('a', {'reconocido': False})
+        sampler.olvidar('a')
+        self.assertIsNone(sampler.ultimo_resultado('a'))
+        self.assertTrue(sampler.debe_procesar('a', _jpeg(100), ahora=0.1))
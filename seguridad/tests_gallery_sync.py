@@ -0,0 +1,206 @@
+"""
+Tests para la sincronización incremental de galerías mediante señales
+"""
+
+import base64
+import io
+from datetime import timedelta
+
+import numpy as np
+from unittest.mock import patch
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from authz.models import Persona, Usuario
+from seguridad.models import CambioGaleriaFacial, Copropietarios, ReconocimientoFacial
+from seguridad.services.face_gallery import FaceGalleryIndex
+from seguridad.services.gallery_sync import (
+    GALERIA_RESIDENTES,
+    GaleriaSincronizada,
+    cargar_matriz_residentes,
+    cargar_residentes,
+    obtener_galeria_sincronizada,
+    purgar_cambios,
+)
+from seguridad.views import ReconocerTiempoRealView
+
+
+def _vector_base64(valor):
+    return base64.b64encode(np.full(128, valor, dtype=np.float64).tobytes()).decode('utf-8')
+
+
+class GaleriaSincronizadaTest(TestCase):
+    """Los cambios de ReconocimientoFacial llegan a la galería sin recarga completa"""
+
+    def _crear_reconocimiento(self, documento, valor):
+        copropietario = Copropietarios.objects.create(
+            nombres='Ana', apellidos=documento, numero_documento=documento, unidad_residencial='A-101'
+        )
+        return ReconocimientoFacial.objects.create(
+            copropietario=copropietario, proveedor_ia='Local', vector_facial=_vector_base64(valor)
+        )
+
+    def setUp(self):
+        self.primero = self._crear_reconocimiento('DOC1', 0.1)
+        self.sincronizada = GaleriaSincronizada(GALERIA_RESIDENTES, cargar_residentes)
+        self.sincronizada.sincronizar()
+
+    def test_carga_inicial(self):
+        self.assertEqual(self.sincronizada.galeria.total_personas, 1)
+        self.assertIn(self.primero.copropietario_id, self.sincronizada.galeria)
+
+    def test_alta_modificacion_y_baja_por_deltas(self):
+        segundo = self._crear_reconocimiento('DOC2', 0.5)
+        galeria = self.sincronizada.sincronizar()
+        self.assertEqual(galeria.total_personas, 2)
+        ids, _ = galeria.search(np.full(128, 0.5))
+        self.assertEqual(ids[0], segundo.copropietario_id)
+
+        segundo.vector_facial = _vector_base64(0.9)
+        segundo.save()
+        ids, distancias = self.sincronizada.sincronizar().search(np.full(128, 0.9))
+        self.assertEqual(ids[0], segundo.copropietario_id)
+        self.assertAlmostEqual(float(distancias[0]), 0.0, places=3)
+
+        segundo.activo = False
+        segundo.save(update_fields=['activo'])
+        self.assertNotIn(segundo.copropietario_id, self.sincronizada.sincronizar())
+
+        self.primero.delete()
+        self.assertEqual(self.sincronizada.sincronizar().total_personas, 0)
+
+    def test_sin_cambios_no_recarga(self):
+        version = self.sincronizada.version
+        self.primero.intentos_verificacion += 1
+        self.primero.save(update_fields=['intentos_verificacion'])
+        self.sincronizada.sincronizar()
+        self.assertEqual(self.sincronizada.version, version)
+        self.assertEqual(CambioGaleriaFacial.objects.filter(id__gt=version).count(), 0)
+
+    def test_guardar_solo_la_copia_binaria_registra_el_cambio(self):
+        version = self.sincronizada.version
+        self.primero.encodings = np.full((1, 128), 0.3, dtype=np.float32)
+        self.primero.save(update_fields=['encodings'])
+        ids, distancias = self.sincronizada.sincronizar().search(np.full(128, 0.3))
+        self.assertGreater(self.sincronizada.version, version)
+        self.assertAlmostEqual(float(distancias[0]), 0.0, places=3)
+
+    def test_purga_solo_cambios_fuera_del_margen_y_del_intervalo(self):
+        margen = GaleriaSincronizada.MARGEN_VERSION
+        CambioGaleriaFacial.objects.bulk_create([
+            CambioGaleriaFacial(galeria=GALERIA_RESIDENTES, objeto_id=self.primero.copropietario_id)
+            for _ in range(margen + 10)
+        ])
+        ids = list(CambioGaleriaFacial.objects.order_by('id').values_list('id', flat=True))
+        # Los 5 primeros son antiguos; el resto, recientes
+        CambioGaleriaFacial.objects.filter(id__in=ids[:5]).update(fecha=timezone.now() - timedelta(hours=2))
+
+        self.assertEqual(purgar_cambios(3600), 5)
+        self.assertEqual(purgar_cambios(3600), 0)
+        # Lo reciente no se borra aunque esté fuera del margen
+        self.assertEqual(CambioGaleriaFacial.objects.count(), len(ids) - 5)
+
+        CambioGaleriaFacial.objects.update(fecha=timezone.now() - timedelta(hours=2))
+        call_command('purgar_cambios_galeria', stdout=io.StringIO())
+        self.assertEqual(
+            list(CambioGaleriaFacial.objects.values_list('id', flat=True)),
+            [i for i in ids if i >= ids[-1] - margen],
+        )
+
+        # La galería sigue aplicando deltas con la tabla purgada
+        segundo = self._crear_reconocimiento('DOC2', 0.5)
+        self.assertIn(segundo.copropietario_id, self.sincronizada.sincronizar())
+
+
+class ReconocerTiempoRealGaleriaTest(TestCase):
+    """El endpoint de cámara web usa la galería sincronizada del proceso"""
+
+    def test_no_reconstruye_la_galeria_por_frame(self):
+        copropietario = Copropietarios.objects.create(
+            nombres='Ana', apellidos='Paz', numero_documento='DOC9', unidad_residencial='A-101'
+        )
+        ReconocimientoFacial.objects.create(copropietario=copropietario, proveedor_ia='Local',
+                                            vector_facial=_vector_base64(0.3))
+        galerias = []
+
+        def procesar(imagen, galeria):
+            galerias.append(galeria)
+            return []
+
+        vista = ReconocerTiempoRealView.as_view()
+        with patch.dict('seguridad.services.gallery_sync._galerias', clear=True), \
+                patch('seguridad.views.get_face_provider') as proveedor, \
+                patch('seguridad.views.fn_bitacora_log'):
+            proveedor.return_value.procesar_imagen_multiple.side_effect = procesar
+            for _ in range(2):
+                request = APIRequestFactory().post(
+                    '/', {'imagen': SimpleUploadedFile('frame.jpg', b'jpeg')}, format='multipart'
+                )
+                self.assertEqual(vista(request).status_code, 200)
+            compartida = obtener_galeria_sincronizada(GALERIA_RESIDENTES).galeria
+
+        self.assertIs(galerias[0], galerias[1])
+        self.assertIs(galerias[0], compartida)
+        self.assertIn(copropietario.id, compartida)
+
+
+class CargaMatrizResidentesTest(TestCase):
+    """La recarga completa lee las columnas binarias en una sola consulta"""
+
+    def test_matriz_igual_a_la_carga_por_personas(self):
+        persona = Persona.objects.create(nombre='Luis', apellido='Paz', documento_identidad='DOC9')
+        persona.encoding_facial = [[0.7] * 128, [0.8] * 128]
+        persona.reconocimiento_facial_activo = True
+        persona.save()
+        usuario = Usuario.objects.create_user(email='luis@test.com', password='12345678', persona=persona)
+        for documento, valor, usuario_sistema in (('DOC1', 0.1, None), ('DOC2', 0.5, usuario)):
+            copropietario = Copropietarios.objects.create(
+                nombres='Ana', apellidos=documento, numero_documento=documento,
+                unidad_residencial='A-101', usuario_sistema=usuario_sistema,
+            )
+            ReconocimientoFacial.objects.create(
+                copropietario=copropietario, proveedor_ia='Local', vector_facial=_vector_base64(valor)
+            )
+        # Azure guarda un faceId, no un vector: no aporta encodings
+        azure = Copropietarios.objects.create(nombres='Eva', apellidos='Azure', numero_documento='DOC3', unidad_residencial='B-1')
+        ReconocimientoFacial.objects.create(copropietario=azure, proveedor_ia='Microsoft', vector_facial='face-id-123')
+
+        with self.assertNumQueries(1):
+            matriz, ids, datos = cargar_matriz_residentes()
+
+        por_personas = FaceGalleryIndex().cargar_personas(cargar_residentes().values())
+        self.assertEqual(matriz.dtype, np.float32)
+        np.testing.assert_array_equal(ids, por_personas.ids)
+        np.testing.assert_allclose(matriz, por_personas.encodings)
+        self.assertEqual(datos, {p['id']: p for p in por_personas.personas()})
+
+        galeria = FaceGalleryIndex().cargar_matriz(matriz, ids, datos)
+        self.assertEqual(galeria.total_personas, 2)
+        ids_match, _ = galeria.search(np.full(128, 0.8))
+        self.assertEqual(ids_match[0], ids[-1])
+
+    def test_registros_sin_copia_binaria_usan_el_texto(self):
+        persona = Persona.objects.create(nombre='Luis', apellido='Paz', documento_identidad='DOC9')
+        persona.encoding_facial = [[0.7] * 128]
+        persona.reconocimiento_facial_activo = True
+        persona.save()
+        usuario = Usuario.objects.create_user(email='luis@test.com', password='12345678', persona=persona)
+        copropietario = Copropietarios.objects.create(
+            nombres='Ana', apellidos='Paz', numero_documento='DOC1',
+            unidad_residencial='A-101', usuario_sistema=usuario,
+        )
+        ReconocimientoFacial.objects.create(
+            copropietario=copropietario, proveedor_ia='Local', vector_facial=_vector_base64(0.1)
+        )
+        # Registros anteriores a la copia binaria (sin migración de relleno)
+        ReconocimientoFacial.objects.update(encodings=None)
+        Persona.objects.update(encodings=None)
+
+        matriz, ids, _ = cargar_matriz_residentes()
+        self.assertEqual(matriz.shape, (2, 128))
+        np.testing.assert_array_equal(ids, [copropietario.id] * 2)
+        np.testing.assert_allclose(matriz[:, 0], [0.1, 0.7], rtol=1e-6)
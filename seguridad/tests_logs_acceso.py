@@ -0,0 +1,121 @@
+"""
+Tests para la paginación por cursor de los logs de acceso
+"""
+
+import tempfile
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient, APIRequestFactory, APITestCase, force_authenticate
+
+from core.services.archivo_bitacora import archivar
+from seguridad.models import BitacoraAcciones, Copropietarios
+from seguridad.views_actividad import actividad_reciente
+
+URL = '/api/seguridad/acceso/logs/'
+
+
+class LogsAccesoCursorTest(APITestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user(email='guardia@test.com', password='12345678'))
+        ahora = timezone.now()
+        # Pares con la misma hora: el id desempata
+        BitacoraAcciones.objects.bulk_create([
+            BitacoraAcciones(tipo_accion='ACCESS_GRANTED', descripcion=f'acceso {numero}',
+                             fecha_accion=ahora - timedelta(minutes=numero // 2))
+            for numero in range(7)
+        ])
+        BitacoraAcciones.objects.create(tipo_accion='LOGIN', descripcion='fuera del filtro')
+
+    def test_recorre_todas_las_paginas_sin_repetir(self):
+        vistos, url = [], f'{URL}?limit=3'
+        while url:
+            respuesta = self.client.get(url)
+            self.assertEqual(respuesta.status_code, 200)
+            self.assertEqual(respuesta.data['count'], 7)
+            vistos += [item['id'] for item in respuesta.data['results']]
+            url = respuesta.data['next']
+        esperados = list(
+            BitacoraAcciones.objects.filter(tipo_accion='ACCESS_GRANTED')
+            .order_by('-fecha_accion', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(vistos, esperados)
+
+    def test_modos_de_conteo(self):
+        # Exacto por defecto; el estimado solo si se pide
+        exacto = self.client.get(f'{URL}?limit=2').data
+        self.assertEqual(exacto['count'], 7)
+        self.assertFalse(exacto['count_estimado'])
+        estimado = self.client.get(f'{URL}?limit=2&conteo=estimado').data
+        self.assertEqual(estimado['count'], 7)
+        self.assertIsNone(self.client.get(f'{URL}?conteo=ninguno').data['count'])
+
+    def test_cursor_invalido(self):
+        self.assertEqual(self.client.get(f'{URL}?cursor=no-es-un-cursor').status_code, 400)
+
+    def test_una_consulta_por_tipo_con_su_indice(self):
+        BitacoraAcciones.objects.create(tipo_accion='ACCESS_DENIED', descripcion='denegado')
+        primera = self.client.get(f'{URL}?limit=3&conteo=ninguno')
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.get(primera.data['next'] + '&conteo=ninguno')
+        paginas = [c['sql'] for c in consultas if 'FROM "bitacora_acciones"' in c['sql'] and 'ORDER BY' in c['sql']]
+        self.assertEqual(len(paginas), len(BitacoraAcciones.TIPOS_ACCESO))
+
+        for sql in paginas:
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                plan = ' '.join(str(fila[-1]) for fila in cursor.fetchall())
+            self.assertIn('bitacora_ac_tipo_ac_aa3cf2_idx', plan)
+            # El índice ya da el orden: no se ordenan las filas en memoria
+            self.assertNotIn('TEMP B-TREE', plan)
+
+        # La mezcla conserva el orden global entre tipos
+        vistos, url = [], f'{URL}?limit=3&conteo=ninguno'
+        while url:
+            respuesta = self.client.get(url)
+            vistos += [item['id'] for item in respuesta.data['results']]
+            url = respuesta.data['next']
+        esperados = list(
+            BitacoraAcciones.objects.filter(tipo_accion__in=BitacoraAcciones.TIPOS_ACCESO)
+            .order_by('-fecha_accion', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(vistos, esperados)
+
+    def test_incluye_los_registros_archivados(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        copropietario = Copropietarios.objects.create(
+            nombres='Ana', apellidos='Rojas', numero_documento='123', unidad_residencial='Torre A'
+        )
+        hace_un_anio = timezone.now() - timedelta(days=365)
+        for numero, tipo in enumerate(['ACCESS_DENIED', 'LOGIN', 'ACCESS_DENIED']):
+            BitacoraAcciones.objects.create(
+                tipo_accion=tipo, descripcion=f'archivado {numero}', copropietario=copropietario,
+                fecha_accion=hace_un_anio - timedelta(minutes=numero)
+            )
+
+        with override_settings(BITACORA_ARCHIVO_DIR=directorio.name):
+            self.assertEqual(archivar('seguridad_bitacora', dias=90), 3)
+
+            vistos, url = [], f'{URL}?limit=4&conteo=exacto'
+            while url:
+                respuesta = self.client.get(url)
+                self.assertEqual(respuesta.data['count'], 9)
+                vistos += respuesta.data['results']
+                url = respuesta.data['next']
+            self.assertEqual([item['descripcion'] for item in vistos[-2:]], ['archivado 0', 'archivado 2'])
+            self.assertEqual(vistos[-1]['nombre_completo'], copropietario.nombre_completo)
+
+            filtrado = self.client.get(f'{URL}?usuario=rojas').data
+            self.assertEqual(filtrado['count'], 2)
+
+            request = APIRequestFactory().get('/?limit=20')
+            force_authenticate(request, user=get_user_model().objects.get())
+            recientes = actividad_reciente(request).data
+            self.assertEqual(len(recientes), 9)
@@ -0,0 +1,70 @@
+"""
+Tests para el registro de proveedores compartidos por proceso
+"""
+
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import numpy as np
+from django.test import SimpleTestCase
+from django.utils import timezone
+
+from core.services import ai_training_service, artefactos_modelo
+from core.services.clasificador_prototipos import ClasificadorPrototipos
+from seguridad.services import provider_registry
+from seguridad.services.realtime_face_provider import RealTimeFaceProviderFactory, get_face_provider
+
+
+class ProviderRegistryTest(SimpleTestCase):
+
+    def setUp(self):
+        provider_registry.limpiar()
+        self.addCleanup(provider_registry.limpiar)
+        # AITrainingService crea su directorio de modelos al construirse
+        self.directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directorio.cleanup)
+        directorio_actual = os.getcwd()
+        os.chdir(self.directorio.name)
+        self.addCleanup(os.chdir, directorio_actual)
+
+    def test_una_instancia_por_proceso(self):
+        provider = get_face_provider()
+        self.assertIs(provider, get_face_provider())
+        self.assertIs(provider, RealTimeFaceProviderFactory.create_provider())
+        self.assertIs(provider_registry.obtener_provider_local(), provider_registry.obtener_provider_local())
+
+        provider_registry.limpiar()
+        self.assertIsNot(provider, get_face_provider())
+
+    def test_construccion_concurrente_crea_una_sola(self):
+        construidos = []
+
+        def fabrica():
+            construidos.append(object())
+            return construidos[-1]
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            instancias = list(pool.map(lambda _: provider_registry._obtener('prueba', fabrica), range(64)))
+
+        self.assertEqual(len(construidos), 1)
+        self.assertTrue(all(instancia is construidos[0] for instancia in instancias))
+
+    def test_calentar_carga_el_modelo_vigente(self):
+        clasificador = ClasificadorPrototipos().fit(np.vstack([np.zeros((2, 128)), np.ones((2, 128))]), [1, 1, 2, 2])
+        version = artefactos_modelo.publicar_version(
+            os.path.abspath('ai_models'), clasificador, {1: 'Ana', 2: 'Luis'}, timezone.now(), 0.9
+        )
+
+        with patch('seguridad.services.realtime_face_provider.FACE_RECOGNITION_AVAILABLE', False):
+            resultado = provider_registry.calentar()
+
+        self.assertFalse(resultado['inferencia'])
+        self.assertEqual(resultado['modelo'], version)
+
+        # La instancia compartida predice con el modelo vigente sin recargarlo
+        servicio = provider_registry.obtener_servicio_entrenamiento()
+        with patch.object(ai_training_service, 'np', np):
+            prediccion = servicio.predecir_con_modelo_entrenado(np.ones(128))
+        self.assertEqual(prediccion['persona_id'], 2)
@@ -0,0 +1,82 @@
+"""
+Tests para los contadores pre-agregados de la bitácora
+"""
+
+import tempfile
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from core.services.archivo_bitacora import archivar
+from seguridad.models import BitacoraAcciones, Copropietarios, ResumenBitacora, fn_bitacora_log
+from seguridad.services import bitacora_buffer
+from seguridad.services.resumen_bitacora import contadores_recientes, reconstruir
+
+
+class ResumenBitacoraTest(TestCase):
+
+    def setUp(self):
+        self.copropietario = Copropietarios.objects.create(
+            nombres='Ana', apellidos='Rojas', numero_documento='123', unidad_residencial='A-1'
+        )
+
+    def _registrar(self):
+        fn_bitacora_log('ACCESS_GRANTED', 'puerta', copropietario=self.copropietario, resultado_match=True)
+        fn_bitacora_log('VERIFY_FACE', 'frame', copropietario=self.copropietario, resultado_match=False)
+        fn_bitacora_log('ACCESS_DENIED', 'puerta')
+        # Inserción por lotes del escritor de bitácora
+        bitacora_buffer.insertar_registros([
+            {'tipo_accion': 'ACCESS_DENIED', 'descripcion': 'lote', 'fecha_accion': timezone.now()},
+            {'tipo_accion': 'LOGIN', 'descripcion': 'lote', 'fecha_accion': timezone.now()},
+        ])
+
+    def test_contadores_coinciden_con_la_bitacora(self):
+        self._registrar()
+        self.assertEqual(contadores_recientes(), {
+            'eventos_hoy': 5,
+            'accesos_hoy': 2,
+            'accesos_exitosos': 1,
+            'intentos_fallidos': 2,
+            'denegados_24h': 2,
+            'usuarios_unicos': 1,
+        })
+
+    def test_compactar_y_reconstruir(self):
+        self._registrar()
+        esperado = contadores_recientes()
+        BitacoraAcciones.objects.create(
+            tipo_accion='LOGIN', descripcion='antiguo', fecha_accion=timezone.now() - timedelta(days=30)
+        )
+
+        call_command('compactar_resumen_bitacora', stdout=open('/dev/null', 'w'))
+        self.assertEqual(ResumenBitacora.objects.get(granularidad='dia').total, 1)
+        self.assertEqual(contadores_recientes(), esperado)
+
+        # El registro antiguo ya está archivado: la reconstrucción también lo cuenta
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        with self.settings(BITACORA_ARCHIVO_DIR=directorio.name):
+            self.assertEqual(archivar('seguridad_bitacora', dias=7), 1)
+            ResumenBitacora.objects.all().delete()
+            self.assertEqual(reconstruir(), 6)
+        self.assertEqual(contadores_recientes(), esperado)
+        self.assertEqual(ResumenBitacora.objects.get(granularidad='dia').total, 1)
+
+    def test_dashboard_lee_los_contadores_con_cache(self):
+        from django.contrib.auth import get_user_model
+        from rest_framework.test import APIClient
+
+        cache.clear()
+        self.addCleanup(cache.clear)
+        cliente = APIClient()
+        cliente.force_authenticate(get_user_model().objects.create_user(email='guardia@test.com', password='12345678'))
+        self._registrar()
+
+        with self.assertNumQueries(5):
+            datos = cliente.get('/api/seguridad/dashboard/').data
+        self.assertEqual((datos['accesos_hoy'], datos['intentos_fallidos']), (2, 2))
+        with self.assertNumQueries(0):
+            cliente.get('/api/seguridad/dashboard/')
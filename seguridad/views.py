@@ -5,6 +5,9 @@ Face Recognition API Views
 import json
 import logging
 from typing import Dict, Any, cast
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef, Prefetch
 from django.utils import timezone
 from rest_framework import status
 from rest_framework.views import APIView
@@ -141,10 +144,7 @@ class FaceEnrollView(APIView):
             imagen_bytes = imagen.read()
             
             # Crear proveedor de reconocimiento facial
-            if FaceProviderFactory:
-                face_provider = FaceProviderFactory.create_provider()
-            else:
-                face_provider = OpenCVFaceProvider()
+            face_provider = get_face_provider()
             
             # Enrolar rostro
             try:
@@ -375,7 +375,7 @@ class FaceVerifyView(APIView):
             imagen_bytes = imagen.read()
             
             # Crear proveedor de reconocimiento facial
-            face_provider = FaceProviderFactory.create_provider()
+            face_provider = get_face_provider()
             
             # Verificar rostro
             try:
@@ -691,8 +691,12 @@ class ListarUsuariosReconocimientoFacialView(APIView):
     def get(self, request):
         """Listar usuarios con reconocimiento facial"""
         try:
-            # Obtener todos los copropietarios activos
-            copropietarios = Copropietarios.objects.filter(activo=True).order_by('unidad_residencial')
+            # Copropietarios activos con su reconocimiento y usuario en una sola consulta
+            copropietarios = Copropietarios.objects.filter(activo=True).select_related(
+                'usuario_sistema__persona', 'reconocimiento_facial'
+            ).defer(
+                'reconocimiento_facial__vector_facial', 'reconocimiento_facial__encodings'
+            ).order_by('unidad_residencial')
             
             datos = []
             estadisticas = {
@@ -704,13 +708,12 @@ class ListarUsuariosReconocimientoFacialView(APIView):
             }
             
             for coprop in copropietarios:
-                # Obtener fotos de reconocimiento
-                fotos_reconocimiento = ReconocimientoFacial.objects.filter(
-                    copropietario=coprop
-                ).order_by('-fecha_enrolamiento')
+                # Reconocimiento cargado con select_related (uno por copropietario)
+                reconocimiento = getattr(coprop, 'reconocimiento_facial', None)
+                fotos_reconocimiento = [reconocimiento] if reconocimiento else []
                 
                 # Solo incluir si tiene fotos
-                if fotos_reconocimiento.exists():
+                if fotos_reconocimiento:
                     # ACTUALIZADO: Obtener TODAS las fotos sincronizadas de Dropbox
                     fotos_urls = []
                     for foto in fotos_reconocimiento:
@@ -735,7 +738,7 @@ class ListarUsuariosReconocimientoFacialView(APIView):
                         foto_perfil_url = usuario_sistema.persona.foto_perfil_url
                     
                     # Obtener fechas de forma segura
-                    primera_foto = fotos_reconocimiento.first()
+                    primera_foto = fotos_reconocimiento[0]
                     fecha_ultimo_enrolamiento = None
                     ultima_verificacion = None
                     
@@ -850,17 +853,11 @@ class DashboardSeguridadView(APIView):
                     'error': 'No tiene permisos para acceder al dashboard de seguridad'
                 }, status=status.HTTP_403_FORBIDDEN)
             
-            # Obtener estadísticas
-            from authz.models import Usuario
-            
-            usuarios_activos = Usuario.objects.filter(is_active=True).count()
-            usuarios_con_reconocimiento = ReconocimientoFacial.objects.values('copropietario').distinct().count()
-            
-            # Estadísticas simuladas para incidentes, visitas y alertas
-            # TODO: Implementar con modelos reales cuando estén disponibles
-            incidentes_hoy = 0
-            visitas_activas = 0  
-            alertas_pendientes = 0
+            # Estadísticas (cache corta: el dashboard se refresca seguido)
+            estadisticas = cache.get_or_set(
+                'seguridad:dashboard', self._calcular_estadisticas,
+                getattr(settings, 'DASHBOARD_SEGURIDAD_CACHE_SEGUNDOS', 15)
+            )
             
             # Actividad reciente simulada
             actividad_reciente = [
@@ -875,13 +872,7 @@ class DashboardSeguridadView(APIView):
             return Response({
                 'success': True,
                 'data': {
-                    'estadisticas': {
-                        'usuarios_activos': usuarios_activos,
-                        'usuarios_con_reconocimiento': usuarios_con_reconocimiento,
-                        'incidentes_hoy': incidentes_hoy,
-                        'visitas_activas': visitas_activas,
-                        'alertas_pendientes': alertas_pendientes
-                    },
+                    'estadisticas': estadisticas,
                     'actividad_reciente': actividad_reciente
                 }
             }, status=status.HTTP_200_OK)
@@ -893,6 +884,24 @@ class DashboardSeguridadView(APIView):
                 'message': f'Error obteniendo datos del dashboard: {str(e)}'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
+    def _calcular_estadisticas(self):
+        """
+        Conteos del dashboard
+
+        ``incidentes_hoy`` cuenta los accesos fallidos de hoy (contadores de la
+        bitácora), ya no un valor simulado; visitas y alertas siguen en 0.
+        """
+        from authz.models import Usuario
+        from seguridad.services.resumen_bitacora import contadores_recientes
+        
+        return {
+            'usuarios_activos': Usuario.objects.filter(is_active=True).count(),
+            'usuarios_con_reconocimiento': ReconocimientoFacial.objects.values('copropietario').distinct().count(),
+            'incidentes_hoy': contadores_recientes()['intentos_fallidos'],
+            'visitas_activas': 0,
+            'alertas_pendientes': 0
+        }
+    
     def _verificar_permisos_seguridad(self, user):
         """Verificar si el usuario tiene permisos de seguridad"""
         try:
@@ -1178,24 +1187,19 @@ class ListaUsuariosActivosView(APIView):
             
             from authz.models import Usuario
             
-            # Obtener todos los usuarios activos
-            usuarios = Usuario.objects.filter(is_active=True).select_related('persona').prefetch_related('roles')
+            # Obtener todos los usuarios activos; el reconocimiento se resuelve como subconsulta
+            usuarios = Usuario.objects.filter(is_active=True).select_related('persona').prefetch_related(
+                'roles'
+            ).annotate(
+                copropietario_con_reconocimiento=Exists(
+                    ReconocimientoFacial.objects.filter(copropietario__email=OuterRef('email'))
+                )
+            )
             
             datos = []
             for usuario in usuarios:
                 # Verificar si tiene reconocimiento facial
-                tiene_reconocimiento = False
-                if usuario.persona:
-                    try:
-                        copropietario = Copropietarios.objects.filter(
-                            email=usuario.email
-                        ).first()
-                        if copropietario:
-                            tiene_reconocimiento = ReconocimientoFacial.objects.filter(
-                                copropietario=copropietario
-                            ).exists()
-                    except:
-                        pass
+                tiene_reconocimiento = bool(usuario.persona and usuario.copropietario_con_reconocimiento)
                 
                 # Obtener roles
                 roles = [rol.nombre for rol in usuario.roles.all()]
@@ -1321,11 +1325,18 @@ class PropietariosConReconocimientoView(APIView):
                 tipo_residente='Propietario'
             ).count()
             
-            # Obtener propietarios con reconocimiento facial
+            # Obtener propietarios con su reconocimiento activo (una consulta para todos)
             propietarios_con_reconocimiento = Copropietarios.objects.filter(
                 activo=True,
-                tipo_residente='Propietario'
-            ).prefetch_related('reconocimiento_facial').order_by('unidad_residencial', 'apellidos')
+                tipo_residente='Propietario',
+                reconocimiento_facial__activo=True
+            ).select_related('usuario_sistema__persona').prefetch_related(
+                Prefetch(
+                    'reconocimiento_facial',
+                    queryset=ReconocimientoFacial.objects.filter(activo=True).defer('vector_facial', 'encodings'),
+                    to_attr='reconocimiento_activo'
+                )
+            ).order_by('unidad_residencial', 'apellidos')
             
             datos_propietarios = []
             propietarios_con_fotos = 0
@@ -1333,13 +1344,10 @@ class PropietariosConReconocimientoView(APIView):
             
             for propietario in propietarios_con_reconocimiento:
                 # Verificar si tiene fotos de reconocimiento
-                fotos_reconocimiento = ReconocimientoFacial.objects.filter(
-                    copropietario=propietario,
-                    activo=True
-                )
+                fotos_reconocimiento = [propietario.reconocimiento_activo] if propietario.reconocimiento_activo else []
                 
                 # Solo incluir si tiene fotos
-                if fotos_reconocimiento.exists():
+                if fotos_reconocimiento:
                     # Recopilar todas las URLs de fotos
                     fotos_urls = []
                     fecha_registro = None
@@ -1481,31 +1489,22 @@ class ReconocerTiempoRealView(APIView):
             imagen = request.FILES['imagen']
             imagen_bytes = imagen.read()
             
-            # Usar el proveedor de reconocimiento existente
-            try:
-                from .services.realtime_face_provider import OpenCVFaceProvider
-            except ImportError:
-                from .services.robust_face_provider import OpenCVFaceProvider
-            
-            provider = OpenCVFaceProvider()
+            # Usar el proveedor de reconocimiento compartido del proceso
+            from .services.gallery_sync import GALERIA_RESIDENTES, obtener_galeria_sincronizada
             
-            # Obtener todas las personas con reconocimiento facial de la BD
-            personas_bd = []
-            reconocimientos = ReconocimientoFacial.objects.filter(activo=True).select_related('copropietario')
+            provider = get_face_provider()
             
-            for reconocimiento in reconocimientos:
-                personas_bd.append({
-                    'persona': reconocimiento.copropietario,
-                    'reconocimiento': reconocimiento
-                })
+            # Galería de residentes del proceso, al día por deltas (sin reconstruirla por frame)
+            galeria = obtener_galeria_sincronizada(GALERIA_RESIDENTES).sincronizar()
             
             # Procesar reconocimiento
-            resultados = provider.procesar_imagen_multiple(imagen_bytes, personas_bd)
+            resultados = provider.procesar_imagen_multiple(imagen_bytes, galeria)
+            reconocidos = [r for r in resultados if r.get('reconocido')]
             
-            if resultados and len(resultados) > 0:
+            if reconocidos:
                 # Persona reconocida
-                resultado = resultados[0]  # Tomar el mejor match
-                persona = resultado['persona']
+                resultado = max(reconocidos, key=lambda r: r['confianza'])  # Tomar el mejor match
+                persona = Copropietarios.objects.get(id=resultado['persona']['id'])
                 
                 # Registrar en bitácora
                 fn_bitacora_log(
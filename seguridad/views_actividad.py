@@ -1,18 +1,23 @@
 # seguridad/views_actividad.py - Endpoints para el panel de actividades de seguridad
+from django.conf import settings
+from django.core.cache import cache
 from django.http import JsonResponse
 from django.utils import timezone
-from django.db.models import Q, Count
-from django.core.paginator import Paginator
+from django.db.models import Q, prefetch_related_objects
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from datetime import datetime, timedelta
+from itertools import islice
 import logging
 
 from .models import Copropietarios, ReconocimientoFacial, BitacoraAcciones
+from .services.paginacion_cursor import CursorInvalido, codificar_cursor, contar, decodificar_cursor
+from .services.resumen_bitacora import contadores_recientes
 from core.models.seguridad_ia import LecturaPlacaOCR
 from core.models.propiedades_residentes import Visita
+from core.services.archivo_bitacora import contar as contar_archivo, contar_por, iterar
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
@@ -20,6 +25,47 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger('seguridad.actividad')
 
+# Registros máximos por página de logs de acceso
+MAX_LIMITE_LOGS = 200
+
+CACHE_DASHBOARD_ESTADISTICAS = 'seguridad:dashboard_estadisticas'
+
+
+def _fecha_consulta(valor):
+    fecha = datetime.fromisoformat(valor.replace('Z', '+00:00'))
+    return timezone.make_aware(fecha) if timezone.is_naive(fecha) else fecha
+
+
+def _coincide_usuario(texto):
+    """Filtro por nombre del copropietario o email del usuario para registros archivados"""
+    from django.contrib.auth import get_user_model
+
+    copropietarios = set(Copropietarios.objects.filter(
+        Q(nombres__icontains=texto) | Q(apellidos__icontains=texto)
+    ).values_list('id', flat=True))
+    usuarios = set(get_user_model().objects.filter(email__icontains=texto).values_list('id', flat=True))
+    return lambda b: b.copropietario_id in copropietarios or b.usuario_id in usuarios
+
+
+def _cargar_relaciones(bitacoras):
+    """Los registros archivados no traen select_related: se cargan en bloque"""
+    archivados = [b for b in bitacoras if b._state.db is None]
+    if archivados:
+        prefetch_related_objects(archivados, 'copropietario', 'usuario')
+
+
+def _contar_logs(conteo, queryset, desde, hasta, incluir):
+    """El exacto incluye los registros archivados del rango; el estimado, solo la tabla"""
+    if conteo == 'exacto':
+        total = contar_archivo('seguridad_bitacora', desde, hasta, queryset=queryset, incluir=incluir)
+        return {'count': total, 'count_estimado': False}
+    if desde:
+        queryset = queryset.filter(fecha_accion__gte=desde)
+    if hasta:
+        queryset = queryset.filter(fecha_accion__lt=hasta)
+    return contar(queryset, conteo if conteo == 'ninguno' else 'estimado')
+
+
 # ===================================================
 # ENDPOINTS PARA LOGS DE ACCESO Y ACTIVIDAD
 # ===================================================
@@ -30,31 +76,39 @@ def logs_acceso(request):
     """
     Endpoint principal para logs de acceso al condominio
     GET /api/authz/seguridad/acceso/logs/
+
+    Paginado por cursor: ``next`` trae la URL de la página siguiente
+    (``?cursor=...``). ``conteo`` = exacto (por defecto), estimado o ninguno.
+    Incluye los registros ya archivados (``core.services.archivo_bitacora``).
     """
     try:
         # Parámetros de consulta
-        limit = int(request.GET.get('limit', 50))
+        limit = min(max(int(request.GET.get('limit', 50)), 1), MAX_LIMITE_LOGS)
+        cursor = request.GET.get('cursor')
+        conteo = request.GET.get('conteo', 'exacto')
         fecha_desde = request.GET.get('fecha_desde')
         fecha_hasta = request.GET.get('fecha_hasta')
         usuario = request.GET.get('usuario')
         
-        # Construir consulta base - obtener acciones de verificación facial
+        # Construir consulta base - obtener acciones de verificación facial.
+        # Los filtros se aplican a la tabla (queryset) y al archivo (incluir)
         queryset = BitacoraAcciones.objects.filter(
-            tipo_accion__in=['VERIFY_FACE', 'ACCESS_GRANTED', 'ACCESS_DENIED']
+            tipo_accion__in=BitacoraAcciones.TIPOS_ACCESO
         ).select_related('copropietario', 'usuario')
+        condiciones = [lambda b: b.tipo_accion in BitacoraAcciones.TIPOS_ACCESO]
+        desde = hasta = None
         
         # Aplicar filtros
         if fecha_desde:
             try:
-                fecha_desde_dt = datetime.fromisoformat(fecha_desde.replace('Z', '+00:00'))
-                queryset = queryset.filter(fecha_accion__gte=fecha_desde_dt)
+                desde = _fecha_consulta(fecha_desde)
             except ValueError:
                 pass
                 
         if fecha_hasta:
             try:
-                fecha_hasta_dt = datetime.fromisoformat(fecha_hasta.replace('Z', '+00:00'))
-                queryset = queryset.filter(fecha_accion__lte=fecha_hasta_dt)
+                # fecha_hasta es inclusiva
+                hasta = _fecha_consulta(fecha_hasta) + timedelta(microseconds=1)
             except ValueError:
                 pass
                 
@@ -64,17 +118,29 @@ def logs_acceso(request):
                 Q(copropietario__apellidos__icontains=usuario) |
                 Q(usuario__email__icontains=usuario)
             )
+            condiciones.append(_coincide_usuario(usuario))
         
-        # Ordenar por fecha descendente
-        queryset = queryset.order_by('-fecha_accion')
+        def incluir(bitacora):
+            return all(condicion(bitacora) for condicion in condiciones)
         
-        # Paginar
-        paginator = Paginator(queryset, limit)
-        page = paginator.get_page(1)
+        # Página por (fecha_accion, id) descendente, de la tabla y del archivo
+        try:
+            antes = decodificar_cursor(cursor) if cursor else None
+        except CursorInvalido as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        pagina = list(islice(iterar(
+            'seguridad_bitacora', desde, hasta, antes, queryset=queryset, incluir=incluir,
+            dividir_por=('tipo_accion', BitacoraAcciones.TIPOS_ACCESO),
+        ), limit + 1))
+        siguiente = None
+        if len(pagina) > limit:
+            pagina = pagina[:limit]
+            siguiente = codificar_cursor(pagina[-1].fecha_accion, pagina[-1].pk)
+        _cargar_relaciones(pagina)
         
         # Formatear resultados
         results = []
-        for bitacora in page.object_list:
+        for bitacora in pagina:
             # Determinar datos del usuario
             if bitacora.copropietario:
                 usuario_nombre = bitacora.copropietario.nombre_completo
@@ -142,10 +208,16 @@ def logs_acceso(request):
             }
             results.append(result_item)
         
+        next_url = None
+        if siguiente:
+            parametros = request.GET.copy()
+            parametros['cursor'] = siguiente
+            next_url = request.build_absolute_uri(f"{request.path}?{parametros.urlencode()}")
+        
         response_data = {
             'results': results,
-            'count': paginator.count,
-            'next': None,
+            **_contar_logs(conteo, queryset, desde, hasta, incluir),
+            'next': next_url,
             'previous': None
         }
         
@@ -170,10 +242,15 @@ def actividad_reciente(request):
     try:
         limit = int(request.GET.get('limit', 20))
         
-        # Obtener las acciones más recientes
-        bitacoras = BitacoraAcciones.objects.filter(
-            tipo_accion__in=['VERIFY_FACE', 'ACCESS_GRANTED', 'ACCESS_DENIED', 'ENROLL_FACE']
-        ).select_related('copropietario', 'usuario').order_by('-fecha_accion')[:limit]
+        # Obtener las acciones más recientes (también del archivo)
+        tipos = ['VERIFY_FACE', 'ACCESS_GRANTED', 'ACCESS_DENIED', 'ENROLL_FACE']
+        bitacoras = list(islice(iterar(
+            'seguridad_bitacora',
+            queryset=BitacoraAcciones.objects.select_related('copropietario', 'usuario'),
+            incluir=lambda b: b.tipo_accion in tipos,
+            dividir_por=('tipo_accion', tipos),
+        ), max(limit, 0)))
+        _cargar_relaciones(bitacoras)
         
         results = []
         for bitacora in bitacoras:
@@ -215,24 +292,20 @@ def incidentes_seguridad(request):
     GET /api/authz/seguridad/incidentes/
     """
     try:
-        # Obtener intentos fallidos recientes
-        intentos_fallidos = BitacoraAcciones.objects.filter(
-            tipo_accion='ACCESS_DENIED',
-            fecha_accion__gte=timezone.now() - timedelta(days=7)
-        ).select_related('copropietario')
-        
         # Agrupar por IP o usuario para detectar intentos repetidos
         incidentes = []
         
         # Buscar intentos repetidos en las últimas 24 horas
-        intentos_24h = BitacoraAcciones.objects.filter(
-            tipo_accion='ACCESS_DENIED',
-            fecha_accion__gte=timezone.now() - timedelta(hours=24)
-        ).values('direccion_ip').annotate(intentos=Count('id')).filter(intentos__gte=3)
-        
-        for intento in intentos_24h:
-            ip = intento['direccion_ip'] or 'IP desconocida'
-            cantidad = intento['intentos']
+        intentos_por_ip = contar_por(
+            'seguridad_bitacora', 'direccion_ip',
+            desde=timezone.now() - timedelta(hours=24),
+            queryset=BitacoraAcciones.objects.filter(tipo_accion='ACCESS_DENIED'),
+            incluir=lambda b: b.tipo_accion == 'ACCESS_DENIED',
+        )
+        intentos_24h = [(ip, cantidad) for ip, cantidad in intentos_por_ip.items() if cantidad >= 3]
+        
+        for ip, cantidad in intentos_24h:
+            ip = ip or 'IP desconocida'
             
             incidente = {
                 'id': len(incidentes) + 1,
@@ -251,11 +324,12 @@ def incidentes_seguridad(request):
             incidentes.append(incidente)
         
         # Buscar usuarios no reconocidos (baja confianza)
-        baja_confianza = BitacoraAcciones.objects.filter(
-            tipo_accion='VERIFY_FACE',
-            confianza__lt=50.0,
-            fecha_accion__gte=timezone.now() - timedelta(days=1)
-        ).count()
+        baja_confianza = contar_archivo(
+            'seguridad_bitacora',
+            desde=timezone.now() - timedelta(days=1),
+            queryset=BitacoraAcciones.objects.filter(tipo_accion='VERIFY_FACE', confianza__lt=50.0),
+            incluir=lambda b: b.tipo_accion == 'VERIFY_FACE' and b.confianza is not None and b.confianza < 50.0,
+        )
         
         if baja_confianza > 0:
             incidente = {
@@ -289,6 +363,41 @@ def incidentes_seguridad(request):
 # ENDPOINT PARA ESTADÍSTICAS DEL DASHBOARD
 # ===================================================
 
+def _calcular_estadisticas_dashboard():
+    """Conteos del dashboard: los de bitácora salen de los contadores por hora"""
+    total_usuarios = Copropietarios.objects.filter(activo=True).count()
+    usuarios_con_fotos = ReconocimientoFacial.objects.filter(activo=True).count()
+    contadores = contadores_recientes()
+    
+    # Visitas activas (si tienes el modelo)
+    try:
+        inicio_hoy = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+        visitas_activas = Visita.objects.filter(
+            estado='en_curso',
+            fecha_hora_llegada__gte=inicio_hoy,
+            fecha_hora_llegada__lt=inicio_hoy + timedelta(days=1)
+        ).count()
+    except:
+        visitas_activas = 0
+    
+    # Porcentaje de enrolamiento
+    porcentaje_enrolamiento = (usuarios_con_fotos / total_usuarios * 100) if total_usuarios > 0 else 0
+    
+    return {
+        'total_usuarios': total_usuarios,
+        'usuarios_con_fotos': usuarios_con_fotos,
+        'total_fotos': usuarios_con_fotos,  # Una foto por usuario por ahora
+        'accesos_hoy': contadores['accesos_hoy'],
+        'incidentes_abiertos': min(contadores['denegados_24h'], 10),  # Limitar para no alarmar
+        'visitas_activas': visitas_activas,
+        'porcentaje_enrolamiento': round(porcentaje_enrolamiento, 1),
+        'eventos_hoy': contadores['eventos_hoy'],
+        'accesos_exitosos': contadores['accesos_exitosos'],
+        'intentos_fallidos': contadores['intentos_fallidos'],
+        'usuarios_unicos': contadores['usuarios_unicos']
+    }
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def dashboard_estadisticas(request):
@@ -297,69 +406,10 @@ def dashboard_estadisticas(request):
     GET /api/authz/seguridad/dashboard/
     """
     try:
-        # Estadísticas básicas
-        total_usuarios = Copropietarios.objects.filter(activo=True).count()
-        usuarios_con_fotos = ReconocimientoFacial.objects.filter(activo=True).count()
-        total_fotos = ReconocimientoFacial.objects.filter(activo=True).count()  # Una foto por usuario por ahora
-        
-        # Estadísticas de hoy
-        hoy = timezone.now().date()
-        accesos_hoy = BitacoraAcciones.objects.filter(
-            tipo_accion__in=['VERIFY_FACE', 'ACCESS_GRANTED'],
-            fecha_accion__date=hoy
-        ).count()
-        
-        eventos_hoy = BitacoraAcciones.objects.filter(fecha_accion__date=hoy).count()
-        
-        # Accesos exitosos vs fallidos
-        accesos_exitosos = BitacoraAcciones.objects.filter(
-            tipo_accion__in=['ACCESS_GRANTED', 'VERIFY_FACE'],
-            resultado_match=True,
-            fecha_accion__date=hoy
-        ).count()
-        
-        intentos_fallidos = BitacoraAcciones.objects.filter(
-            tipo_accion='ACCESS_DENIED',
-            fecha_accion__date=hoy
-        ).count()
-        
-        # Usuarios únicos hoy
-        usuarios_unicos = BitacoraAcciones.objects.filter(
-            fecha_accion__date=hoy,
-            copropietario__isnull=False
-        ).values('copropietario').distinct().count()
-        
-        # Incidentes abiertos (simulado)
-        incidentes_abiertos = BitacoraAcciones.objects.filter(
-            tipo_accion='ACCESS_DENIED',
-            fecha_accion__gte=timezone.now() - timedelta(hours=24)
-        ).count()
-        
-        # Visitas activas (si tienes el modelo)
-        try:
-            visitas_activas = Visita.objects.filter(
-                estado='en_curso',
-                fecha_hora_llegada__date=hoy
-            ).count()
-        except:
-            visitas_activas = 0
-        
-        # Porcentaje de enrolamiento
-        porcentaje_enrolamiento = (usuarios_con_fotos / total_usuarios * 100) if total_usuarios > 0 else 0
-        
-        estadisticas = {
-            'total_usuarios': total_usuarios,
-            'usuarios_con_fotos': usuarios_con_fotos,
-            'total_fotos': total_fotos,
-            'accesos_hoy': accesos_hoy,
-            'incidentes_abiertos': min(incidentes_abiertos, 10),  # Limitar para no alarmar
-            'visitas_activas': visitas_activas,
-            'porcentaje_enrolamiento': round(porcentaje_enrolamiento, 1),
-            'eventos_hoy': eventos_hoy,
-            'accesos_exitosos': accesos_exitosos,
-            'intentos_fallidos': intentos_fallidos,
-            'usuarios_unicos': usuarios_unicos
-        }
+        estadisticas = cache.get_or_set(
+            CACHE_DASHBOARD_ESTADISTICAS, _calcular_estadisticas_dashboard,
+            getattr(settings, 'DASHBOARD_SEGURIDAD_CACHE_SEGUNDOS', 15)
+        )
         
         logger.info(f"📈 Estadísticas dashboard generadas: {estadisticas}")
         return Response(estadisticas, status=status.HTTP_200_OK)
@@ -17,6 +17,7 @@ except ImportError as e:
     logger.warning(f"⚠️ AITrainingService no disponible: {e} - funciones deshabilitadas")
 
 from .models import fn_bitacora_log
+from .services.provider_registry import obtener_provider_tiempo_real, obtener_servicio_entrenamiento
 
 logger = logging.getLogger('ai_training')
 
@@ -45,7 +46,7 @@ def entrenar_ia_automatico(request):
                 'error': 'Servicio de AI Training no disponible'
             }, status=503)
             
-        training_service = AITrainingService()
+        training_service = obtener_servicio_entrenamiento()
         resultado = training_service.entrenar_modelo_automatico()
         
         # Registrar en bitácora
@@ -102,7 +103,7 @@ def re_entrenar_ia(request):
                 'error': 'Servicio de AI Training no disponible'
             }, status=503)
             
-        training_service = AITrainingService()
+        training_service = obtener_servicio_entrenamiento()
         resultado = training_service.re_entrenar_automatico()
         
         logger.info(f"🔄 Re-entrenamiento solicitado por: {request.user.email}")
@@ -136,7 +137,7 @@ def estadisticas_modelo_ia(request):
                 'error': 'Servicio de AI Training no disponible'
             }, status=503)
             
-        training_service = AITrainingService()
+        training_service = obtener_servicio_entrenamiento()
         estadisticas = training_service.obtener_estadisticas_modelo()
         
         return Response({
@@ -169,18 +170,8 @@ def probar_modelo_entrenado(request):
         
         imagen = request.FILES['imagen']
         
-        # Procesar imagen con face_recognition
-        import face_recognition
-        import numpy as np
-        from PIL import Image
-        import io
-        
-        # Cargar imagen
-        imagen_pil = Image.open(io.BytesIO(imagen.read()))
-        imagen_rgb = np.array(imagen_pil)
-        
-        # Extraer encoding facial
-        encodings = face_recognition.face_encodings(imagen_rgb)
+        # Extraer encoding facial con el proveedor compartido
+        encodings = obtener_provider_tiempo_real().codificar_rostros(imagen.read())
         
         if not encodings:
             return Response({
@@ -195,7 +186,7 @@ def probar_modelo_entrenado(request):
                 'error': 'Servicio de AI Training no disponible'
             }, status=503)
             
-        training_service = AITrainingService()
+        training_service = obtener_servicio_entrenamiento()
         resultado_prediccion = training_service.predecir_con_modelo_entrenado(encodings[0])
         
         if not resultado_prediccion['success']:
@@ -245,33 +236,32 @@ def dashboard_entrenamiento_ia(request):
                 'error': 'Servicio de AI Training no disponible'
             }, status=503)
             
-        training_service = AITrainingService()
+        training_service = obtener_servicio_entrenamiento()
         estadisticas = training_service.obtener_estadisticas_modelo()
         
         # Estadísticas adicionales
         from seguridad.models import BitacoraAcciones, ReconocimientoFacial
+        from core.services.archivo_bitacora import contar
         from django.utils import timezone
         from datetime import timedelta
         
-        hoy = timezone.now().date()
-        ayer = hoy - timedelta(days=1)
+        inicio_hoy = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+        inicio_ayer = inicio_hoy - timedelta(days=1)
         
-        # Conteos de entrenamientos
-        entrenamientos_exitosos = BitacoraAcciones.objects.filter(
-            tipo_accion='AI_TRAINING_SUCCESS',
-            fecha_accion__date__gte=ayer
-        ).count()
+        def contar_tipo(tipo_accion, desde, hasta=None):
+            # Tabla y registros ya archivados
+            return contar(
+                'seguridad_bitacora', desde, hasta,
+                queryset=BitacoraAcciones.objects.filter(tipo_accion=tipo_accion),
+                incluir=lambda b: b.tipo_accion == tipo_accion,
+            )
         
-        entrenamientos_fallidos = BitacoraAcciones.objects.filter(
-            tipo_accion='AI_TRAINING_ERROR',
-            fecha_accion__date__gte=ayer
-        ).count()
+        # Conteos de entrenamientos
+        entrenamientos_exitosos = contar_tipo('AI_TRAINING_SUCCESS', inicio_ayer)
+        entrenamientos_fallidos = contar_tipo('AI_TRAINING_ERROR', inicio_ayer)
         
         # Pruebas del modelo
-        pruebas_modelo = BitacoraAcciones.objects.filter(
-            tipo_accion='AI_MODEL_TEST',
-            fecha_accion__date=hoy
-        ).count()
+        pruebas_modelo = contar_tipo('AI_MODEL_TEST', inicio_hoy, inicio_hoy + timedelta(days=1))
         
         dashboard_data = {
             **estadisticas,
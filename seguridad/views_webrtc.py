@@ -87,7 +87,7 @@ def webrtc_face_recognition(request):
         from PIL import Image
         import io
         import base64
-        from .services.realtime_face_provider import OpenCVFaceProvider
+        from .services.realtime_face_provider import get_face_provider
         from .models import Copropietarios
         
         logger.info("📷 Frame recibido para reconocimiento facial")
@@ -126,8 +126,8 @@ def webrtc_face_recognition(request):
                 'message': 'No se pudo decodificar la imagen'
             }, status=400)
         
-        # Inicializar proveedor de reconocimiento
-        provider = OpenCVFaceProvider()
+        # Proveedor de reconocimiento compartido del proceso
+        provider = get_face_provider()
         
         # Realizar reconocimiento facial
         logger.info("🔍 Iniciando reconocimiento facial...")
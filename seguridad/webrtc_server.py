@@ -8,10 +8,13 @@ Usa Socket.IO para comunicación bidireccional y procesamiento en streaming
 import socketio
 import cv2
 import numpy as np
+import asyncio
 import base64
 import json
 import logging
+from concurrent.futures import ProcessPoolExecutor
 from typing import Dict, List, Optional
+from asgiref.sync import sync_to_async
 from django.conf import settings
 import django
 import os
@@ -23,7 +26,14 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 django.setup()
 
 from seguridad.models import ReconocimientoFacial, Copropietarios, fn_bitacora_log
-from seguridad.services.realtime_face_provider import OpenCVFaceProvider, YOLOFaceProvider
+from seguridad.services.realtime_face_provider import detectar_caras_frame, get_face_provider
+try:
+    from seguridad.services.realtime_face_provider import YOLOFaceProvider
+except ImportError:
+    YOLOFaceProvider = None
+from seguridad.services.face_tracker import FaceTracker
+from seguridad.services.frame_sampler import AdaptiveFrameSampler
+from seguridad.services.gallery_sync import GALERIA_RESIDENTES, obtener_galeria_sincronizada
 
 # Importar configuración WebRTC
 try:
@@ -64,8 +74,10 @@ class WebRTCFaceRecognitionServer:
         )
         
         # Configurar proveedores de IA
-        self.opencv_provider = OpenCVFaceProvider()
+        self.opencv_provider = get_face_provider()
         try:
+            if YOLOFaceProvider is None:
+                raise ImportError("YOLOFaceProvider no está disponible")
             self.yolo_provider = YOLOFaceProvider()
             self.use_yolo = True
             logger.info("✅ YOLO provider cargado exitosamente")
@@ -74,10 +86,38 @@ class WebRTCFaceRecognitionServer:
             self.use_yolo = False
             logger.warning(f"⚠️ YOLO no disponible, usando OpenCV puro: {str(e)}")
         
-        # Cache de personas en BD para optimizar rendimiento
-        self.personas_cache = {}
-        self.cache_timestamp = 0
-        self.cache_duration = 300  # 5 minutos
+        # Galería de rostros en memoria, sincronizada por deltas
+        self.galeria_residentes = obtener_galeria_sincronizada(GALERIA_RESIDENTES)
+        self.galeria = self.galeria_residentes.galeria
+        
+        # Pool de procesos acotado para la inferencia (detección + encoding),
+        # así el event loop solo decodifica, compara contra la galería y emite
+        self.inference_workers = FACE_RECOGNITION_SETTINGS.get(
+            'INFERENCE_WORKERS', min(2, os.cpu_count() or 1)
+        )
+        self.inference_pool = (
+            ProcessPoolExecutor(max_workers=self.inference_workers)
+            if self.opencv_provider.available else None
+        )
+        
+        # Backpressure por cliente: a lo sumo un frame en proceso y uno
+        # pendiente; si llega otro, reemplaza al pendiente (frame obsoleto)
+        self.frames_pendientes: Dict[str, dict] = {}
+        self.clientes_procesando: Dict[str, asyncio.Task] = {}
+        
+        # Seguimiento de rostros por cliente para no re-identificar en cada frame
+        self.tracker = FaceTracker(
+            iou_minimo=FACE_RECOGNITION_SETTINGS.get('TRACK_IOU_THRESHOLD', 0.4),
+            decaimiento=FACE_RECOGNITION_SETTINGS.get('TRACK_CONFIDENCE_DECAY', 0.97),
+            confianza_minima=FACE_RECOGNITION_SETTINGS.get('TRACK_MIN_CONFIDENCE', 70.0),
+            expiracion_ms=FACE_RECOGNITION_SETTINGS.get('TRACK_EXPIRY_MS', 1000)
+        )
+        
+        # Omite frames casi idénticos al último procesado de cada cliente
+        self.sampler = AdaptiveFrameSampler(
+            umbral=FACE_RECOGNITION_SETTINGS.get('FRAME_DIFF_THRESHOLD', 4.0),
+            intervalo_maximo=FACE_RECOGNITION_SETTINGS.get('FRAME_MAX_SKIP_SECONDS', 2.0)
+        )
         
         # Estadísticas en tiempo real
         self.stats = {
@@ -85,7 +125,10 @@ class WebRTCFaceRecognitionServer:
             'total_frames_processed': 0,
             'successful_recognitions': 0,
             'failed_recognitions': 0,
-            'average_processing_time': 0.0
+            'average_processing_time': 0.0,
+            'frames_dropped': 0,
+            'frames_skipped': 0,
+            'inference_queue_depth': 0
         }
         
         # Configurar event handlers
@@ -105,6 +148,7 @@ class WebRTCFaceRecognitionServer:
                 'provider': 'YOLO + OpenCV' if self.use_yolo else 'OpenCV',
                 'max_fps': 10,  # Máximo 10 FPS para no sobrecargar
                 'supported_formats': ['jpeg', 'png', 'webp'],
+                'binary_frames': True,  # 'image' puede enviarse como adjunto binario
                 'max_resolution': {'width': 1280, 'height': 720}
             }, room=sid)
             
@@ -115,64 +159,31 @@ class WebRTCFaceRecognitionServer:
         async def disconnect(sid):
             """Cliente desconectado"""
             self.stats['connected_clients'] = max(0, self.stats['connected_clients'] - 1)
+            self.frames_pendientes.pop(sid, None)
+            self.sampler.olvidar(sid)
+            self.tracker.olvidar(sid)
+            self.actualizar_profundidad_cola()
             logger.info(f"❌ Cliente desconectado: {sid} (Total: {self.stats['connected_clients']})")
         
         @self.sio.event
         async def process_frame(sid, data):
-            """Procesar frame de video en tiempo real"""
-            try:
-                import time
-                start_time = time.time()
-                
-                # Validar datos recibidos
-                if not isinstance(data, dict) or 'image' not in data:
-                    await self.sio.emit('error', {
-                        'message': 'Formato de datos inválido',
-                        'code': 'INVALID_DATA'
-                    }, room=sid)
-                    return
-                
-                # Decodificar imagen base64
-                image_data = data['image']
-                if image_data.startswith('data:image'):
-                    # Remover prefijo data:image/jpeg;base64,
-                    image_data = image_data.split(',')[1]
-                
-                # Convertir a bytes
-                image_bytes = base64.b64decode(image_data)
-                
-                # Procesar con IA
-                resultado = await self.process_face_recognition(image_bytes, sid)
-                
-                # Calcular tiempo de procesamiento
-                processing_time = time.time() - start_time
-                self.stats['total_frames_processed'] += 1
-                
-                # Actualizar promedio de tiempo de procesamiento
-                current_avg = self.stats['average_processing_time']
-                total_frames = self.stats['total_frames_processed']
-                self.stats['average_processing_time'] = (
-                    (current_avg * (total_frames - 1) + processing_time) / total_frames
-                )
-                
-                # Enviar resultado
-                await self.sio.emit('recognition_result', {
-                    **resultado,
-                    'processing_time': round(processing_time * 1000, 2),  # En millisegundos
-                    'frame_id': data.get('frame_id', 0),
-                    'timestamp': time.time()
-                }, room=sid)
-                
-                # Enviar estadísticas actualizadas cada 10 frames
-                if self.stats['total_frames_processed'] % 10 == 0:
-                    await self.sio.emit('stats', self.stats, room=sid)
-                
-            except Exception as e:
-                logger.error(f"Error procesando frame: {str(e)}")
+            """Encolar frame de video; solo se conserva el más reciente por cliente"""
+            # Validar datos recibidos
+            if not isinstance(data, dict) or 'image' not in data:
                 await self.sio.emit('error', {
-                    'message': f'Error procesando frame: {str(e)}',
-                    'code': 'PROCESSING_ERROR'
+                    'message': 'Formato de datos inválido',
+                    'code': 'INVALID_DATA'
                 }, room=sid)
+                return
+            
+            if sid in self.frames_pendientes:
+                # El frame pendiente quedó obsoleto antes de procesarse
+                self.stats['frames_dropped'] += 1
+            self.frames_pendientes[sid] = data
+            
+            if sid not in self.clientes_procesando:
+                self.clientes_procesando[sid] = asyncio.create_task(self.consumir_frames(sid))
+            self.actualizar_profundidad_cola()
         
         @self.sio.event
         async def get_stats(sid):
@@ -191,6 +202,131 @@ class WebRTCFaceRecognitionServer:
             await self.sio.emit('stats', self.stats, room=sid)
             logger.info(f"📊 Estadísticas reseteadas por cliente: {sid}")
     
+    def actualizar_profundidad_cola(self):
+        """Frames en inferencia más frames pendientes de todos los clientes"""
+        self.stats['inference_queue_depth'] = len(self.clientes_procesando) + len(self.frames_pendientes)
+    
+    async def consumir_frames(self, sid: str):
+        """
+        Procesar los frames de un cliente de a uno, tomando siempre el más reciente
+        """
+        try:
+            while sid in self.frames_pendientes:
+                data = self.frames_pendientes.pop(sid)
+                self.actualizar_profundidad_cola()
+                await self.procesar_frame(sid, data)
+        finally:
+            self.clientes_procesando.pop(sid, None)
+            self.actualizar_profundidad_cola()
+    
+    async def procesar_frame(self, sid: str, data: dict):
+        """Procesar un frame de video y emitir el resultado al cliente"""
+        try:
+            import time
+            start_time = time.time()
+            
+            image_bytes = self.decodificar_frame(data['image'])
+            
+            # Frames casi idénticos al anterior reutilizan el último resultado
+            loop = asyncio.get_running_loop()
+            procesar = await loop.run_in_executor(None, self.sampler.debe_procesar, sid, image_bytes)
+            ultimo = self.sampler.ultimo_resultado(sid)
+            if not procesar and ultimo is not None:
+                self.stats['frames_skipped'] += 1
+                await self.sio.emit('recognition_result', {
+                    **ultimo,
+                    'frame_skipped': True,
+                    'frame_id': data.get('frame_id', 0),
+                    'timestamp': time.time()
+                }, room=sid)
+                return
+            
+            # Procesar con IA
+            resultado = await self.process_face_recognition(image_bytes, sid)
+            self.sampler.guardar_resultado(sid, resultado)
+            
+            # Calcular tiempo de procesamiento
+            processing_time = time.time() - start_time
+            self.stats['total_frames_processed'] += 1
+            
+            # Actualizar promedio de tiempo de procesamiento
+            current_avg = self.stats['average_processing_time']
+            total_frames = self.stats['total_frames_processed']
+            self.stats['average_processing_time'] = (
+                (current_avg * (total_frames - 1) + processing_time) / total_frames
+            )
+            
+            # Enviar resultado
+            await self.sio.emit('recognition_result', {
+                **resultado,
+                'processing_time': round(processing_time * 1000, 2),  # En millisegundos
+                'frame_id': data.get('frame_id', 0),
+                'timestamp': time.time(),
+                'queue_depth': self.stats['inference_queue_depth']
+            }, room=sid)
+            
+            # Enviar estadísticas actualizadas cada 10 frames
+            if self.stats['total_frames_processed'] % 10 == 0:
+                await self.sio.emit('stats', self.stats, room=sid)
+                logger.info(
+                    f"📈 Cola de inferencia: {self.stats['inference_queue_depth']} "
+                    f"(descartados: {self.stats['frames_dropped']})"
+                )
+            
+        except Exception as e:
+            logger.error(f"Error procesando frame: {str(e)}")
+            await self.sio.emit('error', {
+                'message': f'Error procesando frame: {str(e)}',
+                'code': 'PROCESSING_ERROR'
+            }, room=sid)
+    
+    @staticmethod
+    def decodificar_frame(image) -> bytes:
+        """
+        Bytes del frame recibido como adjunto binario (JPEG crudo) o como
+        string base64 / data URL
+
+        Los adjuntos binarios de Socket.IO llegan como bytes y se usan tal cual,
+        sin copias ni el 33% extra de base64.
+        """
+        if isinstance(image, bytes):
+            return image
+        if isinstance(image, (bytearray, memoryview)):
+            return memoryview(image).tobytes()
+        if image.startswith('data:image'):
+            # Remover prefijo data:image/jpeg;base64,
+            image = image[image.index(',') + 1:]
+        return base64.b64decode(image)
+    
+    async def reconocer_en_pool(self, provider, image_bytes: bytes, sid: str) -> List[Dict]:
+        """
+        Detección y encoding en el pool de procesos; el match contra la
+        galería se hace aquí porque la galería vive en este proceso
+        
+        Las caras que siguen a un track ya identificado no se vuelven a
+        codificar: el tracker reutiliza su identidad hasta que la confianza decae.
+        """
+        if self.inference_pool is None or not hasattr(provider, 'reconocer_encodings'):
+            # Modo simulación: no hay inferencia pesada que delegar
+            return provider.procesar_reconocimiento_tiempo_real(image_bytes, self.galeria)
+        
+        loop = asyncio.get_running_loop()
+        ubicaciones, encodings = await loop.run_in_executor(
+            self.inference_pool, detectar_caras_frame,
+            image_bytes, self.tracker.cajas_confiables(sid), self.tracker.iou_minimo
+        )
+        # También sin caras: los tracks que dejan de verse pierden su identidad
+        return self.tracker.actualizar(
+            sid, ubicaciones, encodings,
+            lambda nuevos: provider.reconocer_encodings(nuevos, self.galeria)
+        )
+    
+    def cerrar(self):
+        """Liberar el pool de inferencia al apagar el servidor"""
+        if self.inference_pool is not None:
+            self.inference_pool.shutdown(wait=False, cancel_futures=True)
+            self.inference_pool = None
+    
     async def process_face_recognition(self, image_bytes: bytes, client_id: str) -> Dict:
         """
         Procesar reconocimiento facial con la imagen recibida
@@ -208,53 +344,50 @@ class WebRTCFaceRecognitionServer:
                 provider_name = "OpenCV"
             
             # Procesar reconocimiento
-            resultados = provider.procesar_reconocimiento_tiempo_real(
-                image_bytes, 
-                list(self.personas_cache.values())
-            )
+            resultados = await self.reconocer_en_pool(provider, image_bytes, client_id)
+            reconocidos = [r for r in resultados if r.get('reconocido')]
             
-            if resultados and len(resultados) > 0:
+            if reconocidos:
                 # Reconocimiento exitoso
-                resultado = resultados[0]
-                persona = resultado['persona']
+                resultado = max(reconocidos, key=lambda r: r['confianza'])
                 confianza = resultado['confianza']
                 
                 self.stats['successful_recognitions'] += 1
                 
-                # Registrar en bitácora (de forma asíncrona)
-                self.log_recognition_async(
-                    persona=persona,
-                    confianza=confianza,
-                    client_id=client_id,
-                    provider_name=provider_name,
-                    success=True
-                )
+                # Registrar en bitácora solo la primera identificación de cada track
+                if resultado.get('evento', 'nuevo') == 'nuevo':
+                    persona = await sync_to_async(Copropietarios.objects.get)(id=resultado['persona']['id'])
+                    await self.log_recognition_async(
+                        persona=persona,
+                        confianza=confianza,
+                        client_id=client_id,
+                        provider_name=provider_name,
+                        success=True
+                    )
                 
                 return {
                     'reconocido': True,
-                    'persona': {
-                        'id': persona.id,
-                        'nombre': f"{persona.nombres} {persona.apellidos}",
-                        'vivienda': persona.unidad_residencial,
-                        'tipo_residente': persona.tipo_residente,
-                        'documento': persona.numero_documento
-                    },
+                    'persona': resultado['persona'],
                     'confianza': round(confianza, 3),
                     'proveedor': provider_name,
-                    'threshold_usado': provider.tolerance if hasattr(provider, 'tolerance') else 0.6
+                    'threshold_usado': provider.tolerance if hasattr(provider, 'tolerance') else 0.6,
+                    'track_id': resultado.get('track_id'),
+                    'evento': resultado.get('evento')
                 }
             
             else:
                 # No se reconoció a nadie
                 self.stats['failed_recognitions'] += 1
                 
-                self.log_recognition_async(
-                    persona=None,
-                    confianza=0.0,
-                    client_id=client_id,
-                    provider_name=provider_name,
-                    success=False
-                )
+                # Un rostro desconocido se registra una vez por track, no por frame
+                if any(r.get('evento', 'nuevo') == 'nuevo' for r in resultados):
+                    await self.log_recognition_async(
+                        persona=None,
+                        confianza=0.0,
+                        client_id=client_id,
+                        provider_name=provider_name,
+                        success=False
+                    )
                 
                 return {
                     'reconocido': False,
@@ -278,40 +411,17 @@ class WebRTCFaceRecognitionServer:
     
     async def update_personas_cache(self):
         """
-        Actualizar cache de personas con reconocimiento facial
+        Aplicar a la galería los cambios registrados por las señales de
+        ReconocimientoFacial y Persona (solo se recargan las filas cambiadas)
         """
-        import time
-        current_time = time.time()
-        
-        # Solo actualizar si han pasado más de 5 minutos
-        if current_time - self.cache_timestamp < self.cache_duration:
-            return
-        
         try:
-            # Obtener todas las personas con reconocimiento activo
-            reconocimientos = ReconocimientoFacial.objects.filter(
-                activo=True
-            ).select_related('copropietario')
-            
-            new_cache = {}
-            for reconocimiento in reconocimientos:
-                persona_id = reconocimiento.copropietario.id
-                new_cache[persona_id] = {
-                    'persona': reconocimiento.copropietario,
-                    'reconocimiento': reconocimiento
-                }
-            
-            self.personas_cache = new_cache
-            self.cache_timestamp = current_time
-            
-            logger.info(f"🔄 Cache actualizado: {len(new_cache)} personas con reconocimiento")
-            
+            self.galeria = await sync_to_async(self.galeria_residentes.sincronizar)()
         except Exception as e:
             logger.error(f"Error actualizando cache de personas: {str(e)}")
     
-    def log_recognition_async(self, persona, confianza, client_id, provider_name, success):
+    async def log_recognition_async(self, persona, confianza, client_id, provider_name, success):
         """
-        Registrar reconocimiento en bitácora de forma asíncrona
+        Registrar reconocimiento en bitácora sin bloquear el event loop
         """
         try:
             descripcion = (
@@ -322,7 +432,7 @@ class WebRTCFaceRecognitionServer:
             if persona:
                 descripcion += f' - Persona: {persona.nombres} {persona.apellidos}'
             
-            fn_bitacora_log(
+            await sync_to_async(fn_bitacora_log)(
                 tipo_accion='RECONOCIMIENTO_WEBRTC',
                 descripcion=descripcion,
                 usuario=None,  # Usuario anónimo para WebRTC
@@ -340,4 +450,4 @@ class WebRTCFaceRecognitionServer:
 webrtc_server = WebRTCFaceRecognitionServer()
 
 # Aplicación ASGI para integrar con Django
-app = socketio.ASGIApp(webrtc_server.sio, other_asgi_app=None)
\ No newline at end of file
+app = socketio.ASGIApp(webrtc_server.sio, other_asgi_app=None, on_shutdown=webrtc_server.cerrar)
\ No newline at end of file
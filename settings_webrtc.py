@@ -31,7 +31,14 @@ FACE_RECOGNITION_SETTINGS = {
         'height': 720
     },
     'TIMEOUT_SECONDS': 30,
-    'MAX_CONCURRENT_CLIENTS': 10
+    'MAX_CONCURRENT_CLIENTS': 10,
+    'INFERENCE_WORKERS': int(os.getenv('WEBRTC_INFERENCE_WORKERS', '2')),  # Procesos para detección/encoding
+    'FRAME_DIFF_THRESHOLD': 4.0,  # Diferencia media (0-255) para considerar un frame igual al anterior
+    'FRAME_MAX_SKIP_SECONDS': 2.0,  # Procesar al menos un frame cada N segundos aunque no cambie
+    'TRACK_IOU_THRESHOLD': 0.4,  # IoU mínimo para seguir un rostro entre frames
+    'TRACK_CONFIDENCE_DECAY': 0.97,  # Decaimiento por frame de la confianza de un track
+    'TRACK_MIN_CONFIDENCE': 70.0,  # Por debajo se vuelve a calcular el encoding
+    'TRACK_EXPIRY_MS': 1000  # Sin asociarse en este tiempo, el track pierde su identidad
 }
 
 # Configuración de proveedores